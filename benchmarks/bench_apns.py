@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+푸시 한 건을 보낼 때의 지연 시간을 APNS.send_push의 이전 구현 (호출마다 새 HTTP/2 연결 + JWT 서명)과
+프로세스 안에서 연결 / provider token을 재사용하는 현재 구현으로 비교합니다.
+
+실제 APNs 대신 로컬에서 실행하는 HTTP/2 (TLS) 스텁 서버에 보냅니다.
+--latency를 지정하면 스텁 서버가 연결을 받을 때마다 그만큼 지연시켜 네트워크 왕복 시간을 흉내냅니다.
+
+usage: python -m benchmarks.bench_apns [--count 200] [--latency 0.0]
+"""
+
+import argparse
+import datetime
+import os
+import socket
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+from typing import List, Literal, Tuple
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flitz.settings_dev')
+django.setup()
+
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from flitz.apns import APNS, APNSIdentity
+
+
+def create_private_key() -> ec.EllipticCurvePrivateKey:
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+def create_certificate(directory: str) -> Tuple[str, str]:
+    key = create_private_key()
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    certificate = x509.CertificateBuilder() \
+        .subject_name(name) \
+        .issuer_name(name) \
+        .public_key(key.public_key()) \
+        .serial_number(x509.random_serial_number()) \
+        .not_valid_before(now - datetime.timedelta(days=1)) \
+        .not_valid_after(now + datetime.timedelta(days=1)) \
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost')]), critical=False) \
+        .sign(key, hashes.SHA256())
+
+    cert_file = os.path.join(directory, 'cert.pem')
+    key_file = os.path.join(directory, 'key.pem')
+
+    with open(cert_file, 'wb') as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+
+    with open(key_file, 'wb') as f:
+        f.write(key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ))
+
+    return cert_file, key_file
+
+
+class StubAPNSServer:
+    """
+    모든 요청에 200으로 응답하는 최소한의 HTTP/2 서버
+    """
+
+    def __init__(self, cert_file: str, key_file: str, latency: float):
+        self.latency = latency
+
+        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.ssl_context.load_cert_chain(cert_file, key_file)
+        self.ssl_context.set_alpn_protocols(['h2'])
+
+        self.socket = socket.create_server(('127.0.0.1', 0))
+        self.port = self.socket.getsockname()[1]
+
+    def start(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            (sock, _) = self.socket.accept()
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock: socket.socket):
+        if self.latency:
+            time.sleep(self.latency)
+
+        try:
+            sock = self.ssl_context.wrap_socket(sock, server_side=True)
+        except (ssl.SSLError, OSError):
+            return
+
+        connection = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        connection.initiate_connection()
+        sock.sendall(connection.data_to_send())
+
+        with sock:
+            while True:
+                try:
+                    data = sock.recv(65535)
+                except OSError:
+                    return
+
+                if not data:
+                    return
+
+                for event in connection.receive_data(data):
+                    if isinstance(event, h2.events.DataReceived):
+                        connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        connection.send_headers(event.stream_id, [(':status', '200'), ('apns-id', 'stub')], end_stream=True)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+
+                sock.sendall(connection.data_to_send())
+
+
+class LegacyAPNS(APNS):
+    """
+    연결 / 토큰 재사용 이전의 APNS.send_push
+    """
+
+    def __init__(self, identity: APNSIdentity, base_url: str, verify: ssl.SSLContext):
+        super().__init__(identity=identity)
+
+        self.base_url = base_url
+        self.verify = verify
+
+    def send_push(self, payload: dict, device_tokens: List[str], push_type: Literal['alert', 'background'] = 'alert'):
+        headers = {
+            'authorization': 'bearer ' + self.identity._sign('ES256', time.time()),
+            'apns-topic': self.identity.bundle_id,
+            'apns-push-type': push_type,
+            'apns-priority': '10' if push_type == 'alert' else '5',
+            'apns-expiration': '0',
+        }
+
+        with httpx.Client(http2=True, verify=self.verify) as client:
+            for token in device_tokens:
+                client.post(self.base_url + token, json=payload, headers=headers)
+
+
+class LocalAPNS(APNS):
+    def __init__(self, identity: APNSIdentity, base_url: str, verify: ssl.SSLContext):
+        super().__init__(identity=identity)
+
+        self.base_url = base_url
+        self.verify = verify
+
+    def _create_client(self) -> httpx.Client:
+        # 스텁 서버의 자체 서명 인증서를 신뢰하도록 verify만 바꿉니다
+        return httpx.Client(
+            http2=True,
+            limits=httpx.Limits(keepalive_expiry=self.KEEPALIVE_EXPIRY),
+            verify=self.verify,
+        )
+
+
+def run(count: int, latency: float):
+    with tempfile.TemporaryDirectory() as directory:
+        (cert_file, key_file) = create_certificate(directory)
+
+        server = StubAPNSServer(cert_file, key_file, latency)
+        server.start()
+
+        verify = ssl.create_default_context(cafile=cert_file)
+        base_url = f'https://localhost:{server.port}/3/device/'
+
+        private_key = create_private_key().private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ).decode('ascii')
+
+        identity = APNSIdentity(private_key=private_key, team_id='TEAM', key_id='KEY', bundle_id='com.example.flitz')
+        payload = {'aps': {'alert': {'title': 'title', 'body': 'body'}, 'mutable-content': 0}}
+
+        def bench(label, apns: APNS):
+            # 첫 호출 (연결 수립)은 측정에서 제외합니다
+            apns.send_push(payload, ['warmup'])
+
+            timings = []
+
+            for index in range(count):
+                started_at = time.perf_counter()
+                apns.send_push(payload, [f'device-{index}'])
+                timings.append(time.perf_counter() - started_at)
+
+            timings.sort()
+
+            print(
+                f'{label:<36} '
+                f'mean {statistics.mean(timings) * 1000:>8.3f} ms  '
+                f'p50 {timings[len(timings) // 2] * 1000:>8.3f} ms  '
+                f'p99 {timings[int(len(timings) * 0.99)] * 1000:>8.3f} ms'
+            )
+
+        bench('legacy (new connection + JWT)', LegacyAPNS(identity, base_url, verify))
+
+        apns = LocalAPNS(identity, base_url, verify)
+        bench('persistent connection + cached JWT', apns)
+        apns.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to delay each new connection')
+
+    args = parser.parse_args()
+    run(args.count, args.latency)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+CardObject / DirectMessage content 디코딩 속도를
+dacite.from_dict()와 직접 작성한 디코더 (card.objdef.load_card_object, messaging.objdef.load_direct_message_content)로 비교합니다.
+
+usage: python -m benchmarks.bench_objdef [--elements 20] [--count 20000]
+"""
+
+import argparse
+import os
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flitz.settings_dev')
+django.setup()
+
+from dacite import from_dict
+
+from card.objdef import CardObject, load_card_object
+from messaging.objdef import DirectMessageAttachmentContent, load_direct_message_content
+
+
+def create_card_content(element_count: int) -> dict:
+    elements = []
+
+    for index in range(element_count):
+        transform = {'position': {'x': index * 1.5, 'y': index * 2.0}, 'scale': 1.0, 'rotation': 0.0}
+
+        if index % 2 == 0:
+            elements.append({
+                'id': f'text-{index}', 'type': 'text', 'transform': transform, 'zIndex': index,
+                'text': f'Hello, World! #{index}',
+            })
+        else:
+            elements.append({
+                'id': f'image-{index}', 'type': 'image', 'transform': transform, 'zIndex': index,
+                'source': {'id': f'asset-{index}', 'public_url': None},
+                'size': {'width': 320.0, 'height': 240.0},
+            })
+
+    return {
+        'schema_version': '1.0',
+        'background': {'id': 'background', 'public_url': None},
+        'elements': elements,
+        'properties': {'theme': 'dark'},
+    }
+
+
+def create_attachment_content() -> dict:
+    return {
+        'type': 'attachment',
+        'attachment_type': 'image',
+        'attachment_id': '0192a7f0-0000-7000-8000-000000000000',
+        'width': 720,
+        'height': 1280,
+        'public_url': None,
+        'thumbnail_url': None,
+    }
+
+
+def measure(name: str, func, count: int) -> float:
+    elapsed = min(timeit.repeat(func, number=count, repeat=3)) / count
+    print(f'{name:<32} {elapsed * 1000 * 1000:>10.2f} us/op')
+
+    return elapsed
+
+
+def run(element_count: int, count: int):
+    card_content = create_card_content(element_count)
+    attachment_content = create_attachment_content()
+
+    # 두 디코더의 결과가 같은지 먼저 확인합니다
+    assert load_card_object(card_content) == from_dict(data_class=CardObject, data=card_content)
+    assert load_direct_message_content(attachment_content) == from_dict(data_class=DirectMessageAttachmentContent, data=attachment_content)
+
+    print(f'CardObject ({element_count} elements), count={count}')
+    dacite_elapsed = measure('dacite.from_dict', lambda: from_dict(data_class=CardObject, data=card_content), count)
+    fast_elapsed = measure('load_card_object', lambda: load_card_object(card_content), count)
+    print(f'{"speedup":<32} {dacite_elapsed / fast_elapsed:>10.1f}x')
+
+    print()
+
+    print(f'DirectMessageAttachmentContent, count={count}')
+    dacite_elapsed = measure('dacite.from_dict', lambda: from_dict(data_class=DirectMessageAttachmentContent, data=attachment_content), count)
+    fast_elapsed = measure('load_direct_message_content', lambda: load_direct_message_content(attachment_content), count)
+    print(f'{"speedup":<32} {dacite_elapsed / fast_elapsed:>10.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--elements', type=int, default=20)
+    parser.add_argument('--count', type=int, default=20000)
+
+    args = parser.parse_args()
+
+    run(args.elements, args.count)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+flitz.storage.StorageURLBuilder와 스토리지 백엔드(django-storages S3Storage)의 URL 생성 속도를 비교합니다.
+실제 S3 / MinIO에 접속하지 않습니다.
+
+usage: python -m benchmarks.bench_storage_url [--count 10000]
+"""
+
+import argparse
+import os
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flitz.settings_dev')
+django.setup()
+
+from django.core.files.storage import default_storage
+
+from flitz.storage import StorageURLBuilder
+
+
+def run(count: int):
+    names = [f'card_assets/{i % 256:02x}/{i:08d}.jpg' for i in range(1000)]
+
+    def bench(label, func):
+        elapsed = timeit.timeit(lambda: [func(name) for name in names], number=max(1, count // len(names)))
+        per_call = elapsed / (max(1, count // len(names)) * len(names))
+        print(f'{label:<40} {per_call * 1_000_000:>10.2f} us/call')
+
+    public_builder = StorageURLBuilder(default_storage, public_base_url='http://localhost:9000/flitz')
+    signed_builder = StorageURLBuilder(default_storage)
+
+    bench('S3Storage.url()', default_storage.url)
+    bench('StorageURLBuilder.url() (public)', public_builder.url)
+
+    # 캐시를 채운 뒤 측정합니다
+    for name in names:
+        signed_builder.url(name)
+
+    bench('StorageURLBuilder.url() (signed, cached)', signed_builder.url)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=10000)
+
+    args = parser.parse_args()
+    run(args.count)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+flitz.thumbgen.generate_thumbnail의 처리 시간과 최대 메모리 사용량 (peak RSS)을
+축소 디코딩 (JPEG draft mode + Image.reduce()) 적용 이전 구현과 비교합니다.
+
+peak RSS는 프로세스 단위로만 측정할 수 있으므로, 구현마다 별도의 프로세스에서 실행합니다.
+--corpus를 지정하지 않으면 12MP / 48MP 크기의 JPEG 이미지를 생성해서 사용합니다.
+
+usage: python -m benchmarks.bench_thumbnail [--corpus DIR] [--count 5] [--max-height 1280]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import List
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flitz.settings_dev')
+django.setup()
+
+from PIL import Image, ImageOps
+
+from flitz.thumbgen import generate_thumbnail
+
+
+def legacy_generate_thumbnail(input_file, max_height: int = 768, jpeg_quality: int = 85):
+    """
+    축소 디코딩 적용 이전의 generate_thumbnail (원본 크기로 디코딩 -> exif_transpose -> LANCZOS)
+    """
+    image = Image.open(input_file)
+    image = ImageOps.exif_transpose(image)
+
+    if image.height > max_height:
+        image = image.resize((int(max_height * image.width / image.height), max_height), Image.Resampling.LANCZOS)
+
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    with tempfile.TemporaryFile() as temp_file:
+        image.save(temp_file, format='JPEG', quality=jpeg_quality, optimize=True)
+
+    return image.size
+
+
+IMPLEMENTATIONS = {
+    'legacy': legacy_generate_thumbnail,
+    'current': lambda input_file, max_height: generate_thumbnail(input_file, max_height)[1],
+}
+
+
+def create_corpus(directory: str) -> List[str]:
+    paths = []
+
+    # 48MP 이미지는 세로로 촬영된 사진처럼 EXIF 방향 정보를 넣습니다
+    for (label, size, orientation) in (('12mp', (4032, 3024), 1), ('48mp', (8064, 6048), 6)):
+        path = os.path.join(directory, f'{label}.jpg')
+
+        # 노이즈가 섞인 이미지를 사용해야 실제 사진과 비슷한 디코딩 비용이 듭니다
+        noise = Image.effect_noise((size[0] // 8, size[1] // 8), 64).resize(size, Image.Resampling.BILINEAR)
+        image = Image.merge('RGB', (noise, noise.rotate(90, expand=False), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+
+        image.save(path, format='JPEG', quality=90, exif=exif.tobytes())
+        paths.append(path)
+
+    return paths
+
+
+def run_implementation(name: str, paths: List[str], count: int, max_height: int, results):
+    func = IMPLEMENTATIONS[name]
+
+    elapsed = []
+
+    for _ in range(count):
+        for path in paths:
+            with open(path, 'rb') as input_file:
+                started_at = time.perf_counter()
+                func(input_file, max_height)
+                elapsed.append(time.perf_counter() - started_at)
+
+    results[name] = (sum(elapsed) / len(elapsed), peak_rss_mb())
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss는 exec 이전 (부모 프로세스)의 값을 물려받으므로, 가능하면 VmHWM을 사용합니다
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # Linux에서는 KB, macOS에서는 bytes 단위입니다
+    ru_maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else ru_maxrss / 1024
+
+
+def run(paths: List[str], count: int, max_height: int):
+    context = multiprocessing.get_context('spawn')
+    results = context.Manager().dict()
+
+    for name in IMPLEMENTATIONS:
+        process = context.Process(target=run_implementation, args=(name, paths, count, max_height, results))
+        process.start()
+        process.join()
+
+    print(f'{len(paths)} images, max_height={max_height}, count={count}')
+
+    for name in IMPLEMENTATIONS:
+        (mean_elapsed, peak_rss) = results[name]
+        print(f'{name:<10} {mean_elapsed * 1000:>10.1f} ms/image {peak_rss:>10.1f} MB peak RSS')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpus', type=str, default=None, help='샘플 이미지가 있는 디렉토리')
+    parser.add_argument('--count', type=int, default=5)
+    parser.add_argument('--max-height', type=int, default=1280)
+
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = sorted(
+            os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+            if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.heic'))
+        )
+        run(corpus, args.count, args.max_height)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            run(create_corpus(directory), args.count, args.max_height)
@@ -0,0 +1,166 @@
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache, BaseCache
+from django.db import transaction
+
+# 카드별 투표 / 즐겨찾기 수를 요청 시점에는 캐시 (Redis)에만 누적하고,
+# 주기적으로 실행되는 flush_card_counters 태스크가 CardCounter 테이블에 한꺼번에 반영합니다.
+#
+# 누적 값은 GENERATION_SECONDS 단위의 세대 (generation)별로 나누어 저장합니다.
+# 요청은 항상 현재 세대에만 쓰고, flush는 이미 지난 세대만 읽으므로 두 작업이 같은 키를 동시에 다루지 않습니다.
+#
+#  {prefix}:{generation}:length                  - 이번 세대에 값이 쌓인 카드 수
+#  {prefix}:{generation}:slot:{n}                - n번째 카드의 ID
+#  {prefix}:{generation}:card:{card_id}          - 카드가 이번 세대의 slot에 등록되었는지 여부
+#  {prefix}:{generation}:{card_id}:{field}       - 누적된 증감 값
+#
+# 캐시의 add() / incr()만 사용하므로, Redis에서는 각 연산이 원자적으로 수행됩니다.
+
+UPVOTE_COUNT = 'upvote_count'
+DOWNVOTE_COUNT = 'downvote_count'
+FAVORITE_COUNT = 'favorite_count'
+
+COUNTER_FIELDS = (UPVOTE_COUNT, DOWNVOTE_COUNT, FAVORITE_COUNT)
+
+
+class CardCounterBuffer:
+    GENERATION_SECONDS = 60
+
+    # flush되지 못한 세대의 키는 이 시간이 지나면 캐시에서 사라집니다
+    KEY_TIMEOUT = 60 * 60 * 24
+
+    def __init__(self, backend: BaseCache = cache, prefix: str = 'fz:card_counters'):
+        self.backend = backend
+        self.prefix = prefix
+
+    def generation(self, timestamp: Optional[float] = None) -> int:
+        if timestamp is None:
+            timestamp = time.time()
+
+        return int(timestamp // self.GENERATION_SECONDS)
+
+    def _incr(self, key: str, delta: int = 1) -> int:
+        self.backend.add(key, 0, timeout=self.KEY_TIMEOUT)
+        return self.backend.incr(key, delta)
+
+    def increment(self, card_id, field: str, delta: int = 1):
+        """
+        카드의 카운터 값을 즉시 캐시에 누적합니다.
+        """
+
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f"Unknown counter field: {field}")
+
+        card_id = str(card_id)
+        generation = self.generation()
+        prefix = f'{self.prefix}:{generation}'
+
+        if self.backend.add(f'{prefix}:card:{card_id}', True, timeout=self.KEY_TIMEOUT):
+            slot = self._incr(f'{prefix}:length')
+            self.backend.set(f'{prefix}:slot:{slot}', card_id, timeout=self.KEY_TIMEOUT)
+
+        self._incr(f'{prefix}:{card_id}:{field}', delta)
+
+    def record(self, card_ids: Iterable, field: str, delta: int = 1):
+        """
+        현재 트랜잭션이 커밋된 후에 카운터 값을 누적합니다. (롤백되면 누적하지 않습니다)
+        """
+
+        card_ids = list(card_ids)
+
+        if not card_ids:
+            return
+
+        def increment_all():
+            for card_id in card_ids:
+                self.increment(card_id, field, delta)
+
+        transaction.on_commit(increment_all)
+
+    def collect(self, generations: Iterable[int]) -> Dict[str, Dict[str, int]]:
+        """
+        주어진 세대들에 누적된 값을 카드별로 합산해서 반환합니다. 캐시의 값은 지우지 않습니다.
+        """
+
+        generations = list(generations)
+        totals: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+
+        lengths = self.backend.get_many([f'{self.prefix}:{generation}:length' for generation in generations])
+
+        for generation in generations:
+            prefix = f'{self.prefix}:{generation}'
+            length = lengths.get(f'{prefix}:length') or 0
+
+            if length == 0:
+                continue
+
+            slots = self.backend.get_many([f'{prefix}:slot:{slot}' for slot in range(1, length + 1)])
+            card_ids = list(slots.values())
+
+            values = self.backend.get_many([
+                f'{prefix}:{card_id}:{field}'
+                for card_id in card_ids
+                for field in COUNTER_FIELDS
+            ])
+
+            for card_id in card_ids:
+                for field in COUNTER_FIELDS:
+                    totals[card_id][field] += values.get(f'{prefix}:{card_id}:{field}', 0)
+
+        return {
+            card_id: deltas
+            for (card_id, deltas) in totals.items()
+            if any(deltas.values())
+        }
+
+    def discard(self, generations: Iterable[int]):
+        """
+        flush가 끝난 세대의 키들을 삭제합니다.
+        """
+
+        generations = list(generations)
+        lengths = self.backend.get_many([f'{self.prefix}:{generation}:length' for generation in generations])
+
+        for (length_key, length) in lengths.items():
+            prefix = length_key.removesuffix(':length')
+            slot_keys = [f'{prefix}:slot:{slot}' for slot in range(1, length + 1)]
+
+            card_ids = list(self.backend.get_many(slot_keys).values())
+
+            self.backend.delete_many([
+                length_key,
+                *slot_keys,
+                *[f'{prefix}:card:{card_id}' for card_id in card_ids],
+                *[f'{prefix}:{card_id}:{field}' for card_id in card_ids for field in COUNTER_FIELDS],
+            ])
+
+    def pending_generations(self) -> List[int]:
+        """
+        flush할 수 있는 (이미 지난) 세대 목록을 반환합니다.
+
+        세대 번호를 계산한 직후에 지연된 요청이 값을 쓸 수 있도록, 바로 이전 세대는 한 세대 더 기다립니다.
+        """
+
+        last_closed = self.generation() - 2
+        flushed = self.backend.get(f'{self.prefix}:flushed_generation')
+
+        oldest = last_closed - (self.KEY_TIMEOUT // self.GENERATION_SECONDS)
+
+        if flushed is not None:
+            oldest = max(oldest, flushed + 1)
+
+        return list(range(oldest, last_closed + 1))
+
+    def mark_flushed(self, generation: int):
+        self.backend.set(f'{self.prefix}:flushed_generation', generation, timeout=None)
+
+    def acquire_flush_lock(self) -> bool:
+        return self.backend.add(f'{self.prefix}:flush_lock', True, timeout=60 * 5)
+
+    def release_flush_lock(self):
+        self.backend.delete(f'{self.prefix}:flush_lock')
+
+
+card_counter_buffer = CardCounterBuffer()
@@ -0,0 +1,188 @@
+import base64
+from collections import defaultdict
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from card.models import CardDistribution
+from flitz.sortedset import SortedSetStore, SortedSetEntry, default_sorted_set_store
+
+# 사용자별로 '받은 카드 목록'에 표시되는 배포의 ID를 정렬된 상태로 미리 저장해 두는 inbox입니다.
+# 목록 API는 inbox에서 한 페이지 분량의 ID만 꺼내고, 해당 배포들만 한 번에 조회합니다.
+#
+# 배포가 생성되거나, 공개 단계가 바뀌거나, dismiss / 삭제되면 sync()로 inbox를 갱신합니다.
+# QuerySet.update()처럼 개별 배포를 알 수 없는 경우에는 invalidate()로 inbox를 지우고, 다음 조회 시 DB에서 다시 만듭니다.
+#
+# 카드 소유자의 계정 비활성화처럼 inbox에 반영되지 않는 변경도 있으므로, 목록 API는 조회한 배포를 다시 한 번 걸러냅니다.
+# 이런 배포는 (계정이 다시 활성화될 수 있으므로) inbox에서 제거하지 않고 건너뜁니다. (prune() 참고)
+
+
+class DistributionInbox:
+    # inbox가 오랫동안 조회되지 않으면 사라지고, 다음 조회 시 다시 만들어집니다
+    TIMEOUT = 60 * 60 * 24
+
+    # 공개 단계 (DESC) → 배포 시각 (ASC) 순서가 되도록, 공개 단계를 밀리초 단위 시각보다 높은 자리에 둡니다
+    PHASE_SCORE_UNIT = float(2 ** 42)
+
+    # 다시 만드는 동안 커밋된 변경을 놓치지 않도록, 스냅샷을 읽기 이 시간 전부터 변경된 배포를 replace() 후에 다시 반영합니다
+    # updated_at은 커밋 시각이 아니라 저장 시각이므로, 저장한 뒤 커밋까지 이보다 오래 걸리는 트랜잭션은 놓칠 수 있습니다
+    REBUILD_WATERMARK_MARGIN = timedelta(seconds=30)
+
+    def __init__(self, store: Optional[SortedSetStore] = None, prefix: str = 'fz:distribution_inbox'):
+        self._store = store
+        self.prefix = prefix
+
+    @property
+    def store(self) -> SortedSetStore:
+        return self._store or default_sorted_set_store()
+
+    def key(self, user_id) -> str:
+        return f'{self.prefix}:{user_id}'
+
+    @staticmethod
+    def visible_distributions(user_id) -> QuerySet:
+        """
+        사용자의 '받은 카드 목록'에 표시되어야 하는 배포들입니다.
+        """
+
+        return CardDistribution.objects.filter(
+            ~Q(reveal_phase=CardDistribution.RevealPhase.HIDDEN),
+            user_id=user_id,
+            card__user__disabled_at__isnull=True,
+            dismissed_at=None,
+            deleted_at=None,
+        )
+
+    @staticmethod
+    def is_visible(distribution: CardDistribution) -> bool:
+        return (
+            distribution.reveal_phase != CardDistribution.RevealPhase.HIDDEN and
+            distribution.dismissed_at is None and
+            distribution.deleted_at is None
+        )
+
+    @classmethod
+    def score(cls, reveal_phase: int, created_at) -> float:
+        phase_rank = CardDistribution.RevealPhase.FULLY_REVEALED - reveal_phase
+
+        return phase_rank * cls.PHASE_SCORE_UNIT + int(created_at.timestamp() * 1000)
+
+    def rebuild(self, user_id):
+        """
+        DB에서 inbox를 다시 만듭니다.
+        """
+
+        watermark = timezone.now() - self.REBUILD_WATERMARK_MARGIN
+
+        rows = self.visible_distributions(user_id).values_list('id', 'reveal_phase', 'created_at')
+
+        self.store.replace(
+            self.key(user_id),
+            {str(distribution_id): self.score(reveal_phase, created_at) for (distribution_id, reveal_phase, created_at) in rows},
+            timeout=self.TIMEOUT
+        )
+
+        # 스냅샷을 읽은 뒤 replace() 전에 커밋된 변경은, inbox가 없어서 sync()가 반영하지 못했으므로 다시 반영합니다
+        # (invalidate()하는 QuerySet.update()도 updated_at을 갱신해야 합니다)
+        self.sync(
+            CardDistribution.objects.filter(user_id=user_id, updated_at__gte=watermark).only(
+                'id', 'user_id', 'reveal_phase', 'created_at', 'dismissed_at', 'deleted_at'
+            )
+        )
+
+    def sync(self, distributions: Iterable[CardDistribution]):
+        """
+        배포들의 현재 상태를 inbox에 반영합니다. 표시되어야 하는 배포는 추가 (또는 순서 갱신)하고, 나머지는 제거합니다.
+        """
+
+        entries_by_user = defaultdict(dict)
+        removals_by_user = defaultdict(list)
+
+        for distribution in distributions:
+            if self.is_visible(distribution):
+                entries_by_user[distribution.user_id][str(distribution.id)] = self.score(
+                    distribution.reveal_phase, distribution.created_at
+                )
+            else:
+                removals_by_user[distribution.user_id].append(str(distribution.id))
+
+        for (user_id, entries) in entries_by_user.items():
+            self.store.add(self.key(user_id), entries)
+
+        for (user_id, members) in removals_by_user.items():
+            self.store.remove(self.key(user_id), members)
+
+    def sync_on_commit(self, distributions: Iterable[CardDistribution]):
+        distributions = list(distributions)
+
+        if distributions:
+            transaction.on_commit(lambda: self.sync(distributions))
+
+    def remove(self, user_id, distribution_ids: Iterable[str]):
+        self.store.remove(self.key(user_id), distribution_ids)
+
+    def prune(self, user_id, distribution_ids: Iterable[str]):
+        """
+        목록 API에서 걸러진 배포들 중, 다시 표시될 일이 없는 배포만 inbox에서 제거합니다.
+        카드 소유자의 계정이 비활성화되어 걸러진 배포는 계정이 다시 활성화되면 표시되어야 하므로 남겨둡니다.
+        """
+
+        distribution_ids = list(distribution_ids)
+
+        suspended_ids = set(
+            str(distribution_id)
+            for distribution_id in CardDistribution.objects.filter(
+                ~Q(reveal_phase=CardDistribution.RevealPhase.HIDDEN),
+                id__in=distribution_ids,
+                user_id=user_id,
+                card__user__disabled_at__isnull=False,
+                dismissed_at=None,
+                deleted_at=None,
+            ).values_list('id', flat=True)
+        )
+
+        self.remove(user_id, [distribution_id for distribution_id in distribution_ids if distribution_id not in suspended_ids])
+
+    def invalidate(self, user_id):
+        self.store.delete(self.key(user_id))
+
+    def invalidate_on_commit(self, user_id):
+        transaction.on_commit(lambda: self.invalidate(user_id))
+
+    def page(self, user_id, after: Optional[SortedSetEntry], limit: int) -> List[SortedSetEntry]:
+        """
+        after 다음에 오는 배포 ID들을 최대 limit개 반환합니다. inbox가 없으면 먼저 DB에서 만듭니다.
+        """
+
+        entries = self.store.range_after(self.key(user_id), after, limit, timeout=self.TIMEOUT)
+
+        if entries is None:
+            self.rebuild(user_id)
+            entries = self.store.range_after(self.key(user_id), after, limit) or []
+
+        return entries
+
+    @staticmethod
+    def encode_cursor(entry: SortedSetEntry) -> str:
+        (member, score) = entry
+
+        return base64.urlsafe_b64encode(f'{score!r}|{member}'.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: Optional[str]) -> Optional[SortedSetEntry]:
+        """
+        :raises ValueError: 잘못된 cursor인 경우
+        """
+
+        if not cursor:
+            return None
+
+        (score, member) = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+
+        return member, float(score)
+
+
+distribution_inbox = DistributionInbox()
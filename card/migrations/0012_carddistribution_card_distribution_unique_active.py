@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-19 01:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def delete_duplicate_distributions(apps, schema_editor):
+    # 제약 조건을 추가하기 전에, 중복된 (card, user) 배포 중 가장 먼저 생성된 것만 남기고 삭제 처리합니다
+    CardDistribution = apps.get_model('card', 'CardDistribution')
+
+    duplicates = CardDistribution.objects.filter(
+        deleted_at__isnull=True
+    ).values('card_id', 'user_id').annotate(
+        count=Count('id')
+    ).filter(count__gt=1)
+
+    now = timezone.now()
+
+    for duplicate in duplicates:
+        ids = list(
+            CardDistribution.objects.filter(
+                card_id=duplicate['card_id'],
+                user_id=duplicate['user_id'],
+                deleted_at__isnull=True
+            ).order_by('created_at').values_list('id', flat=True)
+        )
+
+        CardDistribution.objects.filter(id__in=ids[1:]).update(deleted_at=now, updated_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0011_carddistribution_distribution_method'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_distributions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='carddistribution',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('card', 'user'), name='card_distribution_unique_active'),
+        ),
+    ]
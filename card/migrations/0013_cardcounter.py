@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-19 01:56
+
+import django.db.models.deletion
+import flitz.models
+import uuid_v7.base
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_card_counters(apps, schema_editor):
+    # 기존 투표 / 즐겨찾기 기록으로 카운터의 초기 값을 채웁니다
+    Card = apps.get_model('card', 'Card')
+    CardCounter = apps.get_model('card', 'CardCounter')
+
+    queryset = Card.objects.annotate(
+        upvote_count=Count('votes', filter=Q(votes__vote_type=1), distinct=True),
+        downvote_count=Count('votes', filter=Q(votes__vote_type=2), distinct=True),
+        favorite_count=Count('collection_items', filter=Q(collection_items__deleted_at__isnull=True), distinct=True),
+    ).filter(
+        Q(upvote_count__gt=0) | Q(downvote_count__gt=0) | Q(favorite_count__gt=0)
+    ).values('id', 'upvote_count', 'downvote_count', 'favorite_count')
+
+    CardCounter.objects.bulk_create([
+        CardCounter(
+            card_id=values['id'],
+            upvote_count=values['upvote_count'],
+            downvote_count=values['downvote_count'],
+            favorite_count=values['favorite_count'],
+        )
+        for values in queryset.iterator(chunk_size=1000)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0012_carddistribution_card_distribution_unique_active'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardCounter',
+            fields=[
+                ('id', flitz.models.UUIDv7Field(default=uuid_v7.base.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('upvote_count', models.PositiveIntegerField(default=0)),
+                ('downvote_count', models.PositiveIntegerField(default=0)),
+                ('favorite_count', models.PositiveIntegerField(default=0)),
+                ('card', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='counter', to='card.card')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(backfill_card_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0013_cardcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usercardasset',
+            index=models.Index(fields=['object'], name='card_userca_object_bb23f3_idx'),
+        ),
+    ]
@@ -1,17 +1,21 @@
 from datetime import timedelta
-from typing import Optional
+from typing import Optional, Iterable, List, Dict
 
-from dacite import from_dict
+from django.core.cache import cache
 from django.core.files.storage import default_storage, Storage
-from django.db import models, transaction
+from django.db import models, transaction, connections, router
+from django.db.models import QuerySet, Q
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.postgres.indexes import GinIndex
 
 from uuid_v7.base import uuid7
 
-from card.objdef import CardObject, AssetReference, ImageElement
+from card.objdef import CardObject, AssetReference, ImageElement, load_card_object
+from flitz.conditional import quote_etag
 from flitz.models import BaseModel
+from flitz.storage import storage_url, delete_stored_files, register_content_addressed_field, default_url_builder, \
+    register_deletable_file_fields
 from location.models import LocationDistanceMixin
 from user.models import User, UserMatch
 
@@ -48,6 +52,11 @@ def card_asset_upload_to(instance, filename):
     return f"card_assets/{shard}/{filename}"
 
 
+# 렌더링된 카드 컨텐츠 (URL이 채워진 content)의 캐시 유지 시간
+# NOTE: presigned URL은 URL 주기 (flitz.storage.StorageURLBuilder.url_epoch)가 바뀌면 다시 렌더링하므로,
+#       캐시 유지 시간과 관계없이 서명된 지 만료 시간의 절반 이상 지난 URL은 전달되지 않습니다.
+RENDERED_CONTENT_CACHE_TIMEOUT = 60 * 30
+
 
 class OfficialCardAssetAuthor(BaseModel):
     name = models.CharField(max_length=64, null=False, blank=False)
@@ -111,33 +120,69 @@ class Card(BaseModel):
     # 최종으로 GC가 실행된 시간
     gc_ran_at = models.DateTimeField(null=True, blank=True)
 
-    def remove_orphaned_assets(self):
-        card_obj = from_dict(data_class=CardObject, data=self.content)
+    @property
+    def etag(self) -> str:
+        """
+        카드의 현재 버전을 나타내는 ETag를 반환합니다.
+        카드 응답에는 소유자 정보도 포함되므로, 소유자의 updated_at도 함께 사용합니다.
+
+        카드 컨텐츠를 JSON Patch로 수정할 때 If-Match 전제 조건으로 사용됩니다.
+        """
+
+        card_version = int(self.updated_at.timestamp() * 1_000_000)
+        user_version = int(self.user.updated_at.timestamp() * 1_000_000)
+
+        return quote_etag(f'{self.id.hex}.{card_version:x}.{user_version:x}')
+
+    def find_orphaned_assets(self) -> List['UserCardAsset']:
+        """
+        카드 컨텐츠에서 더 이상 참조하지 않는 (삭제되지 않은) 애셋 레퍼런스 목록을 반환합니다.
+        prefetch_related('asset_references')가 되어 있다면 추가 쿼리 없이 처리됩니다.
+        """
+
+        card_obj = load_card_object(self.content)
 
         current_references = card_obj.extract_asset_references()
         current_references_ids = [ref.id for ref in current_references]
 
-        # 삭제되지 않은 애셋 레퍼런스만 필터링
-        references_in_db = self.asset_references.filter(deleted_at__isnull=True)
+        return [
+            reference
+            for reference in self.asset_references.all()
+            # 삭제되지 않은 애셋 레퍼런스만 필터링
+            if reference.deleted_at is None and str(reference.id) not in current_references_ids
+        ]
 
-        with transaction.atomic():
-            for reference in references_in_db:
-                if str(reference.id) not in current_references_ids:
-                    reference.delete_asset()
+    def remove_orphaned_assets(self):
+        orphaned_assets = self.find_orphaned_assets()
+
+        if not orphaned_assets:
+            return
+
+        UserCardAsset.delete_assets(
+            UserCardAsset.objects.filter(id__in=[asset.id for asset in orphaned_assets])
+        )
+
+        self.invalidate_rendered_content()
 
     def get_content_with_url(self) -> dict:
-        asset_references_queryset = self.asset_references.filter(deleted_at__isnull=True)
-        card_obj = from_dict(data_class=CardObject, data=self.content)
+        # prefetch_related('asset_references')가 되어 있다면 추가 쿼리 없이 처리됩니다.
+        asset_references = {
+            str(reference.id): reference
+            for reference in self.asset_references.all()
+            if reference.deleted_at is None
+        }
+
+        card_obj = load_card_object(self.content)
 
         def resolve_asset_url(asset: Optional[AssetReference]) -> Optional[str]:
             if asset is None:
                 return None
 
-            asset_reference = asset_references_queryset.filter(id=asset.id).first()
-            if asset_reference is None or (not asset_reference.object.name):
+            asset_reference = asset_references.get(str(asset.id))
+            if asset_reference is None:
                 return None
 
-            return asset_reference.object.url
+            return storage_url(asset_reference.object)
 
         if card_obj.background:
             card_obj.background.public_url = resolve_asset_url(card_obj.background)
@@ -148,12 +193,82 @@ class Card(BaseModel):
 
         return card_obj.as_dict()
 
+    @staticmethod
+    def rendered_content_cache_key(card_id) -> str:
+        return f'card:rendered_content:{card_id}'
+
+    @property
+    def rendered_content_version(self) -> str:
+        """
+        렌더링된 컨텐츠의 버전을 반환합니다.
+        카드가 수정되거나 (updated_at), 애셋 레퍼런스가 추가/삭제되거나, presigned URL의 주기가 바뀌면 버전이 바뀝니다.
+        """
+
+        asset_references = self.asset_references.all()
+        assets_updated_at = max((reference.updated_at for reference in asset_references), default=None)
+        url_epoch = default_url_builder().url_epoch()
+
+        return ':'.join([
+            str(self.updated_at.timestamp()),
+            str(len(asset_references)),
+            str(assets_updated_at.timestamp()) if assets_updated_at else '-',
+            str(url_epoch) if url_epoch is not None else '-',
+        ])
+
+    def get_cached_content_with_url(self) -> dict:
+        """
+        get_content_with_url()의 결과를 캐시에서 가져옵니다. 캐시에 없거나 버전이 다르면 새로 렌더링합니다.
+        """
+
+        if not hasattr(self, '_rendered_content'):
+            Card.prefetch_rendered_contents([self])
+
+        return self._rendered_content
+
+    @classmethod
+    def prefetch_rendered_contents(cls, cards: Iterable['Card']):
+        """
+        여러 카드의 렌더링된 컨텐츠를 cache.get_many()로 한 번에 가져와 각 인스턴스에 채워 넣습니다.
+        캐시에 없는 카드는 렌더링 후 cache.set_many()로 한 번에 저장합니다.
+        """
+
+        cards_by_key = {cls.rendered_content_cache_key(card.id): card for card in cards}
+
+        if not cards_by_key:
+            return
+
+        cached_entries = cache.get_many(cards_by_key.keys())
+        entries_to_set = {}
+
+        for key, card in cards_by_key.items():
+            version = card.rendered_content_version
+            cached_entry = cached_entries.get(key)
+
+            if cached_entry is not None and cached_entry[0] == version:
+                card._rendered_content = cached_entry[1]
+                continue
+
+            card._rendered_content = card.get_content_with_url()
+            entries_to_set[key] = (version, card._rendered_content)
+
+        if entries_to_set:
+            cache.set_many(entries_to_set, timeout=RENDERED_CONTENT_CACHE_TIMEOUT)
+
+    def invalidate_rendered_content(self):
+        if hasattr(self, '_rendered_content'):
+            del self._rendered_content
+
+        cache.delete(self.rendered_content_cache_key(self.id))
+
 class UserCardAsset(BaseModel):
     class Meta:
         indexes = [
             models.Index(fields=['card']),
             models.Index(fields=['user']),
 
+            # 내용 기반 오브젝트의 참조 여부 확인 (flitz.storage.find_referenced_names)
+            models.Index(fields=['object']),
+
             models.Index(fields=['deleted_at']),
             models.Index(fields=['banned_at']),
         ]
@@ -165,6 +280,20 @@ class UserCardAsset(BaseModel):
         AUDIO = 'audio'
         OTHER = 'other'
 
+        @classmethod
+        def from_mimetype(cls, mimetype: str) -> 'UserCardAsset.AssetType':
+            if mimetype.startswith('image'):
+                return cls.IMAGE
+            elif mimetype.startswith('video'):
+                return cls.VIDEO
+            elif mimetype.startswith('audio'):
+                return cls.AUDIO
+
+            return cls.OTHER
+
+    # 직접 업로드 (flitz.uploads) 시 허용하는 최대 파일 크기
+    MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     card = models.ForeignKey(Card, on_delete=models.CASCADE, related_name='asset_references')
 
@@ -179,12 +308,23 @@ class UserCardAsset(BaseModel):
     banned_at = models.DateTimeField(null=True, blank=True)
 
     def delete_asset(self):
-        # FileField가 실제 파일을 가지고 있는지 확인
-        if self.object and self.object.name:
-            self.object.delete(save=False)  # save=False로 DB 중복 저장 방지
+        # 같은 내용의 오브젝트를 다른 애셋이 공유할 수 있으므로, delete_assets()를 통해 삭제합니다
+        UserCardAsset.delete_assets(UserCardAsset.objects.filter(pk=self.pk))
+        self.refresh_from_db()
+
+    @classmethod
+    def delete_assets(cls, queryset: QuerySet['UserCardAsset']) -> int:
+        """
+        여러 애셋을 한 번에 삭제합니다.
+        S3 오브젝트는 multi-object delete 요청으로, row는 update()로 일괄 처리합니다.
+        """
+
+        now = timezone.now()
+
+        return delete_stored_files(queryset, ['object'], deleted_at=now, updated_at=now)
 
-        self.deleted_at = timezone.now()
-        self.save()
+register_content_addressed_field('card.UserCardAsset', 'object', deleted_at__isnull=True)
+register_deletable_file_fields('card.UserCardAsset', ['object'])
 
 class CardFlag(BaseModel):
     class Meta:
@@ -210,8 +350,15 @@ class CardFlag(BaseModel):
 
 class CardDistribution(BaseModel, LocationDistanceMixin):
     class Meta:
-        # XXX: 개발 단계에서 같은 카드를 여러번 distribute하는건 사실 편하기 때문에 이걸 막아야 하는지는 잘 모르겠음
-        # unique_together = (('card', 'user'),)
+        constraints = [
+            # 삭제되지 않은 (card, user) 배포는 하나만 존재할 수 있습니다
+            # NOTE: insert_distributions()의 ON CONFLICT DO NOTHING이 이 제약 조건에 의존합니다
+            models.UniqueConstraint(
+                fields=['card', 'user'],
+                condition=Q(deleted_at__isnull=True),
+                name='card_distribution_unique_active',
+            ),
+        ]
 
         indexes = [
             models.Index(fields=['card']),
@@ -264,6 +411,102 @@ class CardDistribution(BaseModel, LocationDistanceMixin):
     dismissed_at = models.DateTimeField(null=True, blank=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+    @classmethod
+    def insert_distributions(cls, distributions: Iterable['CardDistribution']) -> List['CardDistribution']:
+        """
+        저장되지 않은 CardDistribution들을 하나의 INSERT 문으로 저장합니다.
+
+        - 같은 (card, user) 배포가 이미 존재하면 (삭제된 배포 포함) 저장하지 않습니다.
+        - 동시에 같은 배포가 저장되는 경우에는 card_distribution_unique_active 제약 조건에 걸려 무시됩니다.
+          (INSERT ... SELECT ... WHERE NOT EXISTS (...) ON CONFLICT DO NOTHING RETURNING id)
+
+        reveal_phase는 저장하기 전에 update_reveal_phase()로 계산합니다.
+        저장된 배포는 트랜잭션이 커밋된 후 받은 사용자의 inbox (card.inbox.DistributionInbox)에 추가됩니다.
+
+        :returns: 실제로 저장된 배포 목록
+        """
+
+        now = timezone.now()
+
+        pending = {}
+
+        for distribution in distributions:
+            key = (distribution.card_id, distribution.user_id)
+
+            # 같은 요청 안에서 중복된 배포는 먼저 나온 것만 사용합니다
+            if key in pending:
+                continue
+
+            distribution.created_at = now
+            distribution.updated_at = now
+            distribution.update_reveal_phase()
+
+            pending[key] = distribution
+
+        if not pending:
+            return []
+
+        connection = connections[router.db_for_write(cls)]
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        fields = cls._meta.concrete_fields
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+
+        if connection.vendor == 'postgresql':
+            # INSERT ... SELECT에서는 파라미터의 타입을 추론할 수 없으므로 명시적으로 캐스팅합니다
+            placeholders = ', '.join(f'CAST(%s AS {field.db_type(connection)})' for field in fields)
+        else:
+            placeholders = ', '.join('%s' for _ in fields)
+
+        card_column = connection.ops.quote_name(cls._meta.get_field('card').column)
+        user_column = connection.ops.quote_name(cls._meta.get_field('user').column)
+
+        selects = []
+        params = []
+
+        for distribution in pending.values():
+            selects.append(
+                f'SELECT {placeholders} WHERE NOT EXISTS '
+                f'(SELECT 1 FROM {table} WHERE {card_column} = %s AND {user_column} = %s)'
+            )
+
+            params.extend(
+                field.get_db_prep_save(getattr(distribution, field.attname), connection)
+                for field in fields
+            )
+            params.extend(
+                cls._meta.get_field(name).get_db_prep_save(getattr(distribution, f'{name}_id'), connection)
+                for name in ('card', 'user')
+            )
+
+        pk_field = cls._meta.pk
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) {" UNION ALL ".join(selects)} '
+                f'ON CONFLICT DO NOTHING RETURNING {connection.ops.quote_name(pk_field.column)}',
+                params
+            )
+
+            inserted_ids = {pk_field.to_python(row[0]) for row in cursor.fetchall()}
+
+        inserted = []
+
+        for distribution in pending.values():
+            if distribution.pk not in inserted_ids:
+                continue
+
+            distribution._state.adding = False
+            distribution._state.db = connection.alias
+
+            inserted.append(distribution)
+
+        # 받은 카드 목록 (inbox)에도 반영합니다
+        from card.inbox import distribution_inbox
+        distribution_inbox.sync_on_commit(inserted)
+
+        return inserted
+
     @property
     def opponent(self) -> User:
         """
@@ -433,3 +676,110 @@ class CardFavoriteItem(BaseModel):
 
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+
+class CardCounter(BaseModel):
+    """
+    카드별 투표 / 즐겨찾기 수를 비정규화해서 저장합니다.
+
+    요청 시점에는 card.counters.CardCounterBuffer에만 누적되고, flush_card_counters 태스크가 주기적으로 반영하므로
+    실제 값보다 최대 몇 분 늦을 수 있습니다.
+    """
+
+    card = models.OneToOneField(Card, on_delete=models.CASCADE, related_name='counter')
+
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+    favorite_count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def of(cls, card: Card) -> 'CardCounter':
+        """
+        카드의 CardCounter를 반환합니다. 아직 한 번도 flush되지 않은 카드라면 값이 0인 (저장되지 않은) 인스턴스를 반환합니다.
+        """
+
+        try:
+            return card.counter
+        except cls.DoesNotExist:
+            return cls(card=card, updated_at=None)
+
+    @classmethod
+    def apply_deltas(cls, deltas: Dict[str, Dict[str, int]]) -> int:
+        """
+        카드별 증감 값을 현재 값에 더해서 한 번의 upsert로 저장합니다.
+        삭제된 (존재하지 않는) 카드의 값은 무시하며, 값이 0보다 작아지지 않도록 합니다.
+
+        현재 값을 읽지 않고 DB에서 더하므로 (SET x = GREATEST(0, x + 증감 값)), 동시에 실행되어도 증감 값을 잃지 않습니다.
+        음수인 증감 값을 그대로 INSERT하면 CHECK (x >= 0) 제약 조건에 걸리므로,
+        새로 만드는 카운터에는 0 이상으로 보정한 값을 넣고, 이미 있는 카운터에는 CTE의 증감 값을 더합니다.
+
+        :param deltas: {card_id: {'upvote_count': 1, 'downvote_count': 0, 'favorite_count': -1}, ...}
+        :return: 저장된 카드 수
+        """
+
+        if not deltas:
+            return 0
+
+        fields = ['upvote_count', 'downvote_count', 'favorite_count']
+
+        connection = connections[router.db_for_write(cls)]
+        quote_name = connection.ops.quote_name
+
+        table = quote_name(cls._meta.db_table)
+        card_table = quote_name(Card._meta.db_table)
+        card_pk_column = quote_name(Card._meta.pk.column)
+
+        pk_field = cls._meta.pk
+        card_field = cls._meta.get_field('card')
+        columns = [quote_name(cls._meta.get_field(field).column) for field in fields]
+
+        if connection.vendor == 'postgresql':
+            # VALUES에서는 파라미터의 타입을 추론할 수 없으므로 명시적으로 캐스팅합니다
+            uuid_type = pk_field.db_type(connection)
+            row = f'(CAST(%s AS {uuid_type}), CAST(%s AS {uuid_type}){", CAST(%s AS integer)" * len(fields)})'
+            greatest = 'GREATEST'
+        else:
+            row = f'(%s, %s{", %s" * len(fields)})'
+            # SQLite에서는 인자가 여러 개인 MAX()가 GREATEST()와 같습니다
+            greatest = 'MAX'
+
+        params = []
+
+        # 여러 flush가 겹치더라도 같은 순서로 잠금을 잡도록 카드 ID 순서로 저장합니다
+        for card_id in sorted(deltas.keys()):
+            params.append(pk_field.get_db_prep_save(pk_field.get_default(), connection))
+            params.append(card_field.get_db_prep_save(card_id, connection))
+            params.extend(deltas[card_id].get(field, 0) for field in fields)
+
+        now = cls._meta.get_field('updated_at').get_db_prep_save(timezone.now(), connection)
+
+        delta_columns = ', '.join(['id', 'card_id', *fields])
+        insert_columns = ', '.join([
+            quote_name(pk_field.column),
+            quote_name(cls._meta.get_field('created_at').column),
+            quote_name(cls._meta.get_field('updated_at').column),
+            quote_name(card_field.column),
+            *columns,
+        ])
+        insert_values = ', '.join(f'{greatest}(0, deltas.{field})' for field in fields)
+        updates = ', '.join(
+            f'{column} = {greatest}(0, {table}.{column} + '
+            f'(SELECT deltas.{field} FROM deltas WHERE deltas.card_id = EXCLUDED.{quote_name(card_field.column)}))'
+            for field, column in zip(fields, columns)
+        )
+        updated_at_column = quote_name(cls._meta.get_field('updated_at').column)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH deltas ({delta_columns}) AS (VALUES {", ".join([row] * len(deltas))}) '
+                f'INSERT INTO {table} ({insert_columns}) '
+                f'SELECT deltas.id, %s, %s, deltas.card_id, {insert_values} '
+                f'FROM deltas INNER JOIN {card_table} ON {card_table}.{card_pk_column} = deltas.card_id '
+                # SQLite에서 JOIN의 ON과 ON CONFLICT를 구분하려면 WHERE 절이 필요합니다
+                f'WHERE TRUE '
+                f'ON CONFLICT ({quote_name(card_field.column)}) DO UPDATE SET {updates}, '
+                f'{updated_at_column} = EXCLUDED.{updated_at_column} '
+                f'RETURNING {quote_name(pk_field.column)}',
+                [*params, now, now]
+            )
+
+            return len(cursor.fetchall())
@@ -1,8 +1,13 @@
-from typing import List, Optional, TypedDict, Literal, Dict
+from typing import Any, Iterable, List, Optional, TypedDict, Literal, Dict
 
 from enum import Enum
 from dataclasses import dataclass, asdict
 
+from dacite import DaciteError, UnionMatchError
+
+from flitz.objdecode import expect_mapping, required, field_path, str_field, float_field, literal_field, \
+    optional_str_field, optional_int_field, decode_list, decode_str_dict
+
 
 @dataclass
 class ElementSize:
@@ -95,4 +100,121 @@ class CardObject:
         return references
 
 
+# CardObject 디코더
+# dacite.from_dict(data_class=CardObject, data=...)와 같은 결과 / 예외를 반환하지만, 리플렉션 없이 동작하므로 훨씬 빠릅니다.
+# NOTE: 데이터클래스에 필드를 추가하거나 변경하면 아래 디코더도 함께 수정해야 합니다!
+
+def _load_element_size(data: Any, path: Optional[str]) -> ElementSize:
+    data = expect_mapping(data, ElementSize, path)
+
+    return ElementSize(
+        width=float_field(data, 'width', path),
+        height=float_field(data, 'height', path),
+    )
+
+def _load_position(data: Any, path: Optional[str]) -> Position:
+    data = expect_mapping(data, Position, path)
 
+    return Position(
+        x=float_field(data, 'x', path),
+        y=float_field(data, 'y', path),
+    )
+
+def _load_transform(data: Any, path: Optional[str]) -> Transform:
+    data = expect_mapping(data, Transform, path)
+
+    return Transform(
+        position=_load_position(required(data, 'position', path), field_path(path, 'position')),
+        scale=float_field(data, 'scale', path),
+        rotation=float_field(data, 'rotation', path),
+    )
+
+def _load_asset_reference(data: Any, path: Optional[str]) -> AssetReference:
+    data = expect_mapping(data, AssetReference, path)
+
+    return AssetReference(
+        id=str_field(data, 'id', path),
+        public_url=optional_str_field(data, 'public_url', path),
+    )
+
+def _load_image_element(data: dict) -> ImageElement:
+    return ImageElement(
+        id=optional_str_field(data, 'id'),
+        type=literal_field(data, 'type', ('image',), ImageElementType),
+        transform=_load_transform(required(data, 'transform', None), 'transform'),
+        zIndex=optional_int_field(data, 'zIndex'),
+        source=_load_asset_reference(required(data, 'source', None), 'source'),
+        size=_load_element_size(required(data, 'size', None), 'size'),
+    )
+
+def _load_text_element(data: dict) -> TextElement:
+    return TextElement(
+        id=optional_str_field(data, 'id'),
+        type=literal_field(data, 'type', ('text',), TextElementType),
+        transform=_load_transform(required(data, 'transform', None), 'transform'),
+        zIndex=optional_int_field(data, 'zIndex'),
+        text=str_field(data, 'text'),
+    )
+
+_ELEMENT_LOADERS = {
+    'image': _load_image_element,
+    'text': _load_text_element,
+}
+
+def _load_element(data: Any, path: str) -> Element:
+    # dacite와 마찬가지로, 요소가 어떤 타입과도 맞지 않으면 (내부 필드 오류 포함) UnionMatchError를 발생시킵니다
+    loader = _ELEMENT_LOADERS.get(data.get('type')) if isinstance(data, dict) else None
+
+    if loader is None:
+        raise UnionMatchError(Element, data, path)
+
+    try:
+        return loader(data)
+    except DaciteError:
+        raise UnionMatchError(Element, data, path)
+
+def load_card_object(data: Any) -> CardObject:
+    """
+    카드 컨텐츠 (Card.content)를 CardObject로 변환합니다.
+
+    :raises dacite.DaciteError: 데이터가 CardObject 스키마에 맞지 않는 경우
+    """
+
+    data = expect_mapping(data, CardObject, None)
+
+    background = data.get('background')
+
+    return CardObject(
+        schema_version=str_field(data, 'schema_version'),
+        background=None if background is None else _load_asset_reference(background, 'background'),
+        elements=decode_list(required(data, 'elements', None), List[Element], 'elements', _load_element),
+        properties=decode_str_dict(required(data, 'properties', None), Dict[str, str], 'properties'),
+    )
+
+def normalize_card_content(data: Any, trusted_elements: Iterable[dict] = ()) -> dict:
+    """
+    카드 컨텐츠를 검증하고, CardObject.as_dict()와 같은 형태로 정리한 dict를 반환합니다.
+
+    trusted_elements에 포함된 요소 (같은 객체)는 이미 검증 / 정리된 것으로 보고 그대로 사용합니다.
+    JSON Patch로 일부만 수정된 컨텐츠를 저장할 때, 바뀐 요소만 검증하기 위해 사용합니다.
+
+    :raises dacite.DaciteError: 데이터가 CardObject 스키마에 맞지 않는 경우
+    """
+
+    data = expect_mapping(data, CardObject, None)
+    trusted = {id(element) for element in trusted_elements}
+
+    background = data.get('background')
+
+    def normalize_element(element: Any, path: str) -> dict:
+        if id(element) in trusted:
+            return element
+
+        return asdict(_load_element(element, path))
+
+    return {
+        'schema_version': str_field(data, 'schema_version'),
+        'background': None if background is None else asdict(_load_asset_reference(background, 'background')),
+        'elements': decode_list(required(data, 'elements', None), List[Element], 'elements', normalize_element),
+        'properties': decode_str_dict(required(data, 'properties', None), Dict[str, str], 'properties'),
+    }
@@ -1,15 +1,16 @@
 from rest_framework import serializers
 
+from flitz.serializers import StorageURLField
 from user.serializers import PublicSimpleUserSerializer
 
-from card.models import Card, UserCardAsset, CardDistribution, CardFavoriteItem, CardFlag
+from card.models import Card, UserCardAsset, CardDistribution, CardFavoriteItem, CardFlag, CardCounter
 
 
 class PublicSelfUserCardAssetSerializer(serializers.ModelSerializer):
     """
     카드 에셋 정보를 fetch할 때 사용되는 serializer
     """
-    public_url = serializers.FileField(source='object', read_only=True)
+    public_url = StorageURLField(source='object')
     
     class Meta:
         model = UserCardAsset
@@ -38,7 +39,28 @@ class PublicCardSerializer(serializers.ModelSerializer):
     content = serializers.SerializerMethodField(method_name='get_content')
 
     def get_content(self, obj: Card):
-        return obj.get_content_with_url()
+        return obj.get_cached_content_with_url()
+
+class CardCounterSerializer(serializers.ModelSerializer):
+    """
+    카드의 투표 / 즐겨찾기 수를 fetch할 때 사용되는 serializer
+    """
+    class Meta:
+        model = CardCounter
+        fields = ('upvote_count', 'downvote_count', 'favorite_count', 'updated_at')
+
+
+class PublicSelfCardSerializer(PublicCardSerializer):
+    """
+    자신의 카드 정보를 fetch할 때 사용되는 serializer
+    """
+    class Meta(PublicCardSerializer.Meta):
+        fields = PublicCardSerializer.Meta.fields + ('counters',)
+
+    counters = serializers.SerializerMethodField(method_name='get_counters')
+
+    def get_counters(self, obj: Card):
+        return CardCounterSerializer(CardCounter.of(obj)).data
 
 class CardDistributionSerializer(serializers.ModelSerializer):
     """
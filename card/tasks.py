@@ -1,5 +1,9 @@
+import operator
+from collections import defaultdict
+from datetime import datetime
+from functools import reduce
 from logging import Logger
-from typing import Tuple, List
+from typing import Dict, List, Optional
 
 import pytz
 
@@ -10,79 +14,115 @@ from django.db import transaction
 from django.db.models import Q, F
 from django.db.models.aggregates import Count
 from django.utils import timezone
-from pytz.tzinfo import StaticTzInfo, DstTzInfo
 
-from card.models import Card, CardDistribution
+from card.counters import card_counter_buffer
+from card.inbox import distribution_inbox
+from card.models import Card, CardDistribution, UserCardAsset, CardCounter
+from flitz.storage import BatchObjectDeleter
 
-from user.tasks import send_push_message_ex
+from user.tasks import send_push_message_batch
 
 logger: Logger = get_task_logger(__name__)
 
-@shared_task
-def send_card_distribution_notification():
+def card_distribution_notification_targets(utc_now: datetime) -> Optional[Q]:
     """
-    확인할 수 있는 카드 배포가 있을 때 사용자에게 알림을 보냅니다.
+    현지 시각이 19시인 모든 시간대에 대해, '오늘 (현지 시각 기준) 배포된 카드'에 해당하는 조건을 반환합니다.
+    현지 자정이 같은 시간대끼리 묶으므로, 시간대가 많아도 조건의 수는 UTC offset의 수를 넘지 않습니다.
     """
 
-    from location.models import UserLocation
+    timezones_by_today_start: Dict[datetime, List[str]] = defaultdict(list)
+
+    for tz_name in pytz.all_timezones:
+        local_time = utc_now.astimezone(pytz.timezone(tz_name))
+
+        if local_time.hour != 19:
+            continue
+
+        today_start = local_time.replace(hour=0, minute=0, second=0, microsecond=0).astimezone(pytz.UTC)
+        timezones_by_today_start[today_start].append(tz_name)
+
+    if not timezones_by_today_start:
+        return None
 
-    utc_now = timezone.now()
-    target_timezones: List[Tuple[str, StaticTzInfo | DstTzInfo]] = []
+    return reduce(operator.or_, (
+        Q(user__location__timezone__in=tz_names, created_at__gte=today_start)
+        for (today_start, tz_names) in timezones_by_today_start.items()
+    ))
 
-    active_timezones = set(
-        UserLocation.objects.values_list('timezone', flat=True).distinct()
-    )
 
-    for tz_name in active_timezones:
-        tz = pytz.timezone(tz_name)
-        local_time = utc_now.astimezone(tz)
+@shared_task
+def send_card_distribution_notification():
+    """
+    확인할 수 있는 카드 배포가 있을 때 사용자에게 알림을 보냅니다.
+
+    알림 대상 (사용자, APNs 토큰, 카드 수)은 하나의 쿼리로 조회하며,
+    알림은 BATCH_SIZE명 단위로 묶어서 send_push_message_batch 태스크로 보냅니다.
+    """
 
-        if local_time.hour == 19:
-            target_timezones.append((tz_name, tz))
+    BATCH_SIZE = 500
 
-    if not target_timezones:
+    condition = card_distribution_notification_targets(timezone.now())
+
+    if condition is None:
         logger.info("No target timezones found for card distribution notification.")
         return
 
-    for (tz_name, tz) in target_timezones:
-        now = utc_now.astimezone(tz)
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        distributions = CardDistribution.objects.filter(
-            reveal_phase__in=[
-                CardDistribution.RevealPhase.FULLY_REVEALED,
-            ],
-            user__location__timezone=tz_name,
-            user__disabled_at__isnull=True,
-            created_at__gte=today_start.astimezone(pytz.UTC),
-            dismissed_at__isnull=True,
-            deleted_at__isnull=True,
-        ).values('user_id').annotate(
-            card_count=Count('id')
-        ).values_list('user_id', 'card_count')
-
-        iterator = distributions.iterator(chunk_size=100)
-
-        for (user_id, card_count) in iterator:
-            send_push_message_ex.delay(
-                user_id,
-                type='match',
-                aps={
-                    'alert': {
-                        'title': '새로운 카드가 도착했어요!',
-                        'body': f'{card_count} 개의 카드가 교환되었어요. 지금 바로 확인해보세요!',
-                        'title-loc-key': 'fz.notification.card_distribution.title',
-                        'title-loc-args': [],
-                        'loc-key': 'fz.notification.card_distribution.body',
-                        'loc-args': [str(card_count)],
-                    },
-                    'mutable-content': 1,
+    targets = CardDistribution.objects.filter(
+        condition,
+        Q(user__settings__isnull=True) | Q(user__settings__match_notifications_enabled=True),
+
+        reveal_phase__in=[
+            CardDistribution.RevealPhase.FULLY_REVEALED,
+        ],
+        user__disabled_at__isnull=True,
+        user__primary_session__apns_token__isnull=False,
+        dismissed_at__isnull=True,
+        deleted_at__isnull=True,
+    ).exclude(
+        user__primary_session__apns_token='',
+    ).values(
+        'user_id', 'user__primary_session__apns_token'
+    ).annotate(
+        card_count=Count('id')
+    ).values_list('user__primary_session__apns_token', 'card_count')
+
+    batch = []
+    batch_count = 0
+
+    def flush():
+        nonlocal batch, batch_count
+
+        send_push_message_batch.delay(batch)
+
+        batch_count += 1
+        batch = []
+
+    for (apns_token, card_count) in targets.iterator(chunk_size=BATCH_SIZE):
+        batch.append((
+            apns_token,
+            {
+                'alert': {
+                    'title': '새로운 카드가 도착했어요!',
+                    'body': f'{card_count} 개의 카드가 교환되었어요. 지금 바로 확인해보세요!',
+                    'title-loc-key': 'fz.notification.card_distribution.title',
+                    'title-loc-args': [],
+                    'loc-key': 'fz.notification.card_distribution.body',
+                    'loc-args': [str(card_count)],
                 },
-                user_info={
-                    'type': 'card_distribution'
-                }
-            )
+                'mutable-content': 1,
+            },
+            {
+                'type': 'card_distribution'
+            }
+        ))
 
+        if len(batch) >= BATCH_SIZE:
+            flush()
+
+    if batch:
+        flush()
+
+    logger.info(f"send_card_distribution_notification(): enqueued {batch_count} batches")
 
 
 @shared_task
@@ -106,19 +146,80 @@ def perform_gc_asset_references():
 
     iterator = dirty_cards_queryset.iterator(chunk_size=CHUNK_SIZE)
 
+    # 카드 하나마다 S3 삭제 요청 / UPDATE를 보내지 않고, 고아 애셋을 모아서 한 번에 삭제합니다.
+    pending_card_ids = []
+    pending_asset_ids = []
+
+    def flush():
+        if not pending_card_ids:
+            return
+
+        try:
+            with transaction.atomic():
+                if pending_asset_ids:
+                    UserCardAsset.delete_assets(
+                        UserCardAsset.objects.filter(id__in=pending_asset_ids)
+                    )
+
+                Card.objects.filter(id__in=pending_card_ids).update(gc_ran_at=timezone.now())
+        except Exception as e:
+            # TODO: Log to sentry
+            logger.error(f"Error while performing GC on {len(pending_card_ids)} cards: {e}", exc_info=True)
+        finally:
+            cache.delete_many([Card.rendered_content_cache_key(card_id) for card_id in pending_card_ids])
+
+            pending_card_ids.clear()
+            pending_asset_ids.clear()
+
     for card in iterator:
-        with transaction.atomic():
-            try:
-                card.remove_orphaned_assets()
-                card.gc_ran_at = timezone.now()
-                card.save(update_fields=['gc_ran_at'])
-            except Exception as e:
-                # TODO: Log to sentry
-                logger.error(f"Error while performing GC on card {card.id}: {e}", exc_info=True)
-                continue
+        try:
+            orphaned_assets = card.find_orphaned_assets()
+        except Exception as e:
+            # TODO: Log to sentry
+            logger.error(f"Error while performing GC on card {card.id}: {e}", exc_info=True)
+            continue
+
+        pending_card_ids.append(card.id)
+        pending_asset_ids.extend(asset.id for asset in orphaned_assets)
+
+        if len(pending_card_ids) >= CHUNK_SIZE or len(pending_asset_ids) >= BatchObjectDeleter.MAX_KEYS_PER_REQUEST:
+            flush()
+
+    flush()
 
     logger.info('perform_gc_asset_references task completed')
 
+@shared_task
+def flush_card_counters():
+    """
+    캐시에 누적된 카드별 투표 / 즐겨찾기 수를 CardCounter 테이블에 반영합니다.
+    1분에 한번씩 실행합니다.
+
+    DB에 반영한 뒤 캐시의 값을 지우기 전에 작업이 중단되면, 다음 실행에서 같은 값이 한 번 더 반영될 수 있습니다.
+    """
+
+    if not card_counter_buffer.acquire_flush_lock():
+        logger.info('flush_card_counters task is already running, skipping this run')
+        return
+
+    try:
+        generations = card_counter_buffer.pending_generations()
+
+        if not generations:
+            return
+
+        deltas = card_counter_buffer.collect(generations)
+
+        with transaction.atomic():
+            updated_count = CardCounter.apply_deltas(deltas)
+
+        card_counter_buffer.mark_flushed(generations[-1])
+        card_counter_buffer.discard(generations)
+
+        logger.info(f'flush_card_counters task completed: {updated_count} cards updated')
+    finally:
+        card_counter_buffer.release_flush_lock()
+
 @shared_task
 def update_distribution_reveal_phase():
     """
@@ -171,6 +272,8 @@ def update_distribution_reveal_phase():
                 # 실제로 변경되었는지 확인
                 if (distribution.reveal_phase != old_phase or
                     distribution.deleted_at != old_deleted_at):
+                    # bulk_update()는 auto_now를 적용하지 않으므로 직접 갱신합니다 (목록의 ETag가 updated_at에 의존합니다)
+                    distribution.updated_at = timezone.now()
                     changed_instances.append(distribution)
                     updated_count += 1
 
@@ -181,6 +284,7 @@ def update_distribution_reveal_phase():
                             ['reveal_phase', 'deleted_at', 'updated_at'],
                             batch_size=CHUNK_SIZE
                         )
+                        distribution_inbox.sync(changed_instances)
                         changed_instances.clear()  # 리스트 비우기
 
             except Exception as e:
@@ -196,6 +300,7 @@ def update_distribution_reveal_phase():
                 ['reveal_phase', 'deleted_at', 'updated_at'],
                 batch_size=CHUNK_SIZE
             )
+            distribution_inbox.sync(changed_instances)
 
         logger.info(
             f'update_distribution_reveal_phase task completed: '
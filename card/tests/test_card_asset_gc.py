@@ -0,0 +1,109 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from card.models import Card, UserCardAsset
+from card.tasks import perform_gc_asset_references
+from flitz.tasks import sweep_undeleted_file_objects
+from flitz.test_utils import create_test_user, create_test_card
+
+
+class CardAssetGCTestCase(TestCase):
+    def setUp(self):
+        self.user = create_test_user(1)
+        self.card = create_test_card(self.user)
+
+        self.referenced_asset = self.create_asset('card_assets/referenced.jpg')
+        self.orphaned_asset = self.create_asset('card_assets/orphaned.jpg')
+
+        self.card.content = {
+            **self.card.content,
+            'background': {
+                'id': str(self.referenced_asset.id),
+                'public_url': None,
+            }
+        }
+        self.card.save()
+
+    def create_asset(self, name):
+        asset = UserCardAsset.objects.create(
+            user=self.user,
+            card=self.card,
+            type=UserCardAsset.AssetType.IMAGE,
+            mimetype='image/jpeg',
+            size=0
+        )
+
+        # 실제 업로드 없이 파일 이름만 지정
+        UserCardAsset.objects.filter(id=asset.id).update(object=name)
+        asset.refresh_from_db()
+
+        return asset
+
+    @patch('flitz.storage.BatchObjectDeleter.delete', return_value=[])
+    def test_gc_deletes_orphaned_assets_in_batch(self, mock_delete):
+        """고아 애셋만 한 번의 배치 요청으로 삭제되어야 합니다."""
+        perform_gc_asset_references()
+
+        mock_delete.assert_called_once_with(['card_assets/orphaned.jpg'])
+
+        self.orphaned_asset.refresh_from_db()
+        self.referenced_asset.refresh_from_db()
+
+        self.assertIsNotNone(self.orphaned_asset.deleted_at)
+        self.assertFalse(self.orphaned_asset.object)
+
+        self.assertIsNone(self.referenced_asset.deleted_at)
+        self.assertTrue(self.referenced_asset.object)
+
+        self.assertIsNotNone(Card.objects.get(id=self.card.id).gc_ran_at)
+
+    @patch('flitz.storage.BatchObjectDeleter.delete', side_effect=lambda names: list(names))
+    def test_failed_deletion_keeps_object_name(self, mock_delete):
+        """S3 삭제에 실패한 애셋은 나중에 다시 정리할 수 있도록 오브젝트 이름을 유지해야 합니다."""
+        UserCardAsset.delete_assets(UserCardAsset.objects.filter(id=self.orphaned_asset.id))
+
+        self.orphaned_asset.refresh_from_db()
+
+        self.assertIsNotNone(self.orphaned_asset.deleted_at)
+        self.assertEqual(self.orphaned_asset.object.name, 'card_assets/orphaned.jpg')
+
+        # 주기적인 정리 작업에서 다시 삭제되어야 함
+        mock_delete.side_effect = None
+        mock_delete.return_value = []
+
+        sweep_undeleted_file_objects()
+
+        mock_delete.assert_called_with(['card_assets/orphaned.jpg'])
+
+        self.orphaned_asset.refresh_from_db()
+        self.assertFalse(self.orphaned_asset.object)
+
+        # 살아있는 애셋의 파일은 정리 대상이 아님
+        self.referenced_asset.refresh_from_db()
+        self.assertTrue(self.referenced_asset.object)
+
+    @patch('flitz.storage.BatchObjectDeleter.delete', return_value=[])
+    def test_shared_object_is_kept_while_referenced(self, mock_delete):
+        """같은 내용 기반 오브젝트를 다른 애셋이 참조하고 있으면 삭제하지 않아야 합니다."""
+        other_card = create_test_card(self.user)
+        shared_asset = UserCardAsset.objects.create(
+            user=self.user,
+            card=other_card,
+            type=UserCardAsset.AssetType.IMAGE,
+            mimetype='image/jpeg',
+            size=0
+        )
+        UserCardAsset.objects.filter(id=shared_asset.id).update(object='card_assets/orphaned.jpg')
+
+        UserCardAsset.delete_assets(UserCardAsset.objects.filter(id=self.orphaned_asset.id))
+        mock_delete.assert_not_called()
+
+        self.orphaned_asset.refresh_from_db()
+        self.assertIsNotNone(self.orphaned_asset.deleted_at)
+
+        # 마지막 참조가 사라지면 삭제
+        shared_asset.delete_asset()
+        mock_delete.assert_called_with(['card_assets/orphaned.jpg'])
+
+        other_card.invalidate_rendered_content()
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from card.models import UserCardAsset
+from flitz.tests.test_uploads import create_mock_storage
+from flitz.test_utils import create_test_user, create_test_card
+from flitz.uploads import DirectUploader
+
+
+class CardAssetDirectUploadTestCase(APITestCase):
+    def setUp(self):
+        self.user = create_test_user(1)
+        self.card = create_test_card(self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.storage = create_mock_storage()
+
+        patcher = patch('card.views.DirectUploader', lambda: DirectUploader(self.storage))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_upload_session(self, **kwargs):
+        data = {
+            'filename': 'photo.jpg',
+            'content_type': 'image/jpeg',
+            'size': 1024,
+            **kwargs
+        }
+
+        url = reverse('Card-create-asset-upload-session', args=[self.card.id])
+
+        return self.client.post(url, data, format='json')
+
+    def test_upload_session_flow(self):
+        """업로드 세션 발급 후 완료 API를 호출하면 애셋이 생성되어야 합니다."""
+        response = self.create_upload_session()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['url'], 'http://localhost:9000/flitz')
+
+        session_id = response.data['session_id']
+        complete_url = reverse('Card-complete-asset-upload-session', args=[self.card.id, session_id])
+
+        response = self.client.post(complete_url)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        asset = UserCardAsset.objects.get(card=self.card)
+        self.assertEqual(asset.type, UserCardAsset.AssetType.IMAGE)
+        self.assertEqual(asset.size, 1024)
+        self.assertTrue(asset.object.name.startswith('card_assets/'))
+
+        # 같은 세션으로 두 번 완료할 수 없음
+        response = self.client.post(complete_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_upload_session_too_large(self):
+        """최대 크기를 초과하는 파일은 업로드 세션을 발급하지 않아야 합니다."""
+        response = self.create_upload_session(size=UserCardAsset.MAX_UPLOAD_SIZE + 1)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.storage.bucket.meta.client.generate_presigned_post.assert_not_called()
+
+    def test_upload_session_other_users_card(self):
+        """다른 사용자의 카드에는 업로드 세션을 발급하지 않아야 합니다."""
+        other_user = create_test_user(2)
+        self.client.force_authenticate(user=other_user)
+
+        response = self.create_upload_session()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
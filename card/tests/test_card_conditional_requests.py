@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from card.models import CardDistribution, CardFavoriteItem
+from flitz.storage import StorageURLBuilder
+from flitz.test_utils import create_test_user, create_test_card, create_test_user_location
+
+
+class CardConditionalRequestTestCase(APITestCase):
+    def setUp(self):
+        self.user = create_test_user(1)
+        self.other_user = create_test_user(2)
+
+        create_test_user_location(self.user)
+        create_test_user_location(self.other_user)
+
+        self.card = create_test_card(self.user)
+        self.other_card = create_test_card(self.other_user)
+
+        self.distribution = CardDistribution.objects.create(
+            card=self.other_card,
+            user=self.user,
+            reveal_phase=CardDistribution.RevealPhase.FULLY_REVEALED,
+        )
+
+        CardFavoriteItem.objects.create(user=self.user, card=self.other_card)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assertNotModified(self, url: str, serializer_path: str):
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+
+        etag = response['ETag']
+
+        # 304 응답은 직렬화를 하지 않아야 함
+        with patch(serializer_path) as mock_to_representation:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        mock_to_representation.assert_not_called()
+
+        return etag
+
+    def test_distribution_list(self):
+        url = reverse('CardDistribution-list')
+        etag = self.assertNotModified(url, 'card.serializers.CardDistributionSerializer.to_representation')
+
+        # 카드가 수정되면 ETag가 바뀌어야 함
+        self.other_card.title = 'Changed'
+        self.other_card.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # 배포가 dismiss되면 목록에서 빠지므로 ETag가 바뀌어야 함
+        etag = response['ETag']
+        self.client.put(reverse('CardDistribution-dislike', args=[self.distribution.id]))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_favorite_list(self):
+        url = reverse('CardFavorite-list')
+        etag = self.assertNotModified(url, 'card.serializers.CardFavoriteItemSerializer.to_representation')
+
+        # 카드 소유자의 정보가 바뀌면 ETag가 바뀌어야 함
+        self.other_user.display_name = 'Changed'
+        self.other_user.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # 즐겨찾기가 삭제되면 목록에서 빠지므로 ETag가 바뀌어야 함
+        etag = response['ETag']
+        item = CardFavoriteItem.objects.get(user=self.user, card=self.other_card)
+        self.client.delete(reverse('CardFavorite-detail', args=[item.id]))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_card_detail(self):
+        url = reverse('Card-detail', args=[self.other_card.id])
+        etag = self.assertNotModified(url, 'card.serializers.PublicCardSerializer.to_representation')
+
+        # 다른 사용자의 카드에는 weak ETag를 사용함
+        self.assertTrue(etag.startswith('W/'))
+
+        # 다른 사용자에게는 If-Match용 카드 버전을 알려주지 않음
+        self.assertNotIn('X-Card-Version', self.client.get(url))
+
+        # 자신의 카드도 캐시 검증에는 weak ETag를 사용하고, If-Match용 카드 버전은 별도 헤더로 알려줌
+        own_url = reverse('Card-detail', args=[self.card.id])
+        own_card_etag = self.assertNotModified(own_url, 'card.serializers.PublicCardSerializer.to_representation')
+        self.assertTrue(own_card_etag.startswith('W/'))
+
+        response = self.client.get(own_url, HTTP_IF_NONE_MATCH=own_card_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['X-Card-Version'], self.card.etag)
+
+    def test_own_card_detail_url_epoch(self):
+        """presigned URL의 주기가 바뀌면 자신의 카드도 (예전 URL이 담긴) 캐시를 사용하지 않아야 합니다."""
+        url = reverse('Card-detail', args=[self.card.id])
+
+        with patch.object(StorageURLBuilder, 'url_epoch', return_value=10):
+            etag = self.client.get(url)['ETag']
+
+        with patch.object(StorageURLBuilder, 'url_epoch', return_value=11):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response['X-Card-Version'], self.card.etag)
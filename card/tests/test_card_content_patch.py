@@ -0,0 +1,119 @@
+import json
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from card.models import Card
+from flitz.jsonpatch import JSON_PATCH_MEDIA_TYPE
+from flitz.test_utils import create_test_user, create_test_card
+
+
+class CardContentPatchTestCase(APITestCase):
+    def setUp(self):
+        self.user = create_test_user(1)
+        self.other_user = create_test_user(2)
+
+        self.content = {
+            'schema_version': '1.0',
+            'background': None,
+            'elements': [
+                {'id': 'text-1', 'type': 'text', 'transform': {'position': {'x': 0.0, 'y': 0.0}, 'scale': 1.0, 'rotation': 0.0}, 'zIndex': 0, 'text': 'Hello'},
+                {'id': 'text-2', 'type': 'text', 'transform': {'position': {'x': 1.0, 'y': 1.0}, 'scale': 1.0, 'rotation': 0.0}, 'zIndex': 1, 'text': 'World'},
+            ],
+            'properties': {},
+        }
+
+        self.card = create_test_card(self.user, content=self.content)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.url = reverse('Card-detail', args=[self.card.id])
+
+    def patch(self, operations, etag=None):
+        headers = {} if etag is None else {'If-Match': etag}
+        return self.client.generic('PATCH', self.url, data=json.dumps(operations), content_type=JSON_PATCH_MEDIA_TYPE, headers=headers)
+
+    def current_etag(self) -> str:
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response['X-Card-Version']
+
+    def test_patch_content(self):
+        """JSON Patch로 카드 컨텐츠의 일부를 수정할 수 있어야 합니다."""
+        etag = self.current_etag()
+
+        response = self.patch([
+            {'op': 'replace', 'path': '/elements/1/text', 'value': 'Flitz'},
+            {'op': 'add', 'path': '/elements/-', 'value': {'type': 'text', 'transform': {'position': {'x': 2, 'y': 2}, 'scale': 1, 'rotation': 0}, 'text': 'New', 'extra': True}},
+        ], etag=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        self.card.refresh_from_db()
+
+        self.assertEqual(self.card.content['elements'][0], self.content['elements'][0])
+        self.assertEqual(self.card.content['elements'][1]['text'], 'Flitz')
+
+        # 새로 추가된 요소는 CardObject.as_dict()와 같은 형태로 정리되어야 함
+        self.assertEqual(self.card.content['elements'][2], {
+            'id': None, 'type': 'text', 'transform': {'position': {'x': 2, 'y': 2}, 'scale': 1, 'rotation': 0}, 'zIndex': None, 'text': 'New'
+        })
+
+        # 응답의 ETag로 이어서 수정할 수 있어야 함
+        response = self.patch([{'op': 'remove', 'path': '/elements/0'}], etag=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.card.refresh_from_db()
+        self.assertEqual(len(self.card.content['elements']), 2)
+
+    def test_precondition(self):
+        """If-Match 헤더가 없거나 현재 ETag와 다르면 수정되지 않아야 합니다."""
+        operations = [{'op': 'replace', 'path': '/elements/0/text', 'value': 'Changed'}]
+
+        response = self.patch(operations)
+        self.assertEqual(response.status_code, status.HTTP_428_PRECONDITION_REQUIRED)
+
+        etag = self.current_etag()
+
+        # 다른 클라이언트가 먼저 수정한 경우
+        Card.objects.get(pk=self.card.pk).save()
+
+        response = self.patch(operations, etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertNotEqual(response['ETag'], etag)
+
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.content, self.content)
+
+    def test_invalid_patch(self):
+        """잘못된 패치나 스키마에 맞지 않는 결과는 거부되어야 합니다."""
+        etag = self.current_etag()
+
+        cases = [
+            ([{'op': 'replace', 'path': '/elements/5/text', 'value': 'x'}], status.HTTP_400_BAD_REQUEST),
+            ([{'op': 'replace', 'path': '/elements/0/zIndex', 'value': 'top'}], status.HTTP_400_BAD_REQUEST),
+            ([{'op': 'remove', 'path': '/properties'}], status.HTTP_400_BAD_REQUEST),
+            ([{'op': 'test', 'path': '/elements/0/text', 'value': 'Goodbye'}], status.HTTP_409_CONFLICT),
+        ]
+
+        for (operations, expected_status) in cases:
+            with self.subTest(operations=operations):
+                response = self.patch(operations, etag=etag)
+                self.assertEqual(response.status_code, expected_status)
+
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.content, self.content)
+
+    def test_patch_other_users_card(self):
+        self.client.force_authenticate(user=self.other_user)
+
+        response = self.patch([{'op': 'replace', 'path': '/elements/0/text', 'value': 'x'}], etag=self.card.etag)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.content, self.content)
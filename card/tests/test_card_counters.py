@@ -0,0 +1,204 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from card.counters import CardCounterBuffer, UPVOTE_COUNT, DOWNVOTE_COUNT, FAVORITE_COUNT
+from card.models import CardDistribution, CardFavoriteItem, CardCounter
+from card.tasks import flush_card_counters
+from flitz.test_utils import create_test_user, create_test_card, create_test_user_location
+
+
+class CardCounterBufferTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.buffer = CardCounterBuffer(prefix='fz:test_card_counters')
+
+    def test_collect_sums_generations(self):
+        with freeze_time('2026-01-01 00:00:10') as frozen:
+            generation = self.buffer.generation()
+
+            self.buffer.increment('card-a', UPVOTE_COUNT)
+            self.buffer.increment('card-a', UPVOTE_COUNT)
+            self.buffer.increment('card-b', FAVORITE_COUNT)
+
+            frozen.tick(CardCounterBuffer.GENERATION_SECONDS)
+
+            self.buffer.increment('card-a', DOWNVOTE_COUNT)
+            self.buffer.increment('card-b', FAVORITE_COUNT, -1)
+
+            deltas = self.buffer.collect([generation, generation + 1])
+
+            # 증감 값의 합이 0인 카드는 제외되어야 함
+            self.assertEqual(deltas, {
+                'card-a': {UPVOTE_COUNT: 2, DOWNVOTE_COUNT: 1, FAVORITE_COUNT: 0},
+            })
+
+            self.buffer.discard([generation, generation + 1])
+            self.assertEqual(self.buffer.collect([generation, generation + 1]), {})
+
+    def test_pending_generations(self):
+        with freeze_time('2026-01-01 00:10:00'):
+            current = self.buffer.generation()
+
+            generations = self.buffer.pending_generations()
+
+            # 현재 세대와 바로 이전 세대는 아직 flush하지 않아야 함
+            self.assertEqual(generations[-1], current - 2)
+
+            self.buffer.mark_flushed(current - 2)
+            self.assertEqual(self.buffer.pending_generations(), [])
+
+        with freeze_time('2026-01-01 00:12:00'):
+            self.assertEqual(self.buffer.pending_generations(), [current - 1, current])
+
+    def test_record_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.buffer.record(['card-a'], UPVOTE_COUNT)
+
+        # 커밋되기 전에는 누적되지 않아야 함
+        self.assertEqual(self.buffer.collect([self.buffer.generation()]), {})
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.buffer.collect([self.buffer.generation()]), {
+            'card-a': {UPVOTE_COUNT: 1, DOWNVOTE_COUNT: 0, FAVORITE_COUNT: 0},
+        })
+
+
+class CardCounterFlowTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.owner = create_test_user(1)
+        self.user = create_test_user(2)
+        self.other_user = create_test_user(3)
+
+        for user in (self.owner, self.user, self.other_user):
+            create_test_user_location(user)
+
+        self.card = create_test_card(self.owner)
+
+        self.client = APIClient()
+
+    def distribute(self, user):
+        return CardDistribution.objects.create(
+            card=self.card,
+            user=user,
+            reveal_phase=CardDistribution.RevealPhase.FULLY_REVEALED,
+        )
+
+    def test_like_dislike_and_unfavorite(self):
+        with freeze_time('2026-01-01 00:00:00') as frozen:
+            self.client.force_authenticate(user=self.user)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.put(reverse('CardDistribution-like', args=[self.distribute(self.user).id]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            self.client.force_authenticate(user=self.other_user)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.put(reverse('CardDistribution-dislike', args=[self.distribute(self.other_user).id]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            # flush되기 전에는 DB에 반영되지 않아야 함
+            self.assertFalse(CardCounter.objects.filter(card=self.card).exists())
+
+            frozen.tick(CardCounterBuffer.GENERATION_SECONDS * 2)
+            flush_card_counters()
+
+            counter = CardCounter.objects.get(card=self.card)
+            self.assertEqual((counter.upvote_count, counter.downvote_count, counter.favorite_count), (1, 1, 1))
+
+            # 즐겨찾기를 해제하면 favorite_count가 줄어들어야 함
+            self.client.force_authenticate(user=self.user)
+            favorite = CardFavoriteItem.objects.get(user=self.user, card=self.card)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(reverse('CardFavorite-detail', args=[favorite.id]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            frozen.tick(CardCounterBuffer.GENERATION_SECONDS * 2)
+            flush_card_counters()
+
+            counter.refresh_from_db()
+            self.assertEqual((counter.upvote_count, counter.downvote_count, counter.favorite_count), (1, 1, 0))
+
+            # 이미 flush된 세대는 다시 반영되지 않아야 함
+            flush_card_counters()
+
+            counter.refresh_from_db()
+            self.assertEqual((counter.upvote_count, counter.downvote_count, counter.favorite_count), (1, 1, 0))
+
+    def test_apply_deltas(self):
+        CardCounter.objects.create(card=self.card, upvote_count=3, favorite_count=1)
+        deleted_card = create_test_card(self.owner)
+        deleted_card_id = str(deleted_card.id)
+        deleted_card.delete()
+
+        with self.assertNumQueries(1):
+            updated_count = CardCounter.apply_deltas({
+                str(self.card.id): {UPVOTE_COUNT: 2, DOWNVOTE_COUNT: 0, FAVORITE_COUNT: -5},
+                deleted_card_id: {UPVOTE_COUNT: 1, DOWNVOTE_COUNT: 0, FAVORITE_COUNT: 0},
+            })
+
+        self.assertEqual(updated_count, 1)
+
+        counter = CardCounter.objects.get(card=self.card)
+
+        # 값이 0보다 작아지지 않아야 함
+        self.assertEqual((counter.upvote_count, counter.downvote_count, counter.favorite_count), (5, 0, 0))
+        self.assertEqual(CardCounter.objects.count(), 1)
+
+    def test_apply_deltas_adds_to_stored_values(self):
+        card_without_counter = create_test_card(self.owner)
+
+        # 새로 만드는 카운터도 0보다 작아지지 않아야 함
+        CardCounter.apply_deltas({
+            str(self.card.id): {UPVOTE_COUNT: 2, DOWNVOTE_COUNT: 1, FAVORITE_COUNT: 1},
+            str(card_without_counter.id): {UPVOTE_COUNT: 1, DOWNVOTE_COUNT: -1, FAVORITE_COUNT: 0},
+        })
+
+        # 다른 flush가 먼저 반영한 값을 덮어쓰지 않고 더해야 함
+        CardCounter.objects.filter(card=self.card).update(upvote_count=10)
+
+        updated_count = CardCounter.apply_deltas({
+            str(self.card.id): {UPVOTE_COUNT: 3, DOWNVOTE_COUNT: -1, FAVORITE_COUNT: 0},
+        })
+        self.assertEqual(updated_count, 1)
+
+        counter = CardCounter.objects.get(card=self.card)
+        self.assertEqual((counter.upvote_count, counter.downvote_count, counter.favorite_count), (13, 0, 1))
+
+        counter = CardCounter.objects.get(card=card_without_counter)
+        self.assertEqual((counter.upvote_count, counter.downvote_count, counter.favorite_count), (1, 0, 0))
+
+    def test_owner_reads_counters(self):
+        CardCounter.objects.create(card=self.card, upvote_count=4, downvote_count=2, favorite_count=3)
+        card_without_counter = create_test_card(self.owner)
+
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.get(reverse('Card-counters', args=[self.card.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['upvote_count'], 4)
+        self.assertEqual(response.data['favorite_count'], 3)
+
+        response = self.client.get(reverse('Card-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        counters = {item['id']: item['counters'] for item in response.data['results']}
+        self.assertEqual(counters[str(self.card.id)]['downvote_count'], 2)
+        self.assertEqual(counters[str(card_without_counter.id)]['upvote_count'], 0)
+        self.assertIsNone(counters[str(card_without_counter.id)]['updated_at'])
+
+        # 다른 사용자는 카운터를 조회할 수 없어야 함
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(reverse('Card-counters', args=[self.card.id]))
+        self.assertNotEqual(response.status_code, status.HTTP_200_OK)
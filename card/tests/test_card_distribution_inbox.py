@@ -0,0 +1,232 @@
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from card.inbox import DistributionInbox, distribution_inbox
+from card.models import CardDistribution
+from flitz.pagination import CursorPagination
+from flitz.sortedset import LocalSortedSetStore
+from flitz.test_utils import create_test_user, create_test_card, create_test_user_location
+
+
+class LocalSortedSetStoreTestCase(SimpleTestCase):
+    def setUp(self):
+        self.store = LocalSortedSetStore()
+
+    def test_add_requires_existing_set(self):
+        # 만들어지지 않은 집합에 일부 멤버만 추가되면 안 됨
+        self.assertFalse(self.store.add('inbox', {'a': 1.0}))
+        self.assertIsNone(self.store.range_after('inbox', None, 10))
+
+        self.store.replace('inbox', {}, timeout=60)
+        self.assertEqual(self.store.range_after('inbox', None, 10), [])
+
+        self.assertTrue(self.store.add('inbox', {'a': 1.0}))
+        self.assertEqual(self.store.range_after('inbox', None, 10), [('a', 1.0)])
+
+    def test_range_after_with_ties(self):
+        self.store.replace('inbox', {'c': 2.0, 'a': 1.0, 'b': 1.0, 'd': 3.0}, timeout=60)
+
+        self.assertEqual(self.store.range_after('inbox', None, 2), [('a', 1.0), ('b', 1.0)])
+        self.assertEqual(self.store.range_after('inbox', ('a', 1.0), 2), [('b', 1.0), ('c', 2.0)])
+
+        # 커서가 가리키는 멤버가 제거되어도 그 다음부터 이어져야 함
+        self.store.remove('inbox', ['b'])
+        self.assertEqual(self.store.range_after('inbox', ('b', 1.0), 10), [('c', 2.0), ('d', 3.0)])
+
+    def test_range_after_extends_timeout(self):
+        self.store.replace('inbox', {'a': 1.0}, timeout=60)
+
+        with patch('flitz.sortedset.time.time', return_value=time.time() + 50):
+            self.assertEqual(self.store.range_after('inbox', None, 10, timeout=60), [('a', 1.0)])
+
+        # 조회할 때 만료 시간이 연장되었으므로, 처음 만든 시점으로부터 60초가 지나도 남아 있어야 함
+        with patch('flitz.sortedset.time.time', return_value=time.time() + 100):
+            self.assertEqual(self.store.range_after('inbox', None, 10), [('a', 1.0)])
+
+        with patch('flitz.sortedset.time.time', return_value=time.time() + 200):
+            self.assertIsNone(self.store.range_after('inbox', None, 10))
+
+
+class DistributionInboxTestCase(APITestCase):
+    def setUp(self):
+        self.user = create_test_user(1)
+        create_test_user_location(self.user)
+
+        self.senders = [create_test_user(index) for index in range(2, 6)]
+
+        for sender in self.senders:
+            create_test_user_location(sender)
+
+        self.cards = [create_test_card(sender) for sender in self.senders]
+
+        now = timezone.now()
+
+        self.distributions = [
+            self.distribute(self.cards[0], CardDistribution.RevealPhase.BLURRY_STRONG, now - timedelta(minutes=40)),
+            self.distribute(self.cards[1], CardDistribution.RevealPhase.FULLY_REVEALED, now - timedelta(minutes=30)),
+            self.distribute(self.cards[2], CardDistribution.RevealPhase.FULLY_REVEALED, now - timedelta(minutes=20)),
+            self.distribute(self.cards[3], CardDistribution.RevealPhase.HIDDEN, now - timedelta(minutes=10)),
+        ]
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def distribute(self, card, reveal_phase, created_at):
+        distribution = CardDistribution.objects.create(card=card, user=self.user, reveal_phase=reveal_phase)
+
+        # auto_now_add를 우회해서 배포 시각을 지정합니다
+        CardDistribution.objects.filter(id=distribution.id).update(created_at=created_at)
+        distribution.refresh_from_db()
+
+        return distribution
+
+    def list_ids(self, url=None):
+        response = self.client.get(url or reverse('CardDistribution-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [item['id'] for item in response.data['results']], response.data['next']
+
+    def test_list_order_and_paging(self):
+        expected = [str(self.distributions[index].id) for index in (1, 2, 0)]
+
+        (ids, next_url) = self.list_ids()
+        self.assertEqual(ids, expected)
+        self.assertIsNone(next_url)
+
+        with patch.object(CursorPagination, 'page_size', 2):
+            (first_page, next_url) = self.list_ids()
+            (second_page, last_url) = self.list_ids(next_url)
+
+        self.assertEqual(first_page + second_page, expected)
+        self.assertIsNone(last_url)
+
+        response = self.client.get(reverse('CardDistribution-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_queries_do_not_grow_with_page(self):
+        # inbox를 미리 만들어 둡니다
+        self.list_ids()
+
+        # 배포 조회 + 카드 애셋 prefetch
+        with self.assertNumQueries(2):
+            self.list_ids()
+
+        for index in range(10, 15):
+            sender = create_test_user(index)
+            distribution = self.distribute(
+                create_test_card(sender), CardDistribution.RevealPhase.FULLY_REVEALED, timezone.now()
+            )
+            distribution_inbox.sync([distribution])
+
+        with self.assertNumQueries(2):
+            (ids, _) = self.list_ids()
+
+        self.assertEqual(len(ids), 8)
+
+    def test_inbox_is_maintained(self):
+        self.list_ids()
+
+        # 새 배포는 커밋된 후 inbox에 추가되어야 함
+        newcomer = create_test_user(20)
+        create_test_user_location(newcomer)
+        card = create_test_card(newcomer)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            (inserted,) = CardDistribution.insert_distributions([
+                CardDistribution(card=card, user=self.user, latitude=37.5665, longitude=126.9780)
+            ])
+
+        inserted.reveal_phase = CardDistribution.RevealPhase.FULLY_REVEALED
+        CardDistribution.objects.filter(id=inserted.id).update(reveal_phase=inserted.reveal_phase)
+        distribution_inbox.sync([inserted])
+
+        (ids, _) = self.list_ids()
+        self.assertEqual(ids[-2], str(inserted.id))
+
+        # dismiss된 배포는 inbox에서 제거되어야 함
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(reverse('CardDistribution-dislike', args=[self.distributions[1].id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        entries = distribution_inbox.page(self.user.id, None, 10)
+        self.assertNotIn(str(self.distributions[1].id), [member for (member, _) in entries])
+
+        # inbox에 반영되지 않는 변경 (카드 소유자 비활성화)은 목록을 조회할 때 걸러지지만,
+        # 계정이 다시 활성화될 수 있으므로 inbox에서 제거되지 않아야 함
+        self.senders[2].disabled_at = timezone.now()
+        self.senders[2].save()
+
+        (ids, _) = self.list_ids()
+        self.assertNotIn(str(self.distributions[2].id), ids)
+
+        entries = distribution_inbox.page(self.user.id, None, 10)
+        self.assertIn(str(self.distributions[2].id), [member for (member, _) in entries])
+
+        self.senders[2].disabled_at = None
+        self.senders[2].save()
+
+        (ids, _) = self.list_ids()
+        self.assertIn(str(self.distributions[2].id), ids)
+
+        # 다시 표시될 일이 없는 배포 (QuerySet.update()로 삭제되어 inbox에 반영되지 않은 경우)는 inbox에서 제거되어야 함
+        CardDistribution.objects.filter(id=self.distributions[2].id).update(deleted_at=timezone.now())
+
+        (ids, _) = self.list_ids()
+        self.assertNotIn(str(self.distributions[2].id), ids)
+
+        entries = distribution_inbox.page(self.user.id, None, 10)
+        self.assertNotIn(str(self.distributions[2].id), [member for (member, _) in entries])
+
+    def test_rebuild_keeps_concurrent_changes(self):
+        store = distribution_inbox.store
+        replace = store.replace
+
+        newcomer = create_test_user(20)
+        create_test_user_location(newcomer)
+        card = create_test_card(newcomer)
+
+        inserted = []
+
+        def replace_after_concurrent_changes(key, entries, timeout):
+            # 스냅샷을 읽은 뒤 replace() 전에 다른 요청이 커밋한 변경 (inbox가 없으므로 sync()는 아무것도 하지 않음)
+            self.distributions[1].dismissed_at = timezone.now()
+            self.distributions[1].save()
+
+            self.distributions[0].reveal_phase = CardDistribution.RevealPhase.FULLY_REVEALED
+            self.distributions[0].save()
+
+            inserted.append(self.distribute(card, CardDistribution.RevealPhase.FULLY_REVEALED, timezone.now()))
+
+            distribution_inbox.sync([self.distributions[0], self.distributions[1], *inserted])
+
+            replace(key, entries, timeout)
+
+        distribution_inbox.invalidate(self.user.id)
+
+        with patch.object(store, 'replace', side_effect=replace_after_concurrent_changes):
+            (ids, _) = self.list_ids()
+
+        self.assertEqual(ids, [str(self.distributions[0].id), str(self.distributions[2].id), str(inserted[0].id)])
+
+    def test_invalidate_rebuilds_from_database(self):
+        self.list_ids()
+
+        CardDistribution.objects.filter(id=self.distributions[3].id).update(
+            reveal_phase=CardDistribution.RevealPhase.FULLY_REVEALED
+        )
+        distribution_inbox.invalidate(self.user.id)
+
+        (ids, _) = self.list_ids()
+        self.assertEqual(ids[2], str(self.distributions[3].id))
+
+    def test_cursor_round_trip(self):
+        entry = (str(self.distributions[0].id), DistributionInbox.score(2, timezone.now()))
+
+        self.assertEqual(DistributionInbox.decode_cursor(DistributionInbox.encode_cursor(entry)), entry)
@@ -10,7 +10,8 @@ from freezegun import freeze_time
 from card.models import CardDistribution, Card
 from card.tasks import send_card_distribution_notification
 from location.models import UserLocation
-from user.models import User
+from user.models import User, UserSettings
+from user_auth.models import UserSession
 
 from flitz.test_utils import (
     create_test_user, create_test_card,
@@ -35,7 +36,15 @@ class CardDistributionNotificationTestCase(TestCase):
             content={'test': f'content_{identifier}'},
         )
 
+        session = UserSession.objects.create(
+            user=user,
+            description='Test Session',
+            initiated_from='127.0.0.1',
+            apns_token=f'apns_token_{identifier}',
+        )
+
         user.main_card = card
+        user.primary_session = session
         user.save()
 
         return user
@@ -70,24 +79,26 @@ class CardDistributionNotificationTestCase(TestCase):
         # 서울 시간대 (GMT+9)로 오후 7시 설정
         with freeze_time("2024-06-01 10:00:00"):  # UTC 10:00 = KST 19:00
             # Celery task의 delay 메서드를 mock
-            with patch('card.tasks.send_push_message_ex.delay') as mock_delay:
-                send_card_distribution_notification()
+            with patch('card.tasks.send_push_message_batch.delay') as mock_delay:
+                with self.assertNumQueries(1):
+                    send_card_distribution_notification()
 
-                # 두 번 호출되었는지 확인 (user1, user2 각각)
-                self.assertEqual(mock_delay.call_count, 2)
+                # 하나의 배치로 묶여서 한 번만 호출되어야 함
+                self.assertEqual(mock_delay.call_count, 1)
 
-                # 호출된 인자들 확인
-                calls = mock_delay.call_args_list
-                user_ids = [call[0][0] for call in calls]
+                notifications = mock_delay.call_args[0][0]
+                apns_tokens = [notification[0] for notification in notifications]
 
                 # 두 사용자 모두에게 알림이 갔는지 확인
-                self.assertIn(self.user1.id, user_ids)
-                self.assertIn(self.user2.id, user_ids)
+                self.assertEqual(len(notifications), 2)
+                self.assertIn('apns_token_1', apns_tokens)
+                self.assertIn('apns_token_2', apns_tokens)
 
-                # 첫 번째 호출 인자 상세 검증
-                first_call = calls[0]
-                self.assertEqual(first_call[1]['type'], 'match')
-                self.assertIn('개의 카드가 교환되었어요', first_call[1]['aps']['alert']['body'])
+                # 알림 내용 상세 검증
+                (_, aps, user_info) = notifications[0]
+                self.assertEqual(user_info['type'], 'card_distribution')
+                self.assertIn('1 개의 카드가 교환되었어요', aps['alert']['body'])
+                self.assertEqual(aps['alert']['loc-args'], ['1'])
 
     def test_only_fully_revealed_cards_trigger_notification(self):
         """HIDDEN이나 BLURRY_SOFT 상태의 카드는 알림 개수에 포함되지 않아야 함"""
@@ -102,12 +113,66 @@ class CardDistributionNotificationTestCase(TestCase):
             )
 
         with freeze_time("2024-06-01 10:00:00"):  # UTC 10:00 = KST 19:00
-            with patch('card.tasks.send_push_message_ex.delay') as mock_delay:
+            with patch('card.tasks.send_push_message_batch.delay') as mock_delay:
                 send_card_distribution_notification()
 
                 # HIDDEN 카드만 있으므로 알림이 가지 않아야 함
                 self.assertEqual(mock_delay.call_count, 0)
 
+    def test_notification_settings_respected(self):
+        """매칭 알림을 끈 사용자, APNs 토큰이 없는 사용자에게는 알림을 보내지 않아야 함"""
+        user3 = self.__create_user(3)
+
+        with freeze_time("2024-06-01 09:00:00"):
+            for user in (self.user1, self.user2, user3):
+                self.__setup_location(user, self.LOCATION_시청역_서울광장)
+
+            CardDistribution.objects.create(
+                card=self.user1.main_card,
+                user=self.user2,
+                reveal_phase=CardDistribution.RevealPhase.FULLY_REVEALED
+            )
+
+            CardDistribution.objects.create(
+                card=self.user1.main_card,
+                user=user3,
+                reveal_phase=CardDistribution.RevealPhase.FULLY_REVEALED
+            )
+
+            CardDistribution.objects.create(
+                card=self.user2.main_card,
+                user=self.user1,
+                reveal_phase=CardDistribution.RevealPhase.FULLY_REVEALED
+            )
+
+        UserSettings.objects.create(user=self.user2, match_notifications_enabled=False)
+        UserSession.objects.filter(user=user3).update(apns_token=None)
+
+        with freeze_time("2024-06-01 10:00:00"):
+            with patch('card.tasks.send_push_message_batch.delay') as mock_delay:
+                send_card_distribution_notification()
+
+                self.assertEqual(mock_delay.call_count, 1)
+                self.assertEqual([notification[0] for notification in mock_delay.call_args[0][0]], ['apns_token_1'])
+
+    def test_other_timezones_are_skipped(self):
+        """현지 시각이 19시가 아닌 시간대의 사용자에게는 알림을 보내지 않아야 함"""
+        with freeze_time("2024-06-01 09:00:00"):
+            self.__setup_location(self.user1, self.LOCATION_시청역_서울광장)
+
+            CardDistribution.objects.create(
+                card=self.user2.main_card,
+                user=self.user1,
+                reveal_phase=CardDistribution.RevealPhase.FULLY_REVEALED
+            )
+
+        # UTC 11:00 = KST 20:00
+        with freeze_time("2024-06-01 11:00:00"):
+            with patch('card.tasks.send_push_message_batch.delay') as mock_delay:
+                send_card_distribution_notification()
+
+                self.assertEqual(mock_delay.call_count, 0)
+
     # def test_different_timezone(self):
     #     """다른 타임존에서의 알림 테스트"""
     #     import pytz
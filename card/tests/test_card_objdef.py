@@ -1,8 +1,8 @@
 from django.test import TestCase
 
-from dacite import from_dict
+from dacite import from_dict, DaciteError
 
-from card.objdef import CardObject, TextElement, ImageElement
+from card.objdef import CardObject, TextElement, ImageElement, load_card_object
 
 
 # Create your tests here.
@@ -29,3 +29,62 @@ class CardObjdefTestCase(TestCase):
         self.assertIsInstance(card_obj.elements[0], TextElement)
         self.assertIsInstance(card_obj.elements[1], ImageElement)
 
+
+    def test_load_card_object_matches_dacite(self):
+        """load_card_object()가 dacite.from_dict()와 같은 결과를 반환하는지 테스트합니다."""
+        card_obj_dict = {
+            "schema_version": "1.0",
+            "background": { "id": "background-asset", "public_url": "https://example.com/background.jpg" },
+            "elements": [
+                { "id": "text-1", "type": "text", "transform": { "position": { "x": 4, "y": 3.5 }, "scale": 1.0, "rotation": 0 }, "zIndex": 2, "text": "Hello, World!" },
+                { "type": "image", "transform": {"position": {"x": 4.0, "y": 3.0}, "scale": 1.0, "rotation": 1.0}, "source": { "id": "1234-1234-1234" }, "size": { "width": 100, "height": 100.0 }, "unknown": True },
+            ],
+
+            "properties": { "theme": "dark" }
+        }
+
+        card_obj = load_card_object(card_obj_dict)
+
+        self.assertEqual(card_obj, from_dict(data_class=CardObject, data=card_obj_dict))
+        self.assertIsInstance(card_obj.elements[0], TextElement)
+        self.assertIsInstance(card_obj.elements[1], ImageElement)
+        self.assertIsNone(card_obj.elements[1].zIndex)
+        self.assertIsNone(card_obj.elements[1].source.public_url)
+
+        # as_dict() 결과를 다시 읽었을 때 같은 객체가 되어야 함 (round-trip)
+        self.assertEqual(load_card_object(card_obj.as_dict()), card_obj)
+        self.assertEqual(load_card_object(card_obj.as_dict()).as_dict(), card_obj.as_dict())
+
+        empty_card_obj = CardObject.create_empty()
+        self.assertEqual(load_card_object(empty_card_obj.as_dict()), empty_card_obj)
+
+    def test_load_card_object_errors_match_dacite(self):
+        """잘못된 데이터에 대해 dacite.from_dict()와 같은 예외를 발생시키는지 테스트합니다."""
+        base = { "schema_version": "1.0", "background": None, "elements": [], "properties": {} }
+        text_element = { "type": "text", "transform": { "position": { "x": 4.0, "y": 3.0 }, "scale": 1.0, "rotation": 1.0 }, "text": "Hello" }
+
+        invalid_dicts = [
+            { **base, "schema_version": 1 },
+            { key: value for (key, value) in base.items() if key != "elements" },
+            { **base, "background": "not-an-object" },
+            { **base, "background": { "public_url": None } },
+            { **base, "elements": ({ **text_element },) },
+            { **base, "elements": [{ **text_element, "type": "unknown" }] },
+            { **base, "elements": [{ **text_element, "zIndex": 1.5 }] },
+            { **base, "elements": [{ key: value for (key, value) in text_element.items() if key != "text" }] },
+            { **base, "elements": [{ **text_element, "type": "image" }] },
+            { **base, "elements": ["text"] },
+            { **base, "properties": { "theme": 1 } },
+            { **base, "properties": None },
+        ]
+
+        for card_obj_dict in invalid_dicts:
+            with self.subTest(card_obj_dict=card_obj_dict):
+                with self.assertRaises(DaciteError) as expected:
+                    from_dict(data_class=CardObject, data=card_obj_dict)
+
+                with self.assertRaises(DaciteError) as actual:
+                    load_card_object(card_obj_dict)
+
+                self.assertIs(type(actual.exception), type(expected.exception))
+                self.assertEqual(actual.exception.field_path, expected.exception.field_path)
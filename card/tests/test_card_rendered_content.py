@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from card.models import Card, UserCardAsset
+from flitz.storage import StorageURLBuilder
+from flitz.test_utils import create_test_user, create_test_card
+
+
+class CardRenderedContentCacheTestCase(TestCase):
+    def setUp(self):
+        self.user = create_test_user(1)
+        self.card = create_test_card(self.user)
+
+    def tearDown(self):
+        self.card.invalidate_rendered_content()
+
+    def test_cached_content_is_reused(self):
+        """캐시된 컨텐츠가 있으면 다시 렌더링하지 않아야 합니다."""
+        expected = self.card.get_cached_content_with_url()
+
+        card = Card.objects.get(id=self.card.id)
+
+        with patch.object(Card, 'get_content_with_url') as mock_render:
+            content = card.get_cached_content_with_url()
+
+            mock_render.assert_not_called()
+
+        self.assertEqual(content, expected)
+
+    def test_card_update_changes_version(self):
+        """카드가 수정되면 캐시된 컨텐츠를 사용하지 않아야 합니다."""
+        self.card.get_cached_content_with_url()
+
+        card = Card.objects.get(id=self.card.id)
+        card.content = {**card.content, 'properties': {'color': 'red'}}
+        card.save()
+
+        card = Card.objects.get(id=self.card.id)
+        content = card.get_cached_content_with_url()
+
+        self.assertEqual(content['properties'], {'color': 'red'})
+
+    def test_asset_reference_changes_version(self):
+        """애셋 레퍼런스가 추가되면 버전이 바뀌어야 합니다."""
+        version_before = Card.objects.get(id=self.card.id).rendered_content_version
+
+        UserCardAsset.objects.create(
+            user=self.user,
+            card=self.card,
+            type=UserCardAsset.AssetType.IMAGE,
+            mimetype='image/jpeg',
+            size=0
+        )
+
+        version_after = Card.objects.get(id=self.card.id).rendered_content_version
+
+        self.assertNotEqual(version_before, version_after)
+
+    def test_prefetch_rendered_contents_without_queries(self):
+        """캐시가 채워져 있고 애셋 레퍼런스가 prefetch 되어 있으면 쿼리가 발생하지 않아야 합니다."""
+        other_card = create_test_card(self.user)
+
+        try:
+            Card.prefetch_rendered_contents(
+                Card.objects.filter(id__in=[self.card.id, other_card.id]).prefetch_related('asset_references')
+            )
+
+            cards = list(
+                Card.objects.filter(id__in=[self.card.id, other_card.id]).prefetch_related('asset_references')
+            )
+
+            with self.assertNumQueries(0):
+                Card.prefetch_rendered_contents(cards)
+
+                for card in cards:
+                    self.assertEqual(card.get_cached_content_with_url()['schema_version'], 'v1.0-test')
+        finally:
+            other_card.invalidate_rendered_content()
+
+    def test_url_epoch_changes_version(self):
+        """presigned URL의 주기가 바뀌면 캐시된 컨텐츠 (예전 URL)를 사용하지 않아야 합니다."""
+        with patch.object(StorageURLBuilder, 'url_epoch', return_value=10):
+            version_before = self.card.rendered_content_version
+
+        with patch.object(StorageURLBuilder, 'url_epoch', return_value=11):
+            version_after = self.card.rendered_content_version
+
+        self.assertNotEqual(version_before, version_after)
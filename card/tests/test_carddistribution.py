@@ -286,3 +286,82 @@ class CardDistributionTestCase(TestCase):
         
         # assertive 조건이 확인되지 않아야 함 (이미 FULLY_REVEALED이므로)
         mock_assertive.__get__.assert_not_called()
+
+
+class CardDistributionInsertTestCase(TestCase):
+    def setUp(self):
+        self.user1 = create_test_user(1)
+        self.user2 = create_test_user(2)
+        self.user3 = create_test_user(3)
+
+        self.card1 = create_test_card(self.user1)
+        self.card2 = create_test_card(self.user2)
+
+        for (index, user) in enumerate((self.user1, self.user2, self.user3)):
+            create_test_user_location(user, latitude=37.5665851 + index * 0.001, longitude=126.9782038)
+
+    def create_distribution(self, card, user, **kwargs) -> CardDistribution:
+        return CardDistribution(card=card, user=user, latitude=37.5655675, longitude=126.978014, **kwargs)
+
+    def test_insert_distributions_in_bulk(self):
+        """여러 배포를 한 번에 저장하고, 저장된 배포의 reveal_phase가 계산되어 있는지 테스트합니다."""
+        with self.assertNumQueries(1):
+            # NOTE: update_reveal_phase()의 조회 쿼리를 제외하기 위해 공개 조건은 모킹합니다
+            with patch.object(CardDistribution, 'update_reveal_phase') as mock_update:
+                inserted = CardDistribution.insert_distributions([
+                    self.create_distribution(self.card1, self.user2),
+                    self.create_distribution(self.card1, self.user3),
+                    self.create_distribution(self.card2, self.user1),
+                ])
+
+        self.assertEqual(mock_update.call_count, 3)
+        self.assertEqual(len(inserted), 3)
+        self.assertEqual(CardDistribution.objects.count(), 3)
+
+        for distribution in inserted:
+            self.assertFalse(distribution._state.adding)
+            self.assertIsNotNone(distribution.created_at)
+            self.assertTrue(CardDistribution.objects.filter(pk=distribution.pk).exists())
+
+    def test_insert_distributions_skips_existing(self):
+        """이미 배포된 (card, user)는 삭제된 배포를 포함하여 다시 저장하지 않는지 테스트합니다."""
+        existing = self.create_distribution(self.card1, self.user2)
+        existing.save()
+        self.create_distribution(self.card1, self.user3, deleted_at=timezone.now()).save()
+
+        inserted = CardDistribution.insert_distributions([
+            self.create_distribution(self.card1, self.user2),
+            self.create_distribution(self.card1, self.user3),
+            self.create_distribution(self.card2, self.user1),
+            # 같은 요청 안의 중복
+            self.create_distribution(self.card2, self.user1),
+        ])
+
+        self.assertEqual([(d.card_id, d.user_id) for d in inserted], [(self.card2.id, self.user1.id)])
+        self.assertEqual(CardDistribution.objects.filter(card=self.card1, user=self.user2).get(), existing)
+        self.assertEqual(CardDistribution.objects.filter(card=self.card2, user=self.user1).count(), 1)
+
+    def test_insert_distributions_blocked(self):
+        """차단된 상대의 카드는 삭제된 상태로 저장되는지 테스트합니다."""
+        from safety.models import UserBlock
+
+        UserBlock.objects.create(blocked_by=self.user2, user=self.user1, type=UserBlock.Type.BLOCK)
+
+        (distribution,) = CardDistribution.insert_distributions([
+            self.create_distribution(self.card1, self.user2),
+        ])
+
+        distribution.refresh_from_db()
+
+        self.assertIsNotNone(distribution.deleted_at)
+        self.assertEqual(distribution.reveal_phase, CardDistribution.RevealPhase.HIDDEN)
+
+    def test_unique_active_distribution(self):
+        """삭제되지 않은 (card, user) 배포가 두 개 이상 존재할 수 없는지 테스트합니다."""
+        from django.db import IntegrityError, transaction
+
+        self.create_distribution(self.card1, self.user2, deleted_at=timezone.now()).save()
+        self.create_distribution(self.card1, self.user2).save()
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.create_distribution(self.card1, self.user2).save()
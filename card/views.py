@@ -1,45 +1,104 @@
 from datetime import datetime
 from idlelib.pyparse import trans
+from typing import Optional, List
+from uuid import UUID
 
-from dacite import from_dict
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.uploadedfile import UploadedFile
 from django.db import transaction
 from django.db.models import Q
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404
 
 from rest_framework import permissions, viewsets, parsers, filters, status
 from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError
-
-from card.objdef import CardObject, CardSchemaVersion, AssetReference
-from card.serializers import PublicCardSerializer, PublicSelfUserCardAssetSerializer, \
-    CardDistributionSerializer, PublicWriteOnlyCardSerializer, CardFavoriteItemSerializer, CardFlagSerializer
-from card.models import Card, UserCardAsset, CardDistribution, CardVote, CardFavoriteItem, CardFlag
+from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from dacite import DaciteError
+
+from card.counters import card_counter_buffer, UPVOTE_COUNT, DOWNVOTE_COUNT, FAVORITE_COUNT
+from card.inbox import distribution_inbox
+from card.objdef import CardObject, CardSchemaVersion, AssetReference, load_card_object, normalize_card_content
+from card.serializers import PublicCardSerializer, PublicSelfCardSerializer, PublicSelfUserCardAssetSerializer, \
+    CardDistributionSerializer, PublicWriteOnlyCardSerializer, CardFavoriteItemSerializer, CardFlagSerializer, \
+    CardCounterSerializer
+from card.models import Card, UserCardAsset, CardDistribution, CardVote, CardFavoriteItem, CardFlag, CardCounter, \
+    card_asset_upload_to
 from flitz.pagination import CursorPagination
 from user.models import User, UserLike
 
+from flitz.conditional import if_match_passes, make_etag, time_bucket, conditional_response
 from flitz.exceptions import UnsupportedOperationException
+from flitz.jsonpatch import JSONPatchParser, JSONPatchError, JSONPatchTestFailed, JSON_PATCH_MEDIA_TYPE, apply_patch
+from flitz.serializers import DirectUploadSessionRequestSerializer
+from flitz.storage import save_content_addressed, default_url_builder
+from flitz.uploads import DirectUploader
 from flitz.tasks import post_slack_message
 
 # Create your views here.
 
+CARD_ASSET_UPLOAD_PURPOSE = 'card_asset'
+
+# 카드 소유자의 온라인 상태 (online / recently / offline)는 DB에 기록되지 않으므로, 이 주기마다 ETag를 바꿉니다
+ONLINE_STATUS_ETAG_RESOLUTION = 60 * 5
+
+# 카드 소유자에게 JSON Patch의 If-Match로 사용할 카드 버전 (Card.etag)을 알려주는 헤더
+# GET 응답의 ETag는 URL epoch / 에셋 버전 등을 포함하는 캐시 검증용이므로 If-Match에 사용할 수 없습니다
+CARD_VERSION_HEADER = 'X-Card-Version'
+
+
+def location_version(user: User) -> Optional[datetime]:
+    try:
+        return user.location.updated_at
+    except ObjectDoesNotExist:
+        return None
+
+
+def card_page_etag(request: Request, name: str, page: List, next_url: Optional[str]) -> str:
+    """
+    카드 배포 / 즐겨찾기 목록 한 페이지의 ETag를 만듭니다.
+    목록 전체를 집계하거나 직렬화하는 대신, 이미 조회한 페이지의 항목 (배포 / 즐겨찾기)들로 계산하므로 추가 쿼리가 없습니다.
+
+    - 페이지의 항목 / 카드 / 카드 애셋 / 카드 소유자가 수정되거나, 항목이 추가 / 제거되면 바뀝니다.
+    - fuzzy_distance가 바뀔 수 있도록, 카드 소유자와 요청한 사용자의 위치가 갱신되면 바뀝니다.
+    - 온라인 상태, 서명된 URL의 만료를 반영하기 위해 일정 주기마다 바뀝니다.
+    """
+
+    return make_etag(
+        name,
+        request.user.id,
+        request.get_full_path(),
+        next_url,
+        location_version(request.user),
+        [
+            (
+                item.id,
+                item.updated_at,
+                item.card.updated_at,
+                max((reference.updated_at for reference in item.card.asset_references.all()), default=None),
+                item.card.user.updated_at,
+                location_version(item.card.user),
+            )
+            for item in page
+        ],
+        time_bucket(ONLINE_STATUS_ETAG_RESOLUTION),
+        default_url_builder().url_epoch(),
+    )
+
+
 class CardDistributionViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CardDistributionSerializer
 
-    filter_backends = [filters.OrderingFilter]
-    ordering = ('-reveal_phase', 'created_at') # 가장 오래된 것부터 보여주되, reveal_phase는 DESC로
+    # 목록의 순서 (reveal_phase DESC, 가장 오래된 것부터)는 inbox의 점수로 정해집니다 (DistributionInbox.score() 참고)
 
     def get_queryset(self):
-        queryset = CardDistribution.objects.filter(
-            ~Q(reveal_phase=CardDistribution.RevealPhase.HIDDEN),
-            user=self.request.user,
-            card__user__disabled_at__isnull=True,
-            dismissed_at=None,
-            deleted_at=None,
-        ).select_related(
+        queryset = distribution_inbox.visible_distributions(self.request.user.id).select_related(
+            'user',
             'card',
             'card__user', 'card__user__location'
         ).prefetch_related(
@@ -48,6 +107,51 @@ class CardDistributionViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        inbox에서 한 페이지 분량의 배포 ID를 꺼내고, 해당 배포들만 한 번에 조회합니다.
+        """
+
+        try:
+            after = distribution_inbox.decode_cursor(request.query_params.get('cursor'))
+        except ValueError:
+            raise NotFound('Invalid cursor')
+
+        page_size = self.paginator.page_size
+
+        entries = distribution_inbox.page(request.user.id, after, page_size + 1)
+        next_entry = entries[page_size - 1] if len(entries) > page_size else None
+        entries = entries[:page_size]
+
+        distributions = self.get_queryset().in_bulk([member for (member, _) in entries])
+
+        # inbox에 반영되지 않은 변경 (카드 소유자의 계정 비활성화 등)으로 더 이상 표시되지 않는 배포는 건너뜁니다
+        stale_ids = [member for (member, _) in entries if UUID(member) not in distributions]
+
+        if stale_ids:
+            distribution_inbox.prune(request.user.id, stale_ids)
+
+        page = [distributions[UUID(member)] for (member, _) in entries if UUID(member) in distributions]
+
+        next_url = None
+
+        if next_entry is not None:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', distribution_inbox.encode_cursor(next_entry)
+            )
+
+        def render():
+            # 렌더링된 카드 컨텐츠를 캐시에서 한 번에 가져옵니다
+            Card.prefetch_rendered_contents(distribution.card for distribution in page)
+
+            return Response({
+                'next': next_url,
+                'previous': None,
+                'results': self.get_serializer(page, many=True).data,
+            })
+
+        return conditional_response(request, card_page_etag(request, 'cards/distribution', page, next_url), render)
+
     def create(self, request, *args, **kwargs):
         raise UnsupportedOperationException()
 
@@ -55,7 +159,9 @@ class CardDistributionViewSet(viewsets.ModelViewSet):
         distribution: CardDistribution = self.get_object()
         distribution.deleted_at = datetime.now()
 
-        distribution.save()
+        with transaction.atomic():
+            distribution.save()
+            distribution_inbox.sync_on_commit([distribution])
 
         return Response({'is_success': True}, status=200)
 
@@ -64,7 +170,7 @@ class CardDistributionViewSet(viewsets.ModelViewSet):
         distribution: CardDistribution = self.get_object()
 
         with transaction.atomic():
-            CardVote.objects.get_or_create(
+            _, created = CardVote.objects.get_or_create(
                 card=distribution.card,
                 user=request.user,
 
@@ -73,8 +179,12 @@ class CardDistributionViewSet(viewsets.ModelViewSet):
                 },
             )
 
+            if created:
+                card_counter_buffer.record([distribution.card_id], UPVOTE_COUNT)
+
             distribution.dismissed_at = datetime.now()
             distribution.save()
+            distribution_inbox.sync_on_commit([distribution])
 
             _, created = UserLike.objects.get_or_create(
                 user=distribution.card.user,
@@ -89,6 +199,9 @@ class CardDistributionViewSet(viewsets.ModelViewSet):
                 card=distribution.card
             )
 
+            if created:
+                card_counter_buffer.record([distribution.card_id], FAVORITE_COUNT)
+
         return Response({'is_success': True}, status=200)
 
     @action(detail=True, methods=['PUT'], url_path='dislike')
@@ -103,17 +216,21 @@ class CardDistributionViewSet(viewsets.ModelViewSet):
                 vote_type=CardVote.VoteType.DOWNVOTE
             )
 
+            card_counter_buffer.record([distribution.card_id], DOWNVOTE_COUNT)
+
             distribution.dismissed_at = datetime.now()
             distribution.save()
+            distribution_inbox.sync_on_commit([distribution])
 
         return Response({'is_success': True}, status=200)
 
 class PublicCardViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [*api_settings.DEFAULT_PARSER_CLASSES, JSONPatchParser]
 
     def get_serializer_class(self):
         if self.action == 'list':
-            return PublicCardSerializer
+            return PublicSelfCardSerializer
 
         if self.action == 'update':
             return PublicWriteOnlyCardSerializer
@@ -130,10 +247,18 @@ class PublicCardViewSet(viewsets.ModelViewSet):
         if self.action == 'list':
             queryset = queryset.filter(
                 user=self.request.user,
-            ) # .defer('content')
+            ).select_related('counter') # .defer('content')
 
         return queryset
 
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+
+        if page is not None:
+            Card.prefetch_rendered_contents(page)
+
+        return page
+
     def create(self, request: Request, *args, **kwargs):
         card_count = self.get_queryset().filter(user=request.user).only('id').count()
 
@@ -173,7 +298,7 @@ class PublicCardViewSet(viewsets.ModelViewSet):
         if card_dict is None:
             raise UnsupportedOperationException()
 
-        card_obj = from_dict(data_class=CardObject, data=data['content'])
+        card_obj = load_card_object(data['content'])
 
         if not card_obj.sanity_check():
             raise UnsupportedOperationException()
@@ -181,9 +306,106 @@ class PublicCardViewSet(viewsets.ModelViewSet):
         # super().update(request, *args, **kwargs)
         card.content = card_obj.as_dict()
         card.save()
+        card.invalidate_rendered_content()
 
-        serializer = PublicCardSerializer(self.get_object())
-        return Response(serializer.data)
+        card = self.get_object()
+
+        serializer = PublicCardSerializer(card)
+        return Response(serializer.data, headers={'ETag': card.etag})
+
+    def retrieve(self, request, *args, **kwargs):
+        card: Card = self.get_object()
+
+        etag = make_etag(
+            card.etag,
+            max((reference.updated_at for reference in card.asset_references.all()), default=None),
+            location_version(card.user),
+            location_version(request.user),
+            time_bucket(ONLINE_STATUS_ETAG_RESOLUTION),
+            default_url_builder().url_epoch(),
+        )
+
+        response = conditional_response(request, etag, lambda: Response(self.get_serializer(card).data))
+
+        if card.user_id == request.user.id:
+            response[CARD_VERSION_HEADER] = card.etag
+
+        return response
+
+    def partial_update(self, request, *args, **kwargs):
+        if request.content_type.split(';')[0].strip() != JSON_PATCH_MEDIA_TYPE:
+            return super().partial_update(request, *args, **kwargs)
+
+        return self.__patch_content(request, kwargs['pk'])
+
+    def __patch_content(self, request: Request, pk):
+        """
+        카드 컨텐츠에 JSON Patch (RFC 6902) 연산을 적용합니다.
+
+        - If-Match 헤더에 카드의 현재 버전을 지정해야 합니다. (GET 응답의 X-Card-Version 헤더 또는 PUT / PATCH 응답의 ETag 헤더)
+        - 패치로 바뀐 요소만 검증하며, 병합된 컨텐츠를 저장합니다.
+        """
+
+        if_match = request.headers.get('If-Match')
+
+        if not if_match:
+            return Response({
+                'is_success': False,
+                'reason': 'fz.card.precondition_required'
+            }, status=status.HTTP_428_PRECONDITION_REQUIRED)
+
+        with transaction.atomic():
+            card: Card = get_object_or_404(
+                Card.objects.select_for_update(of=('self',)).select_related('user'),
+                pk=pk,
+                user__disabled_at__isnull=True,
+                deleted_at=None
+            )
+
+            if card.user != request.user:
+                raise UnsupportedOperationException()
+
+            if not if_match_passes(if_match, card.etag):
+                return Response({
+                    'is_success': False,
+                    'reason': 'fz.card.precondition_failed'
+                }, status=status.HTTP_412_PRECONDITION_FAILED, headers={'ETag': card.etag})
+
+            stored_content = card.content
+
+            try:
+                patched_content = apply_patch(stored_content, request.data)
+            except JSONPatchTestFailed:
+                return Response({
+                    'is_success': False,
+                    'reason': 'fz.card.patch_test_failed'
+                }, status=status.HTTP_409_CONFLICT, headers={'ETag': card.etag})
+            except JSONPatchError as e:
+                raise ValidationError({'patch': str(e)})
+
+            try:
+                # 저장되어 있던 요소는 이미 검증되었으므로, 패치로 바뀐 요소만 검증합니다
+                card.content = normalize_card_content(patched_content, trusted_elements=stored_content.get('elements') or [])
+            except DaciteError as e:
+                raise ValidationError({'content': str(e)})
+
+            card.save(update_fields=['content', 'updated_at'])
+
+        card.invalidate_rendered_content()
+
+        return Response({'is_success': True}, status=200, headers={'ETag': card.etag})
+
+    @action(detail=True, methods=['GET'], url_path='counters')
+    def counters(self, request: Request, pk, *args, **kwargs):
+        """
+        카드의 투표 / 즐겨찾기 수를 반환합니다. 카드 소유자만 조회할 수 있습니다.
+        """
+        card = get_object_or_404(Card.objects.select_related('counter'), pk=pk, deleted_at=None)
+
+        if card.user_id != request.user.id:
+            raise UnsupportedOperationException()
+
+        return Response(CardCounterSerializer(CardCounter.of(card)).data)
 
     @action(detail=True, methods=['PUT'], url_path='set-as-main')
     def set_card_as_main(self, request: Request, pk, *args, **kwargs):
@@ -260,30 +482,95 @@ class PublicCardViewSet(viewsets.ModelViewSet):
         if extension is None:
             raise UnsupportedOperationException()
 
-        if file.content_type.startswith('image'):
-            type = UserCardAsset.AssetType.IMAGE
-        elif file.content_type.startswith('video'):
-            type = UserCardAsset.AssetType.VIDEO
-        elif file.content_type.startswith('audio'):
-            type = UserCardAsset.AssetType.AUDIO
-        else:
-            type = UserCardAsset.AssetType.OTHER
-
+        type = UserCardAsset.AssetType.from_mimetype(file.content_type)
 
         with transaction.atomic():
             asset = UserCardAsset.objects.create(
                 user=request.user,
                 card=card,
                 type=type,
-                object=file,  # FileField에 직접 파일 할당
+                # 같은 내용의 파일은 하나의 오브젝트를 공유합니다
+                object=save_content_addressed(
+                    'card_assets', file, extension if '.' in file.name else None,
+                    storage=UserCardAsset._meta.get_field('object').storage
+                ),
                 mimetype=file.content_type,
                 size=file.size
             )
 
+        card.invalidate_rendered_content()
 
         serializer = PublicSelfUserCardAssetSerializer(asset)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['POST'], url_path='asset-references/upload-sessions')
+    def create_asset_upload_session(self, request: Request, pk, *args, **kwargs):
+        """
+        애셋을 S3에 직접 업로드하기 위한 업로드 세션 (presigned POST)을 발급합니다.
+        업로드가 끝나면 complete_asset_upload_session을 호출해야 합니다.
+        """
+        card = get_object_or_404(Card, pk=pk)
+
+        if card.user != request.user:
+            raise UnsupportedOperationException()
+
+        serializer = DirectUploadSessionRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        validated_data = serializer.validated_data
+
+        if validated_data['size'] > UserCardAsset.MAX_UPLOAD_SIZE:
+            raise ValidationError({'size': 'File is too large.'})
+
+        uploader = DirectUploader()
+        session, presigned_post = uploader.create_session(
+            user_id=request.user.id,
+            purpose=CARD_ASSET_UPLOAD_PURPOSE,
+            target_id=card.id,
+            name=card_asset_upload_to(None, validated_data['filename']),
+            content_type=validated_data['content_type'],
+            max_size=UserCardAsset.MAX_UPLOAD_SIZE
+        )
+
+        return Response(uploader.as_response(session, presigned_post), status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['POST'], url_path=r'asset-references/upload-sessions/(?P<session_id>[0-9a-fA-F\-]+)/complete')
+    def complete_asset_upload_session(self, request: Request, pk, session_id, *args, **kwargs):
+        card = get_object_or_404(Card, pk=pk)
+
+        if card.user != request.user:
+            raise UnsupportedOperationException()
+
+        uploader = DirectUploader()
+        session = uploader.get_session(session_id, request.user.id, CARD_ASSET_UPLOAD_PURPOSE, card.id)
+
+        if session is None:
+            raise Http404()
+
+        uploaded_object = uploader.verify(session)
+
+        if uploaded_object is None:
+            raise ValidationError({'session_id': 'The object has not been uploaded.'})
+
+        if not uploader.discard(session):
+            # 다른 요청에서 이미 완료 처리됨
+            raise Http404()
+
+        with transaction.atomic():
+            asset = UserCardAsset.objects.create(
+                user=request.user,
+                card=card,
+                type=UserCardAsset.AssetType.from_mimetype(uploaded_object.content_type),
+                object=uploaded_object.name,
+                mimetype=uploaded_object.content_type,
+                size=uploaded_object.size
+            )
+
+        card.invalidate_rendered_content()
+
+        serializer = PublicSelfUserCardAssetSerializer(asset)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['PUT'], url_path='asset-references/gc')
     def garbage_collect_asset_references(self, request: Request, pk, *args, **kwargs):
         card = get_object_or_404(Card, pk=pk)
@@ -312,6 +599,22 @@ class CardFavoriteViewSet(viewsets.ModelViewSet):
             'card__asset_references'
         )
 
+    def list(self, request, *args, **kwargs):
+        """
+        한 페이지 분량의 항목을 조회한 뒤, 변경되지 않았으면 직렬화하지 않고 304를 반환합니다.
+        """
+
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        next_url = self.paginator.get_next_link()
+
+        def render():
+            # 렌더링된 카드 컨텐츠를 캐시에서 한 번에 가져옵니다
+            Card.prefetch_rendered_contents(item.card for item in page)
+
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        return conditional_response(request, card_page_etag(request, 'cards/favorites', page, next_url), render)
+
     def create(self, request, *args, **kwargs):
         raise UnsupportedOperationException()
 
@@ -321,8 +624,11 @@ class CardFavoriteViewSet(viewsets.ModelViewSet):
         if item.user != request.user:
             raise UnsupportedOperationException()
 
-        item.deleted_at = datetime.now()
-        item.save()
+        with transaction.atomic():
+            item.deleted_at = datetime.now()
+            item.save()
+
+            card_counter_buffer.record([item.card_id], FAVORITE_COUNT, -1)
 
         return Response({'is_success': True}, status=200)
 
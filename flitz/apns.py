@@ -1,6 +1,9 @@
-from typing import List, Optional, Literal, TypedDict, NotRequired
+from typing import List, Optional, Literal, TypedDict, NotRequired, Tuple, Iterable
 
+import logging
 import os
+import threading
+import weakref
 
 from django.conf import settings
 
@@ -8,7 +11,33 @@ import httpx
 import jwt
 import time
 
+logger = logging.getLogger(__name__)
+
+# fork된 자식 프로세스 (Celery prefork 워커 등)에서 다시 초기화해야 하는 객체들
+_FORK_SENSITIVE_INSTANCES: 'weakref.WeakSet' = weakref.WeakSet()
+
+
+def _reinitialize_after_fork():
+    """
+    fork 직후 자식 프로세스에서 호출됩니다.
+
+    fork 시점에 다른 스레드가 잡고 있던 lock은 자식 프로세스에서 영원히 풀리지 않으므로 새로 만들고,
+    부모 프로세스의 HTTP/2 연결은 (닫으면 부모의 연결까지 끊기므로) 닫지 않고 버립니다.
+    """
+
+    for instance in list(_FORK_SENSITIVE_INSTANCES):
+        instance._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinitialize_after_fork)
+
+
 class APNSIdentity:
+    # APNs는 발급된 지 1시간이 넘은 provider token을 거부하고 (ExpiredProviderToken),
+    # 20분보다 자주 바뀌는 토큰도 거부하므로 (TooManyProviderTokenUpdates) 그 사이에서 갱신합니다.
+    TOKEN_REFRESH_INTERVAL = 50 * 60
+
     private_key: str
     team_id: str
     key_id: str
@@ -20,11 +49,42 @@ class APNSIdentity:
         self.key_id = key_id
         self.bundle_id = bundle_id
 
+        # (algorithm, token, issued_at)
+        self._token: Optional[Tuple[str, str, float]] = None
+        self._token_lock = threading.Lock()
+
+        _FORK_SENSITIVE_INSTANCES.add(self)
+
+    def _after_fork(self):
+        self._token_lock = threading.Lock()
+
     def jwt_token(self, algorithm: str = 'ES256') -> str:
+        """
+        provider token을 반환합니다. 서명한 토큰은 TOKEN_REFRESH_INTERVAL 동안 재사용합니다.
+        """
+
+        with self._token_lock:
+            now = time.time()
+
+            if self._token is None or self._token[0] != algorithm or now - self._token[2] >= self.TOKEN_REFRESH_INTERVAL:
+                self._token = (algorithm, self._sign(algorithm, now), now)
+
+            return self._token[1]
+
+    def invalidate_token(self, token: str):
+        """
+        APNs가 거부한 토큰을 버립니다. 다른 스레드가 이미 갱신한 경우에는 아무것도 하지 않습니다.
+        """
+
+        with self._token_lock:
+            if self._token is not None and self._token[1] == token:
+                self._token = None
+
+    def _sign(self, algorithm: str, issued_at: float) -> str:
         token = jwt.encode(
             {
                 'iss': self.team_id,
-                'iat': time.time()
+                'iat': int(issued_at)
             },
             self.private_key,
             algorithm=algorithm,
@@ -118,6 +178,15 @@ class MockedAPNS:
         
         self.send_push(payload=payload, device_tokens=device_tokens, push_type='background')
     
+    def send_notifications_ex(self, notifications: List['APNSNotification']) -> List['APNSNotification']:
+        for (device_token, aps, user_info) in notifications:
+            payload = dict() if user_info is None else user_info.copy()
+            payload['aps'] = aps
+
+            self.send_push(payload=payload, device_tokens=[device_token])
+
+        return []
+
     def send_push(self, payload: dict, device_tokens: List[str], push_type: Literal['alert', 'background'] = 'alert'):
         # 실제 HTTP 요청을 보내지 않고 로깅만 수행
         import logging
@@ -143,11 +212,20 @@ APSPayload = TypedDict('APSPayload', {
     'thread-id': NotRequired[str],
 })
 
+# (device token, aps, user_info)
+APNSNotification = Tuple[str, APSPayload, Optional[dict]]
+
 
 class APNS:
     PROD_URL = "https://api.push.apple.com/3/device/"
     DEV_URL = "https://api.development.push.apple.com/3/device/"
 
+    # APNs는 연결을 오래 유지하고 재사용하도록 권장하므로, 유휴 연결을 httpx 기본값 (5초)보다 오래 유지합니다
+    KEEPALIVE_EXPIRY = 10 * 60
+
+    # 잠시 후 다시 보내면 성공할 수 있는 응답 (TooManyRequests, InternalServerError, ServiceUnavailable)
+    RETRYABLE_STATUS_CODES = (429, 500, 503)
+
     identity: APNSIdentity
     sandbox: bool
 
@@ -172,6 +250,44 @@ class APNS:
 
         self.base_url = self.DEV_URL if sandbox else self.PROD_URL
 
+        self._http_client: Optional[httpx.Client] = None
+        self._http_client_lock = threading.Lock()
+
+        _FORK_SENSITIVE_INSTANCES.add(self)
+
+    def _after_fork(self):
+        self._http_client = None
+        self._http_client_lock = threading.Lock()
+
+    def _create_client(self) -> httpx.Client:
+        return httpx.Client(
+            http2=True,
+            limits=httpx.Limits(keepalive_expiry=self.KEEPALIVE_EXPIRY),
+        )
+
+    def _client(self) -> httpx.Client:
+        """
+        프로세스 안에서 공유하는 HTTP/2 클라이언트를 반환합니다. (httpx.Client는 여러 스레드에서 함께 사용할 수 있습니다)
+        """
+
+        client = self._http_client
+
+        if client is not None:
+            return client
+
+        with self._http_client_lock:
+            if self._http_client is None:
+                self._http_client = self._create_client()
+
+            return self._http_client
+
+    def close(self):
+        with self._http_client_lock:
+            (client, self._http_client) = (self._http_client, None)
+
+        if client is not None:
+            client.close()
+
     def send_notification_ex(self,
                              aps: APSPayload,
                              device_tokens: List[str],
@@ -186,6 +302,25 @@ class APNS:
 
         self.send_push(payload=payload, device_tokens=device_tokens)
 
+    def send_notifications_ex(self, notifications: List[APNSNotification]) -> List[APNSNotification]:
+        """
+        기기마다 내용이 다른 여러 알림을 하나의 HTTP/2 연결로 보냅니다.
+        일부 기기에 보내지 못해도 나머지 기기에는 계속 보냅니다.
+
+        :returns: 일시적인 오류 (연결 오류, 429 / 5xx 응답)로 보내지 못해 다시 보내야 하는 알림 목록
+        """
+
+        def payloads():
+            for (device_token, aps, user_info) in notifications:
+                payload = dict() if user_info is None else user_info.copy()
+                payload['aps'] = aps
+
+                yield device_token, payload
+
+        failed_indices = self._send(payloads(), 'alert')
+
+        return [notifications[index] for index in failed_indices]
+
     def send_notification(self,
                           title: str,
                           body: str,
@@ -229,17 +364,65 @@ class APNS:
         
         self.send_push(payload=payload, device_tokens=device_tokens, push_type='background')
 
-    def send_push(self, payload: dict, device_tokens: List[str], push_type: Literal['alert', 'background'] = 'alert'):
+    def _headers(self, push_type: Literal['alert', 'background']) -> dict:
         jwt_token = self.identity.jwt_token()
 
-        headers = {
+        return {
             "authorization": "bearer " + jwt_token,
             "apns-topic": self.identity.bundle_id,
             "apns-push-type": push_type,
             "apns-priority": "10" if push_type == 'alert' else "5",
             "apns-expiration": "0"
         }
-        
-        with httpx.Client(http2=True) as client:
-            for token in device_tokens:
-                client.post(self.base_url + token, json=payload, headers=headers)
+
+    def send_push(self, payload: dict, device_tokens: List[str], push_type: Literal['alert', 'background'] = 'alert'):
+        self._send(((token, payload) for token in device_tokens), push_type)
+
+    def _send(self, payloads: Iterable[Tuple[str, dict]], push_type: Literal['alert', 'background']) -> List[int]:
+        """
+        :returns: 일시적인 오류로 보내지 못한 알림의 순번 목록
+        """
+
+        client = self._client()
+        headers = self._headers(push_type)
+
+        failed_indices = []
+
+        for (index, (device_token, payload)) in enumerate(payloads):
+            try:
+                response = self._post(client, device_token, payload, headers)
+
+                if response.status_code == 403 and self._reason(response) == 'ExpiredProviderToken':
+                    # 캐시된 토큰이 거부되었으므로 새로 서명해서 한 번 더 보냅니다
+                    self.identity.invalidate_token(headers['authorization'].removeprefix('bearer '))
+                    headers = self._headers(push_type)
+
+                    response = self._post(client, device_token, payload, headers)
+            except httpx.HTTPError as e:
+                # 한 기기에 보내지 못해도 나머지 기기에는 계속 보냅니다
+                logger.warning(f"APNS: error sending push to {device_token[:8]}...: {e}")
+                failed_indices.append(index)
+                continue
+
+            if response.status_code in self.RETRYABLE_STATUS_CODES:
+                logger.warning(f"APNS: push to {device_token[:8]}... failed: {response.status_code} {self._reason(response)}")
+                failed_indices.append(index)
+            elif response.status_code != 200:
+                # BadDeviceToken, Unregistered 등은 다시 보내도 실패하므로 기록만 합니다
+                logger.info(f"APNS: push to {device_token[:8]}... rejected: {response.status_code} {self._reason(response)}")
+
+        return failed_indices
+
+    def _post(self, client: httpx.Client, device_token: str, payload: dict, headers: dict) -> httpx.Response:
+        try:
+            return client.post(self.base_url + device_token, json=payload, headers=headers)
+        except httpx.RemoteProtocolError:
+            # 오래 유지한 연결을 APNs가 먼저 닫은 경우 (GOAWAY 등) 새 연결로 한 번 더 시도합니다
+            return client.post(self.base_url + device_token, json=payload, headers=headers)
+
+    @staticmethod
+    def _reason(response: httpx.Response) -> Optional[str]:
+        try:
+            return response.json().get('reason')
+        except ValueError:
+            return None
@@ -18,6 +18,8 @@ app.config_from_object(f'django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+# flitz 패키지는 Django 앱이 아니므로 따로 등록합니다.
+app.autodiscover_tasks(['flitz'])
 
 app.conf.beat_schedule = {
     'update-distribution-reveal-phase': {
@@ -30,6 +32,16 @@ app.conf.beat_schedule = {
         "schedule": crontab(hour=0, minute=0),  # 매일 자정에 실행
     },
 
+    'fail-stale-direct-message-attachments': {
+        'task': 'messaging.tasks.fail_stale_direct_message_attachments',
+        'schedule': crontab(minute='*/10'),  # 매 10분마다 실행
+    },
+
+    'flush-card-counters': {
+        'task': 'card.tasks.flush_card_counters',
+        'schedule': crontab(minute='*'),  # 매 1분마다 실행
+    },
+
     'wake-up-apps': {
         'task': 'user.tasks.wake_up_apps',
         'schedule': crontab(minute='*/20'),  # 매 20분마다 실행
@@ -53,7 +65,17 @@ app.conf.beat_schedule = {
     'chronowave-match-all': {
         'task': 'location.tasks.perform_chronowave_match_all',
         'schedule': crontab(minute='*/30'),  # 30분마다 실행
-    }
+    },
+
+    'sweep-undeleted-file-objects': {
+        'task': 'flitz.tasks.sweep_undeleted_file_objects',
+        'schedule': crontab(hour=1, minute=0),  # 매일 01시에 실행
+    },
+
+    'reconcile-unread-counts': {
+        'task': 'messaging.tasks.reconcile_unread_counts',
+        'schedule': crontab(minute='*'),  # 매 1분마다 실행
+    },
 }
 
 
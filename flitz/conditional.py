@@ -0,0 +1,100 @@
+import hashlib
+import time
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+# 조건부 요청 (RFC 9110 13장) 헤더 처리
+
+
+def quote_etag(value: str, weak: bool = False) -> str:
+    return f'W/"{value}"' if weak else f'"{value}"'
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    응답의 내용을 결정하는 값들 (updated_at, 개수, 요청 경로 등)로부터 weak ETag를 만듭니다.
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+
+    for part in parts:
+        if isinstance(part, datetime):
+            part = part.isoformat()
+
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\0')
+
+    return quote_etag(digest.hexdigest(), weak=True)
+
+
+def time_bucket(seconds: int) -> int:
+    """
+    DB row에 기록되지 않고 시간에 따라 바뀌는 값 (온라인 상태 등)을 ETag에 반영하기 위한 시간 구간 번호입니다.
+    """
+
+    return int(time.time() // seconds)
+
+
+def if_none_match_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match 헤더 값이 주어진 ETag와 일치하는지 확인합니다. (weak comparison)
+    """
+
+    if not if_none_match:
+        return False
+
+    etags = parse_etags(if_none_match)
+
+    if etags == ['*']:
+        return True
+
+    def opaque(tag: str) -> str:
+        return tag[2:] if tag.startswith('W/') else tag
+
+    return opaque(etag) in [opaque(tag) for tag in etags]
+
+
+def conditional_response(request: Request, etag: str, render: Callable[[], Response]) -> Response:
+    """
+    If-None-Match가 ETag와 일치하면 render()를 호출하지 않고 304 Not Modified를 반환합니다.
+    그렇지 않으면 render()의 응답에 ETag를 붙여서 반환합니다.
+    """
+
+    headers = {
+        'ETag': etag,
+        # 사용자마다 응답이 다르므로, 공유 캐시에는 저장하지 않고 항상 재검증하도록 합니다
+        'Cache-Control': 'private, no-cache',
+    }
+
+    if if_none_match_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response = render()
+
+    if response.status_code == status.HTTP_200_OK:
+        for (key, value) in headers.items():
+            response[key] = value
+
+    return response
+
+
+def if_match_passes(if_match: Optional[str], etag: str) -> bool:
+    """
+    If-Match 헤더 값이 주어진 (strong) ETag와 일치하는지 확인합니다.
+    If-Match는 strong comparison을 사용하므로, weak ETag (W/"...")는 일치하지 않는 것으로 봅니다.
+    """
+
+    if not if_match:
+        return False
+
+    etags = parse_etags(if_match)
+
+    if etags == ['*']:
+        return True
+
+    return etag in [tag for tag in etags if not tag.startswith('W/')]
@@ -0,0 +1,217 @@
+from typing import Optional, List, Tuple, Iterable
+
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+
+from flitz.storage import storage_url, BatchObjectDeleter, find_referenced_names, lock_object_names
+from flitz.thumbgen import generate_derivatives, DERIVATIVE_FORMATS
+
+# 파생 이미지 (derivative)의 최대 높이 목록
+IMAGE_DERIVATIVE_HEIGHTS = (160, 480, 1280)
+IMAGE_DERIVATIVE_FORMATS = ('jpeg', 'webp')
+
+# serializer 등에서 기본으로 사용하는 포맷
+IMAGE_DERIVATIVE_PREFERRED_FORMAT = 'jpeg'
+
+MANIFEST_VERSION = 1
+
+"""typescript
+// 파생 이미지 manifest (모델의 JSONField에 저장됩니다)
+export type ImageDerivativeManifest = {
+    version: 1
+    status: 'pending' | 'ready' | 'failed'
+    // 파생 이미지를 생성한 원본 오브젝트 이름
+    source: string
+    variants: {
+        max_height: number
+        format: 'jpeg' | 'webp'
+        name: string
+        width: number
+        height: number
+    }[]
+}
+"""
+
+
+def derivative_name(source_name: str, max_height: int, format: str) -> str:
+    """
+    원본 오브젝트 이름으로부터 파생 이미지의 (결정적인) 오브젝트 이름을 만듭니다.
+    예) profile_images/ab/<uuid>.jpg -> derivatives/profile_images/ab/<uuid>/480.webp
+    """
+    (_, extension, _) = DERIVATIVE_FORMATS[format]
+    base_name = source_name.rsplit('.', 1)[0]
+
+    return f'derivatives/{base_name}/{max_height}.{extension}'
+
+
+def pending_manifest(source_name: str) -> dict:
+    return {
+        'version': MANIFEST_VERSION,
+        'status': 'pending',
+        'source': source_name,
+        'variants': [],
+    }
+
+
+def failed_manifest(source_name: str) -> dict:
+    return {
+        'version': MANIFEST_VERSION,
+        'status': 'failed',
+        'source': source_name,
+        'variants': [],
+    }
+
+
+def find_ready_manifest(model, field_name: str, manifest_field_name: str, source_name: str) -> Optional[dict]:
+    """
+    같은 원본 (내용 기반 오브젝트)을 참조하는 다른 row에 이미 생성된 파생 이미지 manifest가 있으면 반환합니다.
+    """
+    manifest = model.objects.filter(
+        **{field_name: source_name, f'{manifest_field_name}__status': 'ready'}
+    ).values_list(manifest_field_name, flat=True).first()
+
+    if manifest is None or manifest.get('source') != source_name:
+        return None
+
+    return manifest
+
+
+def build_derivatives(source_name: str, storage: Storage = default_storage) -> dict:
+    """
+    원본 오브젝트를 한 번 디코딩하여 파생 이미지들을 생성하고 저장한 뒤, manifest를 반환합니다.
+    """
+    with storage.open(source_name) as source_file:
+        derivatives = generate_derivatives(source_file, IMAGE_DERIVATIVE_HEIGHTS, IMAGE_DERIVATIVE_FORMATS)
+
+    variants = []
+
+    for (max_height, format, file, (width, height)) in derivatives:
+        name = derivative_name(source_name, max_height, format)
+
+        with file:
+            # 이름이 결정적이므로 재시도 되더라도 같은 오브젝트를 덮어씁니다
+            name = storage.save(name, file)
+
+        variants.append({
+            'max_height': max_height,
+            'format': format,
+            'name': name,
+            'width': width,
+            'height': height,
+        })
+
+    return {
+        'version': MANIFEST_VERSION,
+        'status': 'ready',
+        'source': source_name,
+        'variants': variants,
+    }
+
+
+def derivative_names(manifest: Optional[dict]) -> List[str]:
+    if not manifest:
+        return []
+
+    return [variant['name'] for variant in manifest.get('variants', [])]
+
+
+def delete_derivatives(manifests: List[Optional[dict]], exclude: Optional[Tuple[type, Iterable]] = None) -> List[str]:
+    """
+    manifest에 포함된 파생 이미지들을 일괄 삭제합니다.
+    파생 이미지의 이름은 원본 이름으로 결정되므로, 원본을 다른 row가 아직 참조하고 있으면 삭제하지 않습니다.
+
+    :param exclude: (모델, pk 목록) - 삭제하려는 row들은 참조 여부 확인에서 제외합니다
+    :returns: 삭제에 실패한 오브젝트 이름 목록
+    """
+    manifests = [manifest for manifest in manifests if manifest]
+    sources = [manifest.get('source') for manifest in manifests]
+
+    with transaction.atomic():
+        lock_object_names(sources)
+        referenced_sources = find_referenced_names(sources, exclude=exclude)
+
+        names = [
+            name
+            for manifest in manifests if manifest.get('source') not in referenced_sources
+            for name in derivative_names(manifest)
+        ]
+
+        if not names:
+            return []
+
+        return BatchObjectDeleter().delete(names)
+
+
+def select_derivative(manifest: dict, max_height: int, format: str = IMAGE_DERIVATIVE_PREFERRED_FORMAT) -> Optional[dict]:
+    """
+    max_height 이상인 파생 이미지 중 가장 작은 것을 선택합니다. 없으면 가장 큰 것을 선택합니다.
+    """
+    variants = [variant for variant in manifest.get('variants', []) if variant['format'] == format]
+
+    if not variants:
+        return None
+
+    variants.sort(key=lambda variant: variant['max_height'])
+
+    for variant in variants:
+        if variant['max_height'] >= max_height:
+            return variant
+
+    return variants[-1]
+
+
+def derivative_url(file: Optional[FieldFile],
+                   manifest: Optional[dict],
+                   max_height: int,
+                   fallback_to_source: bool = True,
+                   format: str = IMAGE_DERIVATIVE_PREFERRED_FORMAT) -> Optional[str]:
+    """
+    파생 이미지의 URL을 반환합니다.
+
+    - manifest가 없는 경우 (파생 이미지 파이프라인 이전에 저장된 이미지), 원본 URL을 반환합니다.
+    - 파생 이미지가 아직 생성되지 않았거나 생성에 실패한 경우, fallback_to_source가 True이면 원본 URL을, 아니면 None을 반환합니다.
+      (원본에 EXIF 등이 남아 있을 수 있는 경우 fallback_to_source=False를 사용하십시오)
+    """
+    if not file or not file.name:
+        return None
+
+    if manifest is None:
+        return storage_url(file)
+
+    if manifest.get('status') != 'ready' or manifest.get('source') != file.name:
+        return storage_url(file) if fallback_to_source else None
+
+    variant = select_derivative(manifest, max_height, format)
+
+    if variant is None:
+        return storage_url(file) if fallback_to_source else None
+
+    return storage_url(FieldFile(None, file.field, variant['name']))
+
+
+def schedule_image_derivatives(instance, field_name: str, manifest_field_name: str):
+    """
+    인스턴스의 이미지 필드에 대한 파생 이미지 생성 작업을 (트랜잭션 커밋 후) 예약합니다.
+    manifest 필드는 pending 상태로 설정되며, 인스턴스는 호출자가 저장해야 합니다.
+    """
+    from flitz.tasks import generate_image_derivatives
+
+    source_name = getattr(instance, field_name).name
+
+    # 같은 내용의 이미지 (내용 기반 오브젝트)에 대한 파생 이미지가 이미 있으면 재사용합니다
+    existing_manifest = find_ready_manifest(type(instance), field_name, manifest_field_name, source_name)
+
+    if existing_manifest is not None:
+        setattr(instance, manifest_field_name, existing_manifest)
+        return
+
+    setattr(instance, manifest_field_name, pending_manifest(source_name))
+
+    generate_image_derivatives.delay_on_commit(
+        instance._meta.label,
+        str(instance.pk),
+        field_name,
+        manifest_field_name,
+        source_name
+    )
@@ -0,0 +1,234 @@
+import copy
+from typing import Any, List, Tuple
+
+from rest_framework import parsers
+
+# JSON Patch (RFC 6902) / JSON Pointer (RFC 6901) 구현
+#
+# apply_patch()는 원본 문서를 수정하지 않습니다. 대신 수정되는 경로 위의 컨테이너 (dict / list)만 복사하고,
+# 수정되지 않은 나머지 부분은 원본 객체를 그대로 공유합니다. (structural sharing)
+# 따라서 호출자는 `is` 비교로 패치에 의해 바뀐 부분만 골라서 검증할 수 있습니다.
+
+JSON_PATCH_MEDIA_TYPE = 'application/json-patch+json'
+
+
+class JSONPatchError(ValueError):
+    """
+    패치 문서가 잘못되었거나, 패치를 적용할 수 없는 경우 발생합니다.
+    """
+    pass
+
+
+class JSONPatchTestFailed(JSONPatchError):
+    """
+    'test' 연산이 실패한 경우 발생합니다.
+    """
+    pass
+
+
+class JSONPatchParser(parsers.JSONParser):
+    """
+    Content-Type: application/json-patch+json 요청 본문을 파싱합니다.
+    """
+    media_type = JSON_PATCH_MEDIA_TYPE
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    if not isinstance(pointer, str):
+        raise JSONPatchError(f"Invalid JSON pointer: {pointer!r}")
+
+    if pointer == '':
+        return []
+
+    if not pointer.startswith('/'):
+        raise JSONPatchError(f"Invalid JSON pointer: {pointer!r}")
+
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _array_index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == '-':
+        return len(container)
+
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise JSONPatchError(f"Invalid array index: {token!r}")
+
+    index = int(token)
+    upper_bound = len(container) if allow_end else len(container) - 1
+
+    if index > upper_bound:
+        raise JSONPatchError(f"Array index out of range: {token!r}")
+
+    return index
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    # Python에서는 True == 1 이지만, JSON에서는 서로 다른 값입니다
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[key], b[key]) for key in a)
+
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for (x, y) in zip(a, b))
+
+    return a == b
+
+
+class _PatchContext:
+    def __init__(self, document: Any):
+        self.root = document
+
+        # 이번 패치에서 새로 복사한 컨테이너들의 id (같은 컨테이너를 여러 번 복사하지 않도록)
+        self.copied = set()
+
+    def _own(self, container):
+        if id(container) in self.copied:
+            return container
+
+        container = container.copy()
+        self.copied.add(id(container))
+
+        return container
+
+    def resolve(self, tokens: List[str]) -> Any:
+        value = self.root
+
+        for token in tokens:
+            if isinstance(value, dict):
+                if token not in value:
+                    raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+                value = value[token]
+            elif isinstance(value, list):
+                value = value[_array_index(value, token, allow_end=False)]
+            else:
+                raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+        return value
+
+    def parent_for_write(self, tokens: List[str]) -> Tuple[Any, str]:
+        """
+        tokens가 가리키는 위치의 부모 컨테이너를 (필요하면 복사해서) 반환합니다.
+        루트부터 부모까지의 컨테이너는 모두 이번 패치에서 복사한 것으로 교체됩니다.
+        """
+
+        if not isinstance(self.root, (dict, list)):
+            raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+        self.root = container = self._own(self.root)
+
+        for token in tokens[:-1]:
+            if isinstance(container, dict):
+                if token not in container:
+                    raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+                key = token
+            elif isinstance(container, list):
+                key = _array_index(container, token, allow_end=False)
+            else:
+                raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+            child = container[key]
+
+            if not isinstance(child, (dict, list)):
+                raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+            container[key] = child = self._own(child)
+            container = child
+
+        return container, tokens[-1]
+
+    def add(self, tokens: List[str], value: Any):
+        if not tokens:
+            self.root = value
+            return
+
+        (container, token) = self.parent_for_write(tokens)
+
+        if isinstance(container, dict):
+            container[token] = value
+        else:
+            container.insert(_array_index(container, token, allow_end=True), value)
+
+    def remove(self, tokens: List[str]) -> Any:
+        if not tokens:
+            raise JSONPatchError("Cannot remove the root document")
+
+        (container, token) = self.parent_for_write(tokens)
+
+        if isinstance(container, dict):
+            if token not in container:
+                raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+            return container.pop(token)
+
+        return container.pop(_array_index(container, token, allow_end=False))
+
+    def replace(self, tokens: List[str], value: Any):
+        if not tokens:
+            self.root = value
+            return
+
+        (container, token) = self.parent_for_write(tokens)
+
+        if isinstance(container, dict):
+            if token not in container:
+                raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+            container[token] = value
+        else:
+            container[_array_index(container, token, allow_end=False)] = value
+
+
+def _operation_value(operation: dict) -> Any:
+    if 'value' not in operation:
+        raise JSONPatchError(f"Missing 'value' in operation: {operation.get('op')}")
+
+    return operation['value']
+
+
+def apply_patch(document: Any, operations: Any) -> Any:
+    """
+    문서에 JSON Patch 연산들을 순서대로 적용한 새 문서를 반환합니다.
+    연산 중 하나라도 실패하면 예외가 발생하며, 원본 문서는 어떤 경우에도 수정되지 않습니다.
+
+    :raises JSONPatchTestFailed: 'test' 연산이 실패한 경우
+    :raises JSONPatchError: 패치 문서가 잘못되었거나, 경로를 찾을 수 없는 경우
+    """
+
+    if not isinstance(operations, list):
+        raise JSONPatchError("Patch document must be an array of operations")
+
+    context = _PatchContext(document)
+
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise JSONPatchError("Patch operation must be an object")
+
+        op = operation.get('op')
+        tokens = parse_pointer(operation.get('path'))
+
+        if op == 'add':
+            context.add(tokens, _operation_value(operation))
+        elif op == 'remove':
+            context.remove(tokens)
+        elif op == 'replace':
+            value = _operation_value(operation)
+            context.resolve(tokens)
+            context.replace(tokens, value)
+        elif op == 'move':
+            from_tokens = parse_pointer(operation.get('from'))
+
+            if tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                raise JSONPatchError("Cannot move a value into one of its children")
+
+            if tokens != from_tokens:
+                context.add(tokens, context.remove(from_tokens))
+        elif op == 'copy':
+            from_tokens = parse_pointer(operation.get('from'))
+            context.add(tokens, copy.deepcopy(context.resolve(from_tokens)))
+        elif op == 'test':
+            if not _json_equal(context.resolve(tokens), _operation_value(operation)):
+                raise JSONPatchTestFailed(f"Test failed: {operation.get('path')}")
+        else:
+            raise JSONPatchError(f"Unknown operation: {op!r}")
+
+    return context.root
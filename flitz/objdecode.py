@@ -0,0 +1,120 @@
+from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
+
+from dacite import WrongTypeError, MissingValueError
+
+# objdef 데이터클래스용 디코더에서 사용하는 헬퍼 함수들입니다.
+#
+# dacite.from_dict()는 호출할 때마다 타입 힌트를 리플렉션으로 해석하므로, 자주 호출되는 경로
+# (카드 렌더링, 애셋 GC, 메시지 첨부파일 등)에서는 이 헬퍼들로 직접 작성한 디코더를 사용합니다.
+# 검증 규칙과 예외 (dacite.DaciteError)는 dacite.from_dict()와 동일하게 맞춥니다.
+#  - 추가 키는 무시합니다.
+#  - Optional 필드는 키가 없으면 None이 됩니다.
+#  - float 필드는 int (및 bool) 값도 허용합니다. (PEP 484 numeric tower)
+
+T = TypeVar('T')
+
+_MISSING = object()
+
+
+def field_path(parent: Optional[str], name: str) -> str:
+    return name if parent is None else f'{parent}.{name}'
+
+
+def expect_mapping(data: Any, field_type: Type, path: Optional[str]) -> Dict:
+    if not isinstance(data, dict):
+        raise WrongTypeError(field_type, data, path)
+
+    return data
+
+
+def required(data: Dict, name: str, path: Optional[str]) -> Any:
+    value = data.get(name, _MISSING)
+
+    if value is _MISSING:
+        raise MissingValueError(field_path(path, name))
+
+    return value
+
+
+def str_field(data: Dict, name: str, path: Optional[str] = None) -> str:
+    value = data.get(name, _MISSING)
+
+    if not isinstance(value, str):
+        if value is _MISSING:
+            raise MissingValueError(field_path(path, name))
+
+        raise WrongTypeError(str, value, field_path(path, name))
+
+    return value
+
+
+def int_field(data: Dict, name: str, path: Optional[str] = None) -> int:
+    value = data.get(name, _MISSING)
+
+    if not isinstance(value, int):
+        if value is _MISSING:
+            raise MissingValueError(field_path(path, name))
+
+        raise WrongTypeError(int, value, field_path(path, name))
+
+    return value
+
+
+def float_field(data: Dict, name: str, path: Optional[str] = None) -> float:
+    value = data.get(name, _MISSING)
+
+    if not isinstance(value, (int, float)):
+        if value is _MISSING:
+            raise MissingValueError(field_path(path, name))
+
+        raise WrongTypeError(float, value, field_path(path, name))
+
+    return value
+
+
+def literal_field(data: Dict, name: str, choices: tuple, field_type: Type, path: Optional[str] = None) -> str:
+    value = data.get(name, _MISSING)
+
+    if value not in choices:
+        if value is _MISSING:
+            raise MissingValueError(field_path(path, name))
+
+        raise WrongTypeError(field_type, value, field_path(path, name))
+
+    return value
+
+
+def optional_str_field(data: Dict, name: str, path: Optional[str] = None) -> Optional[str]:
+    value = data.get(name)
+
+    if value is not None and not isinstance(value, str):
+        raise WrongTypeError(Optional[str], value, field_path(path, name))
+
+    return value
+
+
+def optional_int_field(data: Dict, name: str, path: Optional[str] = None) -> Optional[int]:
+    value = data.get(name)
+
+    if value is not None and not isinstance(value, int):
+        raise WrongTypeError(Optional[int], value, field_path(path, name))
+
+    return value
+
+
+def decode_list(value: Any, field_type: Type, path: str, decoder: Callable[[Any, str], T]) -> List[T]:
+    if not isinstance(value, list):
+        raise WrongTypeError(field_type, value, path)
+
+    return [decoder(item, path) for item in value]
+
+
+def decode_str_dict(value: Any, field_type: Type, path: str) -> Dict[str, str]:
+    if not isinstance(value, dict):
+        raise WrongTypeError(field_type, value, path)
+
+    for (key, item) in value.items():
+        if not isinstance(key, str) or not isinstance(item, str):
+            raise WrongTypeError(field_type, value, path)
+
+    return dict(value)
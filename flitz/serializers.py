@@ -0,0 +1,52 @@
+from rest_framework import serializers
+
+from flitz.derivatives import derivative_url
+from flitz.storage import storage_url
+
+
+class StorageURLField(serializers.Field):
+    """
+    FileField / ImageField의 URL을 반환하는 읽기 전용 필드입니다.
+    serializers.FileField(read_only=True) 대신, 스토리지 백엔드를 거치지 않는 flitz.storage.storage_url()을 사용합니다.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return storage_url(value)
+
+
+class ImageDerivativeURLField(serializers.Field):
+    """
+    이미지의 파생 이미지 (flitz.derivatives) 중 max_height에 맞는 것의 URL을 반환하는 읽기 전용 필드입니다.
+    """
+
+    def __init__(self, file_field: str, manifest_field: str, max_height: int, fallback_to_source: bool = True, **kwargs):
+        self.file_field = file_field
+        self.manifest_field = manifest_field
+        self.max_height = max_height
+        self.fallback_to_source = fallback_to_source
+
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return derivative_url(
+            getattr(instance, self.file_field),
+            getattr(instance, self.manifest_field),
+            self.max_height,
+            fallback_to_source=self.fallback_to_source
+        )
+
+
+class DirectUploadSessionRequestSerializer(serializers.Serializer):
+    """
+    직접 업로드 세션 생성 요청 (flitz.uploads 참고)
+    """
+
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=128)
+    size = serializers.IntegerField(min_value=1)
@@ -194,6 +194,14 @@ STORAGES = {
     }
 }
 
+# public-read 오브젝트의 URL을 직접 조합할 때 사용하는 base URL (flitz.storage 참고)
+# None이면 스토리지 백엔드가 생성한 (presigned) URL을 캐시해서 사용합니다.
+STORAGE_PUBLIC_BASE_URL = None
+
+# 프로세스 (워커) 내에서 동시에 디코딩할 수 있는 이미지의 총 픽셀 수 (flitz.thumbgen 참고)
+# RGB 기준으로 약 3 bytes/pixel을 사용합니다
+THUMBNAIL_PIXEL_BUDGET = 128 * 1000 * 1000
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
@@ -61,6 +61,9 @@ STORAGES = {
     }
 }
 
+# MinIO의 오브젝트는 public-read로 업로드되므로 URL을 직접 조합합니다.
+STORAGE_PUBLIC_BASE_URL = f"http://{LOCALHOST}:9000/flitz"
+
 # Celery Configuration for development
 CELERY_BROKER_URL = 'redis://localhost:6380/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6380/0'
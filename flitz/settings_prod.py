@@ -54,6 +54,8 @@ STORAGES = {
 
 }
 
+STORAGE_PUBLIC_BASE_URL = os.environ.get('FLITZ_S3_PUBLIC_BASE_URL')
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
@@ -0,0 +1,225 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+# 사용자별 목록 (카드 배포 inbox 등)을 정렬된 상태로 유지하기 위한 sorted set 저장소입니다.
+#
+# 기본 캐시가 Redis라면 같은 Redis 서버의 sorted set을 사용하고,
+# 그렇지 않다면 (테스트 / 로컬 개발 환경의 LocMemCache 등) 프로세스 내부의 저장소를 사용합니다.
+#
+# Redis는 빈 sorted set을 저장하지 않으므로, 목록이 비어 있어도 '이미 만들어진 목록'임을 알 수 있도록
+# 점수가 -inf인 표시용 멤버를 함께 넣어 둡니다. 집합이 존재하지 않는 경우에만 호출자가 DB에서 목록을 다시 만들어야 합니다.
+
+SortedSetEntry = Tuple[str, float]
+
+_MARKER_MEMBER = ''
+_MARKER_SCORE = float('-inf')
+
+SORTED_SET_STORE_GLOBAL_INSTANCE: Optional['SortedSetStore'] = None
+
+
+class SortedSetStore:
+    def replace(self, key: str, entries: Dict[str, float], timeout: int):
+        """
+        집합의 내용을 entries로 교체합니다. entries가 비어 있어도 집합은 존재하게 됩니다.
+        """
+        raise NotImplementedError()
+
+    def add(self, key: str, entries: Dict[str, float]) -> bool:
+        """
+        집합이 존재하는 경우에만 멤버를 추가 (또는 점수를 갱신)합니다.
+        집합이 없는 상태에서 일부 멤버만 추가되면 완전한 목록으로 오해할 수 있기 때문입니다.
+        """
+        raise NotImplementedError()
+
+    def remove(self, key: str, members: Iterable[str]):
+        raise NotImplementedError()
+
+    def delete(self, key: str):
+        raise NotImplementedError()
+
+    def range_after(self, key: str, after: Optional[SortedSetEntry], limit: int,
+                    timeout: Optional[int] = None) -> Optional[List[SortedSetEntry]]:
+        """
+        (점수, 멤버) 순으로 after 다음에 오는 멤버들을 최대 limit개 반환합니다.
+        집합이 존재하지 않으면 None을 반환합니다.
+
+        :param timeout: 주어지면 집합의 만료 시간을 연장합니다 (자주 조회되는 집합이 만료되지 않도록)
+        """
+        raise NotImplementedError()
+
+
+class RedisSortedSetStore(SortedSetStore):
+    ADD_IF_EXISTS_SCRIPT = """
+        if redis.call('EXISTS', KEYS[1]) == 0 then
+            return 0
+        end
+
+        redis.call('ZADD', KEYS[1], unpack(ARGV))
+        return 1
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.add_if_exists = self.client.register_script(self.ADD_IF_EXISTS_SCRIPT)
+
+    def replace(self, key: str, entries: Dict[str, float], timeout: int):
+        pipeline = self.client.pipeline(transaction=True)
+
+        pipeline.delete(key)
+        pipeline.zadd(key, {_MARKER_MEMBER: _MARKER_SCORE, **entries})
+        pipeline.expire(key, timeout)
+
+        pipeline.execute()
+
+    def add(self, key: str, entries: Dict[str, float]) -> bool:
+        if not entries:
+            return False
+
+        args = []
+
+        for (member, score) in entries.items():
+            args += [repr(score), member]
+
+        return bool(self.add_if_exists(keys=[key], args=args))
+
+    def remove(self, key: str, members: Iterable[str]):
+        members = list(members)
+
+        if members:
+            self.client.zrem(key, *members)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def range_after(self, key: str, after: Optional[SortedSetEntry], limit: int,
+                    timeout: Optional[int] = None) -> Optional[List[SortedSetEntry]]:
+        pipeline = self.client.pipeline(transaction=False)
+
+        pipeline.exists(key)
+
+        if after is None:
+            pipeline.zrangebyscore(key, '(-inf', '+inf', start=0, num=limit, withscores=True)
+        else:
+            (after_member, after_score) = after
+
+            # 점수가 같은 멤버들은 멤버 값 순서로 정렬되어 있으므로, after와 점수가 같은 멤버들을 먼저 확인합니다
+            pipeline.zrangebyscore(key, after_score, after_score, withscores=True)
+            pipeline.zrangebyscore(key, f'({after_score!r}', '+inf', start=0, num=limit, withscores=True)
+
+        if timeout is not None:
+            # 존재하지 않는 키에는 아무 영향이 없습니다
+            pipeline.expire(key, timeout)
+
+        (exists, *results) = pipeline.execute()
+
+        if timeout is not None:
+            results.pop()
+
+        if not exists:
+            return None
+
+        entries = []
+
+        if after is not None:
+            entries += [
+                (member.decode('utf-8'), score)
+                for (member, score) in results.pop(0)
+                if member.decode('utf-8') > after[0]
+            ]
+
+        entries += [(member.decode('utf-8'), score) for (member, score) in results[0]]
+
+        return entries[:limit]
+
+
+class LocalSortedSetStore(SortedSetStore):
+    """
+    프로세스 내부에 저장되는 sorted set입니다. (LocMemCache와 같은 범위)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sets: Dict[str, Tuple[float, Dict[str, float]]] = {}
+
+    def _get(self, key: str) -> Optional[Dict[str, float]]:
+        item = self.sets.get(key)
+
+        if item is None:
+            return None
+
+        (expires_at, entries) = item
+
+        if expires_at < time.time():
+            del self.sets[key]
+            return None
+
+        return entries
+
+    def replace(self, key: str, entries: Dict[str, float], timeout: int):
+        with self.lock:
+            self.sets[key] = (time.time() + timeout, dict(entries))
+
+    def add(self, key: str, entries: Dict[str, float]) -> bool:
+        with self.lock:
+            current = self._get(key)
+
+            if current is None:
+                return False
+
+            current.update(entries)
+            return True
+
+    def remove(self, key: str, members: Iterable[str]):
+        with self.lock:
+            current = self._get(key)
+
+            if current is None:
+                return
+
+            for member in members:
+                current.pop(member, None)
+
+    def delete(self, key: str):
+        with self.lock:
+            self.sets.pop(key, None)
+
+    def range_after(self, key: str, after: Optional[SortedSetEntry], limit: int,
+                    timeout: Optional[int] = None) -> Optional[List[SortedSetEntry]]:
+        with self.lock:
+            current = self._get(key)
+
+            if current is None:
+                return None
+
+            if timeout is not None:
+                self.sets[key] = (time.time() + timeout, current)
+
+            entries = sorted(current.items(), key=lambda entry: (entry[1], entry[0]))
+
+        if after is not None:
+            (after_member, after_score) = after
+            entries = [
+                (member, score) for (member, score) in entries
+                if (score, member) > (after_score, after_member)
+            ]
+
+        return entries[:limit]
+
+
+def default_sorted_set_store() -> SortedSetStore:
+    global SORTED_SET_STORE_GLOBAL_INSTANCE
+
+    if SORTED_SET_STORE_GLOBAL_INSTANCE is None:
+        cache_settings = settings.CACHES['default']
+
+        if cache_settings['BACKEND'] == 'django.core.cache.backends.redis.RedisCache':
+            SORTED_SET_STORE_GLOBAL_INSTANCE = RedisSortedSetStore(cache_settings['LOCATION'])
+        else:
+            SORTED_SET_STORE_GLOBAL_INSTANCE = LocalSortedSetStore()
+
+    return SORTED_SET_STORE_GLOBAL_INSTANCE
@@ -0,0 +1,441 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Iterable, List, Set
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+from django.db import connection, transaction
+from django.db.models import QuerySet, Q
+from django.db.models.fields.files import FieldFile
+from django.utils.encoding import filepath_to_uri
+
+logger = logging.getLogger(__name__)
+
+
+def object_key(storage: Storage, name: str) -> str:
+    """
+    스토리지의 location(prefix)을 포함한 실제 오브젝트 키를 반환합니다.
+    """
+
+    location = (getattr(storage, 'location', '') or '').strip('/')
+
+    if location:
+        return f'{location}/{name}'
+
+    return name
+
+
+class StorageURLBuilder:
+    """
+    스토리지 백엔드를 거치지 않고 오브젝트의 URL을 만듭니다.
+
+    django-storages의 S3Storage.url()은 호출할 때마다 boto3 클라이언트로 presigned URL을 생성하기 때문에,
+    피드처럼 수백 개의 URL을 한 번에 만드는 경우 CPU를 꽤 많이 사용합니다.
+
+    - public base URL이 설정되어 있으면 (public-read 오브젝트) `<public base URL>/<key>` 형태로 바로 조합합니다.
+    - 그렇지 않으면 (서명이 필요한 경우) 백엔드가 만든 presigned URL을 LRU 캐시에 보관하고,
+      서명한 주기 (url_epoch(), 만료 시간의 절반) 안에서만 재사용합니다.
+
+    렌더링된 카드 컨텐츠 캐시와 응답의 ETag도 같은 주기를 버전에 포함하므로,
+    캐시나 304 응답을 거쳐 전달된 URL이라도 서명된 지 만료 시간의 절반 이상 지나지 않습니다.
+    """
+
+    DEFAULT_SIGNED_URL_CACHE_SIZE = 8192
+    DEFAULT_SIGNED_URL_EXPIRE = 3600
+
+    storage: Storage
+    public_base_url: Optional[str]
+
+    def __init__(self,
+                 storage: Storage,
+                 public_base_url: Optional[str] = None,
+                 signed_url_cache_size: int = DEFAULT_SIGNED_URL_CACHE_SIZE):
+        self.storage = storage
+        self.public_base_url = (public_base_url or self.__derive_public_base_url(storage) or '').rstrip('/') or None
+
+        self.signed_url_cache_size = signed_url_cache_size
+        self.signed_url_reuse_seconds = getattr(storage, 'querystring_expire', self.DEFAULT_SIGNED_URL_EXPIRE) / 2
+
+        # name -> (URL, 서명한 주기)
+        self._signed_urls: OrderedDict[str, Tuple[str, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def __derive_public_base_url(storage: Storage) -> Optional[str]:
+        custom_domain = getattr(storage, 'custom_domain', None)
+
+        if not custom_domain:
+            return None
+
+        if getattr(storage, 'querystring_auth', False) and getattr(storage, 'cloudfront_signer', None):
+            # CloudFront 서명이 필요한 경우
+            return None
+
+        return f"{getattr(storage, 'url_protocol', 'https:')}//{custom_domain}"
+
+    def url(self, name: Optional[str]) -> Optional[str]:
+        if not name:
+            return None
+
+        if self.public_base_url is not None:
+            return f'{self.public_base_url}/{filepath_to_uri(object_key(self.storage, name))}'
+
+        return self.signed_url(name)
+
+    def url_epoch(self) -> Optional[int]:
+        """
+        URL이 바뀌는 주기의 번호를 반환합니다. 서명이 필요 없는 (public) URL은 바뀌지 않으므로 None을 반환합니다.
+        응답의 ETag에 포함시켜, 만료된 서명 URL이 304 응답으로 계속 재사용되지 않도록 합니다.
+        """
+
+        if self.public_base_url is not None:
+            return None
+
+        return self.__signed_url_epoch()
+
+    def __signed_url_epoch(self) -> int:
+        if self.signed_url_reuse_seconds <= 0:
+            return int(time.time())
+
+        return int(time.time() // self.signed_url_reuse_seconds)
+
+    def signed_url(self, name: str) -> str:
+        if self.signed_url_reuse_seconds <= 0:
+            return self.storage.url(name)
+
+        epoch = self.__signed_url_epoch()
+
+        with self._lock:
+            cached = self._signed_urls.get(name)
+
+            if cached is not None and cached[1] == epoch:
+                self._signed_urls.move_to_end(name)
+                return cached[0]
+
+        url = self.storage.url(name)
+
+        with self._lock:
+            self._signed_urls[name] = (url, epoch)
+            self._signed_urls.move_to_end(name)
+
+            while len(self._signed_urls) > self.signed_url_cache_size:
+                self._signed_urls.popitem(last=False)
+
+        return url
+
+
+DEFAULT_URL_BUILDER: Optional[StorageURLBuilder] = None
+
+def default_url_builder() -> StorageURLBuilder:
+    global DEFAULT_URL_BUILDER
+
+    if DEFAULT_URL_BUILDER is None:
+        DEFAULT_URL_BUILDER = StorageURLBuilder(
+            default_storage,
+            public_base_url=getattr(settings, 'STORAGE_PUBLIC_BASE_URL', None)
+        )
+
+    return DEFAULT_URL_BUILDER
+
+def storage_url(file: Optional[FieldFile]) -> Optional[str]:
+    """
+    FileField / ImageField 값의 URL을 반환합니다. 파일이 없으면 None을 반환합니다.
+    FieldFile.url 대신 사용하십시오.
+    """
+
+    if not file or not file.name:
+        return None
+
+    if file.storage is not default_storage:
+        return file.url
+
+    return default_url_builder().url(file.name)
+
+
+class BatchObjectDeleter:
+    """
+    여러 오브젝트를 S3 multi-object delete (DeleteObjects) 요청으로 한 번에 삭제합니다.
+    요청 한 번에 최대 1000개의 키를 삭제할 수 있습니다.
+
+    S3 백엔드가 아닌 스토리지는 Storage.delete()를 하나씩 호출합니다.
+    """
+
+    MAX_KEYS_PER_REQUEST = 1000
+
+    storage: Storage
+
+    def __init__(self, storage: Storage = default_storage):
+        self.storage = storage
+
+    def delete(self, names: Iterable[str]) -> List[str]:
+        """
+        주어진 오브젝트들을 삭제합니다.
+
+        :returns: 삭제에 실패한 오브젝트 이름 목록
+        """
+
+        names = [name for name in names if name]
+        failed_names = []
+
+        for index in range(0, len(names), self.MAX_KEYS_PER_REQUEST):
+            chunk = names[index:index + self.MAX_KEYS_PER_REQUEST]
+            failed_names.extend(self.__delete_chunk(chunk))
+
+        return failed_names
+
+    def __delete_chunk(self, names: List[str]) -> List[str]:
+        bucket = getattr(self.storage, 'bucket', None)
+
+        if bucket is None:
+            failed_names = []
+
+            for name in names:
+                try:
+                    self.storage.delete(name)
+                except Exception as e:
+                    logger.error(f"BatchObjectDeleter: error deleting {name}: {e}", exc_info=True)
+                    failed_names.append(name)
+
+            return failed_names
+
+        keys = {object_key(self.storage, name): name for name in names}
+
+        try:
+            response = bucket.delete_objects(
+                Delete={
+                    'Objects': [{'Key': key} for key in keys],
+                    'Quiet': True,
+                }
+            )
+        except Exception as e:
+            logger.error(f"BatchObjectDeleter: error deleting {len(names)} objects: {e}", exc_info=True)
+            return names
+
+        errors = response.get('Errors', [])
+
+        for error in errors:
+            logger.error(f"BatchObjectDeleter: error deleting {error.get('Key')}: {error.get('Code')} {error.get('Message')}")
+
+        return [keys.get(error.get('Key'), error.get('Key')) for error in errors]
+
+
+def delete_stored_files(queryset: QuerySet, field_names: List[str], **updates) -> int:
+    """
+    queryset에 속한 row들의 파일 (field_names)을 BatchObjectDeleter로 일괄 삭제한 뒤,
+    row 단위의 save() 대신 update()로 파일 필드를 비우고 updates를 적용합니다.
+    다른 row가 아직 참조하고 있는 (내용 기반) 오브젝트는 삭제하지 않습니다.
+
+    삭제에 실패한 파일이 있는 row는 updates만 적용하고 파일 필드를 그대로 둡니다.
+    이런 row의 파일은 sweep_undeleted_files()가 주기적으로 다시 삭제합니다.
+
+    :returns: 업데이트된 row 수
+    """
+
+    model = queryset.model
+    rows = list(queryset.values_list('pk', *field_names))
+
+    deleter = BatchObjectDeleter()
+    chunk_size = BatchObjectDeleter.MAX_KEYS_PER_REQUEST
+
+    updated_count = 0
+
+    for index in range(0, len(rows), chunk_size):
+        chunk = rows[index:index + chunk_size]
+
+        names = set(name for row in chunk for name in row[1:] if name)
+
+        with transaction.atomic():
+            lock_object_names(names)
+
+            # 내용 기반 오브젝트는 다른 row와 공유될 수 있으므로, 다른 row가 참조하지 않는 오브젝트만 삭제합니다
+            names -= find_referenced_names(names, exclude=(model, [row[0] for row in chunk]))
+
+            failed_names = set(deleter.delete(sorted(names))) if names else set()
+
+            succeeded_pks = []
+            failed_pks = []
+
+            for row in chunk:
+                if any(name in failed_names for name in row[1:] if name):
+                    failed_pks.append(row[0])
+                else:
+                    succeeded_pks.append(row[0])
+
+            if succeeded_pks:
+                updated_count += model.objects.filter(pk__in=succeeded_pks).update(
+                    **{field_name: None for field_name in field_names},
+                    **updates
+                )
+
+            if failed_pks and updates:
+                updated_count += model.objects.filter(pk__in=failed_pks).update(**updates)
+
+    return updated_count
+
+
+# 삭제된 row (deleted_at)에 남아 있는 파일을 다시 정리할 모델 필드 목록
+# (app_label.ModelName, [field_name, ...])
+DELETABLE_FILE_FIELDS: List[Tuple[str, List[str]]] = []
+
+def register_deletable_file_fields(model_label: str, field_names: List[str]):
+    """
+    delete_stored_files()로 삭제하는 파일 필드를 등록합니다. 모델에는 deleted_at 필드가 있어야 합니다.
+    """
+    DELETABLE_FILE_FIELDS.append((model_label, field_names))
+
+
+def sweep_undeleted_files() -> int:
+    """
+    row는 삭제되었지만 (deleted_at) 파일 삭제에 실패해서 오브젝트 이름이 남아 있는 row들의 파일을 다시 삭제합니다.
+
+    :returns: 파일이 정리된 row 수
+    """
+
+    cleaned_count = 0
+
+    for (model_label, field_names) in DELETABLE_FILE_FIELDS:
+        model = apps.get_model(model_label)
+
+        has_files = Q()
+
+        for field_name in field_names:
+            has_files |= Q(**{f'{field_name}__isnull': False}) & ~Q(**{field_name: ''})
+
+        cleaned_count += delete_stored_files(
+            model.objects.filter(has_files, deleted_at__isnull=False),
+            field_names
+        )
+
+    return cleaned_count
+
+
+# 내용 기반 (content-addressed) 오브젝트를 참조할 수 있는 모델 필드 목록
+# (app_label.ModelName, field_name, 살아있는 row에 대한 filter)
+CONTENT_ADDRESSED_FIELDS: List[Tuple[str, str, dict]] = []
+
+def register_content_addressed_field(model_label: str, field_name: str, **live_filter):
+    """
+    내용 기반 오브젝트를 참조하는 필드를 등록합니다.
+    같은 내용의 파일은 하나의 오브젝트를 공유하므로, 삭제하기 전에 등록된 필드들의 참조 여부를 확인합니다.
+    """
+    CONTENT_ADDRESSED_FIELDS.append((model_label, field_name, live_filter))
+
+
+def content_addressed_name(prefix: str, file: File, extension: Optional[str]) -> str:
+    """
+    파일 내용의 SHA-256 해시로 오브젝트 이름을 만듭니다.
+    예) dm_attachments/3f/3fa9...c1.jpg
+    """
+    digest = hashlib.sha256()
+
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+
+    content_hash = digest.hexdigest()
+    filename = f'{content_hash}.{extension}' if extension else content_hash
+
+    # 해시의 첫 2글자로 디렉토리 샤딩 (256개 디렉토리로 분산)
+    return f'{prefix}/{content_hash[:2]}/{filename}'
+
+
+def lock_object_names(names: Iterable[str], shared: bool = False):
+    """
+    오브젝트 이름 단위로 트랜잭션 advisory lock을 겁니다. 잠금은 트랜잭션이 끝날 때 해제되므로,
+    transaction.atomic() 안에서 호출해야 합니다. PostgreSQL이 아닌 DB에서는 아무것도 하지 않습니다.
+
+    내용 기반 오브젝트는 여러 row가 공유하므로, 참조 여부를 확인한 뒤 업로드 / 삭제하는 사이에
+    다른 트랜잭션이 끼어들면 새 row가 삭제된 오브젝트를 참조하게 될 수 있습니다.
+
+    - 오브젝트를 참조하는 row를 저장하는 쪽은 (save_content_addressed) row를 커밋할 때까지 공유 lock을,
+    - 참조 여부를 확인하고 오브젝트를 삭제하는 쪽은 (delete_unreferenced 등) 삭제가 끝날 때까지 배타 lock을 잡습니다.
+
+    :param shared: True이면 공유 lock, False이면 배타 lock을 겁니다
+    """
+
+    if connection.vendor != 'postgresql':
+        return
+
+    # 교착 상태를 피하기 위해 항상 같은 순서로 잠급니다
+    keys = sorted(set(
+        int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], 'big', signed=True)
+        for name in names if name
+    ))
+
+    if not keys:
+        return
+
+    function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+
+    with connection.cursor() as cursor:
+        # unnest()는 배열의 순서대로 row를 반환합니다
+        cursor.execute(f'SELECT {function}(key) FROM unnest(%s::bigint[]) AS key', [keys])
+
+
+def find_referenced_names(names: Iterable[str], exclude: Optional[Tuple[type, Iterable]] = None) -> Set[str]:
+    """
+    주어진 오브젝트 이름 중, 등록된 필드에서 (살아있는 row가) 아직 참조하고 있는 이름들을 반환합니다.
+
+    :param exclude: (모델, pk 목록) - 삭제하려는 row들은 참조 여부 확인에서 제외합니다
+    """
+    names = list(set(name for name in names if name))
+
+    if not names:
+        return set()
+
+    referenced_names = set()
+
+    for (model_label, field_name, live_filter) in CONTENT_ADDRESSED_FIELDS:
+        model = apps.get_model(model_label)
+        queryset = model.objects.filter(**{f'{field_name}__in': names}, **live_filter)
+
+        if exclude is not None and exclude[0] is model:
+            queryset = queryset.exclude(pk__in=list(exclude[1]))
+
+        referenced_names.update(queryset.values_list(field_name, flat=True).distinct())
+
+    return referenced_names
+
+
+def save_content_addressed(prefix: str, file: File, extension: Optional[str], storage: Storage = default_storage) -> str:
+    """
+    파일을 내용 기반 이름으로 저장하고 오브젝트 이름을 반환합니다.
+    이미 같은 내용의 오브젝트를 참조하는 row가 있으면 업로드하지 않습니다.
+
+    반환된 이름을 FileField에 그대로 대입하십시오. (예: `attachment.object = name`)
+    오브젝트를 참조하는 row를 커밋할 때까지 삭제되지 않도록 (lock_object_names 참고),
+    row를 저장하는 트랜잭션 (transaction.atomic()) 안에서 호출해야 합니다.
+    """
+    name = content_addressed_name(prefix, file, extension)
+
+    lock_object_names([name], shared=True)
+
+    if name in find_referenced_names([name]):
+        return name
+
+    # S3Storage는 같은 이름의 오브젝트를 덮어쓰므로 (file_overwrite), 내용이 같은 이상 동시에 저장되어도 문제가 없습니다
+    return storage.save(name, file)
+
+
+def delete_unreferenced(names: Iterable[str], exclude: Optional[Tuple[type, Iterable]] = None) -> List[str]:
+    """
+    다른 row가 참조하지 않는 오브젝트만 일괄 삭제합니다.
+
+    :returns: 삭제에 실패한 오브젝트 이름 목록
+    """
+    names = set(name for name in names if name)
+
+    with transaction.atomic():
+        lock_object_names(names)
+        names -= find_referenced_names(names, exclude=exclude)
+
+        if not names:
+            return []
+
+        return BatchObjectDeleter().delete(sorted(names))
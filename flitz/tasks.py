@@ -1,4 +1,67 @@
+from logging import Logger
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.apps import apps
+from django.utils import timezone
+
+from flitz.derivatives import build_derivatives, delete_derivatives, failed_manifest
+from flitz.storage import sweep_undeleted_files
+
 # Celery가 자동으로 발견할 수 있도록 utils의 태스크들을 import
 from flitz.utils.slack import post_slack_message
 
-__all__ = ['post_slack_message']
\ No newline at end of file
+__all__ = ['post_slack_message', 'generate_image_derivatives', 'sweep_undeleted_file_objects']
+
+logger: Logger = get_task_logger(__name__)
+
+def _on_generate_image_derivatives_failure(self, exc, task_id, args, kwargs, einfo):
+    """
+    재시도 횟수를 초과했거나 예상하지 못한 오류로 실패한 경우, manifest가 pending 상태로 남지 않도록 failed로 바꿉니다.
+    """
+    (model_label, pk, field_name, manifest_field_name, source_name) = args
+
+    logger.error(f"generate_image_derivatives(): failed to generate derivatives of {model_label} {pk}: {exc}")
+
+    apps.get_model(model_label).objects.filter(
+        pk=pk,
+        **{field_name: source_name, f'{manifest_field_name}__status': 'pending'}
+    ).update(**{manifest_field_name: failed_manifest(source_name)})
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3, on_failure=_on_generate_image_derivatives_failure)
+def generate_image_derivatives(model_label: str, pk: str, field_name: str, manifest_field_name: str, source_name: str):
+    """
+    원본 이미지로부터 파생 이미지 (여러 크기 / 포맷)를 생성하고, manifest를 모델에 저장합니다.
+    """
+    model = apps.get_model(model_label)
+
+    if not model.objects.filter(pk=pk, **{field_name: source_name}).exists():
+        logger.info(f"generate_image_derivatives(): {model_label} {pk} no longer references {source_name}, skipping")
+        return
+
+    manifest = build_derivatives(source_name)
+
+    updates = {manifest_field_name: manifest}
+
+    # update()는 auto_now를 적용하지 않으므로, 응답의 ETag가 바뀌도록 updated_at을 직접 갱신합니다
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        updates['updated_at'] = timezone.now()
+
+    updated = model.objects.filter(pk=pk, **{field_name: source_name}).update(**updates)
+
+    if not updated:
+        # 작업 중에 이미지가 교체 / 삭제된 경우, 생성한 파생 이미지를 정리합니다
+        logger.info(f"generate_image_derivatives(): {model_label} {pk} image replaced while processing, discarding derivatives")
+        delete_derivatives([manifest])
+
+
+@shared_task
+def sweep_undeleted_file_objects():
+    """
+    삭제된 row에 남아 있는 (S3 삭제에 실패했던) 파일들을 다시 삭제합니다.
+    """
+    cleaned_count = sweep_undeleted_files()
+
+    if cleaned_count:
+        logger.info(f"sweep_undeleted_file_objects(): cleaned up files of {cleaned_count} rows")
@@ -0,0 +1,170 @@
+from datetime import timedelta
+from unittest.mock import patch, MagicMock
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.test import SimpleTestCase
+from django.utils import timezone
+from freezegun import freeze_time
+
+from flitz.apns import APNS, APNSIdentity, MockedAPNSIdentity, _reinitialize_after_fork
+
+
+def create_test_identity() -> APNSIdentity:
+    private_key = ec.generate_private_key(ec.SECP256R1()).private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode('ascii')
+
+    return APNSIdentity(private_key=private_key, team_id='TEAM', key_id='KEY', bundle_id='com.example.flitz')
+
+
+class APNSTestCase(SimpleTestCase):
+    def test_send_notifications_ex_shares_connection(self):
+        """서로 다른 알림 여러 개를 하나의 HTTP/2 연결로 보내는지 테스트합니다."""
+        apns = APNS(identity=MockedAPNSIdentity(), sandbox=True)
+
+        with patch('flitz.apns.httpx.Client') as mock_client_class:
+            client = mock_client_class.return_value
+
+            apns.send_notifications_ex([
+                ('token_1', {'alert': {'body': '1'}, 'mutable-content': 1}, {'type': 'card_distribution'}),
+                ('token_2', {'alert': {'body': '2'}, 'mutable-content': 1}, None),
+            ])
+
+        mock_client_class.assert_called_once()
+        self.assertTrue(mock_client_class.call_args.kwargs['http2'])
+        self.assertEqual(client.post.call_count, 2)
+
+        (first, second) = client.post.call_args_list
+
+        self.assertEqual(first.args[0], APNS.DEV_URL + 'token_1')
+        self.assertEqual(first.kwargs['json'], {'type': 'card_distribution', 'aps': {'alert': {'body': '1'}, 'mutable-content': 1}})
+        self.assertEqual(first.kwargs['headers']['authorization'], 'bearer mocked_token')
+
+        self.assertEqual(second.args[0], APNS.DEV_URL + 'token_2')
+        self.assertEqual(second.kwargs['json'], {'aps': {'alert': {'body': '2'}, 'mutable-content': 1}})
+
+    def test_client_is_reused_across_calls(self):
+        """여러 번 보내더라도 연결을 새로 만들지 않고, fork된 자식 프로세스에서만 새로 만드는지 테스트합니다."""
+        apns = APNS(identity=MockedAPNSIdentity(), sandbox=True)
+
+        with patch('flitz.apns.httpx.Client') as mock_client_class:
+            parent_client = MagicMock()
+            child_client = MagicMock()
+            mock_client_class.side_effect = [parent_client, child_client]
+
+            apns.send_silent_push(['token_1'])
+            apns.send_notification('title', 'body', ['token_2', 'token_3'])
+
+            self.assertEqual(mock_client_class.call_count, 1)
+            self.assertEqual(parent_client.post.call_count, 3)
+
+            _reinitialize_after_fork()
+            apns.send_silent_push(['token_4'])
+
+        self.assertEqual(mock_client_class.call_count, 2)
+        self.assertEqual(child_client.post.call_count, 1)
+
+        # 부모 프로세스의 연결을 닫으면 안 됨
+        parent_client.close.assert_not_called()
+
+    def test_jwt_token_is_cached(self):
+        identity = create_test_identity()
+        start = timezone.now()
+
+        with freeze_time(start):
+            token = identity.jwt_token()
+
+            claims = jwt.decode(token, options={'verify_signature': False})
+            self.assertEqual(claims['iss'], 'TEAM')
+            self.assertEqual(jwt.get_unverified_header(token)['kid'], 'KEY')
+
+        with freeze_time(start + timedelta(minutes=30)):
+            self.assertEqual(identity.jwt_token(), token)
+
+        with freeze_time(start + timedelta(seconds=APNSIdentity.TOKEN_REFRESH_INTERVAL)):
+            refreshed = identity.jwt_token()
+
+        self.assertNotEqual(refreshed, token)
+
+        # 이미 갱신된 토큰은 예전 토큰으로 무효화할 수 없어야 함
+        identity.invalidate_token(token)
+        self.assertEqual(identity.jwt_token(), refreshed)
+
+    def test_expired_provider_token_is_refreshed(self):
+        identity = create_test_identity()
+        apns = APNS(identity=identity, sandbox=True)
+
+        with freeze_time(timezone.now() - timedelta(minutes=30)):
+            stale_token = identity.jwt_token()
+
+        expired = httpx.Response(403, json={'reason': 'ExpiredProviderToken'})
+
+        with patch('flitz.apns.httpx.Client') as mock_client_class:
+            client = mock_client_class.return_value
+            client.post.side_effect = [expired, httpx.Response(200), httpx.Response(200)]
+
+            apns.send_push({'aps': {'content-available': 1}}, ['token_1', 'token_2'], push_type='background')
+
+        (first, retried, second) = client.post.call_args_list
+
+        self.assertEqual(first.kwargs['headers']['authorization'], 'bearer ' + stale_token)
+        self.assertEqual(retried.args[0], APNS.DEV_URL + 'token_1')
+        self.assertNotEqual(retried.kwargs['headers']['authorization'], 'bearer ' + stale_token)
+        self.assertEqual(second.kwargs['headers'], retried.kwargs['headers'])
+
+    def test_failures_do_not_stop_the_batch(self):
+        """일부 기기에 보내지 못해도 나머지 기기에는 보내고, 다시 보내야 하는 알림만 반환하는지 테스트합니다."""
+        apns = APNS(identity=MockedAPNSIdentity(), sandbox=True)
+
+        notifications = [
+            (f'token_{index}', {'alert': {'body': str(index)}, 'mutable-content': 0}, None)
+            for index in range(4)
+        ]
+
+        with patch('flitz.apns.httpx.Client') as mock_client_class:
+            client = mock_client_class.return_value
+            client.post.side_effect = [
+                httpx.ConnectError('connection refused'),
+                httpx.Response(410, json={'reason': 'Unregistered'}),
+                httpx.Response(503, json={'reason': 'ServiceUnavailable'}),
+                httpx.Response(200),
+            ]
+
+            failed = apns.send_notifications_ex(notifications)
+
+        self.assertEqual(client.post.call_count, 4)
+
+        # 연결 오류 / 503은 다시 보내야 하고, 410 (Unregistered)은 다시 보내도 실패하므로 제외
+        self.assertEqual(failed, [notifications[0], notifications[2]])
+
+    def test_batch_task_retries_only_failed_notifications(self):
+        from user.tasks import send_push_message_batch
+
+        notifications = [
+            ('token_1', {'alert': {'body': '1'}, 'mutable-content': 0}, None),
+            ('token_2', {'alert': {'body': '2'}, 'mutable-content': 0}, None),
+        ]
+
+        apns = MagicMock()
+        apns.send_notifications_ex.return_value = [notifications[1]]
+
+        with patch('user.tasks.APNS.default', return_value=apns), \
+                patch.object(send_push_message_batch, 'retry', return_value=RuntimeError('retry')) as mock_retry:
+            with self.assertRaisesMessage(RuntimeError, 'retry'):
+                send_push_message_batch(notifications)
+
+        self.assertEqual(mock_retry.call_args.kwargs['args'], [[notifications[1]]])
+
+        # 모두 보냈으면 다시 시도하지 않아야 함
+        apns.send_notifications_ex.return_value = []
+
+        with patch('user.tasks.APNS.default', return_value=apns), \
+                patch.object(send_push_message_batch, 'retry') as mock_retry:
+            send_push_message_batch(notifications)
+
+        mock_retry.assert_not_called()
@@ -0,0 +1,103 @@
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.test import SimpleTestCase
+from PIL import Image
+
+from flitz.derivatives import derivative_name, build_derivatives, select_derivative, derivative_url, \
+    pending_manifest, IMAGE_DERIVATIVE_HEIGHTS, IMAGE_DERIVATIVE_FORMATS
+from flitz.thumbgen import generate_derivatives
+
+
+def create_test_image(size=(1500, 2000), mode='RGB', format='JPEG') -> BytesIO:
+    buffer = BytesIO()
+    Image.new(mode, size, (255, 0, 0) if mode == 'RGB' else None).save(buffer, format=format)
+    buffer.seek(0)
+
+    return buffer
+
+
+class ImageDerivativesTestCase(SimpleTestCase):
+
+    def test_generate_derivatives(self):
+        """요청한 모든 크기 / 포맷의 파생 이미지를 생성해야 합니다."""
+        derivatives = generate_derivatives(create_test_image(), (160, 480, 1280), ('jpeg', 'webp'))
+
+        self.assertEqual(len(derivatives), 6)
+
+        sizes = {(max_height, format): size for (max_height, format, _, size) in derivatives}
+
+        self.assertEqual(sizes[(1280, 'jpeg')], (960, 1280))
+        self.assertEqual(sizes[(480, 'webp')], (360, 480))
+        self.assertEqual(sizes[(160, 'jpeg')], (120, 160))
+
+        (_, _, file, _) = derivatives[-1]
+        self.assertEqual(Image.open(file).format, 'WEBP')
+
+    def test_generate_derivatives_does_not_upscale(self):
+        """원본보다 큰 크기는 원본 크기로 생성해야 합니다."""
+        derivatives = generate_derivatives(create_test_image(size=(300, 400), mode='RGBA', format='PNG'), (160, 1280), ('jpeg',))
+
+        sizes = {max_height: size for (max_height, _, _, size) in derivatives}
+
+        self.assertEqual(sizes[1280], (300, 400))
+        self.assertEqual(sizes[160], (120, 160))
+
+    def test_build_derivatives(self):
+        """파생 이미지를 결정적인 이름으로 저장하고 manifest를 반환해야 합니다."""
+        storage = InMemoryStorage()
+        storage.save('profile_images/ab/test.jpg', ContentFile(create_test_image().read()))
+
+        manifest = build_derivatives('profile_images/ab/test.jpg', storage=storage)
+
+        self.assertEqual(manifest['status'], 'ready')
+        self.assertEqual(len(manifest['variants']), len(IMAGE_DERIVATIVE_HEIGHTS) * len(IMAGE_DERIVATIVE_FORMATS))
+
+        for variant in manifest['variants']:
+            self.assertEqual(variant['name'], derivative_name('profile_images/ab/test.jpg', variant['max_height'], variant['format']))
+            self.assertTrue(storage.exists(variant['name']))
+
+        self.assertEqual(
+            derivative_name('profile_images/ab/test.jpg', 480, 'webp'),
+            'derivatives/profile_images/ab/test/480.webp'
+        )
+
+    def test_select_derivative(self):
+        """요청한 크기 이상인 것 중 가장 작은 파생 이미지를 선택해야 합니다."""
+        manifest = {
+            'status': 'ready',
+            'variants': [
+                {'max_height': height, 'format': 'jpeg', 'name': f'{height}.jpg'}
+                for height in (1280, 160, 480)
+            ]
+        }
+
+        self.assertEqual(select_derivative(manifest, 100)['max_height'], 160)
+        self.assertEqual(select_derivative(manifest, 480)['max_height'], 480)
+        self.assertEqual(select_derivative(manifest, 2000)['max_height'], 1280)
+        self.assertIsNone(select_derivative(manifest, 480, format='webp'))
+
+    @patch('flitz.derivatives.storage_url', side_effect=lambda file: f'https://cdn.example.com/{file.name}')
+    def test_derivative_url(self, mock_storage_url):
+        """manifest 상태에 따라 파생 이미지 / 원본 / None을 반환해야 합니다."""
+        file = MagicMock()
+        file.name = 'profile_images/ab/test.jpg'
+
+        manifest = {
+            'status': 'ready',
+            'source': file.name,
+            'variants': [{'max_height': 480, 'format': 'jpeg', 'name': 'derivatives/profile_images/ab/test/480.jpg'}]
+        }
+
+        with patch('flitz.derivatives.FieldFile', side_effect=lambda instance, field, name: MagicMock(name=name)) as mock_field_file:
+            derivative_url(file, manifest, 480)
+            self.assertEqual(mock_field_file.call_args.args[2], 'derivatives/profile_images/ab/test/480.jpg')
+
+        # manifest가 없으면 (기존 이미지) 원본
+        self.assertEqual(derivative_url(file, None, 480), 'https://cdn.example.com/profile_images/ab/test.jpg')
+
+        # 파생 이미지 생성 전
+        self.assertEqual(derivative_url(file, pending_manifest(file.name), 480), 'https://cdn.example.com/profile_images/ab/test.jpg')
+        self.assertIsNone(derivative_url(file, pending_manifest(file.name), 480, fallback_to_source=False))
@@ -0,0 +1,95 @@
+import copy
+
+from django.test import SimpleTestCase
+
+from flitz.jsonpatch import apply_patch, parse_pointer, JSONPatchError, JSONPatchTestFailed
+
+
+class JSONPatchTestCase(SimpleTestCase):
+    def setUp(self):
+        self.document = {
+            'title': 'card',
+            'elements': [
+                {'id': 'a', 'text': 'A'},
+                {'id': 'b', 'text': 'B'},
+                {'id': 'c', 'text': 'C'},
+            ],
+            'properties': {'a/b': 1, 'm~n': 2},
+        }
+
+        self.original = copy.deepcopy(self.document)
+
+    def test_parse_pointer(self):
+        self.assertEqual(parse_pointer(''), [])
+        self.assertEqual(parse_pointer('/elements/0/text'), ['elements', '0', 'text'])
+        self.assertEqual(parse_pointer('/properties/a~1b'), ['properties', 'a/b'])
+        self.assertEqual(parse_pointer('/properties/m~0n'), ['properties', 'm~n'])
+
+        with self.assertRaises(JSONPatchError):
+            parse_pointer('elements')
+
+    def test_operations(self):
+        """RFC 6902의 각 연산이 올바르게 적용되는지 테스트합니다."""
+        patched = apply_patch(self.document, [
+            {'op': 'replace', 'path': '/elements/0/text', 'value': 'AA'},
+            {'op': 'add', 'path': '/elements/-', 'value': {'id': 'd', 'text': 'D'}},
+            {'op': 'remove', 'path': '/elements/1'},
+            {'op': 'move', 'from': '/elements/0', 'path': '/elements/2'},
+            {'op': 'copy', 'from': '/title', 'path': '/subtitle'},
+            {'op': 'test', 'path': '/properties/a~1b', 'value': 1},
+            {'op': 'remove', 'path': '/properties/m~0n'},
+        ])
+
+        self.assertEqual(patched, {
+            'title': 'card',
+            'subtitle': 'card',
+            'elements': [
+                {'id': 'c', 'text': 'C'},
+                {'id': 'd', 'text': 'D'},
+                {'id': 'a', 'text': 'AA'},
+            ],
+            'properties': {'a/b': 1},
+        })
+
+    def test_original_is_not_modified(self):
+        """원본 문서는 수정되지 않고, 수정되지 않은 부분은 원본 객체를 공유해야 합니다."""
+        patched = apply_patch(self.document, [
+            {'op': 'replace', 'path': '/elements/1/text', 'value': 'BB'},
+            {'op': 'replace', 'path': '/elements/1/id', 'value': 'bb'},
+        ])
+
+        self.assertEqual(self.document, self.original)
+
+        self.assertIs(patched['elements'][0], self.document['elements'][0])
+        self.assertIs(patched['elements'][2], self.document['elements'][2])
+        self.assertIs(patched['properties'], self.document['properties'])
+        self.assertIsNot(patched['elements'][1], self.document['elements'][1])
+        self.assertEqual(patched['elements'][1], {'id': 'bb', 'text': 'BB'})
+
+    def test_errors(self):
+        invalid_patches = [
+            {'op': 'replace', 'path': '/elements/0/text'},
+            [{'op': 'replace', 'path': '/missing', 'value': 1}],
+            [{'op': 'remove', 'path': '/elements/3'}],
+            [{'op': 'add', 'path': '/elements/01', 'value': 1}],
+            [{'op': 'add', 'path': '/missing/key', 'value': 1}],
+            [{'op': 'move', 'from': '/elements', 'path': '/elements/0'}],
+            [{'op': 'unknown', 'path': '/title'}],
+            [{'op': 'remove', 'path': ''}],
+        ]
+
+        for patch in invalid_patches:
+            with self.subTest(patch=patch):
+                with self.assertRaises(JSONPatchError):
+                    apply_patch(self.document, patch)
+
+        self.assertEqual(self.document, self.original)
+
+    def test_test_operation(self):
+        with self.assertRaises(JSONPatchTestFailed):
+            apply_patch(self.document, [
+                {'op': 'replace', 'path': '/title', 'value': 'changed'},
+                {'op': 'test', 'path': '/properties/a~1b', 'value': True},
+            ])
+
+        self.assertEqual(self.document, self.original)
@@ -0,0 +1,247 @@
+import os
+import uuid
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from django.core.files.base import ContentFile
+
+from flitz.storage import StorageURLBuilder, BatchObjectDeleter, content_addressed_name, lock_object_names
+
+
+class StorageURLBuilderTestCase(SimpleTestCase):
+
+    def create_storage(self, **kwargs):
+        storage = MagicMock()
+        storage.location = kwargs.get('location', '')
+        storage.custom_domain = kwargs.get('custom_domain', None)
+        storage.querystring_auth = kwargs.get('querystring_auth', True)
+        storage.querystring_expire = kwargs.get('querystring_expire', 3600)
+        storage.url_protocol = 'https:'
+        storage.cloudfront_signer = None
+        storage.url.side_effect = lambda name: f'https://signed.example.com/{name}?Signature=xxx'
+
+        return storage
+
+    def test_public_base_url(self):
+        """public base URL이 설정되어 있으면 백엔드를 호출하지 않고 URL을 조합해야 합니다."""
+        storage = self.create_storage()
+        builder = StorageURLBuilder(storage, public_base_url='http://localhost:9000/flitz/')
+
+        url = builder.url('card_assets/ab/hello world.jpg')
+
+        self.assertEqual(url, 'http://localhost:9000/flitz/card_assets/ab/hello%20world.jpg')
+        storage.url.assert_not_called()
+
+    def test_custom_domain(self):
+        """custom_domain이 설정된 스토리지는 public base URL을 유추해야 합니다."""
+        storage = self.create_storage(custom_domain='cdn.example.com', location='media')
+        builder = StorageURLBuilder(storage)
+
+        self.assertEqual(builder.url('a.jpg'), 'https://cdn.example.com/media/a.jpg')
+        storage.url.assert_not_called()
+
+    def test_empty_name(self):
+        builder = StorageURLBuilder(self.create_storage(), public_base_url='http://localhost:9000/flitz')
+
+        self.assertIsNone(builder.url(None))
+        self.assertIsNone(builder.url(''))
+
+    def test_signed_url_is_cached(self):
+        """서명이 필요한 경우, 같은 오브젝트의 URL은 캐시된 값을 재사용해야 합니다."""
+        storage = self.create_storage()
+        builder = StorageURLBuilder(storage)
+
+        url_1 = builder.url('a.jpg')
+        url_2 = builder.url('a.jpg')
+
+        self.assertEqual(url_1, url_2)
+        self.assertEqual(storage.url.call_count, 1)
+
+    def test_signed_url_cache_eviction(self):
+        """LRU 캐시 크기를 초과하면 가장 오래 사용되지 않은 항목이 제거되어야 합니다."""
+        storage = self.create_storage()
+        builder = StorageURLBuilder(storage, signed_url_cache_size=2)
+
+        builder.url('a.jpg')
+        builder.url('b.jpg')
+        builder.url('a.jpg')
+        builder.url('c.jpg')  # b.jpg가 제거됨
+
+        builder.url('a.jpg')
+        self.assertEqual(storage.url.call_count, 3)
+
+        builder.url('b.jpg')
+        self.assertEqual(storage.url.call_count, 4)
+
+    def test_signed_url_expiry(self):
+        """만료 시간의 절반이 지난 presigned URL은 다시 생성해야 합니다."""
+        storage = self.create_storage(querystring_expire=0)
+        builder = StorageURLBuilder(storage)
+
+        builder.url('a.jpg')
+        builder.url('a.jpg')
+
+        self.assertEqual(storage.url.call_count, 2)
+
+    def test_signed_url_is_not_reused_across_epochs(self):
+        """presigned URL은 서명한 주기 안에서만 재사용되어야 합니다. (만료 시간의 절반 이상 지난 URL을 반환하지 않음)"""
+        storage = self.create_storage(querystring_expire=3600)
+        builder = StorageURLBuilder(storage)
+
+        with patch('flitz.storage.time.time', return_value=1800 * 10 + 1799):
+            epoch = builder.url_epoch()
+            builder.url('a.jpg')
+            builder.url('a.jpg')
+
+        self.assertEqual(storage.url.call_count, 1)
+
+        # 서명한 지 1초밖에 지나지 않았더라도 주기가 바뀌면 다시 서명해야 함
+        with patch('flitz.storage.time.time', return_value=1800 * 11):
+            self.assertEqual(builder.url_epoch(), epoch + 1)
+            builder.url('a.jpg')
+
+        self.assertEqual(storage.url.call_count, 2)
+
+
+class BatchObjectDeleterTestCase(SimpleTestCase):
+
+    def create_storage(self, location=''):
+        storage = MagicMock()
+        storage.location = location
+        storage.bucket.delete_objects.return_value = {}
+
+        return storage
+
+    def test_chunking(self):
+        """한 요청에 최대 1000개의 키만 보내야 합니다."""
+        storage = self.create_storage()
+        deleter = BatchObjectDeleter(storage)
+
+        failed_names = deleter.delete([f'{i}.jpg' for i in range(2500)])
+
+        self.assertEqual(failed_names, [])
+        self.assertEqual(storage.bucket.delete_objects.call_count, 3)
+
+        sizes = [
+            len(call.kwargs['Delete']['Objects'])
+            for call in storage.bucket.delete_objects.call_args_list
+        ]
+        self.assertEqual(sizes, [1000, 1000, 500])
+        storage.delete.assert_not_called()
+
+    def test_errors_are_mapped_to_names(self):
+        """삭제에 실패한 키는 location prefix를 제외한 오브젝트 이름으로 반환되어야 합니다."""
+        storage = self.create_storage(location='media')
+        storage.bucket.delete_objects.return_value = {
+            'Errors': [{'Key': 'media/b.jpg', 'Code': 'AccessDenied', 'Message': 'Access Denied'}]
+        }
+
+        deleter = BatchObjectDeleter(storage)
+        failed_names = deleter.delete(['a.jpg', 'b.jpg', None])
+
+        self.assertEqual(failed_names, ['b.jpg'])
+        self.assertEqual(
+            storage.bucket.delete_objects.call_args.kwargs['Delete']['Objects'],
+            [{'Key': 'media/a.jpg'}, {'Key': 'media/b.jpg'}]
+        )
+
+    def test_request_failure(self):
+        """요청 자체가 실패하면 모든 오브젝트가 실패한 것으로 간주해야 합니다."""
+        storage = self.create_storage()
+        storage.bucket.delete_objects.side_effect = Exception('connection reset')
+
+        deleter = BatchObjectDeleter(storage)
+
+        self.assertEqual(deleter.delete(['a.jpg', 'b.jpg']), ['a.jpg', 'b.jpg'])
+
+
+@skipUnless(os.environ.get('FLITZ_TEST_S3_ENDPOINT_URL'), 'FLITZ_TEST_S3_ENDPOINT_URL is not set')
+class BatchObjectDeleterS3TestCase(SimpleTestCase):
+    """
+    로컬 S3 (flitz-devenv의 MinIO)에 실제로 DeleteObjects 요청을 보내는 테스트입니다.
+
+    usage: FLITZ_TEST_S3_ENDPOINT_URL=http://localhost:9000 python manage.py test flitz.tests.test_storage
+    """
+
+    def setUp(self):
+        from storages.backends.s3 import S3Storage
+
+        self.storage = S3Storage(
+            bucket_name=os.environ.get('FLITZ_TEST_S3_BUCKET', 'flitz'),
+            access_key=os.environ.get('FLITZ_TEST_S3_ACCESS_KEY', 'flitzdev'),
+            secret_key=os.environ.get('FLITZ_TEST_S3_SECRET_KEY', 'flitzdev123'),
+            endpoint_url=os.environ['FLITZ_TEST_S3_ENDPOINT_URL'],
+            location=f'tests/{uuid.uuid4()}',
+        )
+
+    def test_delete(self):
+        names = [self.storage.save(f'{index}.txt', ContentFile(b'hello')) for index in range(3)]
+
+        for name in names:
+            self.assertTrue(self.storage.exists(name))
+
+        deleter = BatchObjectDeleter(self.storage)
+
+        # 존재하지 않는 키는 S3에서 실패로 취급하지 않습니다
+        self.assertEqual(deleter.delete(names + ['missing.txt']), [])
+
+        for name in names:
+            self.assertFalse(self.storage.exists(name))
+
+
+class ContentAddressedNameTestCase(SimpleTestCase):
+
+    def test_same_content_same_name(self):
+        """같은 내용의 파일은 같은 이름을, 다른 내용의 파일은 다른 이름을 가져야 합니다."""
+        name_1 = content_addressed_name('dm_attachments', ContentFile(b'hello', name='a.jpg'), 'jpg')
+        name_2 = content_addressed_name('dm_attachments', ContentFile(b'hello', name='b.jpg'), 'jpg')
+        name_3 = content_addressed_name('dm_attachments', ContentFile(b'world', name='a.jpg'), 'jpg')
+
+        self.assertEqual(name_1, name_2)
+        self.assertNotEqual(name_1, name_3)
+        self.assertEqual(
+            name_1,
+            'dm_attachments/2c/2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824.jpg'
+        )
+
+
+class LockObjectNamesTestCase(SimpleTestCase):
+
+    def create_connection(self, vendor='postgresql'):
+        connection = MagicMock()
+        connection.vendor = vendor
+
+        return connection
+
+    def test_locks_in_sorted_order(self):
+        """같은 이름은 한 번만, 항상 같은 순서로 잠가서 교착 상태가 생기지 않아야 합니다."""
+        connection = self.create_connection()
+
+        with patch('flitz.storage.connection', connection):
+            lock_object_names(['b.jpg', 'a.jpg', 'b.jpg', None])
+            lock_object_names(['a.jpg', 'b.jpg'], shared=True)
+
+        cursor = connection.cursor.return_value.__enter__.return_value
+        ((exclusive_sql, (exclusive_keys,)), (shared_sql, (shared_keys,))) = [
+            call.args for call in cursor.execute.call_args_list
+        ]
+
+        self.assertIn('pg_advisory_xact_lock(', exclusive_sql)
+        self.assertIn('pg_advisory_xact_lock_shared(', shared_sql)
+
+        self.assertEqual(len(exclusive_keys), 2)
+        self.assertEqual(exclusive_keys, sorted(exclusive_keys))
+        self.assertEqual(exclusive_keys, shared_keys)
+        self.assertTrue(all(-2 ** 63 <= key < 2 ** 63 for key in exclusive_keys))
+
+    def test_no_op_without_postgresql(self):
+        """PostgreSQL이 아니거나 잠글 이름이 없으면 쿼리를 실행하지 않아야 합니다."""
+        for (vendor, names) in (('sqlite', ['a.jpg']), ('postgresql', [None, ''])):
+            connection = self.create_connection(vendor)
+
+            with patch('flitz.storage.connection', connection):
+                lock_object_names(names)
+
+            connection.cursor.assert_not_called()
@@ -0,0 +1,90 @@
+import threading
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from flitz import thumbgen
+from flitz.thumbgen import generate_thumbnail, open_normalized_image, PixelBudget, ImageTooLargeError
+
+
+def create_test_jpeg(size=(4000, 3000), orientation=None) -> BytesIO:
+    buffer = BytesIO()
+    image = Image.new('RGB', size, (0, 128, 255))
+
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+
+    image.save(buffer, format='JPEG', exif=exif.tobytes())
+    buffer.seek(0)
+
+    return buffer
+
+
+class GenerateThumbnailTestCase(SimpleTestCase):
+
+    def test_thumbnail_size(self):
+        """높이가 max_height가 되도록 aspect ratio를 유지하며 줄여야 합니다."""
+        (file, size) = generate_thumbnail(create_test_jpeg(), 768)
+
+        self.assertEqual(size, (1024, 768))
+        self.assertEqual(Image.open(file).size, (1024, 768))
+
+    def test_small_image_is_not_resized(self):
+        (_, size) = generate_thumbnail(create_test_jpeg(size=(400, 300)), 768)
+
+        self.assertEqual(size, (400, 300))
+
+    def test_draft_mode_decoding(self):
+        """JPEG는 목표 크기 이상인 가장 작은 스케일로 디코딩해야 합니다."""
+        with open_normalized_image(create_test_jpeg(), 768) as image:
+            # 4000x3000 -> draft 1/2 (2000x1500) 이후 reduce 없이 그대로
+            self.assertGreaterEqual(image.height, 768)
+            self.assertLess(image.height, 3000)
+
+    def test_exif_orientation(self):
+        """EXIF 방향 정보가 적용된 후의 높이를 기준으로 줄여야 합니다."""
+        # orientation 6: 시계 방향 90도 회전 -> 표시 크기는 3000x4000
+        (file, size) = generate_thumbnail(create_test_jpeg(orientation=6), 800)
+
+        self.assertEqual(size, (600, 800))
+        self.assertNotIn(0x0112, Image.open(file).getexif())
+
+    def test_decompression_bomb(self):
+        """최대 픽셀 수를 초과하는 이미지는 디코딩하지 않아야 합니다."""
+        with patch.object(thumbgen, 'MAX_IMAGE_PIXELS', 1000 * 1000):
+            with self.assertRaises(ImageTooLargeError):
+                generate_thumbnail(create_test_jpeg(), 768)
+
+
+class PixelBudgetTestCase(SimpleTestCase):
+
+    def test_reserve_waits_for_budget(self):
+        """예산을 초과하면 다른 작업이 끝날 때까지 대기해야 합니다."""
+        budget = PixelBudget(100)
+
+        entered = threading.Event()
+
+        def worker():
+            with budget.reserve(60):
+                entered.set()
+
+        with budget.reserve(60):
+            thread = threading.Thread(target=worker)
+            thread.start()
+
+            self.assertFalse(entered.wait(0.1))
+
+        self.assertTrue(entered.wait(1))
+        thread.join()
+
+        self.assertEqual(budget.used_pixels, 0)
+
+    def test_oversized_reservation_runs_alone(self):
+        """예산보다 큰 작업도 다른 작업이 없으면 실행되어야 합니다."""
+        budget = PixelBudget(100)
+
+        with budget.reserve(1000):
+            self.assertEqual(budget.used_pixels, 1000)
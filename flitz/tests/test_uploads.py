@@ -0,0 +1,104 @@
+from unittest.mock import MagicMock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from flitz.uploads import DirectUploader
+
+
+def create_mock_storage(location='', content_type='image/jpeg', content_length=1024):
+    storage = MagicMock()
+    storage.location = location
+    storage.bucket_name = 'flitz'
+    storage.object_parameters = {'ACL': 'public-read'}
+
+    client = storage.bucket.meta.client
+    client.generate_presigned_post.return_value = {
+        'url': 'http://localhost:9000/flitz',
+        'fields': {'key': 'card_assets/00/test.jpg'}
+    }
+    client.head_object.return_value = {
+        'ContentType': content_type,
+        'ContentLength': content_length,
+    }
+
+    return storage
+
+
+class DirectUploaderTestCase(SimpleTestCase):
+
+    def create_session(self, uploader):
+        return uploader.create_session(
+            user_id='user-1',
+            purpose='card_asset',
+            target_id='card-1',
+            name='card_assets/00/test.jpg',
+            content_type='image/jpeg',
+            max_size=2048
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_presigned_post_conditions(self):
+        """presigned POST에 Content-Type / 파일 크기 / ACL 조건이 포함되어야 합니다."""
+        storage = create_mock_storage(location='media')
+        uploader = DirectUploader(storage)
+
+        self.create_session(uploader)
+
+        kwargs = storage.bucket.meta.client.generate_presigned_post.call_args.kwargs
+
+        self.assertEqual(kwargs['Key'], 'media/card_assets/00/test.jpg')
+        self.assertEqual(kwargs['Fields'], {'Content-Type': 'image/jpeg', 'acl': 'public-read'})
+        self.assertIn(['content-length-range', 1, 2048], kwargs['Conditions'])
+        self.assertIn({'Content-Type': 'image/jpeg'}, kwargs['Conditions'])
+
+    def test_session_is_bound_to_user_and_target(self):
+        """다른 사용자 / 다른 대상의 세션은 가져올 수 없어야 합니다."""
+        uploader = DirectUploader(create_mock_storage())
+        session, _ = self.create_session(uploader)
+
+        self.assertIsNotNone(uploader.get_session(session.id, 'user-1', 'card_asset', 'card-1'))
+        self.assertIsNone(uploader.get_session(session.id, 'user-2', 'card_asset', 'card-1'))
+        self.assertIsNone(uploader.get_session(session.id, 'user-1', 'card_asset', 'card-2'))
+        self.assertIsNone(uploader.get_session(session.id, 'user-1', 'dm_attachment', 'card-1'))
+
+    def test_verify(self):
+        """업로드된 오브젝트의 크기와 Content-Type을 확인해야 합니다."""
+        uploader = DirectUploader(create_mock_storage())
+        session, _ = self.create_session(uploader)
+
+        uploaded_object = uploader.verify(session)
+
+        self.assertEqual(uploaded_object.name, 'card_assets/00/test.jpg')
+        self.assertEqual(uploaded_object.size, 1024)
+
+    def test_verify_rejects_violating_object(self):
+        """제약 조건에 맞지 않는 오브젝트는 삭제해야 합니다."""
+        storage = create_mock_storage(content_type='text/html')
+        uploader = DirectUploader(storage)
+        session, _ = self.create_session(uploader)
+
+        self.assertIsNone(uploader.verify(session))
+        storage.delete.assert_called_once_with('card_assets/00/test.jpg')
+
+    def test_verify_missing_object(self):
+        """아직 업로드되지 않은 경우 None을 반환해야 합니다."""
+        storage = create_mock_storage()
+        storage.bucket.meta.client.head_object.side_effect = Exception('404 Not Found')
+
+        uploader = DirectUploader(storage)
+        session, _ = self.create_session(uploader)
+
+        self.assertIsNone(uploader.verify(session))
+        storage.delete.assert_not_called()
+
+    def test_discard_only_once(self):
+        """완료 처리는 한 번만 성공해야 합니다."""
+        uploader = DirectUploader(create_mock_storage())
+        session, _ = self.create_session(uploader)
+
+        self.assertTrue(uploader.discard(session))
+        self.assertFalse(uploader.discard(session))
+        self.assertIsNone(uploader.get_session(session.id, 'user-1', 'card_asset', 'card-1'))
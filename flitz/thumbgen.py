@@ -1,59 +1,237 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple, Optional
+
+from django.conf import settings
 from django.core.files import File
 from django.core.files.temp import NamedTemporaryFile
 
-from PIL import Image
+from PIL import Image, ImageOps
+
+# 디코딩을 허용하는 최대 픽셀 수 (decompression bomb 방지)
+# NOTE: 48MP (8000x6000) 카메라 이미지까지는 허용합니다
+MAX_IMAGE_PIXELS = 64 * 1000 * 1000
+
+# 최종 리샘플링 전에 Image.reduce()로 줄일 때, 목표 크기 대비 남겨두는 배율
+# (Image.thumbnail()의 reducing_gap과 같은 의미입니다)
+REDUCING_GAP = 2.0
+
+# EXIF Orientation 값 중 가로 / 세로가 바뀌는 값들
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+class ImageTooLargeError(ValueError):
+    """
+    이미지의 픽셀 수가 MAX_IMAGE_PIXELS를 초과하는 경우 발생합니다.
+    """
+    pass
+
+
+class PixelBudget:
+    """
+    프로세스 내에서 동시에 디코딩할 수 있는 픽셀 수를 제한합니다.
+    예산을 초과하는 경우 다른 작업이 끝날 때까지 대기하므로, 워커의 메모리 사용량 상한을 정할 수 있습니다.
+
+    예산보다 큰 이미지는 다른 작업이 없을 때 단독으로 처리합니다.
+    """
+
+    def __init__(self, total_pixels: int):
+        self.total_pixels = total_pixels
+        self.used_pixels = 0
+
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, pixels: int):
+        with self._condition:
+            while self.used_pixels > 0 and self.used_pixels + pixels > self.total_pixels:
+                self._condition.wait()
+
+            self.used_pixels += pixels
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used_pixels -= pixels
+                self._condition.notify_all()
+
+
+DEFAULT_PIXEL_BUDGET: Optional[PixelBudget] = None
+
+def default_pixel_budget() -> PixelBudget:
+    global DEFAULT_PIXEL_BUDGET
+
+    if DEFAULT_PIXEL_BUDGET is None:
+        DEFAULT_PIXEL_BUDGET = PixelBudget(getattr(settings, 'THUMBNAIL_PIXEL_BUDGET', 128 * 1000 * 1000))
+
+    return DEFAULT_PIXEL_BUDGET
+
+
+def _open_image(input_file: File, max_height: Optional[int]) -> Tuple[Image.Image, bool]:
+    """
+    이미지 헤더를 읽고, 픽셀 수를 확인한 뒤 가능한 경우 축소 디코딩 (JPEG draft mode)을 설정합니다.
+    실제 디코딩은 아직 수행되지 않습니다.
+
+    :returns: (이미지, EXIF 방향 정보 적용 시 가로 / 세로가 바뀌는지 여부)
+    """
+    try:
+        image = Image.open(input_file)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e))
+
+    (width, height) = image.size
+
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageTooLargeError(f"Image is too large: {width}x{height}")
+
+    try:
+        transposed = image.getexif().get(0x0112, 1) in TRANSPOSED_ORIENTATIONS
+    except Exception:
+        transposed = False
+
+    if max_height is not None:
+        # 회전 전 기준으로 목표 크기를 계산합니다
+        if transposed:
+            target_size = (max_height, max(1, int(max_height * height / width)))
+        else:
+            target_size = (max(1, int(max_height * width / height)), max_height)
+
+        # JPEG의 경우, 목표 크기 이상인 가장 작은 스케일 (1/2, 1/4, 1/8)로 디코딩합니다
+        # JPEG가 아니면 아무 것도 하지 않습니다
+        if target_size[0] < width and target_size[1] < height:
+            image.draft(image.mode, target_size)
+
+    return image, transposed
+
+
+def _reduce(image: Image.Image, max_height: int, transposed: bool) -> Image.Image:
+    """
+    목표 크기보다 REDUCING_GAP배 이상 큰 이미지를 Image.reduce()로 먼저 (빠르게) 줄입니다.
+    """
+    display_height = image.width if transposed else image.height
+    factor = int(display_height / (max_height * REDUCING_GAP))
+
+    if factor >= 2:
+        return image.reduce(factor)
+
+    return image
+
+
+def _normalize_mode(image: Image.Image) -> Image.Image:
+    # RGBA 이미지를 RGB로 변환 (JPEG는 알파 채널 미지원)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # 흰색 배경 생성
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        background.paste(image, mask=image.split()[-1] if image.mode in ('RGBA', 'LA') else None)
+        return background
+    elif image.mode not in ('RGB', 'L'):
+        return image.convert('RGB')
+
+    return image
+
+
+def _resize_to_height(image: Image.Image, max_height: int) -> Image.Image:
+    if image.height <= max_height:
+        return image
+
+    # aspect ratio 유지하면서 높이 기준으로 리사이징
+    aspect_ratio = image.width / image.height
+    new_width = max(1, int(max_height * aspect_ratio))
+
+    # 고품질 리샘플링 사용
+    return image.resize((new_width, max_height), Image.Resampling.LANCZOS)
+
+
+@contextmanager
+def open_normalized_image(input_file: File, max_height: Optional[int] = None, pixel_budget: Optional[PixelBudget] = None):
+    """
+    이미지를 디코딩한 후, EXIF 방향 정보를 적용하고 RGB (또는 L)로 변환합니다.
+    반환된 이미지에는 EXIF 데이터가 포함되지 않습니다.
+
+    max_height가 주어지면, 디코딩 단계에서부터 (JPEG draft mode, Image.reduce()) 가능한 만큼 줄여서 메모리 사용량을 줄입니다.
+    이 경우 반환된 이미지의 높이는 max_height 이상일 수 있으므로, 최종 리샘플링은 호출자가 수행해야 합니다.
+
+    디코딩된 이미지가 사용되는 동안 pixel_budget (기본값: default_pixel_budget())을 점유합니다.
+    """
+    (image, transposed) = _open_image(input_file, max_height)
+
+    with (pixel_budget or default_pixel_budget()).reserve(image.width * image.height):
+        image.load()
+
+        if max_height is not None:
+            # 회전 전에 줄여야 회전에 드는 비용도 줄어듭니다
+            image = _reduce(image, max_height, transposed)
+
+        # EXIF 방향 정보에 따라 이미지 회전 (카메라 촬영 이미지 대응)
+        try:
+            image = ImageOps.exif_transpose(image)
+        except:
+            pass
+
+        yield _normalize_mode(image)
+
 
 def generate_thumbnail(input_file: File, max_height: int = 768, jpeg_quality: int = 85) -> (File, (int, int)):
     """
     주어진 입력 파일에 대해 썸네일을 생성합니다.
     원본의 aspect ratio를 유지하며, 높이가 max_height를 초과하는 경우에만 리사이징합니다.
     EXIF 데이터는 보안과 프라이버시를 위해 제거됩니다.
-    
+
     :param input_file: 입력 이미지 파일
     :param max_height: 최대 높이 (픽셀). 이보다 작은 이미지는 리사이징하지 않음
     :param jpeg_quality: JPEG 품질 (1-100, 기본값 85)
     :returns: 썸네일 파일 객체 (EXIF 데이터 제거됨)
+    :raises ImageTooLargeError: 이미지의 픽셀 수가 MAX_IMAGE_PIXELS를 초과하는 경우
     """
-    image = Image.open(input_file)
-    
-    # EXIF 방향 정보에 따라 이미지 회전 (카메라 촬영 이미지 대응)
-    try:
-        from PIL import ImageOps
-        image = ImageOps.exif_transpose(image)
-    except:
-        pass
-    
-    # 원본 크기 확인
-    original_width, original_height = image.size
-    
-    # 높이가 max_height보다 작거나 같으면 리사이징하지 않음
-    if original_height <= max_height:
-        # 리사이징 없이 원본 유지
-        resized_image = image
-    else:
-        # aspect ratio 유지하면서 높이 기준으로 리사이징
-        aspect_ratio = original_width / original_height
-        new_height = max_height
-        new_width = int(new_height * aspect_ratio)
-        
-        # 고품질 리샘플링 사용
-        resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-    
-    # RGBA 이미지를 RGB로 변환 (JPEG는 알파 채널 미지원)
-    if resized_image.mode in ('RGBA', 'LA', 'P'):
-        # 흰색 배경 생성
-        background = Image.new('RGB', resized_image.size, (255, 255, 255))
-        if resized_image.mode == 'P':
-            resized_image = resized_image.convert('RGBA')
-        background.paste(resized_image, mask=resized_image.split()[-1] if resized_image.mode in ('RGBA', 'LA') else None)
-        resized_image = background
-    elif resized_image.mode not in ('RGB', 'L'):
-        resized_image = resized_image.convert('RGB')
-    
-    temp_file = NamedTemporaryFile()
-    # JPEG로 저장할 때 EXIF 데이터를 포함하지 않음
-    # save 메서드에 exif 파라미터를 명시적으로 제공하지 않으면 EXIF가 제거됨
-    resized_image.save(temp_file, format="JPEG", quality=jpeg_quality, optimize=True)
-    
+    with open_normalized_image(input_file, max_height) as image:
+        resized_image = _resize_to_height(image, max_height)
+
+        temp_file = NamedTemporaryFile()
+        # JPEG로 저장할 때 EXIF 데이터를 포함하지 않음
+        # save 메서드에 exif 파라미터를 명시적으로 제공하지 않으면 EXIF가 제거됨
+        resized_image.save(temp_file, format="JPEG", quality=jpeg_quality, optimize=True)
+
     temp_file.seek(0)
-    return File(temp_file), (resized_image.width, resized_image.height)
\ No newline at end of file
+    return File(temp_file), (resized_image.width, resized_image.height)
+
+
+DERIVATIVE_FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+
+def generate_derivatives(input_file: File,
+                         max_heights: Iterable[int],
+                         formats: Iterable[str] = ('jpeg', 'webp')) -> List[Tuple[int, str, File, Tuple[int, int]]]:
+    """
+    한 번의 디코딩으로 여러 크기 / 포맷의 파생 이미지를 생성합니다.
+    큰 크기부터 차례로 리사이징하며, 작은 크기는 바로 이전 단계의 결과물에서 리사이징합니다.
+
+    :param input_file: 입력 이미지 파일
+    :param max_heights: 최대 높이 목록 (픽셀). 원본보다 큰 크기는 원본 크기로 생성됩니다.
+    :param formats: 생성할 포맷 목록 (DERIVATIVE_FORMATS의 key)
+    :returns: [(max_height, format, 파일 객체, (width, height)), ...]
+    :raises ImageTooLargeError: 이미지의 픽셀 수가 MAX_IMAGE_PIXELS를 초과하는 경우
+    """
+    max_heights = sorted(set(max_heights), reverse=True)
+    formats = list(formats)
+
+    derivatives = []
+
+    with open_normalized_image(input_file, max_heights[0]) as image:
+        for max_height in max_heights:
+            image = _resize_to_height(image, max_height)
+
+            for format in formats:
+                (pil_format, _, save_options) = DERIVATIVE_FORMATS[format]
+
+                temp_file = NamedTemporaryFile()
+                image.save(temp_file, format=pil_format, **save_options)
+                temp_file.seek(0)
+
+                derivatives.append((max_height, format, File(temp_file), (image.width, image.height)))
+
+    return derivatives
@@ -0,0 +1,180 @@
+import logging
+from dataclasses import dataclass, asdict
+from typing import Optional, Tuple
+
+from dacite import from_dict
+from django.core.cache import cache
+from django.core.files.storage import Storage, default_storage
+from uuid_v7.base import uuid7
+
+from flitz.storage import object_key
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DirectUploadSession:
+    """
+    클라이언트가 스토리지에 직접 업로드하기 위한 세션 정보입니다.
+    """
+
+    id: str
+
+    user_id: str
+    # 업로드 용도 (예: 'card_asset', 'dm_attachment')
+    purpose: str
+    # 업로드 대상 (카드 ID, 대화방 ID 등)
+    target_id: str
+
+    # 스토리지 상의 오브젝트 이름
+    name: str
+    content_type: str
+    max_size: int
+
+
+@dataclass
+class DirectUploadedObject:
+    """
+    업로드가 완료된 오브젝트의 정보입니다. (HEAD 요청 결과)
+    """
+
+    name: str
+    content_type: str
+    size: int
+
+
+class DirectUploader:
+    """
+    앱 서버를 거치지 않고 클라이언트가 S3에 직접 업로드할 수 있도록 presigned POST를 발급합니다.
+
+    1. create_session()으로 업로드 세션과 presigned POST (url, fields)를 발급합니다.
+       - 파일 크기 (content-length-range)와 Content-Type은 POST policy로 S3에서 검증됩니다.
+    2. 클라이언트는 발급받은 url에 fields + file을 multipart/form-data로 업로드합니다.
+    3. 완료 API에서 get_session() / verify()로 오브젝트가 실제로 업로드 되었는지 확인한 후 row를 생성합니다.
+
+    업로드 세션은 캐시에 저장되며, presigned POST가 만료되면 함께 만료됩니다.
+    """
+
+    SESSION_TIMEOUT = 60 * 15
+
+    storage: Storage
+
+    def __init__(self, storage: Storage = default_storage):
+        self.storage = storage
+
+    @staticmethod
+    def session_cache_key(session_id: str) -> str:
+        return f'fz:upload_session:{session_id}'
+
+    def create_session(self,
+                       user_id: str,
+                       purpose: str,
+                       target_id: str,
+                       name: str,
+                       content_type: str,
+                       max_size: int) -> Tuple[DirectUploadSession, dict]:
+        """
+        업로드 세션을 생성하고, presigned POST를 발급합니다.
+
+        :returns: (업로드 세션, presigned POST {'url': ..., 'fields': {...}})
+        """
+
+        session = DirectUploadSession(
+            id=str(uuid7()),
+            user_id=str(user_id),
+            purpose=purpose,
+            target_id=str(target_id),
+            name=name,
+            content_type=content_type,
+            max_size=max_size
+        )
+
+        fields = {
+            'Content-Type': content_type,
+        }
+
+        acl = (getattr(self.storage, 'object_parameters', None) or {}).get('ACL', None) or \
+            getattr(self.storage, 'default_acl', None)
+
+        if acl:
+            fields['acl'] = acl
+
+        conditions = [
+            {key: value} for key, value in fields.items()
+        ] + [
+            ['content-length-range', 1, max_size],
+        ]
+
+        presigned_post = self.storage.bucket.meta.client.generate_presigned_post(
+            Bucket=self.storage.bucket_name,
+            Key=object_key(self.storage, name),
+            Fields=fields,
+            Conditions=conditions,
+            ExpiresIn=self.SESSION_TIMEOUT
+        )
+
+        cache.set(self.session_cache_key(session.id), asdict(session), timeout=self.SESSION_TIMEOUT)
+
+        return session, presigned_post
+
+    def get_session(self, session_id: str, user_id: str, purpose: str, target_id: str) -> Optional[DirectUploadSession]:
+        """
+        업로드 세션을 가져옵니다. 만료되었거나, 다른 사용자 / 용도의 세션이면 None을 반환합니다.
+        """
+
+        data = cache.get(self.session_cache_key(str(session_id)), None)
+
+        if data is None:
+            return None
+
+        session = from_dict(data_class=DirectUploadSession, data=data)
+
+        if session.user_id != str(user_id) or session.purpose != purpose or session.target_id != str(target_id):
+            return None
+
+        return session
+
+    def verify(self, session: DirectUploadSession) -> Optional[DirectUploadedObject]:
+        """
+        세션의 오브젝트가 제약 조건에 맞게 업로드 되었는지 확인합니다.
+        업로드 되지 않았으면 None을 반환하고, 제약 조건에 맞지 않는 오브젝트는 삭제한 뒤 None을 반환합니다.
+        """
+
+        try:
+            response = self.storage.bucket.meta.client.head_object(
+                Bucket=self.storage.bucket_name,
+                Key=object_key(self.storage, session.name)
+            )
+        except Exception as e:
+            logger.info(f"DirectUploader: object {session.name} of session {session.id} not found: {e}")
+            return None
+
+        uploaded_object = DirectUploadedObject(
+            name=session.name,
+            content_type=response.get('ContentType', ''),
+            size=response.get('ContentLength', 0)
+        )
+
+        if uploaded_object.content_type != session.content_type or not (0 < uploaded_object.size <= session.max_size):
+            logger.warning(f"DirectUploader: object {session.name} of session {session.id} violates constraints")
+            self.storage.delete(session.name)
+
+            return None
+
+        return uploaded_object
+
+    def discard(self, session: DirectUploadSession) -> bool:
+        """
+        업로드 세션을 제거합니다. 완료 API가 동시에 두 번 호출되더라도 한 쪽만 True를 반환합니다.
+        """
+
+        return cache.delete(self.session_cache_key(session.id))
+
+    def as_response(self, session: DirectUploadSession, presigned_post: dict) -> dict:
+        return {
+            'session_id': session.id,
+            'url': presigned_post['url'],
+            'fields': presigned_post['fields'],
+            'max_size': session.max_size,
+            'expires_in': self.SESSION_TIMEOUT,
+        }
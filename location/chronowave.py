@@ -1,6 +1,6 @@
 import logging
 from datetime import timedelta
-from typing import Optional
+from typing import List
 
 import pygeohash as pgh
 import sentry_sdk
@@ -48,16 +48,9 @@ class ChronoWaveMatcher:
 
         self.area_latitude, self.area_longitude = pgh.decode(geohash)
 
-    def __distribute_card(self, from_user: User, to_user: User) -> Optional[CardDistribution]:
-        already_distributed = from_user.main_card.distributions.only('id').filter(
-            user=to_user
-        ).exists()
-
-        if already_distributed:
-            self.logger.debug(f"[{self.geohash}][{from_user.id} -> {to_user.id}] Card already distributed, skipping...")
-            return None
-
-        distribution = from_user.main_card.distributions.create(
+    def __build_distribution(self, from_user: User, to_user: User) -> CardDistribution:
+        return CardDistribution(
+            card=from_user.main_card,
             user=to_user,
 
             latitude=self.area_latitude,
@@ -68,10 +61,21 @@ class ChronoWaveMatcher:
             distribution_method=CardDistribution.DistributionMethod.CHRONOWAVE,
         )
 
-        distribution.update_reveal_phase()
-        distribution.save(update_fields=['reveal_phase', 'deleted_at', 'updated_at'])
+    def __distribute_cards(self, user_a: User, user_b: User) -> List[CardDistribution]:
+        """
+        양방향 카드 배포를 하나의 INSERT 문으로 처리합니다.
+        이미 배포된 방향은 건너뜁니다.
+        """
+
+        distributions = CardDistribution.insert_distributions([
+            self.__build_distribution(user_a, user_b),
+            self.__build_distribution(user_b, user_a),
+        ])
+
+        if len(distributions) < 2:
+            self.logger.debug(f"[{self.geohash}][{user_a.id} <-> {user_b.id}] Card already distributed, skipping...")
 
-        return distribution
+        return distributions
 
     def __try_match(self, user_a: User, user_b: User) -> bool:
         # SANITY CHECK: user_b가 user_a의 조건에 맞는지 다시 한 번 확인
@@ -83,8 +87,7 @@ class ChronoWaveMatcher:
             return False
 
         # 매칭 성공!
-        self.__distribute_card(user_a, user_b)
-        self.__distribute_card(user_b, user_a)
+        self.__distribute_cards(user_a, user_b)
 
         return True
 
@@ -91,29 +91,24 @@ class UserMatcher:
         사용자의 main_card를 상대편에게 배포합니다.
         """
 
-        # only()를 사용하여 필요한 필드만 조회
-        already_distributed = from_user.main_card.distributions.only('id').filter(
-            user=to_user
-        ).exists()
+        # 이미 배포된 경우에는 저장되지 않습니다 (CardDistribution.insert_distributions() 참고)
+        distributions = CardDistribution.insert_distributions([
+            CardDistribution(
+                card=from_user.main_card,
+                user=to_user,
+
+                latitude=history.latitude,
+                longitude=history.longitude,
+                altitude=history.altitude,
+                accuracy=history.accuracy
+            )
+        ])
 
-        if already_distributed:
+        if not distributions:
             print("card already distributed to this user")
             return
 
-        distribution = CardDistribution.objects.create(
-            card=from_user.main_card,
-            user=to_user,
-
-            latitude=history.latitude,
-            longitude=history.longitude,
-            altitude=history.altitude,
-            accuracy=history.accuracy
-        )
-
-        distribution.update_reveal_phase()
-        distribution.save(update_fields=['reveal_phase', 'deleted_at', 'updated_at'])
-
-        return distribution
+        return distributions[0]
 
     def sanity_check(self) -> bool:
         """
@@ -1,7 +1,8 @@
-from typing import Optional, TypedDict, Literal
+from typing import List, Optional, Set, TypedDict, Literal
+import asyncio
 import json
-from urllib.parse import parse_qsl
 from datetime import datetime
+from urllib.parse import parse_qsl
 
 import jwt
 from django.conf import settings
@@ -9,10 +10,16 @@ from django.conf import settings
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from asgiref.sync import sync_to_async
-from django.db import transaction
 
-from messaging.models import DirectMessageConversation, DirectMessage, DirectMessageParticipant
-from user_auth.models import UserSession
+from dacite import DaciteError
+
+from messaging.models import DirectMessageConversation, DirectMessage, DirectMessageParticipant, \
+    DirectMessageInboxEntry
+from messaging.objdef import load_direct_message_content
+from messaging.membership import resolve_connection
+from messaging.unread import unread_counters
+from messaging.services import send_direct_message, ConversationNotJoined, MAX_PAYLOAD_LENGTH, \
+    apublish_read_event, user_group_name
 from user.models import User
 from django.utils import timezone
 
@@ -25,72 +32,161 @@ class Message(TypedDict):
     type: Literal['message']
     message: dict
 
-class DirectMessageConsumer(AsyncWebsocketConsumer):
-    user_id: str
-    conversation_id: str
+class MessageAck(TypedDict):
+    type: Literal['message_ack']
+    idempotency_key: str
+    message_id: str
+    message: dict
 
-    @staticmethod
-    def extract_conversation_id(scope) -> Optional[str]:
-        return scope['url_route']['kwargs']['conversation_id']
+class Error(TypedDict):
+    type: Literal['error']
+    idempotency_key: Optional[str]
+    reason: str
+
+class TokenAuthMixin:
+    """
+    query string의 token (JWT)으로 사용자를 인증합니다.
+    """
 
     @staticmethod
     def extract_token(query_string: str) -> Optional[str]:
         query = dict(parse_qsl(query_string.decode()))
         return query.get('token')
 
+    @staticmethod
+    def decode_session_id(token: str) -> Optional[str]:
+        try:
+            # JWT 토큰 디코딩 (DB 조회 없음)
+            jwt_payload = jwt.decode(token, key=settings.SECRET_KEY, algorithms=['HS256'])
+            return jwt_payload['sub']
+        except (jwt.InvalidTokenError, KeyError):
+            return None
+
+    @database_sync_to_async
+    def resolve_connection(self, session_id: str, conversation_id: Optional[str] = None):
+        # 세션 / 참여자 정보는 캐시에서 가져오고, 캐시에 없는 정보만 하나의 쿼리로 조회합니다
+        return resolve_connection(session_id, conversation_id)
+
+class DirectMessageConsumer(TokenAuthMixin, AsyncWebsocketConsumer):
+    # idempotency key의 최대 길이 (DirectMessage.idempotency_key)
+    MAX_IDEMPOTENCY_KEY_LENGTH = 64
+
+    # 읽음 상태 갱신을 모으는 시간 (초)
+    READ_RECEIPT_DEBOUNCE_SECONDS = 0.5
+
+    user: Optional[User]
+    user_id: str
+    conversation_id: str
+    participant_ids: List[str]
+
+    # 아직 저장 / 발송하지 않은 읽음 상태
+    pending_read_at: Optional[datetime] = None
+    read_receipt_task: Optional[asyncio.Future] = None
+
+    @staticmethod
+    def extract_conversation_id(scope) -> Optional[str]:
+        return scope['url_route']['kwargs']['conversation_id']
+
     @property
     def group_name(self) -> str:
         return f'direct_message_{self.conversation_id}'
 
+    async def publish_read_event(self, read_at):
+        # 다른 참여자들에게 읽음 상태 알림 (대화방 그룹 + 참여자별 사용자 그룹)
+        await apublish_read_event(
+            self.channel_layer, self.conversation_id, self.user_id, read_at.isoformat(), self.participant_ids
+        )
+
     @database_sync_to_async
-    def get_conversation(self):
-        try:
-            return DirectMessageConversation.objects.get(id=self.conversation_id)
-        except DirectMessageConversation.DoesNotExist:
-            return None
+    def update_read_at(self, read_at: datetime):
+        DirectMessageParticipant.objects.filter(
+            conversation_id=self.conversation_id,
+            user_id=self.user_id
+        ).update(read_at=read_at, unread_count=0, updated_at=timezone.now())
+
+        DirectMessageInboxEntry.mark_as_read(self.user_id, self.conversation_id)
+        unread_counters.reset(self.user_id, self.conversation_id)
+
+    def schedule_read_receipt(self):
+        """
+        읽음 상태 갱신을 예약합니다.
+        READ_RECEIPT_DEBOUNCE_SECONDS 동안 들어온 요청은 마지막 read_at 하나로 모아서 한 번만 저장 / 발송합니다.
+        """
+
+        self.pending_read_at = timezone.now()
+
+        if self.read_receipt_task is None:
+            self.read_receipt_task = asyncio.ensure_future(self.flush_read_receipt_later())
+
+    async def flush_read_receipt_later(self):
+        await asyncio.sleep(self.READ_RECEIPT_DEBOUNCE_SECONDS)
+
+        self.read_receipt_task = None
+        await self.flush_read_receipt()
+
+    async def flush_read_receipt(self):
+        read_at = self.pending_read_at
+
+        if read_at is None:
+            return
+
+        self.pending_read_at = None
+
+        await self.update_read_at(read_at)
+        await self.publish_read_event(read_at)
 
     @database_sync_to_async
-    def get_user_from_token(self, token):
+    def send_message(self, content: dict, idempotency_key: str) -> dict:
+        # 연결할 때는 사용자를 조회하지 않으므로, 처음 메시지를 보낼 때 가져옵니다
+        if self.user is None:
+            self.user = User.objects.get(id=self.user_id)
+
+        # REST API와 같은 전송 서비스를 사용하므로, 실시간 이벤트 / 푸시 알림도 커밋 후 똑같이 발송됩니다
+        (_, message_data) = send_direct_message(
+            self.conversation_id, self.user, content, idempotency_key=idempotency_key
+        )
+
+        return message_data
+
+    async def send_error(self, idempotency_key: Optional[str], reason: str):
+        await self.send(text_data=json.dumps(Error(
+            type='error',
+            idempotency_key=idempotency_key,
+            reason=reason
+        )))
+
+    async def receive_send_message(self, data: dict, payload_length: int):
+        idempotency_key = data.get('idempotency_key')
+
+        if not isinstance(idempotency_key, str) or not 0 < len(idempotency_key) <= self.MAX_IDEMPOTENCY_KEY_LENGTH:
+            await self.send_error(None, 'fz.messaging.invalid_idempotency_key')
+            return
+
+        if payload_length > MAX_PAYLOAD_LENGTH:
+            await self.send_error(idempotency_key, 'fz.messaging.payload_too_large')
+            return
+
+        content = data.get('content')
+
         try:
-            # JWT 토큰 디코딩
-            jwt_payload = jwt.decode(token, key=settings.SECRET_KEY, algorithms=['HS256'])
-            session_id = jwt_payload['sub']
-            
-            # 세션 ID로 세션 조회
-            session = UserSession.objects.select_related('user').filter(id=session_id).first()
-            
-            # 세션이 없거나 무효화되었거나 만료되었다면 None 반환
-            if session is None or session.invalidated_at is not None:
-                return None
-                
-            if session.expires_at is not None and session.expires_at < datetime.now(tz=timezone.utc):
-                return None
-                
-            return session.user
-            
-        except (jwt.InvalidTokenError, Exception):
-            return None
+            load_direct_message_content(content)
+        except (DaciteError, ValueError, KeyError, TypeError):
+            await self.send_error(idempotency_key, 'fz.messaging.invalid_content')
+            return
 
-    @database_sync_to_async
-    def check_participant(self, conversation, user_id):
-        return DirectMessageParticipant.objects.filter(
-            conversation=conversation,
-            user_id=user_id,
-            deleted_at__isnull=True
-        ).exists()
+        try:
+            message_data = await self.send_message(content, idempotency_key)
+        except ConversationNotJoined:
+            await self.send_error(idempotency_key, 'fz.messaging.conversation_not_joined')
+            return
 
-    @database_sync_to_async
-    def update_read_at(self, user_id):
-        with transaction.atomic():
-            participant = DirectMessageParticipant.objects.get(
-                conversation_id=self.conversation_id,
-                user_id=user_id
-            )
-            participant.read_at = timezone.now()
-            participant.unread_count = 0
-            participant.save(update_fields=['read_at', 'unread_count', 'updated_at'])
-
-        return participant.read_at
+        # 같은 키로 다시 보낸 경우에도 처음 저장된 메시지의 ID로 응답합니다
+        await self.send(text_data=json.dumps(MessageAck(
+            type='message_ack',
+            idempotency_key=idempotency_key,
+            message_id=message_data['id'],
+            message=message_data
+        )))
 
     async def connect(self):
         # 대화방 ID 추출
@@ -100,28 +196,22 @@ class DirectMessageConsumer(AsyncWebsocketConsumer):
             return
         
         # 인증 토큰 추출
-        token = self.extract_token(self.scope["query_string"])
-        if not token:
+        session_id = self.decode_session_id(self.extract_token(self.scope["query_string"]) or '')
+        if not session_id:
             await self.close()
             return
         
-        # 토큰으로부터 사용자 정보 가져오기
-        user = await self.get_user_from_token(token)
-        if not user:
+        # 세션 / 대화방 참여자 확인
+        (session, self.participant_ids) = await self.resolve_connection(session_id, self.conversation_id)
+        if session is None:
             await self.close()
             return
         
-        self.user_id = str(user.id)
+        self.user = None
+        self.user_id = session['user_id']
         
-        # 대화방 존재 여부 확인
-        conversation = await self.get_conversation()
-        if not conversation:
-            await self.close()
-            return
-        
-        # 사용자가 대화방에 참여하고 있는지 확인
-        participant_exists = await self.check_participant(conversation, self.user_id)
-        if not participant_exists:
+        # 사용자가 대화방에 참여하고 있는지 확인 (대화방이 없거나 삭제되었다면 참여자 목록이 비어 있음)
+        if self.user_id not in self.participant_ids:
             await self.close()
             return
         
@@ -135,19 +225,17 @@ class DirectMessageConsumer(AsyncWebsocketConsumer):
         await self.accept()
         
         # 읽음 상태 업데이트 및 이벤트 발송
-        read_at = await self.update_read_at(self.user_id)
-        
-        # 다른 참여자들에게 읽음 상태 알림
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                "type": "dm_read_event",
-                "user_id": self.user_id,
-                "read_at": read_at.isoformat()
-            }
-        )
+        self.pending_read_at = timezone.now()
+        await self.flush_read_receipt()
 
     async def disconnect(self, close_code):
+        # 예약된 읽음 상태 갱신은 연결이 끊어지기 전에 바로 처리
+        if self.read_receipt_task is not None:
+            self.read_receipt_task.cancel()
+            self.read_receipt_task = None
+
+        await self.flush_read_receipt()
+
         # WebSocket 그룹에서 제거
         await self.channel_layer.group_discard(
             self.group_name,
@@ -160,17 +248,9 @@ class DirectMessageConsumer(AsyncWebsocketConsumer):
             data = json.loads(text_data)
             if data.get("type") == "read_receipt":
                 # 읽음 상태 업데이트 요청을 받으면 처리
-                read_at = await self.update_read_at(self.user_id)
-                
-                # 다른 참여자들에게 읽음 상태 알림
-                await self.channel_layer.group_send(
-                    self.group_name,
-                    {
-                        "type": "dm_read_event",
-                        "user_id": self.user_id,
-                        "read_at": read_at.isoformat()
-                    }
-                )
+                self.schedule_read_receipt()
+            elif data.get("type") == "send_message":
+                await self.receive_send_message(data, len(text_data.encode('utf-8')))
         except json.JSONDecodeError:
             pass
 
@@ -185,18 +265,18 @@ class DirectMessageConsumer(AsyncWebsocketConsumer):
         }))
         
         # 내가 메시지를 보낸 경우가 아니라면, 읽음 상태 자동 업데이트
-        if str(message.get("sender_id")) != self.user_id:
-            read_at = await self.update_read_at(self.user_id)
-            
-            # 다른 참여자들에게 읽음 상태 알림
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "dm_read_event",
-                    "user_id": self.user_id,
-                    "read_at": read_at.isoformat()
-                }
-            )
+        # (DirectMessageReadOnlySerializer로 직렬화된 메시지에는 sender 필드에 보낸 사람의 ID가 들어 있음)
+        sender_id = message.get("sender_id", message.get("sender"))
+
+        if str(sender_id) != self.user_id:
+            self.schedule_read_receipt()
+
+    async def dm_message_updated(self, event):
+        # 변경된 메시지 (처리가 끝난 첨부파일 등)를 클라이언트에게 전송
+        await self.send(text_data=json.dumps({
+            "type": "message_updated",
+            "message": event["message"]
+        }))
 
     async def dm_read_event(self, event):
         # 읽음 상태 업데이트 이벤트 처리
@@ -213,3 +293,160 @@ class DirectMessageConsumer(AsyncWebsocketConsumer):
             "user_id": user_id,
             "read_at": read_at
         }))
+
+
+class Subscriptions(TypedDict):
+    type: Literal['subscriptions']
+    all: bool
+    conversation_ids: List[str]
+
+class UserMessagingConsumer(TokenAuthMixin, AsyncWebsocketConsumer):
+    """
+    사용자가 참여하고 있는 모든 대화의 이벤트를 하나의 연결로 받는 WebSocket (user_<user_id> 그룹)
+
+    연결 직후에는 모든 대화의 메시지 / 읽음 이벤트를 받습니다.
+    subscribe / unsubscribe 프레임으로 관심 있는 대화를 좁힐 수 있습니다.
+
+    - {"type": "subscribe", "all": true}: 모든 대화의 이벤트를 받음 (기본값)
+    - {"type": "unsubscribe", "all": true}: subscribe한 대화의 이벤트만 받음
+    - {"type": "subscribe" | "unsubscribe", "conversation_ids": [...]}: 대화를 추가 / 제외
+
+    관심 없는 대화에 새 메시지가 오면 메시지 본문 대신 대화 목록 갱신에 필요한 정보 (conversation_updated)만 전달합니다.
+    """
+
+    # 한 번에 subscribe / unsubscribe할 수 있는 최대 대화 수
+    MAX_CONVERSATION_IDS = 500
+
+    user_id: str
+
+    # subscribe_all이 True라면 conversation_ids는 제외할 대화, False라면 받을 대화입니다
+    subscribe_all: bool
+    conversation_ids: Set[str]
+
+    @property
+    def group_name(self) -> str:
+        return user_group_name(self.user_id)
+
+    def is_subscribed(self, conversation_id: str) -> bool:
+        return (conversation_id in self.conversation_ids) != self.subscribe_all
+
+    async def connect(self):
+        session_id = self.decode_session_id(self.extract_token(self.scope["query_string"]) or '')
+        if not session_id:
+            await self.close()
+            return
+
+        (session, _) = await self.resolve_connection(session_id)
+        if session is None:
+            await self.close()
+            return
+
+        self.user_id = session['user_id']
+        self.subscribe_all = True
+        self.conversation_ids = set()
+
+        await self.channel_layer.group_add(
+            self.group_name,
+            self.channel_name
+        )
+
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if not hasattr(self, 'user_id'):
+            return
+
+        await self.channel_layer.group_discard(
+            self.group_name,
+            self.channel_name
+        )
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            return
+
+        if data.get("type") not in ("subscribe", "unsubscribe"):
+            return
+
+        subscribe = data["type"] == "subscribe"
+
+        if data.get("all") is True:
+            self.subscribe_all = subscribe
+            self.conversation_ids = set()
+        else:
+            conversation_ids = data.get("conversation_ids")
+
+            if not isinstance(conversation_ids, list) or len(conversation_ids) > self.MAX_CONVERSATION_IDS:
+                await self.send(text_data=json.dumps(Error(
+                    type='error',
+                    idempotency_key=None,
+                    reason='fz.messaging.invalid_conversation_ids'
+                )))
+                return
+
+            conversation_ids = {str(conversation_id) for conversation_id in conversation_ids}
+
+            # subscribe_all 상태에서는 conversation_ids가 제외 목록이므로 반대로 적용합니다
+            if subscribe != self.subscribe_all:
+                self.conversation_ids |= conversation_ids
+            else:
+                self.conversation_ids -= conversation_ids
+
+        await self.send(text_data=json.dumps(Subscriptions(
+            type='subscriptions',
+            all=self.subscribe_all,
+            conversation_ids=sorted(self.conversation_ids)
+        )))
+
+    async def dm_message(self, event):
+        conversation_id = event["conversation_id"]
+        message = event["message"]
+
+        if not self.is_subscribed(conversation_id):
+            # 대화 목록 갱신에 필요한 정보만 전달합니다
+            await self.send(text_data=json.dumps({
+                "type": "conversation_updated",
+                "conversation_id": conversation_id,
+                "latest_message_id": message["id"],
+                "unread_count": event["unread_count"]
+            }))
+            return
+
+        await self.send(text_data=json.dumps({
+            "type": "message",
+            "conversation_id": conversation_id,
+            "message": message,
+            "unread_count": event["unread_count"]
+        }))
+
+    async def dm_message_updated(self, event):
+        if not self.is_subscribed(event["conversation_id"]):
+            return
+
+        await self.send(text_data=json.dumps({
+            "type": "message_updated",
+            "conversation_id": event["conversation_id"],
+            "message": event["message"]
+        }))
+
+    async def dm_read_event(self, event):
+        # 자신이 발생시킨 읽음 이벤트는 자신에게 다시 보내지 않음
+        if event["user_id"] == self.user_id or not self.is_subscribed(event["conversation_id"]):
+            return
+
+        await self.send(text_data=json.dumps({
+            "type": "read_event",
+            "conversation_id": event["conversation_id"],
+            "user_id": event["user_id"],
+            "read_at": event["read_at"]
+        }))
+
+    async def dm_conversation_event(self, event):
+        # 대화 목록의 변경 (created / deleted)은 subscribe 여부와 관계없이 전달합니다
+        await self.send(text_data=json.dumps({
+            "type": "conversation_event",
+            "conversation_id": event["conversation_id"],
+            "event": event["event"]
+        }))
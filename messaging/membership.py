@@ -0,0 +1,126 @@
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from django.core.cache import cache, BaseCache
+from django.db import transaction
+from django.db.models import DateTimeField, QuerySet, Subquery, UUIDField
+
+from messaging.models import DirectMessageParticipant
+from user_auth.session_cache import CachedSession, SessionCache, session_cache
+
+# 대화별 (나가지 않은) 참여자 ID 목록을 캐시에 저장해 두고, WebSocket 연결 / 읽음 이벤트 발송 시 DB 조회 없이 사용합니다.
+#
+# 참여자가 나가거나 대화가 삭제되는 곳에서는 invalidate_on_commit()으로 캐시를 지워야 합니다.
+# (새 대화는 처음 조회할 때 캐시되므로 따로 지울 필요가 없습니다)
+
+
+class ConversationMembershipCache:
+    TIMEOUT = 60 * 10
+
+    def __init__(self, backend: BaseCache = cache, prefix: str = 'fz:dm_members'):
+        self.backend = backend
+        self.prefix = prefix
+
+    def key(self, conversation_id) -> str:
+        return f'{self.prefix}:{conversation_id}'
+
+    @staticmethod
+    def active_participants(conversation_id) -> QuerySet:
+        return DirectMessageParticipant.objects.filter(
+            conversation_id=conversation_id,
+            conversation__deleted_at__isnull=True,
+            deleted_at__isnull=True,
+        )
+
+    def set(self, conversation_id, participant_ids: List[str]):
+        # 존재하지 않는 대화는 캐시하지 않습니다
+        if participant_ids:
+            self.backend.set(self.key(conversation_id), participant_ids, timeout=self.TIMEOUT)
+
+    def participant_ids(self, conversation_id) -> List[str]:
+        participant_ids = self.backend.get(self.key(conversation_id))
+
+        if participant_ids is None:
+            participant_ids = [
+                str(user_id) for user_id in
+                self.active_participants(conversation_id).values_list('user_id', flat=True)
+            ]
+            self.set(conversation_id, participant_ids)
+
+        return participant_ids
+
+    def invalidate(self, conversation_ids: Iterable):
+        self.backend.delete_many([self.key(conversation_id) for conversation_id in conversation_ids])
+
+    def invalidate_on_commit(self, conversation_ids: Iterable):
+        conversation_ids = list(conversation_ids)
+
+        if conversation_ids:
+            transaction.on_commit(lambda: self.invalidate(conversation_ids))
+
+
+conversation_membership = ConversationMembershipCache()
+
+
+def resolve_connection(
+    session_id: str,
+    conversation_id: Optional[str] = None,
+    sessions: SessionCache = session_cache,
+    memberships: ConversationMembershipCache = conversation_membership,
+) -> Tuple[Optional[CachedSession], List[str]]:
+    """
+    WebSocket 연결에 필요한 세션 / 대화 참여자 정보를 캐시에서 한 번에 가져옵니다.
+    캐시에 없는 정보는 DB에서 하나의 쿼리로 가져온 뒤 캐시에 저장합니다.
+
+    대화가 없거나 삭제된 경우에는 세션이 유효하더라도 None을 반환할 수 있습니다. (어느 쪽이든 연결을 거부해야 하므로)
+
+    :returns: (세션 (유효하지 않으면 None), 대화의 참여자 ID 목록 (conversation_id가 없으면 빈 목록))
+    """
+
+    try:
+        session_id = UUID(str(session_id))
+
+        if conversation_id is not None:
+            conversation_id = UUID(str(conversation_id))
+    except ValueError:
+        return None, []
+
+    keys = [sessions.key(session_id)]
+
+    if conversation_id is not None:
+        keys.append(memberships.key(conversation_id))
+
+    cached = sessions.backend.get_many(keys)
+
+    session: Optional[CachedSession] = cached.get(sessions.key(session_id))
+    participant_ids: Optional[List[str]] = cached.get(memberships.key(conversation_id)) \
+        if conversation_id is not None else []
+
+    valid_session = sessions.valid_sessions().filter(id=session_id)
+
+    if session is None and participant_ids is None:
+        # 참여자 목록을 조회하면서 세션도 서브쿼리로 함께 확인합니다
+        rows = list(memberships.active_participants(conversation_id).annotate(
+            session_user_id=Subquery(valid_session.values('user_id')[:1], output_field=UUIDField()),
+            session_expires_at=Subquery(valid_session.values('expires_at')[:1], output_field=DateTimeField()),
+        ).values_list('user_id', 'session_user_id', 'session_expires_at'))
+
+        participant_ids = [str(user_id) for (user_id, _, _) in rows]
+        memberships.set(conversation_id, participant_ids)
+
+        if rows and rows[0][1] is not None:
+            session = sessions.entry(rows[0][1], rows[0][2])
+            sessions.set(session_id, session)
+    elif session is None:
+        row = valid_session.values_list('user_id', 'expires_at').first()
+
+        if row is not None:
+            session = sessions.entry(*row)
+            sessions.set(session_id, session)
+    elif participant_ids is None:
+        participant_ids = memberships.participant_ids(conversation_id)
+
+    if session is not None and sessions.is_expired(session):
+        session = None
+
+    return session, participant_ids
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0009_directmessageparticipant_unread_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='directmessageattachment',
+            name='derivatives',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:41
+
+import django.db.models.deletion
+import flitz.models
+import uuid_v7.base
+from django.conf import settings
+from django.db import migrations, models
+from rest_framework.fields import DateTimeField
+
+
+def backfill_inbox_entries(apps, schema_editor):
+    # 삭제되지 않은 대화의 (나가지 않은) 참여자마다 대화 목록 row를 만듭니다
+    # NOTE: 최근 메시지는 DirectMessageInboxEntry.message_preview()와 같은 형식으로 저장합니다
+    DirectMessageParticipant = apps.get_model('messaging', 'DirectMessageParticipant')
+    DirectMessageInboxEntry = apps.get_model('messaging', 'DirectMessageInboxEntry')
+
+    datetime_field = DateTimeField()
+
+    participants = DirectMessageParticipant.objects.filter(
+        deleted_at__isnull=True,
+        conversation__deleted_at__isnull=True,
+    ).select_related('conversation', 'conversation__latest_message').order_by('conversation_id')
+
+    members_by_conversation = {}
+
+    for participant in DirectMessageParticipant.objects.filter(
+        conversation__deleted_at__isnull=True
+    ).select_related('user').iterator(chunk_size=1000):
+        members_by_conversation.setdefault(participant.conversation_id, []).append(participant.user)
+
+    entries = []
+
+    for participant in participants.iterator(chunk_size=1000):
+        conversation = participant.conversation
+        peer = next(
+            (user for user in members_by_conversation.get(conversation.id, []) if user.id != participant.user_id),
+            None
+        )
+
+        preview = None
+        message = conversation.latest_message
+
+        if message is not None and message.deleted_at is None:
+            content = message.content or {}
+
+            if content.get('type') == 'attachment':
+                content = {**content, 'public_url': None, 'thumbnail_url': None}
+
+            preview = {
+                'id': str(message.id),
+                'sender': str(message.sender_id),
+                'content': content,
+                'created_at': datetime_field.to_representation(message.created_at),
+                'updated_at': datetime_field.to_representation(message.updated_at),
+            }
+
+        entries.append(DirectMessageInboxEntry(
+            user_id=participant.user_id,
+            conversation_id=conversation.id,
+            peer=peer,
+            peer_snapshot={
+                'id': str(peer.id),
+                'username': peer.username,
+                'display_name': peer.display_name,
+                'profile_image': peer.profile_image.name or None,
+                'profile_image_derivatives': peer.profile_image_derivatives,
+            } if peer is not None else {},
+            latest_message_id=preview['id'] if preview is not None else None,
+            latest_message_preview=preview,
+            unread_count=participant.unread_count,
+            sort_ts=conversation.updated_at,
+        ))
+
+    DirectMessageInboxEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0011_directmessage_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectMessageInboxEntry',
+            fields=[
+                ('id', flitz.models.UUIDv7Field(default=uuid_v7.base.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('peer_snapshot', models.JSONField(default=dict)),
+                ('latest_message_preview', models.JSONField(blank=True, null=True)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('sort_ts', models.DateTimeField()),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='messaging.directmessageconversation')),
+                ('latest_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.directmessage')),
+                ('peer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dm_inbox_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-sort_ts'], name='dm_inbox_user_sort_ts_idx'), models.Index(fields=['conversation'], name='messaging_d_convers_369f79_idx'), models.Index(fields=['peer'], name='messaging_d_peer_id_ae31d6_idx')],
+                'unique_together': {('user', 'conversation')},
+            },
+        ),
+        migrations.RunPython(backfill_inbox_entries, migrations.RunPython.noop),
+    ]
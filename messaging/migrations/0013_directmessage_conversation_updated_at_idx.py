@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0012_directmessageinboxentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=models.Index(fields=['conversation', 'updated_at'], name='dm_conversation_updated_at_idx'),
+        ),
+    ]
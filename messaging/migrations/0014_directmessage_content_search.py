@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:50
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import messaging.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0013_directmessage_conversation_updated_at_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='directmessage',
+            name='messaging_d_content_6d195f_gin',
+        ),
+        migrations.AddField(
+            model_name='directmessage',
+            name='content_search',
+            field=models.GeneratedField(db_persist=True, expression=messaging.models.MessageSearchDocument('content'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['content_search'], name='dm_content_search_idx'),
+        ),
+    ]
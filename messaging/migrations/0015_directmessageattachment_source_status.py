@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:56
+
+import messaging.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0014_directmessage_content_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='directmessageattachment',
+            name='source',
+            field=models.FileField(blank=True, null=True, upload_to=messaging.models.attachment_upload_to),
+        ),
+        migrations.AddField(
+            model_name='directmessageattachment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', max_length=16),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0015_directmessageattachment_source_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='directmessageattachment',
+            index=models.Index(fields=['object'], name='messaging_d_object_6ac6ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='directmessageattachment',
+            index=models.Index(fields=['thumbnail'], name='messaging_d_thumbna_be5ffd_idx'),
+        ),
+    ]
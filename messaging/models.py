@@ -1,11 +1,17 @@
-from django.db.models import Q
+from typing import Iterable, List, Optional
+
+from django.db.models import Case, F, Func, Q, QuerySet, Value, When
 from django.utils import timezone
 
 from django.db import models, transaction
 from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from uuid_v7.base import uuid7
 
 from flitz.models import BaseModel
+from flitz.derivatives import derivative_url, delete_derivatives
+from flitz.storage import storage_url, delete_stored_files, register_content_addressed_field, \
+    register_deletable_file_fields
 from messaging.objdef import load_direct_message_content
 from user.models import User
 
@@ -63,11 +69,9 @@ class DirectMessageConversation(BaseModel):
         DirectMessageParticipant.objects.create(conversation=conversation, user=user_a)
         DirectMessageParticipant.objects.create(conversation=conversation, user=user_b)
 
-        return conversation
+        DirectMessageInboxEntry.create_entries(conversation, [user_a, user_b])
 
-    @transaction.atomic
-    def increment_unread_count(self, exclude: User):
-        self.participants.exclude(user=exclude).update(unread_count=models.F('unread_count') + 1)
+        return conversation
 
 class DirectMessageParticipant(BaseModel):
     class Meta:
@@ -90,13 +94,155 @@ class DirectMessageParticipant(BaseModel):
 
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+class DirectMessageInboxEntry(BaseModel):
+    """
+    사용자별 대화 목록 (inbox)의 비정규화된 row입니다.
+    대화 목록은 (user, sort_ts) 인덱스만으로 조회하고, 상대방 / 최근 메시지 정보는 이 row에 저장된 값을 그대로 사용합니다.
+
+    메시지 전송 (record_message), 읽음 처리 (mark_as_read), 차단 / 대화 삭제 (remove_conversations) 시 함께 갱신해야 합니다.
+    """
+
+    class Meta:
+        unique_together = ('user', 'conversation')
+        indexes = [
+            models.Index(fields=['user', '-sort_ts'], name='dm_inbox_user_sort_ts_idx'),
+            models.Index(fields=['conversation']),
+            models.Index(fields=['peer']),
+        ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dm_inbox_entries')
+    conversation = models.ForeignKey(DirectMessageConversation, on_delete=models.CASCADE, related_name='inbox_entries')
+
+    # 상대방의 표시 정보 (peer_snapshot() 참고). URL은 서명이 만료될 수 있으므로 오브젝트 이름만 저장합니다
+    peer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    peer_snapshot = models.JSONField(default=dict)
+
+    # 최근 메시지 (DirectMessageReadOnlySerializer 형식, 첨부파일 URL 제외)
+    latest_message = models.ForeignKey('DirectMessage', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    latest_message_preview = models.JSONField(null=True, blank=True)
+
+    # NOTE: 최신 값은 캐시 (messaging.unread)에 있으며, reconcile_unread_counts 태스크가 주기적으로 반영합니다
+    unread_count = models.IntegerField(default=0)
+
+    sort_ts = models.DateTimeField()
+
+    @staticmethod
+    def peer_snapshot_of(user: User) -> dict:
+        return {
+            'id': str(user.id),
+            'username': user.username,
+            'display_name': user.display_name,
+            'profile_image': user.profile_image.name or None,
+            'profile_image_derivatives': user.profile_image_derivatives,
+        }
+
+    @staticmethod
+    def message_preview(message_data: dict) -> dict:
+        content = message_data.get('content') or {}
+
+        if content.get('type') == 'attachment':
+            # 첨부파일의 URL은 만료될 수 있으므로 저장하지 않습니다 (메시지 목록에서 다시 가져와야 함)
+            content = {**content, 'public_url': None, 'thumbnail_url': None}
+
+        return {**message_data, 'content': content}
+
+    @classmethod
+    def create_entries(cls, conversation: DirectMessageConversation, users: List[User]):
+        entries = []
+
+        for user in users:
+            peer = next((other for other in users if other.id != user.id), None)
+
+            entries.append(cls(
+                user=user,
+                conversation=conversation,
+                peer=peer,
+                peer_snapshot=cls.peer_snapshot_of(peer) if peer is not None else {},
+                sort_ts=conversation.updated_at,
+            ))
+
+        cls.objects.bulk_create(entries, ignore_conflicts=True)
+
+    @classmethod
+    def record_message(cls, message: 'DirectMessage', sender: User, message_data: dict):
+        """
+        대화의 모든 inbox row에 최근 메시지를 기록하고, 받는 사람들의 row에는 보낸 사람의 표시 정보도 갱신합니다. (UPDATE 1회)
+        """
+
+        cls.objects.filter(conversation_id=message.conversation_id).update(
+            latest_message_id=message.id,
+            latest_message_preview=cls.message_preview(message_data),
+            sort_ts=message.created_at,
+            peer_snapshot=Case(
+                When(peer_id=sender.id, then=Value(cls.peer_snapshot_of(sender), output_field=models.JSONField())),
+                default=F('peer_snapshot'),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def mark_as_read(cls, user_id, conversation_id):
+        cls.objects.filter(user_id=user_id, conversation_id=conversation_id).update(unread_count=0)
+
+    @classmethod
+    def remove_conversations(cls, conversation_ids: Iterable):
+        """
+        삭제된 대화 (차단 / 탈퇴 포함)를 참여자들의 대화 목록에서 제거합니다.
+        """
+
+        cls.objects.filter(conversation_id__in=conversation_ids).delete()
+
+    @classmethod
+    def refresh_peer_snapshots(cls, user: User):
+        cls.objects.filter(peer=user).update(peer_snapshot=cls.peer_snapshot_of(user), updated_at=timezone.now())
+
+class MessageSearchDocument(Func):
+    """
+    메시지 검색 (messaging.search)에 사용하는 생성 컬럼의 식입니다. 텍스트 메시지의 내용 (content->>'text')만 포함합니다.
+
+    - PostgreSQL: tsvector ('simple' 설정 - 한국어 형태소 분석기가 없으므로 공백 단위로 나눕니다)
+    - 그 외 (SQLite): LIKE 검색을 위해 소문자로 바꾼 텍스트
+    """
+
+    SEARCH_CONFIG = 'simple'
+
+    output_field = SearchVectorField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template=f"to_tsvector('{self.SEARCH_CONFIG}'::regconfig, COALESCE((%(expressions)s ->> 'text'), ''))",
+            **extra_context
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template="LOWER(COALESCE(json_extract(%(expressions)s, '$.text'), ''))",
+            **extra_context
+        )
+
+
 class DirectMessage(BaseModel):
     class Meta:
+        constraints = [
+            # 클라이언트가 같은 idempotency key로 다시 보낸 메시지는 한 번만 저장됩니다
+            # NOTE: send_direct_message()가 이 제약 조건으로 중복 전송을 판별합니다
+            models.UniqueConstraint(
+                fields=['conversation', 'sender', 'idempotency_key'],
+                condition=Q(idempotency_key__isnull=False),
+                name='direct_message_unique_idempotency_key',
+            ),
+        ]
+
         indexes = [
             models.Index(fields=['conversation']),
             models.Index(fields=['sender']),
 
-            GinIndex(fields=['content']),
+            GinIndex(fields=['content_search'], name='dm_content_search_idx'),
+
+            # 변경 사항 동기화 (messaging.sync)에 사용됩니다
+            models.Index(fields=['conversation', 'updated_at'], name='dm_conversation_updated_at_idx'),
 
             models.Index(fields=['deleted_at']),
 
@@ -109,6 +255,16 @@ class DirectMessage(BaseModel):
 
     content = models.JSONField(null=False, blank=False)
 
+    # 검색용 생성 컬럼 (MessageSearchDocument 참고)
+    content_search = models.GeneratedField(
+        expression=MessageSearchDocument('content'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    # WebSocket으로 메시지를 보낼 때 클라이언트가 생성하는 키 (재전송 시 중복 저장 방지)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+
     deleted_at = models.DateTimeField(null=True, blank=True)
 
     def send_push_notification(self):
@@ -173,15 +329,10 @@ class DirectMessage(BaseModel):
 
         attachment = self.attachment
 
-        if attachment.object.name:
-            content.public_url = attachment.object.url
-        else:
-            content.public_url = None
-
-        if attachment.thumbnail.name:
-            content.thumbnail_url = attachment.thumbnail.url
-        else:
-            content.thumbnail_url = None
+        # 처리 중인 첨부파일은 아직 URL이 없습니다
+        content.public_url = storage_url(attachment.object)
+        content.thumbnail_url = attachment.thumbnail_url
+        content.status = attachment.status
 
         return content.as_dict()
 
@@ -192,6 +343,10 @@ class DirectMessageAttachment(BaseModel):
             models.Index(fields=['conversation']),
             models.Index(fields=['sender']),
 
+            # 내용 기반 오브젝트의 참조 여부 확인 (flitz.storage.find_referenced_names)
+            models.Index(fields=['object']),
+            models.Index(fields=['thumbnail']),
+
             models.Index(fields=['deleted_at']),
 
             models.Index(fields=['created_at']),
@@ -204,6 +359,27 @@ class DirectMessageAttachment(BaseModel):
         AUDIO = 'audio'
         OTHER = 'other'
 
+        @classmethod
+        def from_mimetype(cls, mimetype: str) -> 'DirectMessageAttachment.AttachmentType':
+            if mimetype.startswith('image'):
+                return cls.IMAGE
+            elif mimetype.startswith('video'):
+                return cls.VIDEO
+            elif mimetype.startswith('audio'):
+                return cls.AUDIO
+
+            return cls.OTHER
+
+    class ProcessingStatus(models.TextChoices):
+        # 원본 (source)만 저장된 상태 - process_direct_message_attachment 작업이 처리합니다
+        PENDING = 'pending'
+        READY = 'ready'
+        # 이미지가 아니거나 너무 커서 처리할 수 없는 경우
+        FAILED = 'failed'
+
+    # 직접 업로드 (flitz.uploads) 시 허용하는 최대 파일 크기
+    MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
     conversation = models.ForeignKey(DirectMessageConversation, on_delete=models.CASCADE, related_name='attachments')
     message = models.OneToOneField(DirectMessage, on_delete=models.CASCADE, related_name='attachment', null=True, blank=True)
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -213,27 +389,51 @@ class DirectMessageAttachment(BaseModel):
     object = models.FileField(upload_to=attachment_upload_to, null=True)
     thumbnail = models.ImageField(upload_to=attachment_thumbnail_upload_to, null=True, blank=True)
 
+    # 처리 전의 원본 (EXIF 등이 남아 있으므로 공개하지 않으며, 처리가 끝나면 삭제됩니다)
+    source = models.FileField(upload_to=attachment_upload_to, null=True, blank=True)
+    status = models.CharField(max_length=16, choices=ProcessingStatus.choices, default=ProcessingStatus.READY)
+
     mimetype = models.CharField(max_length=128)
     size = models.IntegerField()
 
     width = models.IntegerField(null=True, blank=True)
     height = models.IntegerField(null=True, blank=True)
 
+    # object의 파생 이미지 manifest (flitz.derivatives 참고)
+    derivatives = models.JSONField(null=True, blank=True)
+
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        if self.derivatives is None:
+            return storage_url(self.thumbnail)
+
+        return derivative_url(self.object, self.derivatives, 480)
+
     def delete_attachment(self):
-        try:
-            if self.object and self.object.name:
-                self.object.delete(save=False)
+        # 같은 내용의 오브젝트를 다른 첨부파일이 공유할 수 있으므로, delete_attachments()를 통해 삭제합니다
+        DirectMessageAttachment.delete_attachments(DirectMessageAttachment.objects.filter(pk=self.pk))
+        self.refresh_from_db()
+
+    @classmethod
+    def delete_attachments(cls, queryset: QuerySet['DirectMessageAttachment']) -> int:
+        """
+        여러 첨부파일을 한 번에 삭제합니다.
+        S3 오브젝트는 multi-object delete 요청으로, row는 update()로 일괄 처리합니다.
+        """
+
+        now = timezone.now()
 
-            if self.thumbnail and self.thumbnail.name:
-                self.thumbnail.delete(save=False)
+        rows = list(queryset.exclude(derivatives=None).values_list('pk', 'derivatives'))
+        delete_derivatives([manifest for (_, manifest) in rows], exclude=(cls, [pk for (pk, _) in rows]))
 
-        except Exception as e:
-            print(e)
+        return delete_stored_files(queryset, ['object', 'thumbnail', 'source'], deleted_at=now, updated_at=now, derivatives=None)
 
-        self.deleted_at = timezone.now()
-        self.save()
+# object와 thumbnail은 같은 내용 기반 오브젝트를 가리킬 수 있습니다
+register_content_addressed_field('messaging.DirectMessageAttachment', 'object', deleted_at__isnull=True)
+register_content_addressed_field('messaging.DirectMessageAttachment', 'thumbnail', deleted_at__isnull=True)
+register_deletable_file_fields('messaging.DirectMessageAttachment', ['object', 'thumbnail', 'source'])
 
 class DirectMessageFlag(BaseModel):
     class Meta:
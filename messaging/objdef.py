@@ -2,7 +2,7 @@ from typing import List, Optional, TypedDict, Literal, Dict
 
 from dataclasses import dataclass, asdict
 
-from dacite import from_dict
+from flitz.objdecode import expect_mapping, str_field, int_field, literal_field, optional_str_field
 
 # Object definitions for DirectMessage.content JSON field
 
@@ -15,6 +15,9 @@ export type DirectMessageTextContent = {
 export type DirectMessageAttachmentContent = {
     type: 'attachment'
     attachment_id: string
+
+    // 'pending'인 동안에는 URL이 없으며, 처리가 끝나면 message_updated 이벤트로 갱신됩니다
+    status?: 'pending' | 'ready' | 'failed'
 }
 
 export type DirectMessageContent = DirectMessageTextContent | DirectMessageAttachmentContent
@@ -44,15 +47,50 @@ class DirectMessageAttachmentContent:
     public_url: Optional[str]
     thumbnail_url: Optional[str]
 
+    # DirectMessageAttachment.ProcessingStatus (이전에 저장된 메시지에는 없음)
+    status: str = 'ready'
+
     def as_dict(self) -> dict:
         return asdict(self)
 
 DirectMessageContent = DirectMessageTextContent | DirectMessageAttachmentContent
 
+def _load_text_content(data: Dict) -> DirectMessageTextContent:
+    return DirectMessageTextContent(
+        type=literal_field(data, 'type', ('text',), DirectMessageTextContentType),
+        text=str_field(data, 'text'),
+    )
+
+def _load_attachment_content(data: Dict) -> DirectMessageAttachmentContent:
+    return DirectMessageAttachmentContent(
+        type=literal_field(data, 'type', ('attachment',), DirectMessageAttachmentContentType),
+
+        attachment_type=str_field(data, 'attachment_type'),
+        attachment_id=str_field(data, 'attachment_id'),
+
+        width=int_field(data, 'width'),
+        height=int_field(data, 'height'),
+
+        public_url=optional_str_field(data, 'public_url'),
+        thumbnail_url=optional_str_field(data, 'thumbnail_url'),
+
+        status=optional_str_field(data, 'status') or 'ready',
+    )
+
 def load_direct_message_content(data: Dict) -> DirectMessageContent:
+    """
+    DirectMessage.content를 DirectMessageContent로 변환합니다.
+    dacite.from_dict()와 같은 결과 / 예외를 반환하지만, 리플렉션 없이 직접 디코딩합니다.
+
+    :raises ValueError: 알 수 없는 type인 경우
+    :raises dacite.DaciteError: 데이터가 스키마에 맞지 않는 경우
+    """
+
+    data = expect_mapping(data, DirectMessageContent, None)
+
     if data["type"] == "text":
-        return from_dict(data_class=DirectMessageTextContent, data=data)
+        return _load_text_content(data)
     elif data["type"] == "attachment":
-        return from_dict(data_class=DirectMessageAttachmentContent, data=data)
+        return _load_attachment_content(data)
     else:
         raise ValueError(f"Unknown content type: {data['type']}")
@@ -1,7 +1,8 @@
 from django.urls import re_path
 
-from messaging.consumers import DirectMessageConsumer
+from messaging.consumers import DirectMessageConsumer, UserMessagingConsumer
 
 websocket_urlpatterns = [
     re_path(r'ws/direct-messages/(?P<conversation_id>[^/]+)/$', DirectMessageConsumer.as_asgi()),
+    re_path(r'ws/messaging/$', UserMessagingConsumer.as_asgi()),
 ]
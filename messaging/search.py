@@ -0,0 +1,142 @@
+import base64
+from typing import List, Optional, Tuple, TypedDict
+from uuid import UUID
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections, router
+from django.db.models import F, FloatField, Q, QuerySet, Value
+from django.db.models.functions import Cast
+
+from messaging.models import DirectMessage, DirectMessageParticipant, MessageSearchDocument
+from messaging.serializers import DirectMessageReadOnlySerializer
+from user.models import User
+
+# 사용자가 참여 중인 대화의 텍스트 메시지를 검색합니다.
+#
+# PostgreSQL에서는 생성 컬럼 DirectMessage.content_search (tsvector, GIN 인덱스)에 to_tsquery로 검색하고
+# ts_rank 순서로 정렬합니다. 그 외 (SQLite)에서는 같은 컬럼 (소문자로 바꾼 텍스트)에 LIKE로 검색하고 최신순으로 정렬합니다.
+#
+# 'simple' 설정은 한국어의 조사를 분리하지 않으므로 ('친구가'는 lexeme '친구가' 하나), 검색어의 각 단어를
+# 접두사 검색 ('친구':*)으로 바꾸고 AND로 묶습니다. (prefix_tsquery() 참고)
+#
+# 커서는 마지막으로 반환한 메시지의 (rank, id)이며, 클라이언트에게는 불투명한 문자열로 전달됩니다.
+
+PAGE_SIZE = 20
+
+MAX_QUERY_LENGTH = 100
+
+
+class InvalidSearchQuery(ValueError):
+    pass
+
+
+class InvalidSearchCursor(ValueError):
+    pass
+
+
+class SearchResult(TypedDict):
+    results: List[dict]
+    cursor: Optional[str]
+    has_more: bool
+
+
+def encode_cursor(rank: float, message_id: UUID) -> str:
+    value = f'{rank!r}|{message_id}'
+
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, UUID]:
+    """
+    :raises InvalidSearchCursor: 커서의 형식이 올바르지 않은 경우
+    """
+
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        (rank, message_id) = value.split('|')
+
+        return float(rank), UUID(message_id)
+    except ValueError:
+        raise InvalidSearchCursor()
+
+
+def prefix_tsquery(query: str) -> str:
+    """
+    검색어의 각 단어를 접두사 검색으로 바꾼 to_tsquery 문자열을 만듭니다.
+    예) `친구 coffee` → `'친구':* & 'coffee':*` ('친구가', 'coffeeshop'에도 일치합니다)
+
+    단어는 따옴표로 감싸므로 to_tsquery의 연산자 (&, |, !, : 등)로 해석되지 않습니다.
+    """
+
+    terms = [
+        "'" + term.replace('\\', '\\\\').replace("'", "''") + "':*"
+        for term in query.split()
+    ]
+
+    return ' & '.join(terms)
+
+
+def _match(messages: QuerySet[DirectMessage], query: str) -> QuerySet[DirectMessage]:
+    vendor = connections[router.db_for_read(DirectMessage)].vendor
+
+    if vendor == 'postgresql':
+        search_query = SearchQuery(prefix_tsquery(query), search_type='raw', config=MessageSearchDocument.SEARCH_CONFIG)
+
+        # ts_rank는 real (float4)을 반환하는데, 커서로 돌려준 값 (float4의 짧은 10진 표현)과 비교할 때는
+        # double precision으로 바뀌어 같은 값으로 비교되지 않으므로, 처음부터 double precision으로 다룹니다
+        return messages \
+            .filter(content_search=search_query) \
+            .annotate(rank=Cast(SearchRank(F('content_search'), search_query), FloatField()))
+
+    # PostgreSQL과 마찬가지로 모든 단어를 포함하는 메시지를 찾습니다 (단어의 중간에 일치하는 것까지 포함)
+    for term in query.lower().split():
+        messages = messages.filter(content_search__contains=term)
+
+    return messages.annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_messages(user: User, query: str, cursor: Optional[str] = None, limit: Optional[int] = None) -> SearchResult:
+    """
+    사용자가 참여 중인 대화에서 query를 포함하는 메시지를 관련도 순서로 반환합니다.
+
+    :raises InvalidSearchQuery: 검색어가 비어 있거나 너무 긴 경우
+    :raises InvalidSearchCursor: 커서의 형식이 올바르지 않은 경우
+    """
+
+    limit = limit or PAGE_SIZE
+    query = (query or '').strip()
+
+    if not query or len(query) > MAX_QUERY_LENGTH:
+        raise InvalidSearchQuery()
+
+    conversation_ids = DirectMessageParticipant.objects.filter(
+        user=user,
+        deleted_at__isnull=True,
+        conversation__deleted_at__isnull=True,
+    ).values('conversation_id')
+
+    messages = _match(
+        DirectMessage.objects.filter(conversation_id__in=conversation_ids, deleted_at__isnull=True),
+        query
+    )
+
+    if cursor:
+        (rank, message_id) = decode_cursor(cursor)
+        messages = messages.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=message_id))
+
+    rows = list(messages.select_related('attachment').order_by('-rank', '-id')[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        'results': [
+            {
+                **DirectMessageReadOnlySerializer(instance=message).data,
+                'conversation_id': str(message.conversation_id),
+            }
+            for message in rows
+        ],
+        'cursor': encode_cursor(rows[-1].rank, rows[-1].id) if has_more else None,
+        'has_more': has_more,
+    }
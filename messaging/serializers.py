@@ -1,7 +1,11 @@
+from django.db.models.fields.files import FieldFile
 from rest_framework import serializers
 
+from flitz.derivatives import derivative_url
 from flitz.exceptions import UnsupportedOperationException
-from messaging.models import DirectMessageParticipant, DirectMessage, DirectMessageFlag, DirectMessageConversation, DirectMessageAttachment
+from flitz.serializers import StorageURLField
+from messaging.models import DirectMessageParticipant, DirectMessage, DirectMessageFlag, DirectMessageConversation, \
+    DirectMessageAttachment, DirectMessageInboxEntry
 from user.models import User
 from user.serializers import PublicUserSerializer
 
@@ -19,6 +23,18 @@ class DirectMessageParticipantSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
+    unread_count = serializers.SerializerMethodField()
+
+    def get_unread_count(self, obj: DirectMessageParticipant):
+        # 요청한 사용자의 값은 아직 DB에 반영되지 않았을 수 있으므로 캐시 (messaging.unread)의 값을 사용합니다
+        unread_counts = self.context.get('unread_counts')
+        request = self.context.get('request')
+
+        if unread_counts is not None and request is not None and obj.user_id == request.user.id:
+            return unread_counts.get(str(obj.conversation_id), obj.unread_count)
+
+        return obj.unread_count
+
     def create(self, validated_data):
         raise UnsupportedOperationException()
 
@@ -80,8 +96,8 @@ class DirectMessageAttachmentSerializer(serializers.ModelSerializer):
     DM 첨부파일 정보를 fetch할 때 사용되는 serializer
     """
 
-    public_url = serializers.FileField(source='object', read_only=True)
-    thumbnail_url = serializers.ImageField(source='thumbnail', read_only=True)
+    public_url = StorageURLField(source='object')
+    thumbnail_url = serializers.CharField(read_only=True)
 
     class Meta:
         model = DirectMessageAttachment
@@ -122,6 +138,8 @@ class DirectMessageConversationSerializer(serializers.ModelSerializer):
                 ) \
                 .save()
 
+        DirectMessageInboxEntry.create_entries(created, initial_participants)
+
         return created
 
     def update(self, instance, validated_data):
@@ -133,6 +151,50 @@ class DirectMessageConversationSerializer(serializers.ModelSerializer):
         fields = (*read_only_fields, 'initial_participants')
 
 
+class DirectMessageInboxEntrySerializer(serializers.ModelSerializer):
+    """
+    | write: unsupported
+    | read: id (대화 ID), peer, latest_message, unread_count, updated_at
+    |
+    | 가벼운 대화 목록 (inbox)에 사용됩니다. 모든 값은 inbox row에 저장된 값이며, 추가 쿼리를 실행하지 않습니다.
+    | latest_message에는 첨부파일 URL이 포함되지 않습니다.
+    """
+
+    id = serializers.CharField(source='conversation_id', read_only=True)
+    peer = serializers.SerializerMethodField()
+    latest_message = serializers.JSONField(source='latest_message_preview', read_only=True)
+    unread_count = serializers.SerializerMethodField()
+    updated_at = serializers.DateTimeField(source='sort_ts', read_only=True)
+
+    def get_peer(self, obj: DirectMessageInboxEntry):
+        snapshot = obj.peer_snapshot
+
+        if not snapshot:
+            return None
+
+        profile_image = FieldFile(None, User._meta.get_field('profile_image'), snapshot.get('profile_image'))
+
+        return {
+            'id': snapshot['id'],
+            'username': snapshot['username'],
+            'display_name': snapshot['display_name'],
+            'profile_image_url': derivative_url(
+                profile_image, snapshot.get('profile_image_derivatives'), 480, fallback_to_source=False
+            ),
+        }
+
+    def get_unread_count(self, obj: DirectMessageInboxEntry):
+        # DB의 값은 아직 반영되지 않았을 수 있으므로 캐시 (messaging.unread)의 값을 우선 사용합니다
+        unread_counts = self.context.get('unread_counts') or {}
+
+        return unread_counts.get(str(obj.conversation_id), obj.unread_count)
+
+    class Meta:
+        model = DirectMessageInboxEntry
+        fields = ('id', 'peer', 'latest_message', 'unread_count', 'updated_at')
+        read_only_fields = fields
+
+
 class DirectMessageFlagSerializer(serializers.ModelSerializer):
 
     message = serializers.PrimaryKeyRelatedField(
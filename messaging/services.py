@@ -0,0 +1,297 @@
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
+
+from messaging.membership import conversation_membership
+from messaging.models import DirectMessage, DirectMessageConversation, DirectMessageParticipant, \
+    DirectMessageInboxEntry
+from messaging.serializers import DirectMessageReadOnlySerializer
+from messaging.tasks import send_direct_message_push_notification
+from messaging.unread import unread_counters
+from user.models import User
+
+# 메시지 전송 경로 (REST API / WebSocket)에서 공통으로 사용하는 서비스입니다.
+#
+# 요청 안에서는 하나의 트랜잭션으로
+#  1. 참여 여부를 확인하면서 메시지를 저장하고 (INSERT ... SELECT ... WHERE EXISTS)
+#  2. 대화의 latest_message와 참여자들의 대화 목록 (DirectMessageInboxEntry)을 갱신합니다.
+# 받는 사람들의 읽지 않은 메시지 수 증가 (messaging.unread)와 실시간 이벤트 / 푸시 알림 발송 (fan-out)은
+# 트랜잭션이 커밋된 후에 처리합니다.
+#
+# 실시간 이벤트는 대화방 그룹 (direct_message_<conversation_id>, 대화방별 WebSocket)과
+# 각 참여자의 사용자 그룹 (user_<user_id>, 사용자별 WebSocket) 양쪽에 전달됩니다.
+# 사용자 그룹으로 가는 이벤트에는 어느 대화의 이벤트인지 알 수 있도록 conversation_id가 포함됩니다.
+
+
+# REST API / WebSocket으로 보낼 수 있는 메시지의 최대 크기 (bytes)
+MAX_PAYLOAD_LENGTH = 2048
+
+
+def conversation_group_name(conversation_id) -> str:
+    return f'direct_message_{conversation_id}'
+
+
+def user_group_name(user_id) -> str:
+    return f'user_{user_id}'
+
+
+class ConversationNotJoined(Exception):
+    """
+    대화가 존재하지 않거나 삭제되었고, 또는 보낸 사람이 대화에 참여하고 있지 않은 경우 발생합니다.
+    """
+    pass
+
+
+def _insert_if_joined(message: DirectMessage) -> bool:
+    """
+    보낸 사람이 (삭제되지 않은) 대화에 참여하고 있는 경우에만 메시지를 저장합니다.
+    """
+
+    connection = connections[router.db_for_write(DirectMessage)]
+    quote_name = connection.ops.quote_name
+
+    # 생성 컬럼 (content_search)은 DB가 채웁니다
+    fields = [field for field in DirectMessage._meta.concrete_fields if not field.generated]
+    columns = ', '.join(quote_name(field.column) for field in fields)
+
+    if connection.vendor == 'postgresql':
+        # INSERT ... SELECT에서는 파라미터의 타입을 추론할 수 없으므로 명시적으로 캐스팅합니다
+        placeholders = ', '.join(f'CAST(%s AS {field.db_type(connection)})' for field in fields)
+    else:
+        placeholders = ', '.join('%s' for _ in fields)
+
+    participant_table = quote_name(DirectMessageParticipant._meta.db_table)
+    conversation_table = quote_name(DirectMessageConversation._meta.db_table)
+
+    sql = (
+        f'INSERT INTO {quote_name(DirectMessage._meta.db_table)} ({columns}) '
+        f'SELECT {placeholders} WHERE EXISTS ('
+        f'SELECT 1 FROM {participant_table} INNER JOIN {conversation_table} '
+        f'ON {conversation_table}.{quote_name("id")} = {participant_table}.{quote_name("conversation_id")} '
+        f'WHERE {participant_table}.{quote_name("conversation_id")} = %s '
+        f'AND {participant_table}.{quote_name("user_id")} = %s '
+        f'AND {participant_table}.{quote_name("deleted_at")} IS NULL '
+        f'AND {conversation_table}.{quote_name("deleted_at")} IS NULL'
+        f')'
+    )
+
+    params = [field.get_db_prep_save(getattr(message, field.attname), connection) for field in fields]
+    params += [
+        DirectMessage._meta.get_field('conversation').get_db_prep_save(message.conversation_id, connection),
+        DirectMessage._meta.get_field('sender').get_db_prep_save(message.sender_id, connection),
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        inserted = cursor.rowcount == 1
+
+    if inserted:
+        message._state.adding = False
+        message._state.db = connection.alias
+
+    return inserted
+
+
+def _update_conversation(message: DirectMessage):
+    """
+    대화의 latest_message를 갱신합니다.
+    """
+
+    DirectMessageConversation.objects.filter(id=message.conversation_id).update(
+        latest_message_id=message.id,
+        updated_at=message.created_at,
+    )
+
+
+def _find_sent_message(conversation_id: UUID, sender: User, idempotency_key: str) -> Optional[DirectMessage]:
+    return DirectMessage.objects.select_related('sender', 'attachment').filter(
+        conversation_id=conversation_id,
+        sender=sender,
+        idempotency_key=idempotency_key,
+    ).first()
+
+
+def send_direct_message(
+    conversation_id: UUID,
+    sender: User,
+    content: dict,
+    idempotency_key: Optional[str] = None
+) -> Tuple[DirectMessage, dict]:
+    """
+    메시지를 저장하고, 트랜잭션이 커밋된 후 실시간 이벤트 / 푸시 알림을 발송합니다.
+
+    idempotency_key가 주어진 경우, 같은 키로 이미 저장된 메시지가 있으면 새로 저장하지 않고
+    (실시간 이벤트 / 푸시 알림도 다시 발송하지 않고) 기존 메시지를 반환합니다.
+
+    :raises ConversationNotJoined: 보낸 사람이 대화에 참여하고 있지 않은 경우
+    :returns: (저장된 메시지, 직렬화된 메시지 (DirectMessageReadOnlySerializer))
+    """
+
+    try:
+        conversation_id = UUID(str(conversation_id))
+    except ValueError:
+        raise ConversationNotJoined()
+
+    if idempotency_key is not None:
+        message = _find_sent_message(conversation_id, sender, idempotency_key)
+
+        if message is not None:
+            return message, DirectMessageReadOnlySerializer(instance=message).data
+
+    now = timezone.now()
+
+    message = DirectMessage(
+        conversation_id=conversation_id,
+        sender=sender,
+        content=content,
+        idempotency_key=idempotency_key,
+        created_at=now,
+        updated_at=now,
+    )
+
+    try:
+        with transaction.atomic():
+            if not _insert_if_joined(message):
+                raise ConversationNotJoined()
+
+            _update_conversation(message)
+
+            message_data = DirectMessageReadOnlySerializer(instance=message).data
+
+            DirectMessageInboxEntry.record_message(message, sender, message_data)
+
+            transaction.on_commit(lambda: publish_direct_message(message, message_data))
+    except IntegrityError:
+        # 같은 키로 동시에 보낸 다른 요청이 먼저 저장한 경우
+        message = _find_sent_message(conversation_id, sender, idempotency_key) if idempotency_key else None
+
+        if message is None:
+            raise
+
+        return message, DirectMessageReadOnlySerializer(instance=message).data
+
+    return message, message_data
+
+
+def publish_direct_message(message: DirectMessage, message_data: dict):
+    """
+    받는 사람들의 읽지 않은 메시지 수를 증가시키고,
+    새 메시지를 대화방 / 참여자들의 WebSocket 그룹에 전달한 뒤 푸시 알림 발송 작업을 예약합니다.
+    """
+
+    recipient_ids = [
+        user_id for user_id in active_participant_ids(message.conversation_id)
+        if user_id != str(message.sender_id)
+    ]
+
+    unread_counts = unread_counters.increment(message.conversation_id, recipient_ids)
+
+    channel_layer = get_channel_layer()
+    group_send = async_to_sync(channel_layer.group_send)
+
+    group_send(
+        conversation_group_name(message.conversation_id),
+        {
+            'type': 'dm_message',
+            'message': message_data
+        }
+    )
+
+    # 보낸 사람의 다른 기기에도 전달합니다
+    for user_id in (str(message.sender_id), *recipient_ids):
+        group_send(
+            user_group_name(user_id),
+            {
+                'type': 'dm_message',
+                'conversation_id': str(message.conversation_id),
+                'message': message_data,
+                'unread_count': unread_counts.get(user_id, 0)
+            }
+        )
+
+    # 수신자 조회 및 알림 내용 생성은 요청 밖 (Celery 작업)에서 처리합니다
+    send_direct_message_push_notification.delay(str(message.id))
+
+
+def publish_message_updated(message: DirectMessage, message_data: dict):
+    """
+    변경된 메시지 (예: 처리가 끝난 첨부파일 메시지)를 대화방 / 참여자들의 WebSocket 그룹에 전달합니다.
+    """
+
+    group_send = async_to_sync(get_channel_layer().group_send)
+
+    group_send(
+        conversation_group_name(message.conversation_id),
+        {
+            'type': 'dm_message_updated',
+            'message': message_data
+        }
+    )
+
+    for user_id in active_participant_ids(message.conversation_id):
+        group_send(
+            user_group_name(user_id),
+            {
+                'type': 'dm_message_updated',
+                'conversation_id': str(message.conversation_id),
+                'message': message_data
+            }
+        )
+
+
+def active_participant_ids(conversation_id) -> List[str]:
+    return conversation_membership.participant_ids(conversation_id)
+
+
+async def apublish_read_event(channel_layer, conversation_id, user_id, read_at: str, participant_ids: Iterable):
+    """
+    읽음 상태 이벤트를 대화방 / 참여자들의 WebSocket 그룹에 전달합니다.
+    """
+
+    await channel_layer.group_send(
+        conversation_group_name(conversation_id),
+        {
+            'type': 'dm_read_event',
+            'user_id': str(user_id),
+            'read_at': read_at
+        }
+    )
+
+    for participant_id in participant_ids:
+        await channel_layer.group_send(
+            user_group_name(participant_id),
+            {
+                'type': 'dm_read_event',
+                'conversation_id': str(conversation_id),
+                'user_id': str(user_id),
+                'read_at': read_at
+            }
+        )
+
+
+def publish_read_event(conversation_id, user_id, read_at: str):
+    async_to_sync(apublish_read_event)(
+        get_channel_layer(), conversation_id, user_id, read_at, active_participant_ids(conversation_id)
+    )
+
+
+def publish_conversation_event(conversation_id, event: str, participant_ids: Iterable):
+    """
+    대화 목록의 변경 (created / deleted)을 참여자들의 사용자 그룹에 전달합니다.
+    """
+
+    group_send = async_to_sync(get_channel_layer().group_send)
+
+    for participant_id in participant_ids:
+        group_send(
+            user_group_name(participant_id),
+            {
+                'type': 'dm_conversation_event',
+                'conversation_id': str(conversation_id),
+                'event': event
+            }
+        )
@@ -0,0 +1,151 @@
+import base64
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple, TypedDict
+from uuid import UUID
+
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from messaging.models import DirectMessage, DirectMessageParticipant
+from messaging.serializers import DirectMessageReadOnlySerializer
+
+# 오프라인이었던 클라이언트가 마지막으로 동기화한 이후의 변경 사항 (새 메시지 / 수정 / 삭제 / 읽음 상태)을
+# 한 번의 요청으로 가져갈 수 있도록 합니다.
+#
+# 커서는 메시지의 (updated_at, id) 위치이며, 클라이언트에게는 불투명한 문자열로 전달됩니다.
+# 메시지는 (conversation, updated_at) 인덱스를 따라 (updated_at, id) 순서로 읽습니다.
+#
+# updated_at은 트랜잭션이 커밋되기 전에 정해지므로, 방금 변경된 row보다 updated_at이 이른 row가 늦게 커밋될 수 있습니다.
+# 이를 놓치지 않도록 페이지를 넘기는 동안에는 SETTLE_SECONDS 이전에 변경된 (안정된) row만 읽고,
+# 최근 SETTLE_SECONDS 동안의 변경은 마지막 페이지에서만 반환하되 커서를 그 이전까지만 전진시킵니다.
+# (다음 동기화에서 같은 메시지를 다시 받을 수 있으므로 클라이언트는 메시지 ID로 덮어써야 합니다)
+
+PAGE_SIZE = 200
+
+SETTLE_SECONDS = 5
+
+MIN_UUID = UUID(int=0)
+
+
+class InvalidSyncCursor(ValueError):
+    pass
+
+
+class SyncTombstone(TypedDict):
+    id: str
+    conversation_id: str
+    deleted_at: str
+
+
+class SyncReadState(TypedDict):
+    conversation_id: str
+    user_id: str
+    read_at: str
+
+
+class SyncResult(TypedDict):
+    messages: List[dict]
+    tombstones: List[SyncTombstone]
+    read_states: List[SyncReadState]
+    cursor: str
+    has_more: bool
+
+
+def encode_cursor(updated_at: datetime, message_id: UUID) -> str:
+    value = f'{updated_at.isoformat()}|{message_id}'
+
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    :raises InvalidSyncCursor: 커서의 형식이 올바르지 않은 경우
+    """
+
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        (updated_at, message_id) = value.split('|')
+
+        updated_at = datetime.fromisoformat(updated_at)
+
+        if timezone.is_naive(updated_at):
+            raise ValueError()
+
+        return updated_at, UUID(message_id)
+    except ValueError:
+        raise InvalidSyncCursor()
+
+
+def sync_changes(
+    messages: QuerySet[DirectMessage],
+    participants: QuerySet[DirectMessageParticipant],
+    cursor: Optional[str],
+    limit: Optional[int] = None
+) -> SyncResult:
+    """
+    cursor 이후에 변경된 메시지와 읽음 상태를 반환합니다. cursor가 없으면 처음부터 반환합니다.
+
+    :param messages: 동기화 대상 메시지 (삭제된 메시지 포함)
+    :param participants: 동기화 대상 참여자 (읽음 상태)
+    :raises InvalidSyncCursor: 커서의 형식이 올바르지 않은 경우
+    """
+
+    limit = limit or PAGE_SIZE
+    (since, since_id) = decode_cursor(cursor) if cursor else (None, MIN_UUID)
+
+    if since is not None:
+        messages = messages.filter(Q(updated_at__gt=since) | Q(updated_at=since, id__gt=since_id))
+        participants = participants.filter(updated_at__gt=since)
+
+    settled_before = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    messages = messages.select_related('attachment').order_by('updated_at', 'id')
+
+    rows = list(messages.filter(updated_at__lt=settled_before)[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if not has_more and len(rows) < limit:
+        # 마지막 페이지에만 아직 안정되지 않은 변경을 덧붙입니다 (커서는 settled_before까지만 전진하므로 다시 전달됩니다)
+        rows += messages.filter(updated_at__gte=settled_before)[:limit - len(rows)]
+
+    result: SyncResult = {
+        'messages': [],
+        'tombstones': [],
+        'read_states': [
+            {
+                'conversation_id': str(conversation_id),
+                'user_id': str(user_id),
+                'read_at': read_at.isoformat(),
+            }
+            for (conversation_id, user_id, read_at) in participants.values_list('conversation_id', 'user_id', 'read_at')
+        ],
+        'cursor': cursor or '',
+        'has_more': has_more,
+    }
+
+    for message in rows:
+        if message.deleted_at is not None:
+            result['tombstones'].append({
+                'id': str(message.id),
+                'conversation_id': str(message.conversation_id),
+                'deleted_at': message.deleted_at.isoformat(),
+            })
+        else:
+            result['messages'].append({
+                **DirectMessageReadOnlySerializer(instance=message).data,
+                'conversation_id': str(message.conversation_id),
+            })
+
+    if has_more:
+        # 페이지를 넘기는 동안에는 안정된 row만 읽으므로, 마지막 row의 위치까지 전진시켜도 놓치는 변경이 없습니다
+        position = (rows[-1].updated_at, rows[-1].id)
+    else:
+        # 남은 변경을 모두 반환했으므로 안정된 시점까지 전진시킵니다
+        # (커밋이 늦어진 변경은 다음 동기화에서 다시 확인합니다)
+        position = (settled_before, MIN_UUID)
+
+    if since is None or position > (since, since_id):
+        result['cursor'] = encode_cursor(*position)
+
+    return result
@@ -0,0 +1,238 @@
+import shutil
+from datetime import timedelta
+from logging import Logger
+from tempfile import NamedTemporaryFile
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from flitz.derivatives import schedule_image_derivatives
+from flitz.storage import storage_url, save_content_addressed
+from flitz.thumbgen import generate_thumbnail
+from messaging.models import DirectMessage, DirectMessageInboxEntry, DirectMessageAttachment
+from messaging.objdef import load_direct_message_content
+from messaging.unread import unread_counters
+from user.models import User
+
+logger: Logger = get_task_logger(__name__)
+
+# 이 시간이 지나도록 처리 중 (pending)인 첨부파일은 실패로 정리합니다 (재시도 대기 시간보다 충분히 길게)
+STALE_ATTACHMENT_TIMEOUT = timedelta(minutes=30)
+
+
+@shared_task
+def send_direct_message_push_notification(message_id: str):
+    """
+    메시지의 수신자들에게 푸시 알림을 보냅니다.
+    """
+
+    message = DirectMessage.objects.select_related('sender', 'conversation').filter(
+        id=message_id,
+        deleted_at__isnull=True
+    ).first()
+
+    if message is None:
+        return
+
+    message.send_push_notification()
+
+
+@shared_task
+def reconcile_unread_counts():
+    """
+    캐시 (Redis)에 누적된 읽지 않은 메시지 수를 DirectMessageParticipant.unread_count에 반영합니다.
+    """
+
+    while unread_counters.reconcile() >= unread_counters.RECONCILE_BATCH_SIZE:
+        pass
+
+
+@shared_task
+def refresh_inbox_peer_snapshots(user_id: str):
+    """
+    상대방들의 대화 목록 (DirectMessageInboxEntry)에 저장된 사용자의 표시 정보를 갱신합니다.
+    """
+
+    user = User.objects.filter(id=user_id).first()
+
+    if user is None:
+        return
+
+    DirectMessageInboxEntry.refresh_peer_snapshots(user)
+
+
+def _apply_attachment_status(attachment: DirectMessageAttachment, message: DirectMessage):
+    """
+    첨부파일의 처리 결과를 메시지 내용과 대화 목록의 미리보기에 반영하고, 커밋 후 message_updated 이벤트를 발송합니다.
+    트랜잭션 안에서 호출해야 합니다.
+    """
+    from messaging.serializers import DirectMessageReadOnlySerializer
+    from messaging.services import publish_message_updated
+
+    content = load_direct_message_content(message.content)
+    content.status = attachment.status
+
+    if attachment.status == DirectMessageAttachment.ProcessingStatus.READY:
+        content.width = attachment.width
+        content.height = attachment.height
+
+        # 굳이 원본을 보여줄 필요는 없음
+        content.public_url = storage_url(attachment.thumbnail)
+        content.thumbnail_url = storage_url(attachment.thumbnail)
+
+    # updated_at이 갱신되므로, 동기화 API (messaging.sync)에서도 변경된 메시지로 전달됩니다
+    message.content = content.as_dict()
+    message.save(update_fields=['content', 'updated_at'])
+
+    message.attachment = attachment
+    message_data = DirectMessageReadOnlySerializer(instance=message).data
+
+    DirectMessageInboxEntry.objects.filter(latest_message_id=message.id).update(
+        latest_message_preview=DirectMessageInboxEntry.message_preview(message_data)
+    )
+
+    transaction.on_commit(lambda: publish_message_updated(message, message_data))
+
+
+def fail_direct_message_attachment(attachment_id: str):
+    """
+    처리 중 (pending)인 첨부파일의 원본을 삭제하고 실패로 표시합니다.
+    """
+
+    attachment = DirectMessageAttachment.objects.filter(
+        id=attachment_id,
+        status=DirectMessageAttachment.ProcessingStatus.PENDING,
+    ).first()
+
+    if attachment is None:
+        return
+
+    # 원본에는 EXIF 등이 남아 있으므로, 삭제에 실패하면 pending 상태로 남겨 다음 정리 때 다시 시도합니다
+    if attachment.source.name:
+        attachment.source.storage.delete(attachment.source.name)
+
+    with transaction.atomic():
+        attachment = DirectMessageAttachment.objects.select_for_update(of=('self',)).select_related('message').filter(
+            id=attachment_id,
+            status=DirectMessageAttachment.ProcessingStatus.PENDING,
+        ).first()
+
+        if attachment is None:
+            return
+
+        attachment.status = DirectMessageAttachment.ProcessingStatus.FAILED
+        attachment.source = None
+        attachment.save()
+
+        if attachment.deleted_at is None and attachment.message is not None:
+            _apply_attachment_status(attachment, attachment.message)
+
+
+def _on_process_direct_message_attachment_failure(self, exc, task_id, args, kwargs, einfo):
+    # 재시도 횟수를 초과했거나 예상하지 못한 오류 (S3 오류 등)로 실패한 경우에도 pending 상태로 남지 않도록 합니다
+    logger.error(f"process_direct_message_attachment(): failed to process attachment {args[0]}: {exc}")
+    fail_direct_message_attachment(*args)
+
+
+@shared_task(
+    autoretry_for=(OSError,), retry_backoff=True, max_retries=3,
+    on_failure=_on_process_direct_message_attachment_failure
+)
+def process_direct_message_attachment(attachment_id: str):
+    """
+    처리 중 (pending)인 이미지 첨부파일의 원본으로 썸네일 (EXIF 제거, 최대 높이 1280)을 만들어 저장하고,
+    첨부파일 / 메시지를 갱신한 뒤 message_updated 이벤트를 발송합니다. 원본은 처리가 끝나면 삭제합니다.
+    """
+
+    attachment = DirectMessageAttachment.objects.select_related('message').filter(
+        id=attachment_id,
+        status=DirectMessageAttachment.ProcessingStatus.PENDING,
+    ).first()
+
+    if attachment is None:
+        return
+
+    source_storage = DirectMessageAttachment._meta.get_field('source').storage
+    source_name = attachment.source.name
+
+    if attachment.deleted_at is not None or attachment.message is None:
+        logger.info(f"process_direct_message_attachment(): attachment {attachment_id} was deleted, discarding source")
+        source_storage.delete(source_name)
+        return
+
+    thumbnail = None
+
+    with NamedTemporaryFile() as local_file:
+        # 스토리지 오류 (OSError)는 재시도하고, 디코딩 오류는 재시도하지 않도록 먼저 로컬로 내려받습니다
+        with source_storage.open(source_name) as file:
+            shutil.copyfileobj(file, local_file)
+
+        local_file.seek(0)
+
+        try:
+            (thumbnail, size) = generate_thumbnail(File(local_file), 1280)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            # 이미지가 아니거나 손상된 경우 (UnidentifiedImageError), 너무 큰 경우 (ImageTooLargeError)
+            logger.warning(f"process_direct_message_attachment(): cannot process attachment {attachment_id}: {e}")
+
+    if thumbnail is None:
+        fail_direct_message_attachment(attachment_id)
+        return
+
+    with transaction.atomic():
+        # 처리하는 동안 삭제되었거나 실패로 정리된 경우 (fail_stale_direct_message_attachments)에는 반영하지 않습니다
+        attachment = DirectMessageAttachment.objects.select_for_update(of=('self',)).select_related('message').filter(
+            id=attachment_id,
+            status=DirectMessageAttachment.ProcessingStatus.PENDING,
+            deleted_at__isnull=True,
+            message__isnull=False,
+        ).first()
+
+        if attachment is not None:
+            # object와 thumbnail은 같은 이미지이므로, 내용 기반 이름으로 한 번만 업로드합니다
+            thumbnail_name = save_content_addressed(
+                'dm_attachments', thumbnail, 'jpg',
+                storage=DirectMessageAttachment._meta.get_field('object').storage
+            )
+
+            attachment.object = thumbnail_name
+            attachment.thumbnail = thumbnail_name
+            attachment.size = thumbnail.size
+            attachment.width = size[0]
+            attachment.height = size[1]
+            attachment.status = DirectMessageAttachment.ProcessingStatus.READY
+            attachment.source = None
+
+            # 여러 크기의 파생 이미지는 트랜잭션 커밋 후 Celery 작업으로 생성합니다
+            schedule_image_derivatives(attachment, 'object', 'derivatives')
+
+            attachment.save()
+
+            _apply_attachment_status(attachment, attachment.message)
+
+    # 원본에는 EXIF 등이 남아 있으므로 삭제합니다
+    source_storage.delete(source_name)
+
+
+@shared_task
+def fail_stale_direct_message_attachments():
+    """
+    작업이 유실되는 등의 이유로 오랫동안 처리 중 (pending)으로 남아 있는 첨부파일을 실패로 정리합니다.
+    """
+
+    threshold = timezone.now() - STALE_ATTACHMENT_TIMEOUT
+
+    attachment_ids = DirectMessageAttachment.objects.filter(
+        status=DirectMessageAttachment.ProcessingStatus.PENDING,
+        created_at__lt=threshold,
+    ).values_list('id', flat=True)
+
+    for attachment_id in attachment_ids:
+        try:
+            fail_direct_message_attachment(str(attachment_id))
+        except Exception as e:
+            logger.error(f"fail_stale_direct_message_attachments(): error cleaning up attachment {attachment_id}: {e}", exc_info=True)
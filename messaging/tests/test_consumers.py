@@ -20,6 +20,7 @@ from flitz.test_utils import create_test_user, create_test_user_with_session
 from messaging.models import DirectMessageConversation, DirectMessageParticipant, DirectMessage
 from messaging.consumers import DirectMessageConsumer
 from messaging.routing import websocket_urlpatterns
+from messaging.services import send_direct_message, publish_read_event, publish_conversation_event
 from user_auth.models import UserSession
 
 
@@ -356,3 +357,266 @@ class DirectMessageConsumerTests(TransactionTestCase):
         
         # 이제 communicator1은 연결이 끊어졌으므로 메시지를 수신하지 않아야 함
         # 테스트 완료
+
+    async def receive_until(self, communicator, event_type):
+        """event_type의 이벤트를 받을 때까지 다른 이벤트 (읽음 이벤트 등)는 건너뜀"""
+        while True:
+            response = await communicator.receive_json_from()
+
+            if response['type'] == event_type:
+                return response
+
+    @mock.patch('messaging.services.send_direct_message_push_notification')
+    async def test_send_message(self, mock_push_task):
+        """WebSocket으로 메시지 전송 테스트 - idempotency key로 중복 저장 방지"""
+        await self.setup_test_data()
+
+        communicator1 = WebsocketCommunicator(application, f"{self.ws_url}?{urlencode({'token': self.token1})}")
+        communicator2 = WebsocketCommunicator(application, f"{self.ws_url}?{urlencode({'token': self.token2})}")
+
+        connected1, _ = await communicator1.connect()
+        self.assertTrue(connected1)
+        connected2, _ = await communicator2.connect()
+        self.assertTrue(connected2)
+
+        frame = {
+            'type': 'send_message',
+            'idempotency_key': 'client-key-1',
+            'content': {'type': 'text', 'text': 'Hello over WebSocket'}
+        }
+
+        await communicator1.send_json_to(frame)
+
+        ack = await self.receive_until(communicator1, 'message_ack')
+        self.assertEqual(ack['idempotency_key'], 'client-key-1')
+        self.assertEqual(ack['message']['content']['text'], 'Hello over WebSocket')
+
+        # 다른 참여자에게도 메시지가 전달되어야 함
+        event = await self.receive_until(communicator2, 'message')
+        self.assertEqual(event['message']['id'], ack['message_id'])
+
+        # 같은 키로 다시 보내면 처음 저장된 메시지로 응답해야 함
+        await communicator1.send_json_to(frame)
+
+        retry_ack = await self.receive_until(communicator1, 'message_ack')
+        self.assertEqual(retry_ack['message_id'], ack['message_id'])
+
+        @database_sync_to_async
+        def count_messages():
+            return DirectMessage.objects.filter(conversation=self.conversation).count()
+
+        self.assertEqual(await count_messages(), 1)
+        mock_push_task.delay.assert_called_once_with(ack['message_id'])
+
+        # 잘못된 프레임은 저장하지 않고 오류로 응답해야 함
+        await communicator1.send_json_to({**frame, 'idempotency_key': 'client-key-2', 'content': {'type': 'unknown'}})
+
+        error = await self.receive_until(communicator1, 'error')
+        self.assertEqual(error['reason'], 'fz.messaging.invalid_content')
+
+        await communicator1.send_json_to({'type': 'send_message', 'content': frame['content']})
+
+        error = await self.receive_until(communicator1, 'error')
+        self.assertEqual(error['reason'], 'fz.messaging.invalid_idempotency_key')
+
+        self.assertEqual(await count_messages(), 1)
+
+        await communicator1.disconnect()
+        await communicator2.disconnect()
+
+    async def test_read_receipts_are_coalesced(self):
+        """연속으로 받은 메시지들의 읽음 상태는 한 번만 저장 / 발송됨"""
+        await self.setup_test_data()
+
+        communicator1 = WebsocketCommunicator(application, f"{self.ws_url}?{urlencode({'token': self.token1})}")
+        communicator2 = WebsocketCommunicator(application, f"{self.ws_url}?{urlencode({'token': self.token2})}")
+
+        connected2, _ = await communicator2.connect()
+        self.assertTrue(connected2)
+        connected1, _ = await communicator1.connect()
+        self.assertTrue(connected1)
+
+        # user1이 연결하면서 발생한 읽음 이벤트
+        response = await communicator2.receive_json_from()
+        self.assertEqual(response['type'], 'read_event')
+
+        @database_sync_to_async
+        def set_unread_count(unread_count):
+            DirectMessageParticipant.objects.filter(
+                conversation=self.conversation, user=self.user1
+            ).update(unread_count=unread_count)
+
+        await set_unread_count(5)
+
+        channel_layer = get_channel_layer()
+
+        for index in range(5):
+            await channel_layer.group_send(
+                f"direct_message_{self.conversation.id}",
+                {
+                    'type': 'dm_message',
+                    'message': {
+                        'id': f'message-{index}',
+                        'content': {'type': 'text', 'text': f'burst {index}'},
+                        'sender': str(self.user2.id),
+                    }
+                }
+            )
+
+        for _ in range(5):
+            response = await communicator1.receive_json_from()
+            self.assertEqual(response['type'], 'message')
+
+        read_events = []
+
+        while not await communicator2.receive_nothing(timeout=DirectMessageConsumer.READ_RECEIPT_DEBOUNCE_SECONDS * 3):
+            response = await communicator2.receive_json_from()
+
+            if response['type'] == 'read_event':
+                read_events.append(response)
+
+        self.assertEqual(len(read_events), 1)
+        self.assertEqual(read_events[0]['user_id'], str(self.user1.id))
+
+        @database_sync_to_async
+        def get_participant():
+            return DirectMessageParticipant.objects.get(conversation=self.conversation, user=self.user1)
+
+        participant = await get_participant()
+        self.assertEqual(participant.unread_count, 0)
+        self.assertEqual(participant.read_at.isoformat(), read_events[0]['read_at'])
+
+        # 연결이 끊어지면 예약된 읽음 상태를 바로 저장함
+        await set_unread_count(1)
+        await communicator1.send_json_to({'type': 'read_receipt'})
+        await communicator1.disconnect()
+
+        participant = await get_participant()
+        self.assertEqual(participant.unread_count, 0)
+
+        await communicator2.disconnect()
+
+@override_settings(
+    CHANNEL_LAYERS={
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+)
+class UserMessagingConsumerTests(TransactionTestCase):
+    @database_sync_to_async
+    def setup_test_data(self):
+        self.user1, self.session1 = create_test_user_with_session(1)
+        self.user2, self.session2 = create_test_user_with_session(2)
+        self.user3, self.session3 = create_test_user_with_session(3)
+
+        self.conversation = DirectMessageConversation.create_conversation(self.user1, self.user2)
+        self.other_conversation = DirectMessageConversation.create_conversation(self.user1, self.user3)
+
+        self.ws_url = f"/ws/messaging/?{urlencode({'token': generate_test_token(self.session1.id)})}"
+
+    @database_sync_to_async
+    def send_message(self, conversation, sender, text):
+        (message, _) = send_direct_message(conversation.id, sender, {'type': 'text', 'text': text})
+        return message
+
+    async def test_connect_requires_token(self):
+        await self.setup_test_data()
+
+        communicator = WebsocketCommunicator(application, '/ws/messaging/')
+        connected, _ = await communicator.connect()
+
+        self.assertFalse(connected)
+
+    @mock.patch('messaging.services.send_direct_message_push_notification')
+    async def test_events_for_all_conversations(self, mock_push_task):
+        """하나의 연결로 모든 대화의 이벤트를 받음"""
+        await self.setup_test_data()
+
+        communicator = WebsocketCommunicator(application, self.ws_url)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await self.send_message(self.conversation, self.user2, 'from user2')
+        await self.send_message(self.other_conversation, self.user3, 'from user3')
+
+        first = await communicator.receive_json_from()
+        second = await communicator.receive_json_from()
+
+        self.assertEqual(first['type'], 'message')
+        self.assertEqual(first['conversation_id'], str(self.conversation.id))
+        self.assertEqual(first['message']['content']['text'], 'from user2')
+        self.assertEqual(first['unread_count'], 1)
+
+        self.assertEqual(second['conversation_id'], str(self.other_conversation.id))
+
+        # 다른 참여자의 읽음 이벤트도 대화 ID와 함께 전달됨
+        await database_sync_to_async(publish_read_event)(self.conversation.id, self.user2.id, timezone.now().isoformat())
+
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'read_event')
+        self.assertEqual(response['conversation_id'], str(self.conversation.id))
+        self.assertEqual(response['user_id'], str(self.user2.id))
+
+        await communicator.disconnect()
+
+    @mock.patch('messaging.services.send_direct_message_push_notification')
+    async def test_subscribe_and_unsubscribe(self, mock_push_task):
+        """관심 없는 대화의 메시지는 대화 목록 갱신 이벤트로만 전달됨"""
+        await self.setup_test_data()
+
+        communicator = WebsocketCommunicator(application, self.ws_url)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await communicator.send_json_to({'type': 'unsubscribe', 'conversation_ids': [str(self.other_conversation.id)]})
+
+        response = await communicator.receive_json_from()
+        self.assertEqual(response, {
+            'type': 'subscriptions',
+            'all': True,
+            'conversation_ids': [str(self.other_conversation.id)]
+        })
+
+        await self.send_message(self.other_conversation, self.user3, 'muted')
+
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'conversation_updated')
+        self.assertEqual(response['conversation_id'], str(self.other_conversation.id))
+        self.assertEqual(response['unread_count'], 1)
+        self.assertNotIn('message', response)
+
+        # 특정 대화만 받도록 전환
+        await communicator.send_json_to({'type': 'unsubscribe', 'all': True})
+        await communicator.receive_json_from()
+
+        await communicator.send_json_to({'type': 'subscribe', 'conversation_ids': [str(self.other_conversation.id)]})
+
+        response = await communicator.receive_json_from()
+        self.assertEqual(response, {
+            'type': 'subscriptions',
+            'all': False,
+            'conversation_ids': [str(self.other_conversation.id)]
+        })
+
+        await self.send_message(self.conversation, self.user2, 'not subscribed')
+        await self.send_message(self.other_conversation, self.user3, 'subscribed')
+
+        first = await communicator.receive_json_from()
+        second = await communicator.receive_json_from()
+
+        self.assertEqual(first['type'], 'conversation_updated')
+        self.assertEqual(second['type'], 'message')
+        self.assertEqual(second['message']['content']['text'], 'subscribed')
+
+        # 대화 목록 변경 이벤트는 subscribe 여부와 관계없이 전달됨
+        await database_sync_to_async(publish_conversation_event)(self.conversation.id, 'deleted', [self.user1.id])
+
+        response = await communicator.receive_json_from()
+        self.assertEqual(response, {
+            'type': 'conversation_event',
+            'conversation_id': str(self.conversation.id),
+            'event': 'deleted'
+        })
+
+        await communicator.disconnect()
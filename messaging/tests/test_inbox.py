@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from messaging.models import DirectMessageConversation, DirectMessageInboxEntry
+from messaging.services import send_direct_message
+from messaging.tasks import refresh_inbox_peer_snapshots
+from flitz.test_utils import create_test_user
+
+
+@mock.patch('messaging.services.send_direct_message_push_notification')
+@mock.patch('messaging.services.get_channel_layer')
+@mock.patch('messaging.services.async_to_sync')
+class DirectMessageInboxTests(APITestCase):
+    def setUp(self):
+        self.user1 = create_test_user(1)
+        self.user2 = create_test_user(2)
+        self.user3 = create_test_user(3)
+
+        self.conversation = DirectMessageConversation.create_conversation(self.user1, self.user2)
+        self.other_conversation = DirectMessageConversation.create_conversation(self.user1, self.user3)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user1)
+
+    def test_list_is_sorted_by_latest_message(self, *mocks):
+        with self.captureOnCommitCallbacks(execute=True):
+            (message, _) = send_direct_message(self.conversation.id, self.user2, {'type': 'text', 'text': 'hello'})
+
+        url = reverse('DirectMessageConversation-inbox')
+
+        # 대화 목록은 inbox row만 읽어야 함 (참여자 / 사용자 / 메시지를 JOIN하거나 따로 조회하지 않음)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.data['results']
+        self.assertEqual([result['id'] for result in results], [str(self.conversation.id), str(self.other_conversation.id)])
+
+        self.assertEqual(results[0]['peer']['id'], str(self.user2.id))
+        self.assertEqual(results[0]['peer']['display_name'], self.user2.display_name)
+        self.assertEqual(results[0]['latest_message']['id'], str(message.id))
+        self.assertEqual(results[0]['latest_message']['content'], {'type': 'text', 'text': 'hello'})
+
+        self.assertEqual(results[1]['peer']['id'], str(self.user3.id))
+        self.assertIsNone(results[1]['latest_message'])
+
+        # 다른 대화에 메시지가 오면 순서가 바뀌어야 함
+        with self.captureOnCommitCallbacks(execute=True):
+            send_direct_message(self.other_conversation.id, self.user3, {'type': 'text', 'text': 'hi'})
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['id'], str(self.other_conversation.id))
+
+    def test_list_keeps_conversation_shape(self, *mocks):
+        # 기존 대화 목록은 inbox가 아닌 대화 전체 (participants, read_at, 첨부파일 URL이 포함된 latest_message)를 반환해야 함
+        with self.captureOnCommitCallbacks(execute=True):
+            (message, _) = send_direct_message(self.conversation.id, self.user2, {'type': 'text', 'text': 'hello'})
+
+        response = self.client.get(reverse('DirectMessageConversation-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        conversation = next(result for result in response.data['results'] if result['id'] == str(self.conversation.id))
+
+        self.assertEqual(
+            {participant['user']['id'] for participant in conversation['participants']},
+            {str(self.user1.id), str(self.user2.id)}
+        )
+        self.assertTrue(all('read_at' in participant for participant in conversation['participants']))
+        self.assertEqual(conversation['latest_message']['id'], str(message.id))
+        self.assertNotIn('peer', conversation)
+
+    def test_send_refreshes_sender_snapshot(self, *mocks):
+        self.user2.display_name = 'renamed'
+        self.user2.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            send_direct_message(self.conversation.id, self.user2, {'type': 'text', 'text': 'hello'})
+
+        entry = DirectMessageInboxEntry.objects.get(user=self.user1, conversation=self.conversation)
+        self.assertEqual(entry.peer_snapshot['display_name'], 'renamed')
+
+        # 보낸 사람 자신의 row에 있는 상대방 정보는 그대로여야 함
+        entry = DirectMessageInboxEntry.objects.get(user=self.user2, conversation=self.conversation)
+        self.assertEqual(entry.peer_snapshot['id'], str(self.user1.id))
+
+    def test_refresh_peer_snapshots(self, *mocks):
+        self.user2.display_name = 'renamed'
+        self.user2.save()
+
+        refresh_inbox_peer_snapshots(str(self.user2.id))
+
+        entry = DirectMessageInboxEntry.objects.get(user=self.user1, conversation=self.conversation)
+        self.assertEqual(entry.peer_snapshot['display_name'], 'renamed')
+
+    def test_mark_as_read(self, *mocks):
+        DirectMessageInboxEntry.objects.filter(user=self.user1).update(unread_count=3)
+
+        with mock.patch('messaging.views.publish_read_event'):
+            response = self.client.post(reverse('DirectMessage-mark-as-read', args=[self.conversation.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        entry = DirectMessageInboxEntry.objects.get(user=self.user1, conversation=self.conversation)
+        self.assertEqual(entry.unread_count, 0)
+
+    def test_block_and_delete_remove_entries(self, *mocks):
+        response = self.client.put(reverse('User-dispatch-block-user', args=[self.user2.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertFalse(DirectMessageInboxEntry.objects.filter(conversation=self.conversation).exists())
+
+        response = self.client.delete(reverse('DirectMessageConversation-detail', args=[self.other_conversation.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get(reverse('DirectMessageConversation-inbox'))
+        self.assertEqual(response.data['results'], [])
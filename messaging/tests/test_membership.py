@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from messaging.membership import resolve_connection, conversation_membership
+from messaging.models import DirectMessageConversation, DirectMessageParticipant
+from user_auth.models import UserSession
+from user_auth.session_cache import session_cache
+from flitz.test_utils import create_test_user, create_test_user_with_session
+
+
+class ResolveConnectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user1, self.session1 = create_test_user_with_session(1)
+        self.user2 = create_test_user(2)
+
+        self.conversation = DirectMessageConversation.create_conversation(self.user1, self.user2)
+
+    def test_reconnect_does_not_query(self):
+        # 처음에는 세션과 참여자 목록을 하나의 쿼리로 가져옴
+        with self.assertNumQueries(1):
+            (session, participant_ids) = resolve_connection(self.session1.id, self.conversation.id)
+
+        self.assertEqual(session['user_id'], str(self.user1.id))
+        self.assertEqual(sorted(participant_ids), sorted([str(self.user1.id), str(self.user2.id)]))
+
+        with self.assertNumQueries(0):
+            (cached_session, cached_participant_ids) = resolve_connection(self.session1.id, self.conversation.id)
+
+        self.assertEqual(cached_session, session)
+        self.assertEqual(cached_participant_ids, participant_ids)
+
+        # 세션만 캐시되어 있는 경우에는 참여자 목록만 조회
+        other_conversation = DirectMessageConversation.create_conversation(self.user1, create_test_user(3))
+
+        with self.assertNumQueries(1):
+            (session, participant_ids) = resolve_connection(self.session1.id, other_conversation.id)
+
+        self.assertIsNotNone(session)
+        self.assertIn(str(self.user1.id), participant_ids)
+
+    def test_invalid_session(self):
+        (session, _) = resolve_connection('not-a-session', self.conversation.id)
+        self.assertIsNone(session)
+
+        UserSession.objects.filter(id=self.session1.id).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        (session, participant_ids) = resolve_connection(self.session1.id, self.conversation.id)
+        self.assertIsNone(session)
+
+        # 세션이 유효하지 않아도 참여자 목록은 캐시됨
+        self.assertEqual(len(participant_ids), 2)
+
+    def test_invalidation(self):
+        resolve_connection(self.session1.id, self.conversation.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSession.objects.filter(id=self.session1.id).update(invalidated_at=timezone.now())
+            session_cache.invalidate_user_on_commit(self.user1.id)
+
+        (session, _) = resolve_connection(self.session1.id, self.conversation.id)
+        self.assertIsNone(session)
+
+        session = UserSession.objects.create(user=self.user1, description='test', initiated_from='127.0.0.1')
+
+        (new_session, _) = resolve_connection(session.id)
+        self.assertEqual(new_session['user_id'], str(self.user1.id))
+
+        # 대화를 삭제하면 참여자 목록 캐시도 지워져야 함
+        client = APIClient()
+        client.force_authenticate(user=self.user1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.delete(reverse('DirectMessageConversation-detail', args=[self.conversation.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        (_, participant_ids) = resolve_connection(session.id, self.conversation.id)
+        self.assertEqual(participant_ids, [])
+
+    def test_participant_ids_are_cached(self):
+        conversation_membership.participant_ids(self.conversation.id)
+
+        with self.assertNumQueries(0):
+            participant_ids = conversation_membership.participant_ids(self.conversation.id)
+
+        self.assertEqual(len(participant_ids), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DirectMessageParticipant.objects.filter(user=self.user2).update(deleted_at=timezone.now())
+            conversation_membership.invalidate_on_commit([self.conversation.id])
+
+        self.assertEqual(conversation_membership.participant_ids(self.conversation.id), [str(self.user1.id)])
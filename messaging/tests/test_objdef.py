@@ -1,8 +1,9 @@
 from django.test import TestCase
 
-from dacite import from_dict
+from dacite import from_dict, DaciteError
 
-from messaging.objdef import DirectMessageContent, load_direct_message_content
+from messaging.objdef import DirectMessageContent, DirectMessageTextContent, DirectMessageAttachmentContent, \
+    load_direct_message_content
 
 class MessagingObjdefTestCase(TestCase):
 
@@ -45,3 +46,45 @@ class MessagingObjdefTestCase(TestCase):
 
         with self.assertRaises(ValueError):
             load_direct_message_content(attachment_content_dict)
+
+    def test_load_direct_message_content_matches_dacite(self):
+        """load_direct_message_content()가 dacite.from_dict()와 같은 결과 / 예외를 반환하는지 테스트합니다."""
+        attachment_content_dict = {
+            "type": "attachment",
+            "attachment_type": "image",
+            "attachment_id": "1234-1234-1234",
+
+            "width": 720,
+            "height": 1280,
+
+            "public_url": "https://example.com/image.jpg",
+        }
+
+        attachment_content = load_direct_message_content(attachment_content_dict)
+
+        self.assertEqual(attachment_content, from_dict(data_class=DirectMessageAttachmentContent, data=attachment_content_dict))
+        self.assertIsNone(attachment_content.thumbnail_url)
+
+        # as_dict() 결과를 다시 읽었을 때 같은 객체가 되어야 함 (round-trip)
+        self.assertEqual(load_direct_message_content(attachment_content.as_dict()), attachment_content)
+
+        text_content = DirectMessageTextContent(type="text", text="Hello, World!")
+        self.assertEqual(load_direct_message_content(text_content.as_dict()), text_content)
+
+        invalid_dicts = [
+            (DirectMessageTextContent, { "type": "text" }),
+            (DirectMessageTextContent, { "type": "text", "text": None }),
+            (DirectMessageAttachmentContent, { **attachment_content_dict, "width": "720" }),
+            (DirectMessageAttachmentContent, { **attachment_content_dict, "thumbnail_url": 1 }),
+        ]
+
+        for (data_class, content_dict) in invalid_dicts:
+            with self.subTest(content_dict=content_dict):
+                with self.assertRaises(DaciteError) as expected:
+                    from_dict(data_class=data_class, data=content_dict)
+
+                with self.assertRaises(DaciteError) as actual:
+                    load_direct_message_content(content_dict)
+
+                self.assertIs(type(actual.exception), type(expected.exception))
+                self.assertEqual(actual.exception.field_path, expected.exception.field_path)
@@ -0,0 +1,167 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from messaging.models import DirectMessageConversation, DirectMessage, MessageSearchDocument
+from messaging.search import prefix_tsquery
+from messaging.services import send_direct_message
+from flitz.test_utils import create_test_user
+
+
+@mock.patch('messaging.services.send_direct_message_push_notification')
+@mock.patch('messaging.services.get_channel_layer')
+@mock.patch('messaging.services.async_to_sync')
+class DirectMessageSearchTests(APITestCase):
+    def setUp(self):
+        self.user1 = create_test_user(1)
+        self.user2 = create_test_user(2)
+        self.user3 = create_test_user(3)
+
+        self.conversation = DirectMessageConversation.create_conversation(self.user1, self.user2)
+        self.other_conversation = DirectMessageConversation.create_conversation(self.user1, self.user3)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user1)
+
+        self.url = reverse('DirectMessageConversation-search')
+
+    def send(self, conversation, sender, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            (message, _) = send_direct_message(conversation.id, sender, {'type': 'text', 'text': text})
+
+        return message
+
+    def test_search(self, *mocks):
+        first = self.send(self.conversation, self.user2, '내일 Coffee 어때요?')
+        second = self.send(self.other_conversation, self.user3, 'coffee 좋아요')
+        self.send(self.conversation, self.user1, '좋아요')
+
+        deleted = self.send(self.conversation, self.user1, 'coffee 말고 차')
+        DirectMessage.objects.filter(id=deleted.id).update(deleted_at=deleted.created_at)
+
+        # 참여하지 않은 대화의 메시지는 검색되지 않아야 함
+        self.send(DirectMessageConversation.create_conversation(self.user2, self.user3), self.user2, 'coffee')
+
+        response = self.client.get(self.url, {'q': 'coffee'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted((result['conversation_id'], result['id']) for result in response.data['results']),
+            sorted([(str(self.conversation.id), str(first.id)), (str(self.other_conversation.id), str(second.id))])
+        )
+        self.assertFalse(response.data['has_more'])
+
+    def test_pagination(self, *mocks):
+        messages = [self.send(self.conversation, self.user2, f'hello {index}') for index in range(3)]
+
+        with mock.patch('messaging.search.PAGE_SIZE', 2):
+            response = self.client.get(self.url, {'q': 'hello'})
+
+            self.assertTrue(response.data['has_more'])
+            found = [result['id'] for result in response.data['results']]
+
+            response = self.client.get(self.url, {'q': 'hello', 'cursor': response.data['cursor']})
+
+        self.assertFalse(response.data['has_more'])
+        found += [result['id'] for result in response.data['results']]
+
+        self.assertEqual(sorted(found), sorted(str(message.id) for message in messages))
+
+    def test_search_matches_word_prefix(self, *mocks):
+        # 한국어는 조사가 붙은 형태 ('친구가')로 저장되므로, 단어의 앞부분으로도 검색되어야 함
+        matched = self.send(self.conversation, self.user2, '친구가 coffee 사 왔어요')
+        self.send(self.conversation, self.user2, '친구가 차를 사 왔어요')
+
+        response = self.client.get(self.url, {'q': '친구 coffee'})
+
+        self.assertEqual([result['id'] for result in response.data['results']], [str(matched.id)])
+
+    def test_invalid_request(self, *mocks):
+        response = self.client.get(self.url, {'q': ' '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['reason'], 'fz.messaging.invalid_query')
+
+        response = self.client.get(self.url, {'q': 'hello', 'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['reason'], 'fz.messaging.invalid_cursor')
+
+
+class PrefixTSQueryTestCase(SimpleTestCase):
+    def test_prefix_tsquery(self):
+        self.assertEqual(prefix_tsquery(' 친구  coffee '), "'친구':* & 'coffee':*")
+
+    def test_operators_are_quoted(self):
+        # to_tsquery의 연산자나 따옴표가 검색어에 있어도 문법 오류가 나지 않아야 함
+        self.assertEqual(prefix_tsquery("it's !a|b"), "'it''s':* & '!a|b':*")
+        self.assertEqual(prefix_tsquery('a\\b'), "'a\\\\b':*")
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL 전문 검색의 동작을 확인합니다')
+class PrefixTSQuerySemanticsTestCase(TestCase):
+    """
+    'simple' 설정에서 to_tsvector / to_tsquery가 한국어를 어떻게 다루는지 보여줍니다.
+    """
+
+    def matches(self, text: str, query: str) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT to_tsvector(%s::regconfig, %s) @@ to_tsquery(%s::regconfig, %s)',
+                [MessageSearchDocument.SEARCH_CONFIG, text, MessageSearchDocument.SEARCH_CONFIG, query]
+            )
+
+            return cursor.fetchone()[0]
+
+    def test_particles(self):
+        # 조사가 분리되지 않으므로 ('친구가'가 하나의 lexeme) 단어 전체로는 일치하지 않음
+        self.assertFalse(self.matches('친구가 왔어요', "'친구'"))
+
+        # 접두사 검색으로는 일치함
+        self.assertTrue(self.matches('친구가 왔어요', prefix_tsquery('친구')))
+        self.assertTrue(self.matches('Coffee 마실래요?', prefix_tsquery('coffee 마실')))
+        self.assertFalse(self.matches('친구가 왔어요', prefix_tsquery('친구 coffee')))
+
+    def test_quoted_operators(self):
+        # 연산자 / 따옴표가 포함된 검색어도 문법 오류 없이 실행되어야 함
+        self.assertFalse(self.matches('hello', prefix_tsquery("it's !a|b")))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL의 ts_rank로 정렬한 커서 페이지네이션을 확인합니다')
+class PostgreSQLSearchPaginationTestCase(TestCase):
+    @mock.patch('messaging.services.send_direct_message_push_notification')
+    @mock.patch('messaging.services.get_channel_layer')
+    @mock.patch('messaging.services.async_to_sync')
+    def test_pagination_has_no_duplicates_or_gaps(self, *mocks):
+        from messaging.search import search_messages
+
+        user1 = create_test_user(1)
+        user2 = create_test_user(2)
+        conversation = DirectMessageConversation.create_conversation(user1, user2)
+
+        # 같은 rank (동점)와 서로 다른 rank가 섞이도록 보냅니다
+        texts = ['coffee'] * 4 + ['coffee coffee'] * 3 + ['coffee 말고 차', 'coffee coffee coffee', '오늘 coffee 어때요?']
+        messages = []
+
+        for text in texts:
+            with self.captureOnCommitCallbacks(execute=True):
+                (message, _) = send_direct_message(conversation.id, user2, {'type': 'text', 'text': text})
+
+            messages.append(message)
+
+        found = []
+        cursor = None
+
+        while True:
+            result = search_messages(user1, 'coffee', cursor=cursor, limit=3)
+            found += [item['id'] for item in result['results']]
+
+            if not result['has_more']:
+                break
+
+            cursor = result['cursor']
+
+        self.assertEqual(len(found), len(set(found)))
+        self.assertEqual(sorted(found), sorted(str(message.id) for message in messages))
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from messaging.models import DirectMessageConversation, DirectMessageParticipant, DirectMessage
+from messaging.services import send_direct_message, ConversationNotJoined
+from messaging.unread import unread_counters
+from flitz.test_utils import create_test_user
+
+
+@mock.patch('messaging.services.send_direct_message_push_notification')
+@mock.patch('messaging.services.get_channel_layer')
+@mock.patch('messaging.services.async_to_sync')
+class SendDirectMessageTests(APITestCase):
+    def setUp(self):
+        self.user1 = create_test_user(1)
+        self.user2 = create_test_user(2)
+        self.user3 = create_test_user(3)
+
+        self.conversation = DirectMessageConversation.create_conversation(self.user1, self.user2)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user1)
+
+    def test_send_updates_conversation(self, mock_async_to_sync, mock_get_channel_layer, mock_push_task):
+        with self.captureOnCommitCallbacks(execute=True):
+            (message, message_data) = send_direct_message(
+                self.conversation.id, self.user1, {'type': 'text', 'text': 'hello'}
+            )
+
+        self.assertEqual(message_data['id'], str(message.id))
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.latest_message_id, message.id)
+
+        # 읽지 않은 메시지 수는 캐시에만 누적됨 (DB에는 reconcile_unread_counts가 반영)
+        self.assertEqual(unread_counters.counts(self.user2.id), {str(self.conversation.id): 1})
+        self.assertEqual(unread_counters.counts(self.user1.id).get(str(self.conversation.id), 0), 0)
+
+        # 실시간 이벤트 (대화방 그룹 + 참여자별 사용자 그룹) / 푸시 알림은 커밋된 후 한 번씩 발송되어야 함
+        self.assertEqual(mock_async_to_sync.return_value.call_count, 3)
+        mock_push_task.delay.assert_called_once_with(str(message.id))
+
+    def test_fan_out_waits_for_commit(self, mock_async_to_sync, mock_get_channel_layer, mock_push_task):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            send_direct_message(self.conversation.id, self.user1, {'type': 'text', 'text': 'hello'})
+
+        self.assertEqual(len(callbacks), 1)
+        mock_async_to_sync.assert_not_called()
+        mock_push_task.delay.assert_not_called()
+
+    def test_not_joined(self, mock_async_to_sync, mock_get_channel_layer, mock_push_task):
+        with self.assertRaises(ConversationNotJoined):
+            send_direct_message(self.conversation.id, self.user3, {'type': 'text', 'text': 'hello'})
+
+        DirectMessageParticipant.objects.filter(conversation=self.conversation, user=self.user2).delete()
+
+        with self.assertRaises(ConversationNotJoined):
+            send_direct_message(self.conversation.id, self.user2, {'type': 'text', 'text': 'hello'})
+
+        self.assertFalse(DirectMessage.objects.filter(conversation=self.conversation).exists())
+
+        # 참여하지 않은 대화에는 API로도 메시지를 보낼 수 없어야 함
+        self.client.force_authenticate(user=self.user3)
+
+        response = self.client.post(
+            reverse('DirectMessage-list', args=[self.conversation.id]),
+            {'content': {'type': 'text', 'text': 'hello'}},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_query_budget(self, mock_async_to_sync, mock_get_channel_layer, mock_push_task):
+        url = reverse('DirectMessage-list', args=[self.conversation.id])
+        data = {'content': {'type': 'text', 'text': 'hello'}}
+
+        # SAVEPOINT / RELEASE + 참여 확인을 겸한 INSERT + 대화 UPDATE + 대화 목록 (inbox) UPDATE
+        # (읽지 않은 메시지 수는 커밋 후 캐시에서 갱신)
+        with self.assertNumQueries(5):
+            response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # 잘못된 메시지 내용은 저장되지 않아야 함
+        response = self.client.post(url, {'content': {'type': 'unknown'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
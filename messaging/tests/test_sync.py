@@ -0,0 +1,157 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from messaging.models import DirectMessageConversation
+from messaging.services import send_direct_message
+from messaging.sync import decode_cursor
+from flitz.test_utils import create_test_user
+
+
+@mock.patch('messaging.services.send_direct_message_push_notification')
+@mock.patch('messaging.services.get_channel_layer')
+@mock.patch('messaging.services.async_to_sync')
+class DirectMessageSyncTests(APITestCase):
+    def setUp(self):
+        self.user1 = create_test_user(1)
+        self.user2 = create_test_user(2)
+        self.user3 = create_test_user(3)
+
+        self.conversation = DirectMessageConversation.create_conversation(self.user1, self.user2)
+        self.other_conversation = DirectMessageConversation.create_conversation(self.user1, self.user3)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user1)
+
+        self.url = reverse('DirectMessage-sync', args=[self.conversation.id])
+
+    def send(self, conversation, sender, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            (message, _) = send_direct_message(conversation.id, sender, {'type': 'text', 'text': text})
+
+        return message
+
+    def test_changes_since_cursor(self, *mocks):
+        start = timezone.now()
+
+        with freeze_time(start):
+            first = self.send(self.conversation, self.user1, 'first')
+            second = self.send(self.conversation, self.user2, 'second')
+
+        with freeze_time(start + timedelta(minutes=1)):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([message['id'] for message in response.data['messages']], [str(first.id), str(second.id)])
+        self.assertEqual(response.data['tombstones'], [])
+        self.assertFalse(response.data['has_more'])
+
+        cursor = response.data['cursor']
+
+        # 메시지 삭제 / 새 메시지 / 읽음 상태 변경은 다음 동기화에서 한 번에 전달되어야 함
+        with freeze_time(start + timedelta(minutes=2)):
+            response = self.client.delete(reverse('DirectMessage-detail', args=[self.conversation.id, first.id]))
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+            third = self.send(self.conversation, self.user2, 'third')
+
+            self.client.force_authenticate(user=self.user2)
+
+            with mock.patch('messaging.views.publish_read_event'):
+                self.client.post(reverse('DirectMessage-mark-as-read', args=[self.conversation.id]))
+
+            self.client.force_authenticate(user=self.user1)
+
+        with freeze_time(start + timedelta(minutes=3)):
+            response = self.client.get(self.url, {'cursor': cursor})
+
+        self.assertEqual([message['id'] for message in response.data['messages']], [str(third.id)])
+        self.assertEqual([tombstone['id'] for tombstone in response.data['tombstones']], [str(first.id)])
+        self.assertEqual([state['user_id'] for state in response.data['read_states']], [str(self.user2.id)])
+
+        # 이미 받은 변경은 다시 전달되지 않아야 함
+        with freeze_time(start + timedelta(minutes=4)):
+            response = self.client.get(self.url, {'cursor': response.data['cursor']})
+
+        self.assertEqual(response.data['messages'], [])
+        self.assertEqual(response.data['tombstones'], [])
+        self.assertEqual(response.data['read_states'], [])
+
+    def test_recent_changes_are_returned_again(self, *mocks):
+        # 커밋이 늦어질 수 있는 최근 변경은 다음 동기화에서도 다시 전달되어야 함
+        message = self.send(self.conversation, self.user2, 'hello')
+
+        response = self.client.get(self.url)
+        response = self.client.get(self.url, {'cursor': response.data['cursor']})
+
+        self.assertEqual([message['id'] for message in response.data['messages']], [str(message.id)])
+
+    def test_pagination(self, *mocks):
+        start = timezone.now() - timedelta(minutes=1)
+
+        with freeze_time(start):
+            messages = [self.send(self.conversation, self.user2, str(index)) for index in range(3)]
+
+        with mock.patch('messaging.sync.PAGE_SIZE', 2):
+            response = self.client.get(self.url)
+            self.assertTrue(response.data['has_more'])
+            self.assertEqual(len(response.data['messages']), 2)
+
+            response = self.client.get(self.url, {'cursor': response.data['cursor']})
+
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual([message['id'] for message in response.data['messages']], [str(messages[2].id)])
+
+    def test_pagination_does_not_pass_recent_changes(self, *mocks):
+        # 페이지를 넘기는 동안에는 안정된 변경만 읽고, 최근 변경은 마지막 페이지에서만 전달되어야 함
+        with freeze_time(timezone.now() - timedelta(minutes=1)):
+            settled = [self.send(self.conversation, self.user2, str(index)) for index in range(3)]
+
+        recent = [self.send(self.conversation, self.user2, f'recent {index}') for index in range(2)]
+
+        with mock.patch('messaging.sync.PAGE_SIZE', 2):
+            response = self.client.get(self.url)
+            self.assertTrue(response.data['has_more'])
+            self.assertEqual([message['id'] for message in response.data['messages']], [str(message.id) for message in settled[:2]])
+
+            response = self.client.get(self.url, {'cursor': response.data['cursor']})
+            self.assertFalse(response.data['has_more'])
+            self.assertEqual([message['id'] for message in response.data['messages']], [str(settled[2].id), str(recent[0].id)])
+
+            # 커서는 최근 변경 이전까지만 전진하므로 최근 변경은 다시 전달되어야 함
+            (cursor_updated_at, _) = decode_cursor(response.data['cursor'])
+            self.assertLess(cursor_updated_at, recent[0].updated_at)
+
+            response = self.client.get(self.url, {'cursor': response.data['cursor']})
+            self.assertFalse(response.data['has_more'])
+            self.assertEqual([message['id'] for message in response.data['messages']], [str(message.id) for message in recent])
+
+    def test_user_sync(self, *mocks):
+        first = self.send(self.conversation, self.user2, 'hello')
+        second = self.send(self.other_conversation, self.user3, 'hi')
+
+        # 참여하지 않은 대화의 메시지는 포함되지 않아야 함
+        self.send(DirectMessageConversation.create_conversation(self.user2, self.user3), self.user2, 'hidden')
+
+        response = self.client.get(reverse('DirectMessageConversation-sync'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(message['conversation_id'], message['id']) for message in response.data['messages']],
+            [(str(self.conversation.id), str(first.id)), (str(self.other_conversation.id), str(second.id))]
+        )
+
+    def test_invalid_request(self, *mocks):
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['reason'], 'fz.messaging.invalid_cursor')
+
+        self.client.force_authenticate(user=self.user3)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,128 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from messaging.models import DirectMessageConversation, DirectMessageParticipant
+from messaging.services import send_direct_message
+from messaging.tasks import reconcile_unread_counts
+from messaging.unread import LocalUnreadCounterStore, UnreadCounters, TOTAL_FIELD
+from flitz.test_utils import create_test_user
+
+
+class LocalUnreadCounterStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.store = LocalUnreadCounterStore()
+
+    def test_increment_requires_loaded_hash(self):
+        # 해시가 없는 상태에서 일부 대화만 누적되면 합계가 틀어지므로 갱신하지 않아야 함
+        self.assertEqual(self.store.increment(['user-a'], 'conversation-1'), {'user-a': None})
+        self.assertIsNone(self.store.get_total('user-a'))
+
+        self.store.load('user-a', {'conversation-1': 2, 'conversation-2': 1})
+        self.assertEqual(self.store.increment(['user-a'], 'conversation-1'), {'user-a': 3})
+        self.assertEqual(self.store.get_total('user-a'), 4)
+
+        # 이미 있는 해시는 다시 load해도 덮어쓰지 않아야 함
+        self.store.load('user-a', {})
+        self.assertEqual(self.store.get_total('user-a'), 4)
+
+    def test_reset(self):
+        self.store.load('user-a', {'conversation-1': 2, 'conversation-2': 1})
+        self.assertEqual(self.store.pop_dirty(10), [])
+
+        self.store.reset('user-a', 'conversation-1')
+
+        self.assertEqual(self.store.get('user-a'), {'conversation-1': 0, 'conversation-2': 1, TOTAL_FIELD: 1})
+        self.assertEqual(self.store.pop_dirty(10), ['user-a'])
+        self.assertEqual(self.store.pop_dirty(10), [])
+
+
+@mock.patch('messaging.services.send_direct_message_push_notification')
+@mock.patch('messaging.services.get_channel_layer')
+@mock.patch('messaging.services.async_to_sync')
+class UnreadCountersTests(APITestCase):
+    def setUp(self):
+        self.counters = UnreadCounters(store=LocalUnreadCounterStore())
+
+        patcher = mock.patch('messaging.services.unread_counters', self.counters)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch('messaging.views.unread_counters', self.counters)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user1 = create_test_user(1)
+        self.user2 = create_test_user(2)
+        self.user3 = create_test_user(3)
+
+        self.conversation = DirectMessageConversation.create_conversation(self.user1, self.user2)
+        self.other_conversation = DirectMessageConversation.create_conversation(self.user3, self.user2)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user2)
+
+    def send(self, conversation, sender, count=1):
+        for _ in range(count):
+            with self.captureOnCommitCallbacks(execute=True):
+                send_direct_message(conversation.id, sender, {'type': 'text', 'text': 'hello'})
+
+    def test_badge_does_not_query_database(self, *mocks):
+        # 캐시에 없던 사용자는 DB에 저장된 값에서 시작해야 함
+        DirectMessageParticipant.objects.filter(conversation=self.conversation, user=self.user2).update(unread_count=2)
+
+        self.send(self.conversation, self.user1, 3)
+        self.send(self.other_conversation, self.user3)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('DirectMessageConversation-total-unread-count'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_unread_count'], 6)
+
+        # 대화 목록에는 캐시의 값이 표시되어야 함
+        response = self.client.get(reverse('DirectMessageConversation-list'))
+
+        unread_counts = {
+            conversation['id']: next(
+                participant['unread_count'] for participant in conversation['participants']
+                if participant['user']['id'] == str(self.user2.id)
+            )
+            for conversation in response.data['results']
+        }
+        self.assertEqual(unread_counts, {str(self.conversation.id): 5, str(self.other_conversation.id): 1})
+
+        response = self.client.get(reverse('DirectMessageConversation-inbox'))
+
+        unread_counts = {
+            conversation['id']: conversation['unread_count'] for conversation in response.data['results']
+        }
+        self.assertEqual(unread_counts, {str(self.conversation.id): 5, str(self.other_conversation.id): 1})
+
+        # 읽음 처리하면 해당 대화의 수만큼 전체 수가 줄어들어야 함
+        with mock.patch('messaging.views.publish_read_event'):
+            response = self.client.post(reverse('DirectMessage-mark-as-read', args=[self.conversation.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.counters.total(self.user2.id), 1)
+
+    def test_reconcile(self, *mocks):
+        self.send(self.conversation, self.user1, 2)
+        self.send(self.other_conversation, self.user3)
+
+        # reconcile 전에는 DB에 반영되지 않아야 함
+        participant = DirectMessageParticipant.objects.get(conversation=self.conversation, user=self.user2)
+        self.assertEqual(participant.unread_count, 0)
+
+        with mock.patch('messaging.tasks.unread_counters', self.counters):
+            reconcile_unread_counts()
+
+        unread_counts = dict(
+            DirectMessageParticipant.objects.filter(user=self.user2).values_list('conversation_id', 'unread_count')
+        )
+        self.assertEqual(unread_counts, {self.conversation.id: 2, self.other_conversation.id: 1})
+
+        self.assertEqual(self.counters.reconcile(), 0)
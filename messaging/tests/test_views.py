@@ -79,9 +79,10 @@ class DirectMessageViewSetTests(APITestCase):
         self.client = APIClient()
         self.client.force_authenticate(user=self.user1)
     
-    @mock.patch('messaging.views.get_channel_layer')
-    @mock.patch('messaging.views.async_to_sync')
-    def test_create_message(self, mock_async_to_sync, mock_get_channel_layer):
+    @mock.patch('messaging.services.send_direct_message_push_notification')
+    @mock.patch('messaging.services.get_channel_layer')
+    @mock.patch('messaging.services.async_to_sync')
+    def test_create_message(self, mock_async_to_sync, mock_get_channel_layer, mock_push_task):
         """메시지 생성 API 테스트 및 실시간 이벤트 발송 테스트"""
         # 채널 레이어 모킹
         mock_channel_layer = mock.MagicMock()
@@ -97,14 +98,17 @@ class DirectMessageViewSetTests(APITestCase):
             }
         }
         
-        response = self.client.post(url, data, format='json')
+        # 실시간 이벤트는 트랜잭션이 커밋된 후 발송됨
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['content']['text'], 'Test message via API')
+        mock_push_task.delay.assert_called_once_with(response.data['id'])
         
-        # 실시간 이벤트 발송 확인
-        mock_group_send.assert_called_once()
-        call_args = mock_group_send.call_args[0]
+        # 실시간 이벤트 발송 확인 (대화방 그룹 + 두 참여자의 사용자 그룹)
+        self.assertEqual(mock_group_send.call_count, 3)
+        call_args = mock_group_send.call_args_list[0][0]
         
         # 대화방 ID 확인
         self.assertEqual(call_args[0], f'direct_message_{self.conversation.id}')
@@ -114,6 +118,12 @@ class DirectMessageViewSetTests(APITestCase):
         self.assertEqual(event_data['type'], 'dm_message')
         self.assertEqual(event_data['message']['sender'], str(self.user1.id))
         self.assertEqual(event_data['message']['content']['text'], 'Test message via API')
+
+        # 받는 사람의 사용자 그룹에는 대화 ID와 갱신된 unread_count가 함께 전달됨
+        user_events = {args[0]: args[1] for (args, _) in mock_group_send.call_args_list[1:]}
+        self.assertEqual(user_events[f'user_{self.user2.id}']['conversation_id'], str(self.conversation.id))
+        self.assertEqual(user_events[f'user_{self.user2.id}']['unread_count'], 1)
+        self.assertEqual(user_events[f'user_{self.user1.id}']['unread_count'], 0)
     
     def test_list_messages(self):
         """메시지 목록 조회 API 테스트"""
@@ -134,16 +144,9 @@ class DirectMessageViewSetTests(APITestCase):
         self.assertGreaterEqual(len(results), 1)
         self.assertEqual(results[0]['content']['text'], 'Test message')
     
-    @mock.patch('messaging.views.get_channel_layer')
-    @mock.patch('messaging.views.async_to_sync')
-    def test_mark_as_read(self, mock_async_to_sync, mock_get_channel_layer):
+    @mock.patch('messaging.views.publish_read_event')
+    def test_mark_as_read(self, mock_publish_read_event):
         """읽음 표시 API 테스트 및 실시간 이벤트 발송 테스트"""
-        # 채널 레이어 모킹
-        mock_channel_layer = mock.MagicMock()
-        mock_get_channel_layer.return_value = mock_channel_layer
-        mock_group_send = mock.MagicMock()
-        mock_async_to_sync.return_value = mock_group_send
-        
         url = reverse('DirectMessage-mark-as-read', args=[self.conversation.id])
         response = self.client.post(url)
         
@@ -157,13 +160,9 @@ class DirectMessageViewSetTests(APITestCase):
         self.assertIsNotNone(participant.read_at)
         
         # 실시간 이벤트 발송 확인
-        mock_group_send.assert_called_once()
-        call_args = mock_group_send.call_args[0]
-        
-        # 이벤트 데이터 확인
-        event_data = call_args[1]
-        self.assertEqual(event_data['type'], 'dm_read_event')
-        self.assertEqual(event_data['user_id'], str(self.user1.id))
+        mock_publish_read_event.assert_called_once_with(
+            self.conversation.id, self.user1.id, participant.read_at.isoformat()
+        )
     
     def test_delete_message(self):
         """메시지 삭제 API 테스트"""
@@ -175,7 +174,10 @@ class DirectMessageViewSetTests(APITestCase):
         )
         
         url = reverse('DirectMessage-detail', args=[self.conversation.id, message.id])
-        response = self.client.delete(url)
+
+        with mock.patch('messaging.views.publish_conversation_event') as publish_conversation_event, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url)
         
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         
@@ -183,6 +185,9 @@ class DirectMessageViewSetTests(APITestCase):
         message.refresh_from_db()
         self.assertIsNotNone(message.deleted_at)
 
+        # 메시지 삭제는 대화 삭제 이벤트를 발송하지 않아야 함
+        publish_conversation_event.assert_not_called()
+
 
 class DirectMessageAttachmentViewSetTests(APITestCase):
     def setUp(self):
@@ -196,47 +201,199 @@ class DirectMessageAttachmentViewSetTests(APITestCase):
         self.client = APIClient()
         self.client.force_authenticate(user=self.user1)
     
-    @mock.patch('messaging.views.generate_thumbnail')
-    @mock.patch('messaging.views.get_channel_layer')
-    @mock.patch('messaging.views.async_to_sync')
-    def test_upload_attachment(self, mock_async_to_sync, mock_get_channel_layer, 
-                               mock_generate_thumbnail):
+    def patch_storage(self):
+        from django.core.files.storage import InMemoryStorage
+
+        storage = InMemoryStorage(base_url='/media/')
+
+        for field_name in ('object', 'thumbnail', 'source'):
+            patcher = mock.patch.object(DirectMessageAttachment._meta.get_field(field_name), 'storage', storage)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        return storage
+
+    def create_test_image(self, name='test_image.png', size=(1600, 2400)):
+        from io import BytesIO
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new('RGB', size).save(buffer, format='PNG')
+
+        return SimpleUploadedFile(name=name, content=buffer.getvalue(), content_type='image/png')
+
+    @mock.patch('messaging.services.send_direct_message_push_notification')
+    @mock.patch('messaging.services.get_channel_layer')
+    @mock.patch('messaging.services.async_to_sync')
+    def test_upload_attachment(self, mock_async_to_sync, mock_get_channel_layer, mock_push_task):
         """첨부파일 업로드 API 테스트 및 실시간 이벤트 발송 테스트"""
+        from flitz import tasks as flitz_tasks
+        from messaging.tasks import process_direct_message_attachment
+
+        storage = self.patch_storage()
+
         # 채널 레이어 모킹
         mock_channel_layer = mock.MagicMock()
         mock_get_channel_layer.return_value = mock_channel_layer
         mock_group_send = mock.MagicMock()
         mock_async_to_sync.return_value = mock_group_send
-        
-        # 썸네일 생성 모킹 - 실제 파일 객체 반환
-        from io import BytesIO
-        from django.core.files.base import ContentFile
-        thumbnail_content = BytesIO(b'fake thumbnail content')
-        mock_generate_thumbnail.return_value = (ContentFile(thumbnail_content.getvalue(), name='thumbnail.jpg'), (1280, 1280))
-        
-        # 테스트 이미지 파일 생성
-        from django.core.files.uploadedfile import SimpleUploadedFile
-        test_image = SimpleUploadedFile(
-            name='test_image.jpg',
-            content=b'fake image content',
-            content_type='image/jpeg'
-        )
-        
+
         url = reverse('DirectMessageAttachments-list', args=[self.conversation.id])
-        data = {'file': test_image}
-        
-        response = self.client.post(url, data, format='multipart')
-        
+        data = {'file': self.create_test_image()}
+
+        # 요청 안에서는 원본만 저장하고, 이미지 처리는 커밋 후 Celery 작업으로 넘겨야 함
+        with mock.patch('messaging.views.generate_thumbnail', create=True) as mock_generate_thumbnail, \
+                mock.patch.object(process_direct_message_attachment, 'delay_on_commit') as mock_process:
+            response = self.client.post(url, data, format='multipart')
+
         # 상태 코드 확인
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        
-        # 첨부파일 메시지 이벤트 발송 확인
-        mock_group_send.assert_called_once()
-        call_args = mock_group_send.call_args[0]
-        
+        mock_generate_thumbnail.assert_not_called()
+
+        self.assertEqual(response.data['content']['status'], 'pending')
+        self.assertEqual((response.data['content']['width'], response.data['content']['height']), (1600, 2400))
+        self.assertIsNone(response.data['content']['public_url'])
+
+        # 첨부파일 메시지 이벤트 발송 확인 (대화방 그룹 + 두 참여자의 사용자 그룹)
+        self.assertEqual(mock_group_send.call_count, 3)
+        call_args = mock_group_send.call_args_list[0][0]
+
         # 이벤트 데이터 확인
         event_data = call_args[1]
         self.assertEqual(event_data['type'], 'dm_message')
-        
-        # 썸네일 생성 함수 호출 확인
-        mock_generate_thumbnail.assert_called_once()
+
+        attachment = DirectMessageAttachment.objects.get(id=response.data['content']['attachment_id'])
+        source_name = attachment.source.name
+
+        self.assertEqual(attachment.status, DirectMessageAttachment.ProcessingStatus.PENDING)
+        self.assertTrue(storage.exists(source_name))
+        mock_process.assert_called_once_with(str(attachment.id))
+
+        # 작업이 썸네일을 만들고, 원본을 삭제한 뒤 message_updated 이벤트를 발송해야 함
+        mock_group_send.reset_mock()
+
+        with mock.patch.object(flitz_tasks.generate_image_derivatives, 'delay_on_commit'), \
+                self.captureOnCommitCallbacks(execute=True):
+            process_direct_message_attachment(str(attachment.id))
+
+        attachment.refresh_from_db()
+
+        self.assertEqual(attachment.status, DirectMessageAttachment.ProcessingStatus.READY)
+        self.assertEqual((attachment.width, attachment.height), (853, 1280))
+        self.assertFalse(attachment.source)
+        self.assertFalse(storage.exists(source_name))
+        self.assertTrue(storage.exists(attachment.object.name))
+
+        message = DirectMessage.objects.get(id=response.data['id'])
+        self.assertEqual(message.content['status'], 'ready')
+        self.assertIsNotNone(message.content['public_url'])
+
+        self.assertEqual(mock_group_send.call_count, 3)
+        self.assertEqual(mock_group_send.call_args_list[0][0][1]['type'], 'dm_message_updated')
+
+        # 파생 이미지 생성이 실패하면 manifest가 pending 상태로 남지 않아야 함
+        self.assertEqual(attachment.derivatives['status'], 'pending')
+
+        with mock.patch('flitz.tasks.build_derivatives', side_effect=RuntimeError('unexpected')):
+            flitz_tasks.generate_image_derivatives.apply(args=(
+                'messaging.DirectMessageAttachment', str(attachment.id), 'object', 'derivatives', attachment.object.name,
+            ))
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.derivatives['status'], 'failed')
+
+    @mock.patch('messaging.services.send_direct_message_push_notification')
+    @mock.patch('messaging.services.get_channel_layer')
+    @mock.patch('messaging.services.async_to_sync')
+    def test_upload_invalid_attachment(self, *mocks):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from messaging.tasks import process_direct_message_attachment
+
+        storage = self.patch_storage()
+        url = reverse('DirectMessageAttachments-list', args=[self.conversation.id])
+
+        # 이미지가 아닌 파일은 요청에서 바로 거부해야 함
+        test_file = SimpleUploadedFile(name='test_image.jpg', content=b'fake image content', content_type='image/jpeg')
+
+        response = self.client.post(url, {'file': test_file}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # 헤더만 올바른 (디코딩할 수 없는) 이미지는 처리 작업에서 실패로 표시해야 함
+        image = self.create_test_image()
+        image.file.truncate(64)
+
+        with mock.patch.object(process_direct_message_attachment, 'delay_on_commit'):
+            response = self.client.post(url, {'file': image}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        attachment_id = response.data['content']['attachment_id']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_direct_message_attachment(attachment_id)
+
+        attachment = DirectMessageAttachment.objects.get(id=attachment_id)
+        self.assertEqual(attachment.status, DirectMessageAttachment.ProcessingStatus.FAILED)
+        self.assertEqual(storage.listdir('dm_attachments')[1], [])
+
+        message = DirectMessage.objects.get(id=response.data['id'])
+        self.assertEqual(message.content['status'], 'failed')
+
+    @mock.patch('messaging.services.send_direct_message_push_notification')
+    @mock.patch('messaging.services.get_channel_layer')
+    @mock.patch('messaging.services.async_to_sync')
+    def test_attachment_is_not_left_pending(self, mock_async_to_sync, *mocks):
+        from datetime import timedelta
+        from messaging.tasks import process_direct_message_attachment, fail_stale_direct_message_attachments
+
+        storage = self.patch_storage()
+        url = reverse('DirectMessageAttachments-list', args=[self.conversation.id])
+
+        mock_group_send = mock.MagicMock()
+        mock_async_to_sync.return_value = mock_group_send
+
+        def upload():
+            with mock.patch.object(process_direct_message_attachment, 'delay_on_commit'):
+                response = self.client.post(url, {'file': self.create_test_image()}, format='multipart')
+
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return DirectMessageAttachment.objects.get(id=response.data['content']['attachment_id'])
+
+        def assert_failed(attachment, source_name):
+            attachment.refresh_from_db()
+
+            self.assertEqual(attachment.status, DirectMessageAttachment.ProcessingStatus.FAILED)
+            self.assertFalse(attachment.source)
+            self.assertFalse(storage.exists(source_name))
+            self.assertEqual(attachment.message.content['status'], 'failed')
+
+        # 재시도하지 않는 오류 (예: botocore ClientError)로 작업이 실패해도 실패로 표시하고 원본을 삭제해야 함
+        attachment = upload()
+        source_name = attachment.source.name
+        mock_group_send.reset_mock()
+
+        with mock.patch('messaging.tasks.save_content_addressed', side_effect=RuntimeError('ClientError')), \
+                self.captureOnCommitCallbacks(execute=True):
+            process_direct_message_attachment.apply(args=(str(attachment.id),))
+
+        assert_failed(attachment, source_name)
+        self.assertEqual(mock_group_send.call_args_list[0][0][1]['type'], 'dm_message_updated')
+
+        # 작업이 유실되어 오랫동안 처리 중인 첨부파일은 주기적으로 (한 번에 모두) 정리해야 함
+        stale_attachments = [upload() for _ in range(2)]
+        stale_source_names = [attachment.source.name for attachment in stale_attachments]
+        DirectMessageAttachment.objects.filter(id__in=[attachment.id for attachment in stale_attachments]).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+
+        fresh_attachment = upload()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fail_stale_direct_message_attachments()
+
+        for (stale_attachment, stale_source_name) in zip(stale_attachments, stale_source_names):
+            assert_failed(stale_attachment, stale_source_name)
+
+        fresh_attachment.refresh_from_db()
+        self.assertEqual(fresh_attachment.status, DirectMessageAttachment.ProcessingStatus.PENDING)
+        self.assertTrue(storage.exists(fresh_attachment.source.name))
@@ -0,0 +1,356 @@
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from messaging.models import DirectMessageParticipant, DirectMessageInboxEntry
+
+# 사용자별 / 대화별 읽지 않은 메시지 수를 Redis 해시에 저장합니다.
+#
+#  fz:dm_unread:{user_id}      - {conversation_id: 읽지 않은 메시지 수, ..., '_total': 합계}
+#  fz:dm_unread:dirty          - DB에 아직 반영되지 않은 변경이 있는 사용자 ID 집합
+#
+# 메시지를 보내거나 읽을 때는 해시만 원자적으로 갱신하고 (HINCRBY / HSET),
+# 주기적으로 실행되는 reconcile_unread_counts 태스크가 DirectMessageParticipant / DirectMessageInboxEntry의 unread_count에
+# 한꺼번에 반영합니다.
+#
+# 해시가 없는 사용자 (처음 사용하거나 캐시에서 사라진 경우)는 DB에 저장된 값으로 해시를 먼저 만든 뒤 갱신합니다.
+# 기본 캐시가 Redis가 아니라면 (테스트 / 로컬 개발 환경) 프로세스 내부의 저장소를 사용합니다.
+
+TOTAL_FIELD = '_total'
+
+UNREAD_COUNTER_STORE_GLOBAL_INSTANCE: Optional['UnreadCounterStore'] = None
+
+
+class UnreadCounterStore:
+    def increment(self, user_ids: Iterable[str], conversation_id: str) -> Dict[str, Optional[int]]:
+        """
+        사용자들의 대화별 / 전체 읽지 않은 메시지 수를 1 증가시킵니다.
+        해시가 없는 사용자는 갱신하지 않고 None을 반환합니다.
+        """
+        raise NotImplementedError()
+
+    def reset(self, user_id: str, conversation_id: str):
+        """
+        대화의 읽지 않은 메시지 수를 0으로 만들고, 그만큼 전체 수를 줄입니다. 해시가 없다면 아무것도 하지 않습니다.
+        """
+        raise NotImplementedError()
+
+    def load(self, user_id: str, counts: Dict[str, int]):
+        """
+        해시가 없는 경우에만 counts로 해시를 만듭니다.
+        """
+        raise NotImplementedError()
+
+    def get(self, user_id: str) -> Optional[Dict[str, int]]:
+        """
+        대화별 읽지 않은 메시지 수 (TOTAL_FIELD 포함)를 반환합니다. 해시가 없다면 None을 반환합니다.
+        """
+        raise NotImplementedError()
+
+    def get_total(self, user_id: str) -> Optional[int]:
+        raise NotImplementedError()
+
+    def pop_dirty(self, limit: int) -> List[str]:
+        raise NotImplementedError()
+
+
+class RedisUnreadCounterStore(UnreadCounterStore):
+    # 해시는 오랫동안 갱신되지 않으면 사라지고, 다음에 필요할 때 DB에서 다시 만들어집니다
+    TIMEOUT = 60 * 60 * 24 * 7
+
+    INCREMENT_SCRIPT = """
+        if redis.call('EXISTS', KEYS[1]) == 0 then
+            return -1
+        end
+
+        local count = redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+        redis.call('HINCRBY', KEYS[1], ARGV[2], 1)
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        redis.call('SADD', KEYS[2], ARGV[4])
+
+        return count
+    """
+
+    RESET_SCRIPT = """
+        local count = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+
+        if count == 0 then
+            return 0
+        end
+
+        redis.call('HSET', KEYS[1], ARGV[1], 0)
+        redis.call('HINCRBY', KEYS[1], ARGV[2], -count)
+        redis.call('SADD', KEYS[2], ARGV[3])
+
+        return count
+    """
+
+    LOAD_SCRIPT = """
+        if redis.call('EXISTS', KEYS[1]) == 1 then
+            return 0
+        end
+
+        redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+        redis.call('EXPIRE', KEYS[1], ARGV[1])
+
+        return 1
+    """
+
+    def __init__(self, url: str, prefix: str = 'fz:dm_unread'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+        self.increment_script = self.client.register_script(self.INCREMENT_SCRIPT)
+        self.reset_script = self.client.register_script(self.RESET_SCRIPT)
+        self.load_script = self.client.register_script(self.LOAD_SCRIPT)
+
+    def key(self, user_id: str) -> str:
+        return f'{self.prefix}:{user_id}'
+
+    @property
+    def dirty_key(self) -> str:
+        return f'{self.prefix}:dirty'
+
+    def increment(self, user_ids: Iterable[str], conversation_id: str) -> Dict[str, Optional[int]]:
+        user_ids = list(user_ids)
+        pipeline = self.client.pipeline(transaction=False)
+
+        for user_id in user_ids:
+            self.increment_script(
+                keys=[self.key(user_id), self.dirty_key],
+                args=[conversation_id, TOTAL_FIELD, self.TIMEOUT, user_id],
+                client=pipeline
+            )
+
+        return {
+            user_id: (count if count >= 0 else None)
+            for (user_id, count) in zip(user_ids, pipeline.execute())
+        }
+
+    def reset(self, user_id: str, conversation_id: str):
+        self.reset_script(keys=[self.key(user_id), self.dirty_key], args=[conversation_id, TOTAL_FIELD, user_id])
+
+    def load(self, user_id: str, counts: Dict[str, int]):
+        args = [self.TIMEOUT, TOTAL_FIELD, sum(counts.values())]
+
+        for (conversation_id, count) in counts.items():
+            args += [conversation_id, count]
+
+        self.load_script(keys=[self.key(user_id)], args=args)
+
+    def get(self, user_id: str) -> Optional[Dict[str, int]]:
+        values = self.client.hgetall(self.key(user_id))
+
+        if not values:
+            return None
+
+        return {field.decode('utf-8'): int(value) for (field, value) in values.items()}
+
+    def get_total(self, user_id: str) -> Optional[int]:
+        value = self.client.hget(self.key(user_id), TOTAL_FIELD)
+
+        return int(value) if value is not None else None
+
+    def pop_dirty(self, limit: int) -> List[str]:
+        return [user_id.decode('utf-8') for user_id in self.client.spop(self.dirty_key, limit) or []]
+
+
+class LocalUnreadCounterStore(UnreadCounterStore):
+    """
+    프로세스 내부에 저장되는 카운터입니다. (LocMemCache와 같은 범위)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hashes: Dict[str, Dict[str, int]] = {}
+        self.dirty = set()
+
+    def increment(self, user_ids: Iterable[str], conversation_id: str) -> Dict[str, Optional[int]]:
+        counts = {}
+
+        with self.lock:
+            for user_id in user_ids:
+                values = self.hashes.get(user_id)
+
+                if values is None:
+                    counts[user_id] = None
+                    continue
+
+                values[conversation_id] = values.get(conversation_id, 0) + 1
+                values[TOTAL_FIELD] += 1
+                self.dirty.add(user_id)
+
+                counts[user_id] = values[conversation_id]
+
+        return counts
+
+    def reset(self, user_id: str, conversation_id: str):
+        with self.lock:
+            values = self.hashes.get(user_id)
+            count = values.get(conversation_id, 0) if values is not None else 0
+
+            if count == 0:
+                return
+
+            values[conversation_id] = 0
+            values[TOTAL_FIELD] -= count
+            self.dirty.add(user_id)
+
+    def load(self, user_id: str, counts: Dict[str, int]):
+        with self.lock:
+            if user_id not in self.hashes:
+                self.hashes[user_id] = {**counts, TOTAL_FIELD: sum(counts.values())}
+
+    def get(self, user_id: str) -> Optional[Dict[str, int]]:
+        with self.lock:
+            values = self.hashes.get(user_id)
+
+            return dict(values) if values is not None else None
+
+    def get_total(self, user_id: str) -> Optional[int]:
+        with self.lock:
+            values = self.hashes.get(user_id)
+
+            return values[TOTAL_FIELD] if values is not None else None
+
+    def pop_dirty(self, limit: int) -> List[str]:
+        with self.lock:
+            user_ids = list(self.dirty)[:limit]
+            self.dirty.difference_update(user_ids)
+
+        return user_ids
+
+
+def default_unread_counter_store() -> UnreadCounterStore:
+    global UNREAD_COUNTER_STORE_GLOBAL_INSTANCE
+
+    if UNREAD_COUNTER_STORE_GLOBAL_INSTANCE is None:
+        cache_settings = settings.CACHES['default']
+
+        if cache_settings['BACKEND'] == 'django.core.cache.backends.redis.RedisCache':
+            UNREAD_COUNTER_STORE_GLOBAL_INSTANCE = RedisUnreadCounterStore(cache_settings['LOCATION'])
+        else:
+            UNREAD_COUNTER_STORE_GLOBAL_INSTANCE = LocalUnreadCounterStore()
+
+    return UNREAD_COUNTER_STORE_GLOBAL_INSTANCE
+
+
+class UnreadCounters:
+    # reconcile() 한 번에 DB에 반영하는 최대 사용자 수
+    RECONCILE_BATCH_SIZE = 500
+
+    def __init__(self, store: Optional[UnreadCounterStore] = None):
+        self._store = store
+
+    @property
+    def store(self) -> UnreadCounterStore:
+        return self._store or default_unread_counter_store()
+
+    @staticmethod
+    def active_participations():
+        return DirectMessageParticipant.objects.filter(deleted_at__isnull=True)
+
+    def load(self, user_ids: Iterable[str]):
+        """
+        DB에 저장된 값으로 사용자들의 해시를 만듭니다. (이미 있는 해시는 그대로 둡니다)
+        """
+
+        user_ids = [str(user_id) for user_id in user_ids]
+
+        if not user_ids:
+            return
+
+        counts_by_user = {user_id: {} for user_id in user_ids}
+
+        rows = self.active_participations().filter(user_id__in=user_ids) \
+            .values_list('user_id', 'conversation_id', 'unread_count')
+
+        for (user_id, conversation_id, unread_count) in rows:
+            counts_by_user[str(user_id)][str(conversation_id)] = unread_count
+
+        for (user_id, counts) in counts_by_user.items():
+            self.store.load(user_id, counts)
+
+    def increment(self, conversation_id, user_ids: Iterable) -> Dict[str, int]:
+        """
+        대화에 새 메시지가 왔을 때 받는 사람들의 읽지 않은 메시지 수를 1 증가시킵니다.
+
+        :returns: 사용자별 갱신된 대화의 읽지 않은 메시지 수
+        """
+
+        conversation_id = str(conversation_id)
+        counts = self.store.increment([str(user_id) for user_id in user_ids], conversation_id)
+
+        missing_user_ids = [user_id for (user_id, count) in counts.items() if count is None]
+
+        if missing_user_ids:
+            self.load(missing_user_ids)
+            counts.update(self.store.increment(missing_user_ids, conversation_id))
+
+        return counts
+
+    def reset(self, user_id, conversation_id):
+        self.store.reset(str(user_id), str(conversation_id))
+
+    def counts(self, user_id) -> Dict[str, int]:
+        """
+        사용자의 대화별 읽지 않은 메시지 수입니다.
+        """
+
+        counts = self.store.get(str(user_id))
+
+        if counts is None:
+            self.load([user_id])
+            counts = self.store.get(str(user_id)) or {}
+
+        counts.pop(TOTAL_FIELD, None)
+
+        return counts
+
+    def total(self, user_id) -> int:
+        total = self.store.get_total(str(user_id))
+
+        if total is None:
+            self.load([user_id])
+            total = self.store.get_total(str(user_id)) or 0
+
+        return total
+
+    def reconcile(self) -> int:
+        """
+        변경된 사용자들의 읽지 않은 메시지 수를 DirectMessageParticipant.unread_count에 반영합니다.
+
+        :returns: 반영한 사용자 수
+        """
+
+        user_ids = self.store.pop_dirty(self.RECONCILE_BATCH_SIZE)
+
+        if not user_ids:
+            return 0
+
+        counts_by_user = {user_id: self.store.get(user_id) or {} for user_id in user_ids}
+
+        # 대화 목록 (inbox)의 값도 함께 맞춥니다
+        for queryset in (self.active_participations(), DirectMessageInboxEntry.objects.all()):
+            rows = list(
+                queryset.filter(user_id__in=user_ids).only('id', 'user_id', 'conversation_id', 'unread_count')
+            )
+
+            changed = []
+
+            for row in rows:
+                count = counts_by_user[str(row.user_id)].get(str(row.conversation_id))
+
+                if count is not None and count != row.unread_count:
+                    row.unread_count = count
+                    changed.append(row)
+
+            queryset.model.objects.bulk_update(changed, ['unread_count'], batch_size=self.RECONCILE_BATCH_SIZE)
+
+        return len(user_ids)
+
+
+unread_counters = UnreadCounters()
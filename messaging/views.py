@@ -1,7 +1,8 @@
 from dataclasses import asdict
+from typing import Tuple
 
 from django.core.files.uploadedfile import UploadedFile
-from django.db import transaction, models
+from django.db import transaction
 from django.http import Http404
 from django.utils import timezone
 from rest_framework import viewsets, permissions, status, filters
@@ -9,20 +10,37 @@ from rest_framework.exceptions import ValidationError, APIException
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from dacite import DaciteError
+from PIL import Image, UnidentifiedImageError
 
 from flitz.exceptions import UnsupportedOperationException
-from flitz.thumbgen import generate_thumbnail
+from flitz.pagination import CursorPagination
+from flitz.serializers import DirectUploadSessionRequestSerializer
+from flitz.thumbgen import MAX_IMAGE_PIXELS
+from flitz.uploads import DirectUploader
 from flitz.tasks import post_slack_message
 
 from messaging.models import DirectMessageConversation, DirectMessage, DirectMessageAttachment, \
-    DirectMessageParticipant, DirectMessageFlag
-from messaging.objdef import DirectMessageAttachmentContent
+    DirectMessageParticipant, DirectMessageFlag, DirectMessageInboxEntry, attachment_upload_to
+from messaging.objdef import DirectMessageAttachmentContent, load_direct_message_content
+from messaging.membership import conversation_membership
+from messaging.unread import unread_counters
+from messaging.tasks import process_direct_message_attachment
+from messaging.sync import sync_changes, InvalidSyncCursor
+from messaging.search import search_messages, InvalidSearchQuery, InvalidSearchCursor
+from messaging.services import send_direct_message, ConversationNotJoined, publish_direct_message, publish_read_event, \
+    publish_conversation_event, active_participant_ids, MAX_PAYLOAD_LENGTH as MAX_MESSAGE_PAYLOAD_LENGTH
 from messaging.serializers import DirectMessageConversationSerializer, DirectMessageSerializer, \
-    DirectMessageReadOnlySerializer, DirectMessageAttachmentSerializer, DirectMessageFlagSerializer
+    DirectMessageReadOnlySerializer, DirectMessageAttachmentSerializer, DirectMessageFlagSerializer, \
+    DirectMessageInboxEntrySerializer
 
 
+DM_ATTACHMENT_UPLOAD_PURPOSE = 'dm_attachment'
+
+
+class DirectMessageInboxPagination(CursorPagination):
+    ordering = '-sort_ts'
+
 
 class DirectMessageConversationViewSet(viewsets.ModelViewSet):
 
@@ -37,6 +55,14 @@ class DirectMessageConversationViewSet(viewsets.ModelViewSet):
             .prefetch_related('participants') \
             .select_related('latest_message', 'latest_message__sender', 'latest_message__attachment')
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+
+        if self.action in ('list', 'retrieve', 'inbox'):
+            context['unread_counts'] = unread_counters.counts(self.request.user.id)
+
+        return context
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -50,7 +76,16 @@ class DirectMessageConversationViewSet(viewsets.ModelViewSet):
         if conflicts:
             raise ValidationError(detail="CONFLICT", code=status.HTTP_409_CONFLICT)
 
-        return super().create(request, *args, **kwargs)
+        response = super().create(request, *args, **kwargs)
+
+        # 참여자들의 대화 목록에 새 대화를 알립니다
+        conversation_id = response.data['id']
+        participant_ids = [participant.id for participant in initial_participants]
+        transaction.on_commit(
+            lambda: publish_conversation_event(conversation_id, 'created', participant_ids)
+        )
+
+        return response
 
     def update(self, request, *args, **kwargs):
         raise UnsupportedOperationException()
@@ -60,8 +95,18 @@ class DirectMessageConversationViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         instance: DirectMessageConversation = self.get_object()
+        participant_ids = active_participant_ids(instance.id)
+
         instance.deleted_at = timezone.now()
         instance.save()
+
+        DirectMessageInboxEntry.remove_conversations([instance.id])
+
+        conversation_membership.invalidate_on_commit([instance.id])
+        transaction.on_commit(
+            lambda: publish_conversation_event(instance.id, 'deleted', participant_ids)
+        )
+
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['POST'], url_path='flag')
@@ -111,26 +156,84 @@ class DirectMessageConversationViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+    @action(detail=False, methods=['GET'], url_path='inbox')
+    def inbox(self, request: Request, *args, **kwargs):
+        """
+        가벼운 대화 목록 (id, peer, latest_message, unread_count, updated_at)을 반환하는 API 엔드포인트
+
+        사용자별 inbox row를 (user, sort_ts) 인덱스 순서대로 읽기만 합니다. (참여자 / 메시지 JOIN 없음)
+        participants와 첨부파일 URL이 필요한 클라이언트는 기존 대화 목록 (list)을 사용해야 합니다.
+        """
+
+        queryset = DirectMessageInboxEntry.objects.filter(user=request.user)
+
+        paginator = DirectMessageInboxPagination()
+        page = paginator.paginate_queryset(queryset, request)
+
+        serializer = DirectMessageInboxEntrySerializer(page, many=True, context=self.get_serializer_context())
+
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['GET'], url_path='sync')
+    def sync(self, request: Request, *args, **kwargs):
+        """
+        참여 중인 모든 대화에서 cursor 이후에 변경된 메시지 / 삭제된 메시지 (tombstones) / 읽음 상태를 반환하는 API 엔드포인트
+        """
+
+        conversation_ids = DirectMessageParticipant.objects.filter(
+            user=request.user,
+            deleted_at__isnull=True,
+            conversation__deleted_at__isnull=True,
+        ).values('conversation_id')
+
+        try:
+            result = sync_changes(
+                DirectMessage.objects.filter(conversation_id__in=conversation_ids),
+                DirectMessageParticipant.objects.filter(conversation_id__in=conversation_ids),
+                request.query_params.get('cursor'),
+            )
+        except InvalidSyncCursor:
+            return Response({
+                'is_success': False,
+                'reason': 'fz.messaging.invalid_cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['GET'], url_path='search')
+    def search(self, request: Request, *args, **kwargs):
+        """
+        참여 중인 모든 대화에서 메시지를 검색하는 API 엔드포인트 (관련도 순)
+        """
+
+        try:
+            result = search_messages(request.user, request.query_params.get('q'), request.query_params.get('cursor'))
+        except InvalidSearchQuery:
+            return Response({
+                'is_success': False,
+                'reason': 'fz.messaging.invalid_query'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidSearchCursor:
+            return Response({
+                'is_success': False,
+                'reason': 'fz.messaging.invalid_cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['GET'], url_path='total_unread_count')
     def total_unread_count(self, request: Request, *args, **kwargs):
         """
         사용자의 전체 읽지 않은 DM 대화 수를 반환하는 API 엔드포인트
         """
-        total_unread = DirectMessageParticipant.objects \
-            .filter(
-                user=request.user,
-                deleted_at__isnull=True
-            ) \
-            .aggregate(total=models.Sum('unread_count'))['total'] or 0
-
         return Response({
-            'total_unread_count': total_unread
+            'total_unread_count': unread_counters.total(request.user.id)
         }, status=status.HTTP_200_OK)
 
 
 class DirectMessageViewSet(viewsets.ModelViewSet):
 
-    MAX_PAYLOAD_LENGTH = 2048 # 최대 메시지 페이로드 길이 (2KB)
+    MAX_PAYLOAD_LENGTH = MAX_MESSAGE_PAYLOAD_LENGTH # 최대 메시지 페이로드 길이 (2KB)
 
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
@@ -150,7 +253,7 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
             return DirectMessageSerializer
         return DirectMessageReadOnlySerializer
 
-    def get_queryset(self):
+    def check_joined(self):
         is_joined = DirectMessageParticipant.objects.filter(
             conversation_id__exact=self.get_conversation_id(),
             user=self.request.user,
@@ -161,6 +264,9 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
             # 사용자가 해당 대화에 참여하지 않는 경우 404 에러 발생
             raise Http404()
 
+    def get_queryset(self):
+        self.check_joined()
+
         return DirectMessage.objects \
             .filter(conversation_id__exact=self.get_conversation_id(), deleted_at__isnull=True) \
             .select_related('sender', 'sender__settings', 'attachment')
@@ -176,36 +282,44 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
 
             raise exception
 
-        request.data['sent_by'] = self.request.user.id
-        request.data['parent_conversation'] = self.get_conversation_id()
+        content = request.data.get('content')
 
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        created_instance: DirectMessage = serializer.save()
+        try:
+            load_direct_message_content(content)
+        except (DaciteError, ValueError, KeyError) as e:
+            raise ValidationError({'content': str(e)})
 
-        conversation = self.get_conversation()
-        conversation.latest_message_id = created_instance.id
-        conversation.increment_unread_count(exclude=request.user)
-        conversation.save()
-        
-        # 실시간 메시지 이벤트 발송
-        channel_layer = get_channel_layer()
-        group_name = f'direct_message_{created_instance.conversation_id}'
+        try:
+            (_, message_data) = send_direct_message(self.get_conversation_id(), request.user, content)
+        except ConversationNotJoined:
+            raise Http404()
 
-        message_data = DirectMessageReadOnlySerializer(instance=created_instance).data
+        return Response(message_data, status=status.HTTP_201_CREATED)
 
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'dm_message',
-                'message': message_data
-            }
-        )
+    @action(detail=False, methods=['GET'], url_path='sync')
+    def sync(self, request: Request, *args, **kwargs):
+        """
+        대화에서 cursor 이후에 변경된 메시지 / 삭제된 메시지 (tombstones) / 읽음 상태를 반환하는 API 엔드포인트
+        """
 
-        created_instance.send_push_notification()
+        self.check_joined()
+
+        conversation_id = self.get_conversation_id()
+
+        try:
+            result = sync_changes(
+                DirectMessage.objects.filter(conversation_id=conversation_id),
+                DirectMessageParticipant.objects.filter(conversation_id=conversation_id),
+                request.query_params.get('cursor'),
+            )
+        except InvalidSyncCursor:
+            return Response({
+                'is_success': False,
+                'reason': 'fz.messaging.invalid_cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result, status=status.HTTP_200_OK)
 
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-        
     @action(detail=False, methods=['post'])
     def mark_as_read(self, request, conversation_id=None):
         """메시지를 읽음 상태로 표시하는 API 엔드포인트"""
@@ -221,19 +335,13 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
                 participant.read_at = timezone.now()
                 participant.unread_count = 0
                 participant.save()
+
+                DirectMessageInboxEntry.mark_as_read(request.user.id, conversation.id)
+
+            unread_counters.reset(request.user.id, conversation.id)
             
             # 읽음 상태 이벤트 발송
-            channel_layer = get_channel_layer()
-            group_name = f'direct_message_{conversation.id}'
-            
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    'type': 'dm_read_event',
-                    'user_id': str(request.user.id),
-                    'read_at': participant.read_at.isoformat()
-                }
-            )
+            publish_read_event(conversation.id, request.user.id, participant.read_at.isoformat())
             
             return Response({'status': 'success'}, status=status.HTTP_200_OK)
         except DirectMessageParticipant.DoesNotExist:
@@ -254,6 +362,7 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
         if instance.sender_id != self.request.user.id:
             raise Http404()
 
+        # updated_at도 갱신되므로, 동기화 API에서 tombstone으로 전달됩니다
         instance.deleted_at = timezone.now()
         instance.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -287,38 +396,122 @@ class DirectMessageAttachmentViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         conversation = self.get_conversation()
         file: UploadedFile = request.data['file']
-        extension = file.name.split('.')[-1]
 
         # Determine attachment type
-        if file.content_type.startswith('image'):
-            attachment_type = DirectMessageAttachment.AttachmentType.IMAGE
-        elif file.content_type.startswith('video'):
-            attachment_type = DirectMessageAttachment.AttachmentType.VIDEO
-        elif file.content_type.startswith('audio'):
-            attachment_type = DirectMessageAttachment.AttachmentType.AUDIO
-        else:
-            attachment_type = DirectMessageAttachment.AttachmentType.OTHER
+        attachment_type = DirectMessageAttachment.AttachmentType.from_mimetype(file.content_type)
 
         if attachment_type != DirectMessageAttachment.AttachmentType.IMAGE:
             # not supported yet
             raise UnsupportedOperationException()
 
-        with transaction.atomic():
-            # TODO: resize image and remove EXIF data
-            sanitized_file = file
-            (thumbnail, size) = generate_thumbnail(file, 1280)
+        # 헤더만 읽어서 이미지인지 확인합니다 (디코딩 / 리사이징은 process_direct_message_attachment 작업에서 수행)
+        try:
+            image = Image.open(file)
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise ValidationError({'file': 'Uploaded file is not an image.'})
+
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise ValidationError({'file': 'Uploaded image is too large.'})
+
+        file.seek(0)
+
+        # 원본은 트랜잭션 밖에서 그대로 저장합니다
+        source_name = DirectMessageAttachment._meta.get_field('source').storage.save(
+            attachment_upload_to(None, file.name), file
+        )
+
+        message_data = self.__create_pending_image_attachment_message(
+            conversation, source_name, file.content_type, file.size, (image.width, image.height)
+        )
+
+        return Response(message_data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['POST'], url_path='upload-sessions')
+    def create_upload_session(self, request, *args, **kwargs):
+        """
+        첨부파일을 S3에 직접 업로드하기 위한 업로드 세션 (presigned POST)을 발급합니다.
+        업로드가 끝나면 complete_upload_session을 호출해야 합니다.
+        """
+        conversation = self.get_conversation()
+
+        serializer = DirectUploadSessionRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        validated_data = serializer.validated_data
+
+        attachment_type = DirectMessageAttachment.AttachmentType.from_mimetype(validated_data['content_type'])
+
+        if attachment_type != DirectMessageAttachment.AttachmentType.IMAGE:
+            # not supported yet
+            raise UnsupportedOperationException()
+
+        if validated_data['size'] > DirectMessageAttachment.MAX_UPLOAD_SIZE:
+            raise ValidationError({'size': 'File is too large.'})
+
+        uploader = DirectUploader()
+        session, presigned_post = uploader.create_session(
+            user_id=request.user.id,
+            purpose=DM_ATTACHMENT_UPLOAD_PURPOSE,
+            target_id=conversation.id,
+            name=attachment_upload_to(None, validated_data['filename']),
+            content_type=validated_data['content_type'],
+            max_size=DirectMessageAttachment.MAX_UPLOAD_SIZE
+        )
+
+        return Response(uploader.as_response(session, presigned_post), status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['POST'], url_path=r'upload-sessions/(?P<session_id>[0-9a-fA-F\-]+)/complete')
+    def complete_upload_session(self, request, session_id, *args, **kwargs):
+        conversation = self.get_conversation()
 
+        uploader = DirectUploader()
+        session = uploader.get_session(session_id, request.user.id, DM_ATTACHMENT_UPLOAD_PURPOSE, conversation.id)
+
+        if session is None:
+            raise Http404()
+
+        uploaded_object = uploader.verify(session)
+
+        if uploaded_object is None:
+            raise ValidationError({'session_id': 'The object has not been uploaded.'})
+
+        if not uploader.discard(session):
+            # 다른 요청에서 이미 완료 처리됨
+            raise Http404()
+
+        # 업로드된 오브젝트를 그대로 원본으로 사용합니다. (크기는 처리가 끝난 후에 알 수 있습니다)
+        message_data = self.__create_pending_image_attachment_message(
+            conversation, uploaded_object.name, uploaded_object.content_type, uploaded_object.size, (0, 0)
+        )
+
+        return Response(message_data, status=status.HTTP_201_CREATED)
+
+    def __create_pending_image_attachment_message(self,
+                                                  conversation: DirectMessageConversation,
+                                                  source_name: str,
+                                                  mimetype: str,
+                                                  size: int,
+                                                  dimensions: Tuple[int, int]) -> dict:
+        """
+        처리 중 (pending)인 이미지 첨부파일과 이를 참조하는 메시지를 생성하고, 실시간 이벤트 / 푸시 알림을 발송합니다.
+        썸네일 생성은 트랜잭션 커밋 후 process_direct_message_attachment 작업이 처리하며, 끝나면 message_updated 이벤트가 발송됩니다.
+
+        :returns: 생성된 메시지 (DirectMessageReadOnlySerializer)
+        """
+        request = self.request
+
+        with transaction.atomic():
             attachment = DirectMessageAttachment.objects.create(
-                sender=self.request.user,
+                sender=request.user,
                 conversation=conversation,
-                type=attachment_type,
-                object=thumbnail,
-                thumbnail=thumbnail,
-                mimetype=file.content_type,
-                size=thumbnail.size,
-
-                width=size[0],
-                height=size[1]
+                type=DirectMessageAttachment.AttachmentType.IMAGE,
+                source=source_name,
+                status=DirectMessageAttachment.ProcessingStatus.PENDING,
+                mimetype=mimetype,
+                size=size,
+
+                width=dimensions[0],
+                height=dimensions[1]
             )
 
             content = DirectMessageAttachmentContent(
@@ -327,15 +520,15 @@ class DirectMessageAttachmentViewSet(viewsets.ModelViewSet):
                 attachment_type='image',
                 attachment_id=str(attachment.id),  # UUID를 문자열로 변환
 
-                width=size[0],
-                height=size[1],
+                width=dimensions[0],
+                height=dimensions[1],
+
+                public_url=None,
+                thumbnail_url=None,
 
-                # 굳이 원본을 보여줄 필요는 없음
-                public_url=attachment.thumbnail.url,
-                thumbnail_url=attachment.thumbnail.url
+                status=DirectMessageAttachment.ProcessingStatus.PENDING
             )
 
-            # Optionally create a direct message referencing the new attachment
             message = DirectMessage.objects.create(
                 conversation=conversation,
                 sender=request.user,
@@ -343,26 +536,18 @@ class DirectMessageAttachmentViewSet(viewsets.ModelViewSet):
             )
 
             attachment.message = message
-            attachment.save()
+            attachment.save(update_fields=['message'])
 
             conversation.latest_message = message
-            conversation.increment_unread_count(exclude=request.user)
             conversation.save(update_fields=['latest_message', 'updated_at'])
-        
-        # 첨부파일 메시지에 대한 실시간 이벤트 발송
-        channel_layer = get_channel_layer()
-        group_name = f'direct_message_{conversation.id}'
 
-        message_data = DirectMessageReadOnlySerializer(instance=message).data
+            message_data = DirectMessageReadOnlySerializer(instance=message).data
 
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'dm_message',
-                'message': message_data
-            }
-        )
+            DirectMessageInboxEntry.record_message(message, request.user, message_data)
 
-        message.send_push_notification()
+            process_direct_message_attachment.delay_on_commit(str(attachment.id))
 
-        return Response(message_data, status=status.HTTP_201_CREATED)
+        # 첨부파일 메시지에 대한 실시간 이벤트 / 푸시 알림 발송
+        publish_direct_message(message, message_data)
+
+        return message_data
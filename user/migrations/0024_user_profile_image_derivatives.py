@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0023_alter_useridentity_gender_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_derivatives',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
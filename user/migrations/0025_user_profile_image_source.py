@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:24
+
+import user.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0024_user_profile_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_source',
+            field=models.FileField(blank=True, null=True, upload_to=user.models.profile_image_source_upload_to),
+        ),
+    ]
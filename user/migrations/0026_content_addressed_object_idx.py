@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('card', '0014_content_addressed_object_idx'),
+        ('user', '0025_user_profile_image_source'),
+        ('user_auth', '0004_usersession_refresh_token_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['profile_image'], name='user_user_profile_609fb4_idx'),
+        ),
+    ]
@@ -8,11 +8,14 @@ from django.core.cache import cache
 from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.postgres.indexes import GinIndex
+from PIL import Image, UnidentifiedImageError
 from uuid_v7.base import uuid7
 
 from flitz.apns import APSPayload
 from flitz.models import UUIDv7Field, BaseModel
-from flitz.thumbgen import generate_thumbnail
+from flitz.derivatives import derivative_url
+from flitz.storage import register_content_addressed_field
+from flitz.thumbgen import MAX_IMAGE_PIXELS, ImageTooLargeError
 from safety.utils.phone_number import hash_phone_number, normalize_phone_number
 
 # Create your models here.
@@ -28,6 +31,18 @@ def profile_image_upload_to(instance, filename):
     shard = file_uuid[:2]
     return f"profile_images/{shard}/{file_uuid}.jpg"
 
+def profile_image_source_upload_to(instance, filename):
+    """
+    처리 전의 프로필 이미지 원본 (EXIF 포함)의 임시 저장 경로를 생성합니다.
+    """
+    ext = filename.split('.')[-1] if '.' in filename else ''
+    file_uuid = str(uuid7())
+    filename = f"{file_uuid}.{ext}" if ext else file_uuid
+
+    # UUID의 첫 2글자로 디렉토리 샤딩 (256개 디렉토리로 분산)
+    shard = file_uuid[:2]
+    return f"profile_image_sources/{shard}/{filename}"
+
 def deleted_user_archive_upload_to(instance, filename):
     """
     사용자 삭제 아카이브의 저장 경로를 생성합니다.
@@ -82,6 +97,9 @@ class User(AbstractUser):
 
             models.Index(fields=['nice_di']),
 
+            # 내용 기반 오브젝트의 참조 여부 확인 (flitz.storage.find_referenced_names)
+            models.Index(fields=['profile_image']),
+
             models.Index(fields=['disabled_at']),
 
             models.Index(fields=['created_at']),
@@ -102,6 +120,10 @@ class User(AbstractUser):
     disabled_at = models.DateTimeField(null=True, blank=True)
 
     profile_image = models.ImageField(upload_to=profile_image_upload_to, null=True, blank=True)
+    # 프로필 이미지의 파생 이미지 manifest (flitz.derivatives 참고)
+    profile_image_derivatives = models.JSONField(null=True, blank=True)
+    # 처리 중인 (EXIF 제거 / 파생 이미지 생성 전) 새 프로필 이미지의 원본. 처리가 끝나면 삭제됩니다
+    profile_image_source = models.FileField(upload_to=profile_image_source_upload_to, null=True, blank=True)
 
     title = models.CharField(max_length=20, null=False, blank=True, default='')
 
@@ -130,10 +152,11 @@ class User(AbstractUser):
 
     @property
     def profile_image_url(self) -> Optional[str]:
-        if not self.profile_image.name:
-            return None
+        return self.get_profile_image_url(480)
 
-        return self.profile_image.url
+    def get_profile_image_url(self, max_height: int) -> Optional[str]:
+        # 원본에는 EXIF 등이 남아 있으므로, 파생 이미지가 생성되기 전까지는 URL을 반환하지 않습니다
+        return derivative_url(self.profile_image, self.profile_image_derivatives, max_height, fallback_to_source=False)
 
     @property
     def last_seen(self) -> datetime:
@@ -310,17 +333,36 @@ class User(AbstractUser):
 
 
     def set_profile_image(self, image_file: UploadedFile):
+        from user.tasks import process_profile_image
+
         if not image_file.content_type.startswith('image/'):
             raise ValueError("Uploaded file is not an image.")
 
-        # 기존 이미지가 있으면 삭제
-        if self.profile_image.name:
-            self.profile_image.delete(save=False)
+        # 헤더만 읽어서 이미지인지 확인합니다 (디코딩은 파생 이미지 생성 작업에서 수행)
+        try:
+            image = Image.open(image_file)
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise ValueError("Uploaded file is not an image.")
+
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise ImageTooLargeError("Uploaded image is too large.")
+
+        image_file.seek(0)
 
-        # 썸네일 생성 후 저장
-        (thumbnail, size) = generate_thumbnail(image_file)
-        # 파일명은 upload_to 함수가 자동으로 처리
-        self.profile_image.save('thumbnail.jpg', thumbnail, save=True)
+        previous_source_name = self.profile_image_source.name
+
+        # 원본에는 EXIF (촬영 위치 등)가 남아 있으므로 프로필 이미지로 쓰지 않고, 처리가 끝날 때까지만 보관합니다
+        # EXIF를 제거한 이미지 / 파생 이미지 생성은 Celery 작업 (process_profile_image)에서 처리하며,
+        # 그동안에는 기존 프로필 이미지가 그대로 표시됩니다
+        extension = 'jpg' if image.format == 'JPEG' else (image.format or 'bin').lower()
+        self.profile_image_source.save(f'original.{extension}', image_file, save=False)
+        self.save()
+
+        process_profile_image.delay_on_commit(str(self.id), self.profile_image_source.name)
+
+        # 아직 처리되지 않은 이전 업로드는 더 이상 필요하지 않습니다
+        if previous_source_name:
+            self.profile_image_source.storage.delete(previous_source_name)
 
     def is_blocked_by(self, other: 'User') -> bool:
         """
@@ -329,6 +371,8 @@ class User(AbstractUser):
 
         return other.blocked_users.only('id').filter(user=self).exists()
 
+register_content_addressed_field('user.User', 'profile_image')
+
 class UserSettings(BaseModel):
     class Meta:
         indexes = [
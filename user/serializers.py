@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from flitz.serializers import ImageDerivativeURLField
 from user.models import User, UserIdentity, UserSettings, UserFlag
 from user.utils import validate_password
 
@@ -9,7 +10,7 @@ class PublicUserSerializer(serializers.ModelSerializer):
     타 사용자를 fetch할 때 사용되는 serializer
     """
 
-    profile_image_url = serializers.ImageField(source='profile_image', read_only=True)
+    profile_image_url = ImageDerivativeURLField('profile_image', 'profile_image_derivatives', max_height=480, fallback_to_source=False)
     online_status = serializers.CharField(read_only=True)
     fuzzy_distance = serializers.SerializerMethodField()
 
@@ -28,7 +29,7 @@ class PublicUserSerializer(serializers.ModelSerializer):
 
 class PublicSimpleUserSerializer(serializers.ModelSerializer):
 
-    profile_image_url = serializers.ImageField(source='profile_image', read_only=True)
+    profile_image_url = ImageDerivativeURLField('profile_image', 'profile_image_derivatives', max_height=160, fallback_to_source=False)
     online_status = serializers.CharField(read_only=True)
     fuzzy_distance = serializers.SerializerMethodField()
 
@@ -75,7 +76,7 @@ class PublicSelfUserSerializer(serializers.ModelSerializer):
     자신의 정보를 fetch할 때 사용되는 serializer
     """
 
-    profile_image_url = serializers.ImageField(source='profile_image', read_only=True)
+    profile_image_url = ImageDerivativeURLField('profile_image', 'profile_image_derivatives', max_height=480, fallback_to_source=False)
 
     title = serializers.CharField(allow_blank=True, max_length=20)
     bio = serializers.CharField(allow_blank=True, max_length=600)
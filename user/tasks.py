@@ -1,4 +1,5 @@
 import json
+import shutil
 from logging import Logger
 from typing import Optional, List
 
@@ -13,14 +14,19 @@ from django.db import transaction
 from django.db.models import Q
 from django.template.loader import render_to_string
 from django.utils import timezone, translation
+from PIL import Image
 
-from flitz.apns import APNS, APSPayload
+from flitz.apns import APNS, APSPayload, APNSNotification
+from flitz.derivatives import delete_derivatives, build_derivatives, find_ready_manifest, IMAGE_DERIVATIVE_HEIGHTS
+from flitz.storage import delete_unreferenced, save_content_addressed
+from flitz.thumbgen import generate_thumbnail
 from flitz.gpgenc import gpg_encrypt
 from flitz.utils.mailgun import send_email
 from user.models import User, PushNotificationType, UserIdentity, UserGenderBit, UserDeletionPhase, \
     UserDeletionReviewRequestReason, UserDeletionReviewRequest, DeletedUserArchive
 from user.objdef import DeletedUserArchiveData
 from user_auth.models import UserSession
+from user_auth.session_cache import session_cache
 
 logger: Logger = get_task_logger(__name__)
 
@@ -38,6 +44,106 @@ def send_push_message_ex(user_id: UUID,
     user = User.objects.get(id=user_id)
     user.send_push_message_ex(type, aps, user_info=user_info)
 
+@shared_task(bind=True, max_retries=3)
+def send_push_message_batch(self, notifications: List[APNSNotification]):
+    """
+    여러 사용자에게 (내용이 서로 다른) 푸시 메시지를 하나의 APNs 연결로 보냅니다.
+    일시적인 오류로 보내지 못한 알림은 해당 수신자들에게만 다시 보냅니다.
+
+    :note: 사용자 조회 / 알림 설정 확인을 하지 않으므로, 호출하는 쪽에서 수신 대상을 미리 걸러야 합니다.
+    """
+
+    failed_notifications = APNS.default().send_notifications_ex([
+        (device_token, aps, user_info) for (device_token, aps, user_info) in notifications
+    ])
+
+    if failed_notifications:
+        logger.warning(
+            f"send_push_message_batch(): failed to send {len(failed_notifications)} of {len(notifications)} notifications, "
+            f"retrying (attempt {self.request.retries + 1})"
+        )
+
+        raise self.retry(args=[failed_notifications], countdown=60 * (2 ** self.request.retries))
+
+def discard_profile_image_source(user_id: str, source_name: str):
+    """
+    처리하지 못한 프로필 이미지 원본을 정리합니다. 기존 프로필 이미지는 그대로 유지됩니다.
+    """
+
+    User.objects.filter(id=user_id, profile_image_source=source_name).update(profile_image_source=None)
+    User._meta.get_field('profile_image_source').storage.delete(source_name)
+
+def _on_process_profile_image_failure(self, exc, task_id, args, kwargs, einfo):
+    # 재시도 횟수를 초과했거나 예상하지 못한 오류로 실패한 경우에도 원본 (EXIF 포함)이 남지 않도록 정리합니다
+    logger.error(f"process_profile_image(): failed to process profile image of user {args[0]}: {exc}")
+    discard_profile_image_source(*args)
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3, on_failure=_on_process_profile_image_failure)
+def process_profile_image(user_id: str, source_name: str):
+    """
+    업로드된 프로필 이미지 원본에서 EXIF를 제거하고 다시 인코딩한 이미지와 파생 이미지를 만든 뒤 프로필 이미지를 교체합니다.
+    원본과 기존 프로필 이미지는 처리가 끝나면 삭제합니다.
+    """
+    from messaging.tasks import refresh_inbox_peer_snapshots
+
+    source_storage = User._meta.get_field('profile_image_source').storage
+    storage = User._meta.get_field('profile_image').storage
+
+    if not User.objects.filter(id=user_id, profile_image_source=source_name).exists():
+        logger.info(f"process_profile_image(): user {user_id} no longer references {source_name}, discarding source")
+        source_storage.delete(source_name)
+        return
+
+    image = None
+
+    with NamedTemporaryFile() as local_file:
+        # 스토리지 오류 (OSError)는 재시도하고, 디코딩 오류는 재시도하지 않도록 먼저 로컬로 내려받습니다
+        with source_storage.open(source_name) as file:
+            shutil.copyfileobj(file, local_file)
+
+        local_file.seek(0)
+
+        try:
+            (image, _) = generate_thumbnail(File(local_file), max(IMAGE_DERIVATIVE_HEIGHTS))
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            # 이미지가 아니거나 손상된 경우 (UnidentifiedImageError), 너무 큰 경우 (ImageTooLargeError)
+            logger.warning(f"process_profile_image(): cannot process profile image of user {user_id}: {e}")
+
+    if image is None:
+        discard_profile_image_source(user_id, source_name)
+        return
+
+    with transaction.atomic():
+        # 같은 이미지는 내용 기반 이름으로 공유하며, 이미 생성된 파생 이미지가 있으면 재사용합니다
+        # 프로필 이미지를 저장할 때까지 같은 오브젝트가 삭제되지 않도록 트랜잭션 안에서 저장합니다
+        name = save_content_addressed('profile_images', image, 'jpg', storage=storage)
+        manifest = find_ready_manifest(User, 'profile_image', 'profile_image_derivatives', name) or \
+            build_derivatives(name, storage=storage)
+
+        user = User.objects.select_for_update().filter(id=user_id, profile_image_source=source_name).first()
+
+        if user is not None:
+            previous = (user.profile_image.name, user.profile_image_derivatives)
+
+            user.profile_image = name
+            user.profile_image_derivatives = manifest
+            user.profile_image_source = None
+            user.save(update_fields=['profile_image', 'profile_image_derivatives', 'profile_image_source', 'updated_at'])
+
+            transaction.on_commit(lambda: refresh_inbox_peer_snapshots.delay(user_id))
+
+    if user is None:
+        # 처리 중에 다른 이미지가 업로드된 경우, 만든 이미지를 정리합니다
+        logger.info(f"process_profile_image(): profile image of user {user_id} replaced while processing, discarding")
+        delete_derivatives([manifest])
+        delete_unreferenced([name])
+    elif previous[0] and previous[0] != name:
+        # 기존 이미지를 다른 사용자가 공유하고 있지 않으면 삭제
+        delete_derivatives([previous[1]])
+        delete_unreferenced([previous[0]])
+
+    source_storage.delete(source_name)
+
 @shared_task
 def send_templated_email(to: str, subject: str, template_name: str, ctx: dict):
     # TODO: 사용자 선호 언어
@@ -246,6 +352,7 @@ def execute_deletion_phase_sensitive_data(user_id: UUID):
         user=user,
         invalidated_at__isnull=True
     ).update(invalidated_at=timezone.now())
+    session_cache.invalidate_user_on_commit(user.id)
 
     # 1. 민감 정보 삭제: 정체성 및 성적 선호도
     UserIdentity.objects.filter(
@@ -287,7 +394,16 @@ def execute_deletion_phase_sensitive_data(user_id: UUID):
 
     if user.profile_image.name:
         # TODO: 프로필 이미지 삭제는 나중에 아카이브로 옮겨야 할까요?
-        user.profile_image.delete(save=False)
+        # 같은 내용의 이미지를 다른 사용자가 공유할 수 있으므로, 참조하는 사용자가 없을 때만 삭제합니다
+        delete_derivatives([user.profile_image_derivatives], exclude=(User, [user.pk]))
+        delete_unreferenced([user.profile_image.name], exclude=(User, [user.pk]))
+
+    if user.profile_image_source.name:
+        user.profile_image_source.storage.delete(user.profile_image_source.name)
+
+    user.profile_image = None
+    user.profile_image_derivatives = None
+    user.profile_image_source = None
 
     user.title = ''
     user.bio = ''
@@ -307,40 +423,45 @@ def execute_deletion_phase_sensitive_data(user_id: UUID):
 
 @transaction.atomic
 def execute_deletion_phase_content(user_id: UUID):
+    from card.counters import card_counter_buffer, FAVORITE_COUNT
+    from card.inbox import distribution_inbox
     from card.models import CardFavoriteItem, CardDistribution, Card, UserCardAsset, CardFlag
 
     user = User.objects.get(id=user_id)
 
     # 1-1. CardFavoriteItem 삭제
-    CardFavoriteItem.objects.filter(
+    favorite_items = CardFavoriteItem.objects.filter(
         Q(user=user) | Q(card__user=user)
-    ).update(
+    )
+
+    card_counter_buffer.record(
+        favorite_items.filter(deleted_at=None).values_list('card_id', flat=True),
+        FAVORITE_COUNT, -1
+    )
+
+    favorite_items.update(
         deleted_at=timezone.now()
     )
 
     # 1-2. CardDistribution 삭제
+    # inbox를 다시 만드는 중에 커밋되어도 반영되도록 updated_at을 갱신합니다 (DistributionInbox.rebuild() 참고)
     CardDistribution.objects.filter(
         Q(user=user) | Q(card__user=user),
         ).update(
-        deleted_at=timezone.now()
+        deleted_at=timezone.now(),
+        updated_at=timezone.now()
     )
 
+    # 다른 사용자의 inbox에 남아 있는 배포는 목록을 조회할 때 걸러집니다
+    distribution_inbox.invalidate_on_commit(user.id)
+
     # 1-3. UserCardAsset 삭제
     queryset = UserCardAsset.objects.filter(
         user=user,
         deleted_at__isnull=True
     ).all()
 
-    iterator = queryset.iterator(chunk_size=1000)
-    for asset in iterator:
-        try:
-            asset.delete_asset()
-        except Exception as e:
-            logger.error(f"deactivate_user(): error deleting asset {asset.id} for user {user_id}: {e}", exc_info=True)
-
-    queryset.update(
-        deleted_at=timezone.now()
-    )
+    UserCardAsset.delete_assets(queryset)
 
     # 1-4. Card 삭제
     queryset = Card.objects.filter(
@@ -348,6 +469,8 @@ def execute_deletion_phase_content(user_id: UUID):
         deleted_at__isnull=True
     )
 
+    card_ids = list(queryset.values_list('id', flat=True))
+
     queryset.update(
         content={}
     )
@@ -356,6 +479,9 @@ def execute_deletion_phase_content(user_id: UUID):
         deleted_at=timezone.now()
     )
 
+    # 렌더링된 카드 컨텐츠 캐시도 함께 제거합니다
+    cache.delete_many([Card.rendered_content_cache_key(card_id) for card_id in card_ids])
+
     user.deletion_phase = UserDeletionPhase.CONTENT_DELETED
 
     tomorrow_midnight = timezone.now() + timezone.timedelta(days=1)
@@ -368,7 +494,8 @@ def execute_deletion_phase_content(user_id: UUID):
 @transaction.atomic
 def execute_deletion_phase_message(user_id: UUID):
     from messaging.models import DirectMessageFlag, DirectMessageAttachment, DirectMessage, DirectMessageConversation, \
-        DirectMessageParticipant
+        DirectMessageParticipant, DirectMessageInboxEntry
+    from messaging.membership import conversation_membership
 
     user = User.objects.get(id=user_id)
 
@@ -377,17 +504,7 @@ def execute_deletion_phase_message(user_id: UUID):
         sender=user
     ).all()
 
-    iterator = queryset.iterator(chunk_size=1000)
-    for attachment in iterator:
-        try:
-            attachment.delete_attachment()
-        except Exception as e:
-            logger.error(f"deactivate_user(): error deleting attachment {attachment.id} for user {user_id}: {e}",
-                         exc_info=True)
-
-    queryset.update(
-        deleted_at=timezone.now()
-    )
+    DirectMessageAttachment.delete_attachments(queryset)
 
     # 2-2. DirectMessage 삭제
     queryset = DirectMessage.objects.filter(
@@ -398,8 +515,14 @@ def execute_deletion_phase_message(user_id: UUID):
         content={}
     )
 
+    # 변경 사항 동기화 (messaging.sync)에서 삭제된 메시지로 보이도록 updated_at도 갱신합니다
     queryset.update(
-        deleted_at=timezone.now()
+        deleted_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+
+    conversation_membership.invalidate_on_commit(
+        DirectMessageParticipant.objects.filter(user=user).values_list('conversation_id', flat=True)
     )
 
     # 2-3. DirectMessageParticipant 삭제
@@ -416,6 +539,10 @@ def execute_deletion_phase_message(user_id: UUID):
         deleted_at=timezone.now()
     )
 
+    DirectMessageInboxEntry.remove_conversations(
+        DirectMessageParticipant.objects.filter(user=user).values_list('conversation_id', flat=True)
+    )
+
     user.deletion_phase = UserDeletionPhase.MESSAGE_DELETED
 
     tomorrow_midnight = timezone.now() + timezone.timedelta(days=1)
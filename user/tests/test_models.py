@@ -28,6 +28,110 @@ class UserModelTests(TestCase):
         self.assertIsNotNone(self.user1.updated_at)
 
 
+    def patch_profile_image_storage(self):
+        from contextlib import ExitStack
+
+        from django.core.files.storage import InMemoryStorage
+
+        storage = InMemoryStorage()
+        stack = ExitStack()
+
+        for field_name in ('profile_image', 'profile_image_source'):
+            stack.enter_context(patch.object(User._meta.get_field(field_name), 'storage', storage))
+
+        stack.enter_context(patch('flitz.derivatives.storage_url', side_effect=lambda file: file.name))
+        stack.enter_context(patch('messaging.tasks.refresh_inbox_peer_snapshots.delay'))
+
+        return storage, stack
+
+    def upload_profile_image(self, content: bytes, name='photo.jpg', content_type='image/jpeg'):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from user import tasks as user_tasks
+
+        image_file = SimpleUploadedFile(name, content, content_type=content_type)
+
+        with patch.object(user_tasks.process_profile_image, 'delay_on_commit') as mock_delay:
+            # FieldFile이 패치된 스토리지를 사용하도록 다시 불러옵니다
+            User.objects.get(id=self.user1.id).set_profile_image(image_file)
+
+        mock_delay.assert_called_once()
+        return mock_delay.call_args.args
+
+    def test_set_profile_image_strips_exif(self):
+        """프로필 이미지는 EXIF를 제거하고 다시 인코딩한 이미지로 교체되고, 원본은 삭제되어야 합니다."""
+        from io import BytesIO
+
+        from PIL import Image
+
+        from user.tasks import process_profile_image
+
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera Maker'
+
+        buffer = BytesIO()
+        Image.new('RGB', (600, 800)).save(buffer, format='JPEG', exif=exif)
+
+        (storage, stack) = self.patch_profile_image_storage()
+
+        with stack:
+            args = self.upload_profile_image(buffer.getvalue())
+
+            # 처리가 끝나기 전에는 원본을 프로필 이미지로 사용하지 않아야 함
+            user = User.objects.get(id=self.user1.id)
+            self.assertFalse(user.profile_image)
+            self.assertEqual(user.profile_image_source.name, args[1])
+            self.assertIsNone(user.profile_image_url)
+
+            process_profile_image(*args)
+
+            user = User.objects.get(id=self.user1.id)
+
+            self.assertEqual(user.profile_image_derivatives['status'], 'ready')
+            self.assertEqual(user.get_profile_image_url(160), f'derivatives/{user.profile_image.name[:-4]}/160.jpg')
+            self.assertFalse(user.profile_image_source)
+            self.assertFalse(storage.exists(args[1]))
+
+            with storage.open(user.profile_image.name) as file:
+                self.assertEqual(dict(Image.open(file).getexif()), {})
+
+    def test_failed_profile_image_keeps_previous_image(self):
+        """처리에 실패하면 원본을 정리하고 기존 프로필 이미지를 유지해야 합니다."""
+        from io import BytesIO
+
+        from PIL import Image
+
+        from user.tasks import process_profile_image
+
+        buffer = BytesIO()
+        Image.new('RGB', (600, 800)).save(buffer, format='PNG')
+
+        (storage, stack) = self.patch_profile_image_storage()
+
+        with stack:
+            process_profile_image(*self.upload_profile_image(buffer.getvalue(), 'photo.png', 'image/png'))
+            previous = User.objects.get(id=self.user1.id).profile_image.name
+
+            # 헤더만 올바른 (손상된) 이미지
+            args = self.upload_profile_image(buffer.getvalue()[:100], 'photo.png', 'image/png')
+            process_profile_image(*args)
+
+            user = User.objects.get(id=self.user1.id)
+            self.assertEqual(user.profile_image.name, previous)
+            self.assertFalse(user.profile_image_source)
+            self.assertFalse(storage.exists(args[1]))
+
+            # 재시도 횟수 초과 / 예상하지 못한 오류도 원본을 정리해야 함
+            args = self.upload_profile_image(buffer.getvalue(), 'photo.png', 'image/png')
+
+            with patch('user.tasks.build_derivatives', side_effect=RuntimeError('unexpected')):
+                process_profile_image.apply(args=args)
+
+            user = User.objects.get(id=self.user1.id)
+            self.assertEqual(user.profile_image.name, previous)
+            self.assertFalse(user.profile_image_source)
+            self.assertFalse(storage.exists(args[1]))
+
 class UserLikeTests(TestCase):
     def setUp(self):
         self.user1 = create_test_user(1)
@@ -58,6 +58,71 @@ class PublicUserViewSetTests(APITestCase):
         self.assertIn('free_coins', response.data)
         self.assertIn('paid_coins', response.data)
 
+    def test_get_self_not_modified(self):
+        """If-None-Match가 ETag와 같으면 304를, 정보가 바뀌면 새 응답을 반환하는지 테스트"""
+        request = self.factory.get('/')
+        force_authenticate(request, user=self.user, token=self.session)
+        response = self.view(request)
+
+        etag = response['ETag']
+
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.user, token=self.session)
+
+        with patch('user.views.PublicSelfUserSerializer') as mock_serializer:
+            response = self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        mock_serializer.assert_not_called()
+
+        self.user.display_name = 'Changed User'
+        self.user.save()
+
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.user, token=self.session)
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['display_name'], 'Changed User')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_phone_number_reassignment_changes_etag(self):
+        """다른 사용자가 같은 휴대폰 번호를 인증해서 번호가 지워지면, 기존 사용자의 ETag가 바뀌는지 테스트"""
+        from django.core.cache import cache
+
+        self.user.phone_number = '+821012345678'
+        self.user.save()
+
+        request = self.factory.get('/')
+        force_authenticate(request, user=self.user, token=self.session)
+        etag = self.view(request)['ETag']
+
+        other_user = User.objects.create_user(username='otheruser', display_name='Other User', password='testpassword')
+        cache.set(f'fz:phone_verification:{other_user.id}', {'country_code': 'KR', 'private_data': None})
+
+        complete_view = PublicUserViewSet.as_view({'post': 'complete_phone_verification'})
+        request = self.factory.post('/', {
+            'verification_code': '000000',
+            'encrypted_payload': None,
+            'payload_hmac': None,
+        }, format='json')
+        force_authenticate(request, user=other_user)
+
+        with patch('user.verification.logics.complete_phone_verification', return_value={'phone_number': '+821012345678'}):
+            response = complete_view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.phone_number)
+
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.user, token=self.session)
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
     def test_set_apns_token(self):
         """APNS 토큰 설정 테스트"""
         data = {'apns_token': 'new_test_token'}
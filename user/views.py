@@ -19,11 +19,15 @@ from rest_framework.decorators import action, throttle_classes
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 
+from card.counters import card_counter_buffer, FAVORITE_COUNT
+from card.inbox import distribution_inbox
 from card.models import CardDistribution, CardFavoriteItem
 from flitz.thumbgen import generate_thumbnail
 from flitz.turnstile import validate_turnstile
 from flitz.utils.aligo_sms import AligoSMS
-from messaging.models import DirectMessageConversation
+from messaging.membership import conversation_membership
+from messaging.models import DirectMessageConversation, DirectMessageInboxEntry
+from messaging.tasks import refresh_inbox_peer_snapshots
 from safety.models import UserWaveSafetyZone, UserBlock
 from safety.serializers import UserWaveSafetyZoneSerializer
 from safety.utils.phone_number import normalize_phone_number, to_local_phone_number
@@ -36,7 +40,9 @@ from user.serializers import PublicUserSerializer, PublicSelfUserSerializer, Sel
     UserStartPhoneVerificationSerializer, UserCompletePhoneVerificationSerializer, UsernameAvailabilitySerializer, \
     ResetPasswordRequestSerializer, ResetPasswordConfirmSerializer
 
+from flitz.conditional import make_etag, conditional_response
 from flitz.exceptions import UnsupportedOperationException
+from flitz.storage import default_url_builder
 from flitz.tasks import post_slack_message
 from user.tasks import execute_deletion_phase, send_templated_email
 from user.throttling import UserEmailRateThrottle
@@ -44,6 +50,7 @@ from user.verification.errors import AdultVerificationError
 from user.verification.logics import CompletePhoneVerificationArgs
 from user_auth.authentication import UserRegistrationSessionAuthentication
 from user_auth.models import UserSession
+from user_auth.session_cache import session_cache
 
 # Create your views here.
 
@@ -91,9 +98,12 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_self(self, request, *args, **kwargs):
         user = self.request.user
-        serializer = PublicSelfUserSerializer(user)
 
-        return Response(serializer.data)
+        # 응답에 포함되는 값은 모두 User row에 있으므로 updated_at으로 충분합니다
+        # (온라인 상태는 요청한 사용자 자신이므로 항상 online, fuzzy_distance는 항상 nearest입니다)
+        etag = make_etag('users/self', user.id, user.updated_at, default_url_builder().url_epoch())
+
+        return conditional_response(request, etag, lambda: Response(PublicSelfUserSerializer(user).data))
 
     def patch_self(self, request, *args, **kwargs):
         user = self.request.user
@@ -101,6 +111,10 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+
+            # 상대방들의 대화 목록에 저장된 표시 정보 (이름 등)를 갱신합니다
+            refresh_inbox_peer_snapshots.delay_on_commit(str(user.id))
+
             return Response(serializer.data)
         else:
             return Response(serializer.errors, status=400)
@@ -257,6 +271,7 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
         user: User = self.request.user
 
         file: UploadedFile = request.data['file']
+        # 대화 목록의 프로필 이미지는 처리가 끝난 후 (process_profile_image) 갱신됩니다
         user.set_profile_image(file)
 
         serializer = PublicSelfUserSerializer(user)
@@ -447,9 +462,10 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
             ).exists():
                 # 헉, 이미 사용 중인 번호네?
 
+                # update()는 auto_now를 적용하지 않으므로, users/self의 ETag가 바뀌도록 updated_at을 직접 갱신합니다
                 User.objects.filter(
                     phone_number=response['phone_number']
-                ).update(phone_number=None)
+                ).update(phone_number=None, updated_at=timezone.now())
 
             user.country = context['country_code']
             user.phone_number = response['phone_number']
@@ -498,19 +514,36 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
 
             UserMatch.delete_match(user, target_user)
 
-            DirectMessageConversation.objects.filter(
+            conversations = DirectMessageConversation.objects.filter(
                 participants__user=user
             ).filter(
                 participants__user=target_user
-            ).distinct().update(
+            ).distinct()
+
+            conversation_ids = list(conversations.values_list('id', flat=True))
+            conversation_membership.invalidate_on_commit(conversation_ids)
+
+            DirectMessageConversation.objects.filter(id__in=conversation_ids).update(
                 deleted_at=now,
             )
 
+            DirectMessageInboxEntry.remove_conversations(conversation_ids)
+
+            # inbox를 다시 만드는 중에 커밋되어도 반영되도록 updated_at을 갱신합니다 (DistributionInbox.rebuild() 참고)
             CardDistribution.objects.filter(card__user=target_user, user=user).update(
                 deleted_at=now,
+                updated_at=now,
+            )
+            distribution_inbox.invalidate_on_commit(user.id)
+
+            favorite_items = CardFavoriteItem.objects.filter(card__user=target_user, user=user)
+
+            card_counter_buffer.record(
+                favorite_items.filter(deleted_at=None).values_list('card_id', flat=True),
+                FAVORITE_COUNT, -1
             )
 
-            CardFavoriteItem.objects.filter(card__user=target_user, user=user).update(
+            favorite_items.update(
                 deleted_at=now,
             )
 
@@ -603,6 +636,8 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
                 user.deletion_phase_scheduled_at = timezone.now()
                 user.save()
 
+                session_cache.invalidate_user_on_commit(user.id)
+
             execute_deletion_phase.delay(user.id)
 
         except serializers.ValidationError as e:
@@ -846,10 +881,12 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
 
                     # TODO: 이 부분은 추후에 휴대폰 번호 변경 기능이 생기면, 변경 기능에도 동일하게 적용해야 함
                     # TODO: 기존 사용자에겐 휴대폰 번호를 다시 인증 받기 전까진 앱을 사용할 수 없도록 해야 함
+                    # update()는 auto_now를 적용하지 않으므로, users/self의 ETag가 바뀌도록 updated_at을 직접 갱신합니다
                     User.objects.filter(
                         phone_number=context.phone_number
                     ).update(
-                        phone_number=None
+                        phone_number=None,
+                        updated_at=timezone.now()
                     )
                 else:
                     return Response({
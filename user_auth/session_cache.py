@@ -0,0 +1,74 @@
+import time
+from typing import Iterable, Optional, TypedDict
+
+from django.core.cache import cache, BaseCache
+from django.db import transaction
+
+from user_auth.models import UserSession
+
+# 유효한 세션의 (사용자 ID, 만료 시각)을 캐시에 저장해 두고, WebSocket 연결처럼 자주 반복되는 인증에서 DB 조회 없이 사용합니다.
+#
+# 세션을 무효화하거나 사용자를 비활성화하는 곳에서는 invalidate_*()로 캐시를 지워야 합니다.
+# (지우지 못하더라도 TIMEOUT이 지나면 DB에서 다시 확인합니다)
+
+
+class CachedSession(TypedDict):
+    user_id: str
+
+    # 만료 시각 (UNIX timestamp), 만료되지 않는 세션이라면 None
+    expires_at: Optional[float]
+
+
+class SessionCache:
+    TIMEOUT = 60 * 5
+
+    def __init__(self, backend: BaseCache = cache, prefix: str = 'fz:session'):
+        self.backend = backend
+        self.prefix = prefix
+
+    def key(self, session_id) -> str:
+        return f'{self.prefix}:{session_id}'
+
+    @staticmethod
+    def valid_sessions():
+        """
+        인증에 사용할 수 있는 세션들입니다. (UserSessionAuthentication과 같은 조건)
+        """
+
+        return UserSession.objects.filter(invalidated_at__isnull=True, user__disabled_at__isnull=True)
+
+    @staticmethod
+    def entry(user_id, expires_at) -> CachedSession:
+        return CachedSession(
+            user_id=str(user_id),
+            expires_at=expires_at.timestamp() if expires_at is not None else None
+        )
+
+    @staticmethod
+    def is_expired(entry: CachedSession) -> bool:
+        return entry['expires_at'] is not None and entry['expires_at'] < time.time()
+
+    def set(self, session_id, entry: CachedSession):
+        timeout = self.TIMEOUT
+
+        if entry['expires_at'] is not None:
+            # 세션이 만료된 뒤에는 캐시에 남아 있지 않도록 합니다
+            timeout = min(timeout, max(int(entry['expires_at'] - time.time()), 1))
+
+        self.backend.set(self.key(session_id), entry, timeout=timeout)
+
+    def invalidate(self, session_ids: Iterable):
+        self.backend.delete_many([self.key(session_id) for session_id in session_ids])
+
+    def invalidate_user(self, user_id):
+        """
+        사용자의 모든 세션을 캐시에서 지웁니다.
+        """
+
+        self.invalidate(UserSession.objects.filter(user_id=user_id).values_list('id', flat=True))
+
+    def invalidate_user_on_commit(self, user_id):
+        transaction.on_commit(lambda: self.invalidate_user(user_id))
+
+
+session_cache = SessionCache()
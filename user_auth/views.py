@@ -11,6 +11,7 @@ from django.utils import timezone
 from flitz.turnstile import validate_turnstile
 from user.models import User
 from user_auth.models import UserSession
+from user_auth.session_cache import session_cache
 from user_auth.serializers import TokenRequestSerializer, TokenRefreshRequestSerializer
 
 
@@ -56,6 +57,7 @@ def request_token(request: HttpRequest):
             UserSession.objects.filter(
                 user=user, invalidated_at__isnull=True
             ).update(invalidated_at=timezone.now())
+            session_cache.invalidate_user_on_commit(user.id)
 
             # create session
             session = UserSession.objects.create(